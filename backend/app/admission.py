@@ -0,0 +1,270 @@
+"""Admission control for the LLM-backed endpoints.
+
+Each caller is identified by the first configured identity header present
+(``X-Judge-Id``, ``X-User-Id``, sent by the frontend from the judge/user it
+acts as) or, failing that, by client address.  The client address is the
+peer address, or the nearest untrusted ``X-Forwarded-For`` hop when the peer
+is one of ``trusted_proxies``.  A request is admitted in two steps:
+
+1. the caller's token bucket (``rate`` tokens per second up to ``burst``)
+   must hold the endpoint's ``cost``, and so must the bucket of its client
+   address (``address_rate``/``address_burst``), which every identity sent
+   from that address shares, so inventing identities does not buy tokens;
+   otherwise it is rejected at once with 429 and a ``Retry-After`` telling
+   when the buckets will have refilled;
+2. it takes one of the model's ``model_concurrency`` slots.  When all are
+   busy it waits in that model's queue, which is served by start-time fair
+   queuing: a request starts at ``max(virtual time, the caller's previous
+   finish)`` and finishes ``cost / weight`` later; the smallest start goes
+   next, so a caller flooding the queue only delays its own requests.  A full
+   queue (``max_queue``) or a wait longer than ``queue_timeout`` sheds the
+   request with 429.
+
+Limits come from the ``admission`` block of ``policy.yaml``.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import ipaddress
+import itertools
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+
+from app.observability import metrics
+
+DEFAULT_IDENTITY_HEADERS = {"x-judge-id": "judge", "x-user-id": "user"}
+
+
+def _reject(reason: str, detail: str, retry_after: float) -> HTTPException:
+    metrics.inc(f"admission.rejected.{reason}")
+    return HTTPException(
+        status_code=429,
+        detail=detail,
+        headers={"Retry-After": str(max(math.ceil(retry_after), 1))},
+    )
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float, now: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, cost: float, now: float) -> float:
+        """Take ``cost`` tokens; returns 0 or the seconds until they are available."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        if self.rate <= 0:
+            return math.inf
+        return (cost - self.tokens) / self.rate
+
+    def refund(self, cost: float) -> None:
+        self.tokens = min(self.burst, self.tokens + cost)
+
+
+class ModelGate:
+    """Concurrency cap for one model with a start-time fair queue in front."""
+
+    def __init__(self, name: str, limit: int, max_queue: int, queue_timeout: float) -> None:
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.inflight = 0
+        self._queue: List[Tuple[float, int, asyncio.Future]] = []
+        self._queued = 0
+        self._seq = itertools.count()
+        self._vtime = 0.0
+        self._tags: Dict[str, float] = {}
+        metrics.set_gauge(f"admission.{name}.inflight", lambda: self.inflight)
+        metrics.set_gauge(f"admission.{name}.queued", lambda: self._queued)
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    def _tag(self, user: str, cost: float, weight: float) -> float:
+        """Start tag of a new request by ``user``; advances the user's finish tag."""
+        start = max(self._vtime, self._tags.get(user, 0.0))
+        self._tags[user] = start + cost / weight
+        if len(self._tags) > 4 * (self.limit + self.max_queue) + 64:
+            # Tags at or behind virtual time no longer change anything.
+            self._tags = {u: t for u, t in self._tags.items() if t > self._vtime}
+        return start
+
+    async def acquire(self, user: str, cost: float = 1.0, weight: float = 1.0) -> float:
+        """Wait for a slot; returns the milliseconds spent queued."""
+        if self.inflight < self.limit and not self._queued:
+            self.inflight += 1
+            self._vtime = self._tag(user, cost, weight)
+            return 0.0
+        if self._queued >= self.max_queue:
+            raise _reject("queue_full", f"{self.name} queue is full", self.queue_timeout)
+        tag = self._tag(user, cost, weight)
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (tag, next(self._seq), waiter))
+        self._queued += 1
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over as the wait ended; give it back.
+                self.release()
+            else:
+                waiter.cancel()
+                self._queued -= 1
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+            raise _reject("deadline", f"{self.name} queue wait exceeded {self.queue_timeout:g}s", self.queue_timeout) from exc
+        return (time.perf_counter() - start) * 1000
+
+    def release(self) -> None:
+        """Hand the slot to the smallest queued tag, or free it."""
+        while self._queue:
+            tag, _, waiter = heapq.heappop(self._queue)
+            if waiter.cancelled():
+                continue
+            self._queued -= 1
+            self._vtime = tag
+            waiter.set_result(None)
+            return
+        self.inflight -= 1
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        enabled: bool = True,
+        rate: float = 0.5,
+        burst: float = 10,
+        costs: Optional[Dict[str, float]] = None,
+        weights: Optional[Dict[str, float]] = None,
+        user_weights: Optional[Dict[str, float]] = None,
+        identity_headers: Optional[Dict[str, str]] = None,
+        model_concurrency: Optional[Dict[str, int]] = None,
+        max_queue: int = 64,
+        queue_timeout: float = 20.0,
+        max_users: int = 10000,
+        address_rate: float = 2.0,
+        address_burst: float = 40,
+        trusted_proxies: Optional[Sequence[str]] = None,
+    ) -> None:
+        self.enabled = enabled
+        self.rate = rate
+        self.burst = burst
+        self.address_rate = address_rate
+        self.address_burst = address_burst
+        self.trusted_proxies = [ipaddress.ip_network(p, strict=False) for p in trusted_proxies or ()]
+        self.costs = costs or {}
+        self.weights = {"judge": 1.0, "user": 1.0, "anonymous": 1.0, **(weights or {})}
+        self.user_weights = user_weights or {}
+        headers = identity_headers if identity_headers is not None else DEFAULT_IDENTITY_HEADERS
+        self.identity_headers = {k.lower(): v for k, v in headers.items()}
+        self.model_concurrency = {"default": 4, **(model_concurrency or {})}
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_users = max_users
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._gates: Dict[str, ModelGate] = {}
+        metrics.set_gauge("admission.users", lambda: len(self._buckets))
+
+    @classmethod
+    def from_policy(cls, policy: Dict[str, Any]) -> "AdmissionController":
+        """Build from the ``admission`` block of ``policy.yaml``."""
+        return cls(**(policy.get("admission") or {}))
+
+    def _trusted(self, host: str) -> bool:
+        try:
+            addr = ipaddress.ip_address(host.strip())
+        except ValueError:
+            return False
+        return any(addr in net for net in self.trusted_proxies)
+
+    def client_address(self, headers: Any, peer: Optional[str]) -> str:
+        """Client address, honouring ``X-Forwarded-For`` only from trusted proxies."""
+        host = peer or "unknown"
+        if not self.trusted_proxies or not self._trusted(host):
+            return host
+        hops = [h.strip() for h in (headers.get("x-forwarded-for") or "").split(",") if h.strip()]
+        # Walk back from the peer: the first hop not added by our own proxies
+        # is the client; anything further left is client-supplied.
+        for hop in reversed(hops):
+            if not self._trusted(hop):
+                return hop
+            host = hop
+        return host
+
+    def identify(self, headers: Any, client_host: Optional[str]) -> Tuple[str, float]:
+        """``(caller key, weight)`` for a request from ``client_host``."""
+        for header, kind in self.identity_headers.items():
+            value = headers.get(header)
+            if value:
+                key = f"{kind}:{value}"
+                break
+        else:
+            kind, key = "anonymous", f"anonymous:{client_host or 'unknown'}"
+        return key, float(self.user_weights.get(key, self.weights.get(kind, 1.0)))
+
+    def gate(self, model: str) -> ModelGate:
+        gate = self._gates.get(model)
+        if gate is None:
+            limit = int(self.model_concurrency.get(model, self.model_concurrency["default"]))
+            gate = self._gates[model] = ModelGate(model, limit, self.max_queue, self.queue_timeout)
+        return gate
+
+    def _bucket(self, key: str, now: float, rate: float, burst: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(rate, burst, now)
+            while len(self._buckets) > self.max_users:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    @asynccontextmanager
+    async def admit(self, request: Any, endpoint: str, model: str) -> AsyncIterator[None]:
+        """Hold a ``model`` slot for one ``endpoint`` call, raising 429 when shed."""
+        if not self.enabled:
+            yield
+            return
+        client = self.client_address(request.headers, request.client.host if request.client else None)
+        user, weight = self.identify(request.headers, client)
+        cost = float(self.costs.get(endpoint, 1.0))
+        now = time.monotonic()
+        buckets = [self._bucket(user, now, self.rate, self.burst)]
+        if not user.startswith("anonymous:"):
+            buckets.append(self._bucket(f"address:{client}", now, self.address_rate, self.address_burst))
+        taken: List[TokenBucket] = []
+        for bucket in buckets:
+            wait = bucket.take(cost, now)
+            if wait:
+                for earlier in taken:
+                    earlier.refund(cost)
+                raise _reject("rate_limited", "Rate limit exceeded", wait if math.isfinite(wait) else self.queue_timeout)
+            taken.append(bucket)
+        gate = self.gate(model)
+        try:
+            queued_ms = await gate.acquire(user, cost, weight)
+        except HTTPException:
+            # Shedding is on us, not the caller: keep their tokens.
+            for bucket in taken:
+                bucket.refund(cost)
+            raise
+        metrics.inc(f"admission.admitted.{endpoint}")
+        metrics.observe(f"admission.{model}.queue_ms", queued_ms)
+        try:
+            yield
+        finally:
+            gate.release()
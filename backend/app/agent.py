@@ -1,19 +1,34 @@
 from __future__ import annotations
-"""LangChain agent utilities for question routing and retries."""
+"""LangChain agent utilities for question routing and retries.
 
-from typing import Callable
+LangChain is imported on first use so that processes which never run the
+agent (e.g. judging-only workers) do not pay for it.
+"""
 
-from langchain.agents import AgentExecutor, AgentType, Tool, initialize_agent
-from langchain_community.llms import Ollama
-from langchain.output_parsers import PydanticOutputParser
-from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_fixed
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, Callable
+
+from tenacity import (
+    AsyncRetrying,
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_fixed,
+)
 from pydantic import ValidationError
-from app.observability import span
+from app.observability import metrics, span
 
 from app.rag import RagService
 from app.schemas import AgentAnswer
 from app.core.config import ModelsConfig, load_config
 
+if TYPE_CHECKING:
+    from langchain.agents import AgentExecutor
+    from langchain.output_parsers import PydanticOutputParser
+
 
 def _rag_tool_factory(rag: RagService) -> Callable[[str], str]:
     """Create a tool function querying the ``RagService``."""
@@ -25,9 +40,22 @@ def _rag_tool_factory(rag: RagService) -> Callable[[str], str]:
     return _rag_query
 
 
+def _async_rag_tool_factory(rag: RagService) -> Callable[[str], Awaitable[str]]:
+    """Create an async tool function querying the ``RagService``."""
+
+    async def _rag_aquery(question: str) -> str:
+        result = await rag.aquery(question)
+        return result["answer"]
+
+    return _rag_aquery
+
+
 def build_agent(rag: RagService, models: ModelsConfig | None = None) -> AgentExecutor:
     """Return an agent with RAG and free-form chat tools.
 
+    Every tool has a sync ``func`` and an async ``coroutine`` so the agent
+    can run via ``run``/``invoke`` as well as ``ainvoke``.
+
     Parameters
     ----------
     rag:
@@ -36,13 +64,17 @@ def build_agent(rag: RagService, models: ModelsConfig | None = None) -> AgentExe
         Model configuration loaded from ``models.yaml``. If ``None`` the
         configuration is loaded on demand.
     """
+    from langchain.agents import AgentType, Tool, initialize_agent
+    from langchain_ollama import OllamaLLM
+
     if models is None:
         models = load_config().models
-    llm = Ollama(base_url=models.base_url, model=models.model)
+    llm = OllamaLLM(base_url=models.base_url, model=models.model)
     tools = [
         Tool(
             name="rag_search",
             func=_rag_tool_factory(rag),
+            coroutine=_async_rag_tool_factory(rag),
             description=(
                 "Search expert and evaluation documents to answer domain questions."
             ),
@@ -50,14 +82,19 @@ def build_agent(rag: RagService, models: ModelsConfig | None = None) -> AgentExe
         Tool(
             name="free_chat",
             func=llm.invoke,
+            coroutine=llm.ainvoke,
             description="General chat without document lookup.",
         ),
     ]
     return initialize_agent(tools, llm, agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION, handle_parsing_errors=True)
 
 
-parser = PydanticOutputParser(pydantic_object=AgentAnswer)
-FORMAT_INSTRUCTIONS = parser.get_format_instructions()
+@lru_cache
+def get_parser() -> PydanticOutputParser:
+    """Return the shared ``AgentAnswer`` output parser, built on first use."""
+    from langchain.output_parsers import PydanticOutputParser
+
+    return PydanticOutputParser(pydantic_object=AgentAnswer)
 
 
 @retry(
@@ -69,6 +106,60 @@ FORMAT_INSTRUCTIONS = parser.get_format_instructions()
 def run_agent(agent: AgentExecutor, question: str) -> AgentAnswer:
     """Execute ``agent`` with structured output parsing and retries."""
     with span("agent.run"):
-        prompt = f"{question}\n{FORMAT_INSTRUCTIONS}"
+        parser = get_parser()
+        prompt = f"{question}\n{parser.get_format_instructions()}"
         output = agent.run(prompt)
         return parser.parse(output)
+
+
+async def arun_agent(agent: AgentExecutor, question: str) -> AgentAnswer:
+    """Async variant of :func:`run_agent`; retries sleep without blocking."""
+    async for attempt in AsyncRetrying(
+        reraise=True,
+        stop=stop_after_attempt(3),
+        wait=wait_fixed(1),
+        retry=retry_if_exception_type(ValidationError),
+    ):
+        with attempt:
+            with span("agent.arun"):
+                parser = get_parser()
+                prompt = f"{question}\n{parser.get_format_instructions()}"
+                result = await agent.ainvoke({"input": prompt})
+                return parser.parse(result["output"])
+
+
+class AgentBusyError(RuntimeError):
+    """Raised when no agent slot frees up within the queue timeout."""
+
+
+class AgentLimiter:
+    """Bound concurrent agent runs so agent load cannot starve other endpoints."""
+
+    def __init__(self, max_concurrency: int = 4, queue_timeout: float = 30.0) -> None:
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._inflight = 0
+        self._waiting = 0
+        metrics.set_gauge("agent.inflight", lambda: self._inflight)
+        metrics.set_gauge("agent.waiting", lambda: self._waiting)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one agent slot, raising :class:`AgentBusyError` on timeout."""
+        start = time.perf_counter()
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError as exc:
+            metrics.inc("agent.rejected")
+            raise AgentBusyError("Agent capacity exhausted") from exc
+        finally:
+            self._waiting -= 1
+        metrics.observe("agent.queue_ms", (time.perf_counter() - start) * 1000)
+        self._inflight += 1
+        try:
+            yield
+        finally:
+            self._inflight -= 1
+            self._semaphore.release()
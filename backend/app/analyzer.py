@@ -0,0 +1,330 @@
+"""Deterministic image checks backing ``/analyze``.
+
+Everything here is plain NumPy over a downsized luminance/RGB array, cheap
+enough to run on every submission without a model call:
+
+* text-region heuristics: tiles with dense, high-amplitude edges,
+* WCAG 2.x contrast per text tile (5th/95th luminance percentiles as
+  background/foreground), grouped into regions below the AA threshold,
+* dominant palette compared against the submitted ``meta.colors``,
+* whitespace share and left-margin alignment of content rows.
+
+:func:`analyze_image` returns :class:`AnalysisResult` with findings in the
+``AnalyzeFinding`` shape and a ``checks`` summary keyed by rubric
+``required_checks`` names (``color_contrast``).
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from app.imaging import open_image
+
+ANALYZER_VERSION = "heuristic_analyzer_v1"
+# WCAG 2.x AA minimum for normal / large text.
+AA_NORMAL = 4.5
+AA_LARGE = 3.0
+HEX_RE = re.compile(r"^#?([0-9a-fA-F]{6})$")
+
+# sRGB -> linear lookup table for 8-bit channels.
+_C = np.arange(256, dtype=np.float32) / 255.0
+_LINEAR = np.where(_C <= 0.04045, _C / 12.92, ((_C + 0.055) / 1.055) ** 2.4).astype(np.float32)
+# Per-channel tables with the luminance weights folded in.
+_LUM_R, _LUM_G, _LUM_B = (_LINEAR * w for w in (0.2126, 0.7152, 0.0722))
+
+
+@dataclass
+class AnalysisResult:
+    findings: List[Dict[str, Any]] = field(default_factory=list)
+    checks: Dict[str, Any] = field(default_factory=dict)
+    metrics: Dict[str, Any] = field(default_factory=dict)
+
+
+def load_rgb(content: bytes, max_side: int = 960) -> np.ndarray:
+    """Decode ``content`` to an ``HxWx3`` uint8 array no larger than ``max_side``.
+
+    JPEGs are decoded at a reduced DCT scale (``draft``), which is what keeps
+    4K posters cheap: a 2160x3840 poster decodes straight to 540x960.
+    """
+    from PIL import Image, ImageOps
+
+    with open_image(content) as img:
+        scale = min(1.0, max_side / max(img.size))
+        img.draft("RGB", (int(img.size[0] * scale), int(img.size[1] * scale)))
+        img = ImageOps.exif_transpose(img).convert("RGB")
+        if max(img.size) > max_side:
+            img.thumbnail((max_side, max_side), Image.Resampling.BILINEAR)
+        return np.asarray(img)
+
+
+def relative_luminance(rgb: np.ndarray) -> np.ndarray:
+    return _LUM_R[rgb[..., 0]] + _LUM_G[rgb[..., 1]] + _LUM_B[rgb[..., 2]]
+
+
+def contrast_ratio(l1: np.ndarray | float, l2: np.ndarray | float) -> np.ndarray | float:
+    hi, lo = np.maximum(l1, l2), np.minimum(l1, l2)
+    return (hi + 0.05) / (lo + 0.05)
+
+
+def parse_hex(color: str) -> Tuple[int, int, int] | None:
+    m = HEX_RE.match(color.strip())
+    if not m:
+        return None
+    v = m.group(1)
+    return int(v[0:2], 16), int(v[2:4], 16), int(v[4:6], 16)
+
+
+def to_hex(rgb: Sequence[int]) -> str:
+    return "#" + "".join(f"{int(c):02X}" for c in rgb)
+
+
+def _tiles(a: np.ndarray, tile: int) -> np.ndarray:
+    """Reshape a 2D array into ``(rows, cols, tile*tile)`` (edges cropped)."""
+    h, w = a.shape[0] // tile * tile, a.shape[1] // tile * tile
+    t = a[:h, :w].reshape(h // tile, tile, w // tile, tile).swapaxes(1, 2)
+    return t.reshape(h // tile, w // tile, tile * tile)
+
+
+def _components(mask: np.ndarray) -> List[List[Tuple[int, int]]]:
+    """4-connected components of a small boolean tile grid."""
+    seen = np.zeros_like(mask, dtype=bool)
+    comps = []
+    rows, cols = mask.shape
+    for r, c in zip(*np.nonzero(mask)):
+        if seen[r, c]:
+            continue
+        stack, comp = [(r, c)], []
+        seen[r, c] = True
+        while stack:
+            y, x = stack.pop()
+            comp.append((y, x))
+            for ny, nx in ((y - 1, x), (y + 1, x), (y, x - 1), (y, x + 1)):
+                if 0 <= ny < rows and 0 <= nx < cols and mask[ny, nx] and not seen[ny, nx]:
+                    seen[ny, nx] = True
+                    stack.append((ny, nx))
+        comps.append(comp)
+    return comps
+
+
+def _region(comp: List[Tuple[int, int]], tile: int, shape: Tuple[int, int]) -> Dict[str, float]:
+    ys = [p[0] for p in comp]
+    xs = [p[1] for p in comp]
+    h, w = shape
+    x0, y0 = int(min(xs)) * tile, int(min(ys)) * tile
+    x1, y1 = (int(max(xs)) + 1) * tile, (int(max(ys)) + 1) * tile
+    return {
+        "x": round(x0 / w, 4),
+        "y": round(y0 / h, 4),
+        "w": round((x1 - x0) / w, 4),
+        "h": round((y1 - y0) / h, 4),
+    }
+
+
+def dominant_colors(rgb: np.ndarray, k: int = 6, min_share: float = 0.02) -> List[Tuple[str, float]]:
+    """Return up to ``k`` dominant colors as ``(hex, share)`` from a 4-bit/channel histogram."""
+    q = (rgb[::2, ::2] >> 4).astype(np.int32)
+    codes = (q[..., 0] << 8) | (q[..., 1] << 4) | q[..., 2]
+    counts = np.bincount(codes.ravel(), minlength=4096)
+    total = counts.sum()
+    out = []
+    for code in np.argsort(counts)[::-1][:k]:
+        share = counts[code] / total
+        if share < min_share:
+            break
+        center = [((code >> s) & 0xF) * 16 + 8 for s in (8, 4, 0)]
+        out.append((to_hex(center), round(float(share), 4)))
+    return out
+
+
+def color_share(rgb: np.ndarray, color: Sequence[int], tolerance: int = 40) -> float:
+    """Share of pixels within ``tolerance`` (per channel) of ``color``."""
+    diff = np.abs(rgb[::2, ::2].astype(np.int16) - np.asarray(color, dtype=np.int16)).max(axis=2)
+    return float((diff <= tolerance).mean())
+
+
+def _color_distance(a: Sequence[int], b: Sequence[int]) -> float:
+    # "Redmean" weighted RGB distance: cheap and closer to perception than
+    # plain Euclidean.
+    rmean = (a[0] + b[0]) / 2
+    dr, dg, db = a[0] - b[0], a[1] - b[1], a[2] - b[2]
+    return float(np.sqrt((2 + rmean / 256) * dr * dr + 4 * dg * dg + (2 + (255 - rmean) / 256) * db * db))
+
+
+def _check_palette(result: AnalysisResult, rgb: np.ndarray, declared_colors: Sequence[str]) -> None:
+    """Dominant palette against the colors declared with the upload."""
+    h, w = rgb.shape[:2]
+    palette = dominant_colors(rgb)
+    result.metrics["palette"] = [{"color": c, "share": s} for c, s in palette]
+    declared = [c for c in (parse_hex(x) for x in declared_colors) if c]
+    if declared and palette:
+        pal_rgb = [parse_hex(c) for c, _ in palette]
+        # Declared colors only need to be present (text, logos), while
+        # large undeclared areas count against the palette.  Neutrals
+        # (white/grey/black backgrounds) are always allowed.
+        missing = [to_hex(d) for d in declared if color_share(rgb, d) < 0.001]
+        off = [
+            (c, s) for (c, s), p in zip(palette, pal_rgb)
+            if s >= 0.1 and max(p) - min(p) > 32 and min(_color_distance(p, d) for d in declared) > 90
+        ]
+        result.checks["palette"] = {"declared": [to_hex(d) for d in declared], "missing": missing,
+                                    "off_palette": [c for c, _ in off]}
+        if missing or off:
+            share = sum(s for _, s in off)
+            parts = []
+            if missing:
+                parts.append(f"Declared colors {', '.join(missing)} are not used")
+            if off:
+                parts.append(f"{share:.0%} of the area uses undeclared colors {', '.join(c for c, _ in off)}")
+            region = {"x": 0.0, "y": 0.0, "w": 1.0, "h": 1.0}
+            if off:
+                target = np.array(parse_hex(off[0][0]))
+                mask = (np.abs(rgb.astype(np.int16) - target).max(axis=2) <= 24)
+                ys, xs = np.nonzero(mask)
+                if ys.size:
+                    region = {
+                        "x": round(float(xs.min()) / w, 4),
+                        "y": round(float(ys.min()) / h, 4),
+                        "w": round(float(xs.max() - xs.min() + 1) / w, 4),
+                        "h": round(float(ys.max() - ys.min() + 1) / h, 4),
+                    }
+            result.findings.append({
+                "region": region,
+                "label": "Palette Deviation",
+                "confidence": round(min(0.9, 0.5 + share + 0.1 * len(missing)), 3),
+                "explanation": "; ".join(parts) + ".",
+            })
+
+
+def analyze_image(
+    content: bytes | None = None,
+    *,
+    rgb: np.ndarray | None = None,
+    declared_colors: Sequence[str] = (),
+    tile: int = 16,
+    max_side: int = 960,
+) -> AnalysisResult:
+    """Run all checks on an encoded image (``content``) or an RGB array."""
+    if rgb is None:
+        rgb = load_rgb(content, max_side)
+    result = AnalysisResult()
+    h, w = rgb.shape[:2]
+    if h < tile or w < tile:
+        # No whole tile to measure text, white space or alignment on.
+        result.metrics.update(text_share=None, whitespace_share=None, tiles=0)
+        result.checks["color_contrast"] = {
+            "passed": None,
+            "reason": f"image smaller than {tile}x{tile} px",
+            "min_ratio": None,
+            "text_blocks": 0,
+            "failing_regions": 0,
+            "threshold": AA_NORMAL,
+        }
+        _check_palette(result, rgb, declared_colors)
+        return result
+    lum = relative_luminance(rgb)
+
+    # Edge map from luminance gradients (gamma-encoded luma is closer to
+    # what strokes look like than linear luminance).
+    luma = rgb.astype(np.float32) @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    ex = np.zeros_like(luma, dtype=bool)
+    ey = np.zeros_like(luma, dtype=bool)
+    ex[:, 1:] = np.abs(np.diff(luma, axis=1)) > 40
+    ey[1:, :] = np.abs(np.diff(luma, axis=0)) > 40
+    ex_density = _tiles(ex, tile).mean(axis=2)
+    ey_density = _tiles(ey, tile).mean(axis=2)
+    density = _tiles(ex | ey, tile).mean(axis=2)
+
+    lt = _tiles(lum, tile)
+    n = lt.shape[2]
+    k5, k95 = int(0.05 * (n - 1)), int(0.95 * (n - 1))
+    part = np.partition(lt, (k5, k95), axis=2)
+    p5, p95 = part[..., k5], part[..., k95]
+    spread = np.std(_tiles(luma, tile), axis=2)
+    ratio = contrast_ratio(p95, p5)
+
+    # Text-like tiles: strokes in both directions (a straight shape border
+    # only has one), but not as dense as texture/photo noise.
+    text = (ex_density > 0.02) & (ey_density > 0.02) & (density > 0.06) & (density < 0.55) & (spread > 8)
+    # Faint text never produces strong edges; catch it by a weaker gradient.
+    faint = np.zeros_like(luma, dtype=bool)
+    faint[:, 1:] |= np.abs(np.diff(luma, axis=1)) > 12
+    faint_density = _tiles(faint, tile).mean(axis=2)
+    text |= (faint_density > 0.1) & (faint_density < 0.55) & (spread > 4) & (ratio < AA_NORMAL)
+    blank = (density < 0.01) & (spread < 6)
+
+    result.metrics.update(
+        text_share=round(float(text.mean()), 4),
+        whitespace_share=round(float(blank.mean()), 4),
+        tiles=int(text.size),
+    )
+
+    # --- WCAG contrast over text blocks ---
+    # Tiles at the edge of a glyph see little foreground, so a block is
+    # rated by its 90th percentile tile ratio.  Lines are joined into blocks
+    # by bridging one-tile vertical gaps.
+    bridged = text.copy()
+    bridged[1:-1] |= text[:-2] & text[2:]
+    blocks = []
+    for comp in _components(bridged):
+        comp = [p for p in comp if text[p]]
+        if len(comp) < 2:
+            continue
+        estimate = float(np.percentile([ratio[p] for p in comp], 90))
+        rows = {p[0] for p in comp}
+        # Blocks with few, tall rows hold large text (>= 18pt), which only
+        # needs 3:1; normalized to a 960px long side.
+        line_px = (max(rows) - min(rows) + 1) * tile / len(rows) * 960 / max(h, w)
+        threshold = AA_LARGE if line_px >= 40 else AA_NORMAL
+        blocks.append((comp, estimate, threshold))
+    failing = sorted((b for b in blocks if b[1] < b[2]), key=lambda b: len(b[0]), reverse=True)
+    for comp, estimate, threshold in failing[:5]:
+        severity = min(1.0, (threshold - estimate) / (threshold - 1.0))
+        coverage = min(1.0, len(comp) / 12)
+        result.findings.append({
+            "region": _region(comp, tile, (h, w)),
+            "label": "Low Contrast",
+            "confidence": round(0.5 + 0.3 * severity + 0.2 * coverage, 3),
+            "explanation": (
+                f"Estimated text contrast {estimate:.1f}:1 is below the WCAG AA "
+                f"minimum of {threshold:g}:1."
+            ),
+        })
+    result.checks["color_contrast"] = {
+        "passed": not failing if blocks else None,
+        "min_ratio": round(min(b[1] for b in blocks), 2) if blocks else None,
+        "text_blocks": len(blocks),
+        "failing_regions": len(failing),
+        "threshold": AA_NORMAL,
+    }
+
+    _check_palette(result, rgb, declared_colors)
+
+    # --- whitespace and alignment ---
+    content_tiles = ~blank
+    whitespace = float(blank.mean())
+    if whitespace < 0.1 and text.mean() > 0.2:
+        result.findings.append({
+            "region": {"x": 0.0, "y": 0.0, "w": 1.0, "h": 1.0},
+            "label": "Crowded Layout",
+            "confidence": round(0.5 + (0.1 - whitespace) * 3, 3),
+            "explanation": f"Only {whitespace:.0%} of the layout is empty space.",
+        })
+    starts = [int(np.argmax(row)) for row in content_tiles if row.any() and not row.all()]
+    if len(starts) >= 6:
+        values, counts = np.unique(starts, return_counts=True)
+        top = np.sort(counts)[::-1]
+        # Rows starting on the two most common columns (e.g. margin + gutter).
+        aligned = float(top[:2].sum() / len(starts))
+        result.metrics["left_alignment"] = round(aligned, 4)
+        if aligned < 0.5:
+            result.findings.append({
+                "region": {"x": 0.0, "y": 0.0, "w": round(float(values.max() + 1) * tile / w, 4), "h": 1.0},
+                "label": "Inconsistent Alignment",
+                "confidence": round(0.4 + (0.5 - aligned), 3),
+                "explanation": f"Content rows start on {len(values)} different columns; "
+                               f"only {aligned:.0%} share a common margin.",
+            })
+    return result
@@ -0,0 +1,494 @@
+"""Bulk submission import from manifests.
+
+A manifest is either ``{"submissions": [...]}`` like
+``seeds/submissions/demo_submissions.json``, a plain JSON list, or JSON
+Lines; each entry follows :class:`app.schemas.UploadRequest` plus an
+optional ``submission_id``.  Entries are streamed, never loaded at once.
+
+:class:`BulkImporter` fetches ``asset_url`` images with bounded concurrency
+and retries, runs them through the upload image pipeline (derivative,
+near-duplicate hashes) and writes the ``submissions`` rows, ledger
+``upload`` events and the import progress in one transaction per batch.
+Progress is the manifest position below which every entry is committed, so
+an interrupted import of the same manifest (identified by its SHA-256)
+resumes there.  Run from ``backend/``::
+
+    python -m app.bulk_import app/seeds/submissions/demo_submissions.json --project "KDA 2025"
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import datetime
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+import httpx
+from pydantic import ValidationError
+
+from app.imaging import DerivativeStore, InvalidImageError
+from app.ledger_codec import LedgerCodec
+from app.ledger_writer import LedgerEvent, insert_events
+from app.observability import metrics
+from app.phash import DuplicateIndex, compute_hashes
+from app.schemas import UploadRequest
+from app.warmup import jittered
+
+logger = logging.getLogger(__name__)
+
+# Same limit as /uploads.
+MAX_ASSET_BYTES = 2 * 1024 * 1024
+RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class AssetError(Exception):
+    """An entry that cannot be imported; retrying will not help."""
+
+
+def iter_manifest(path: Path, chunk_size: int = 1 << 16) -> Iterator[Dict[str, Any]]:
+    """Yield manifest entries in order while reading ``path`` incrementally."""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8-sig") as f:
+        buf = f.read(chunk_size)
+        head = buf.lstrip()
+        if head.startswith("{") and not path.suffix == ".jsonl":
+            # Skip to the first element of the "submissions" array.
+            while '"submissions"' not in buf:
+                more = f.read(chunk_size)
+                if not more:
+                    raise ValueError(f"{path}: no submissions array")
+                buf += more
+            buf = buf[buf.index('"submissions"') + len('"submissions"'):]
+            while not buf.lstrip(" \t\r\n:"):
+                more = f.read(chunk_size)
+                if not more:
+                    raise ValueError(f"{path}: no submissions array")
+                buf += more
+            buf = buf.lstrip(" \t\r\n:")
+            if not buf.startswith("["):
+                raise ValueError(f"{path}: no submissions array")
+            buf = buf[1:]
+        elif head.startswith("["):
+            buf = head[1:]
+        else:
+            # JSON Lines
+            for line in _lines(buf, f, chunk_size):
+                if line.strip():
+                    yield json.loads(line)
+            return
+        while True:
+            buf = buf.lstrip(" \t\r\n,")
+            if buf.startswith("]"):
+                return
+            try:
+                entry, end = decoder.raw_decode(buf)
+            except json.JSONDecodeError:
+                more = f.read(chunk_size)
+                if not more:
+                    raise ValueError(f"{path}: truncated manifest")
+                buf += more
+                continue
+            yield entry
+            buf = buf[end:]
+            if len(buf) < chunk_size:
+                buf += f.read(chunk_size)
+
+
+def _lines(buf: str, f, chunk_size: int) -> Iterator[str]:
+    while True:
+        *lines, buf = buf.split("\n")
+        yield from lines
+        more = f.read(chunk_size)
+        if not more:
+            yield buf
+            return
+        buf += more
+
+
+def manifest_key(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def sniff_image(content: bytes) -> str:
+    if content.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if content.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    raise AssetError("asset is not a JPEG or PNG image")
+
+
+@dataclass
+class Outcome:
+    position: int
+    submission_id: str
+    title: str
+    event: Optional[LedgerEvent] = None
+    error: Optional[str] = None
+
+
+class BulkImporter:
+    """Streams one manifest into the database; see the module docstring."""
+
+    def __init__(
+        self,
+        db_path: Path | str,
+        codec: LedgerCodec,
+        image_store: DerivativeStore,
+        duplicate_index: DuplicateIndex,
+        concurrency: int = 8,
+        retries: int = 3,
+        backoff: float = 0.5,
+        timeout: float = 30.0,
+        batch_size: int = 100,
+        max_bytes: int = MAX_ASSET_BYTES,
+        allow_local: bool = False,
+    ) -> None:
+        self.db_path = db_path
+        self.codec = codec
+        self.image_store = image_store
+        self.duplicate_index = duplicate_index
+        self.concurrency = max(1, concurrency)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.batch_size = max(1, batch_size)
+        self.max_bytes = max_bytes
+        self.allow_local = allow_local
+        # find+add must not interleave, or concurrent copies both miss.
+        self._hash_lock = threading.Lock()
+
+    # -- progress ---------------------------------------------------------
+
+    def start(self, manifest: Path, project: str) -> Tuple[str, int, int]:
+        """Register the import; returns ``(key, project_id, resume position)``."""
+        key = manifest_key(manifest)
+        now = _now()
+        conn = sqlite3.connect(self.db_path)
+        try:
+            row = conn.execute("SELECT project_id, position FROM bulk_imports WHERE manifest_key=?", (key,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE bulk_imports SET state='running', updated_at=? WHERE manifest_key=?", (now, key))
+                conn.commit()
+                return key, row[0], row[1]
+            found = conn.execute("SELECT id FROM projects WHERE name=? ORDER BY id LIMIT 1", (project,)).fetchone()
+            project_id = found[0] if found else conn.execute(
+                "INSERT INTO projects(name, created_at) VALUES(?, ?)", (project, now)
+            ).lastrowid
+            conn.execute(
+                "INSERT INTO bulk_imports(manifest_key, source, project_id, position, imported, failed, state, started_at, updated_at) "
+                "VALUES(?,?,?,0,0,0,'running',?,?)",
+                (key, str(manifest), project_id, now, now),
+            )
+            conn.commit()
+            return key, project_id, 0
+        finally:
+            conn.close()
+
+    def _commit(self, key: str, project_id: int, batch: List[Outcome], position: int) -> None:
+        ok = [o for o in batch if o.event is not None]
+        failed = [o for o in batch if o.event is None]
+        start = time.perf_counter()
+        conn = sqlite3.connect(self.db_path)
+        try:
+            for o in ok:
+                # The upload event links the ledger id to the project's row.
+                o.event.payload["project_id"] = project_id
+                o.event.payload["project_submission_id"] = conn.execute(
+                    "INSERT INTO submissions(project_id, title, created_at) VALUES(?,?,?)",
+                    (project_id, o.title, o.event.at),
+                ).lastrowid
+            insert_events(conn, self.codec, [o.event for o in ok])
+            conn.executemany(
+                "INSERT OR REPLACE INTO bulk_import_failures(manifest_key, position, submission_id, error) VALUES(?,?,?,?)",
+                [(key, o.position, o.submission_id, o.error) for o in failed],
+            )
+            conn.execute(
+                "UPDATE bulk_imports SET position=?, imported=imported+?, failed=failed+?, updated_at=? WHERE manifest_key=?",
+                (position, len(ok), len(failed), _now(), key),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        metrics.inc("bulk_import.imported", len(ok))
+        metrics.inc("bulk_import.failed", len(failed))
+        metrics.observe("bulk_import.batch_ms", (time.perf_counter() - start) * 1000)
+
+    def _finish(self, key: str, state: str) -> None:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute("UPDATE bulk_imports SET state=?, updated_at=? WHERE manifest_key=?", (state, _now(), key))
+            conn.commit()
+        finally:
+            conn.close()
+
+    # -- assets -----------------------------------------------------------
+
+    async def fetch(self, client: httpx.AsyncClient, url: str, base_dir: Path) -> Tuple[bytes, str]:
+        """Return ``(content, filename)``, retrying transient HTTP failures."""
+        parsed = urlparse(url)
+        if parsed.scheme in ("", "file"):
+            if not self.allow_local:
+                raise AssetError("local asset paths are not allowed")
+            path = base_dir / unquote(parsed.path if parsed.scheme else url)
+            try:
+                content = await asyncio.to_thread(path.read_bytes)
+            except OSError as exc:
+                raise AssetError(str(exc)) from exc
+            return self._check_size(content), path.name
+        if parsed.scheme not in ("http", "https"):
+            raise AssetError(f"unsupported asset URL scheme {parsed.scheme}")
+        name = Path(unquote(parsed.path)).name or None
+        for attempt in range(self.retries + 1):
+            try:
+                return await self._download(client, url), name
+            except (httpx.TransportError, _Retry) as exc:
+                if attempt == self.retries:
+                    raise AssetError(f"{url}: {exc or type(exc).__name__} after {attempt + 1} attempts") from exc
+                metrics.inc("bulk_import.retries")
+                await asyncio.sleep(jittered(self.backoff * 2 ** attempt, 0.25))
+        raise AssertionError("unreachable")
+
+    async def _download(self, client: httpx.AsyncClient, url: str) -> bytes:
+        async with client.stream("GET", url) as resp:
+            if resp.status_code in RETRY_STATUS:
+                raise _Retry(f"HTTP {resp.status_code}")
+            if resp.status_code >= 400:
+                raise AssetError(f"{url}: HTTP {resp.status_code}")
+            chunks, size = [], 0
+            async for chunk in resp.aiter_bytes():
+                size += len(chunk)
+                self._check_size(b"", size)
+                chunks.append(chunk)
+        return b"".join(chunks)
+
+    def _check_size(self, content: bytes, size: Optional[int] = None) -> bytes:
+        if (size if size is not None else len(content)) > self.max_bytes:
+            raise AssetError(f"asset larger than {self.max_bytes} bytes")
+        return content
+
+    def _pipeline(self, sid: str, content: bytes) -> Dict[str, Any]:
+        """Same processing as /uploads; returns the payload additions."""
+        sniff_image(content)
+        try:
+            derivative = self.image_store.ingest(content)
+        except InvalidImageError as exc:
+            raise AssetError(str(exc)) from exc
+        hashes = compute_hashes(content)
+        with self._hash_lock:
+            match = self.duplicate_index.find(hashes, with_submission=True)
+            self.duplicate_index.add(derivative.sha256, hashes, sid)
+        extra: Dict[str, Any] = {"image_sha256": derivative.sha256}
+        if match is not None and match.submission_id not in (None, sid):
+            extra["duplicate_of"] = match.submission_id
+            extra["duplicate_distance"] = match.phash_distance
+        return extra
+
+    async def process(self, client: httpx.AsyncClient, key: str, position: int, raw: Any, base_dir: Path) -> Outcome:
+        sid = (raw.get("submission_id") if isinstance(raw, dict) else None) or f"sub_import_{key[:8]}_{position}"
+        try:
+            entry = UploadRequest.model_validate(raw)
+        except ValidationError as exc:
+            return Outcome(position, sid, "", error=f"invalid entry: {exc.errors()[0]['msg']}")
+        payload: Dict[str, Any] = {"title": entry.title, "author_id": entry.author_id, "filename": None}
+        if entry.meta is not None:
+            payload["meta"] = entry.meta
+        image_b64 = None
+        try:
+            if entry.asset_url:
+                content, payload["filename"] = await self.fetch(client, entry.asset_url, base_dir)
+                payload.update(await asyncio.to_thread(self._pipeline, sid, content))
+                image_b64 = base64.b64encode(content).decode("utf-8")
+                payload["asset_url"] = entry.asset_url
+        except AssetError as exc:
+            return Outcome(position, sid, entry.title, error=str(exc))
+        payload["import"] = key
+        return Outcome(position, sid, entry.title, LedgerEvent("upload", sid, payload, image=image_b64))
+
+    # -- driver -----------------------------------------------------------
+
+    async def run(self, manifest: Path, project: str) -> Dict[str, Any]:
+        manifest = Path(manifest)
+        key, project_id, resume = await asyncio.to_thread(self.start, manifest, project)
+        base_dir = manifest.resolve().parent
+        todo: asyncio.Queue = asyncio.Queue(self.concurrency * 2)
+        done: asyncio.Queue = asyncio.Queue()
+        started = time.perf_counter()
+
+        async def produce() -> None:
+            async for position, entry in _aenumerate(manifest, resume):
+                await todo.put((position, entry))
+            for _ in range(self.concurrency):
+                await todo.put(None)
+
+        async def work(client: httpx.AsyncClient) -> None:
+            try:
+                while (item := await todo.get()) is not None:
+                    try:
+                        outcome = await self.process(client, key, item[0], item[1], base_dir)
+                    except Exception as exc:
+                        # e.g. a decompression bomb; record it rather than stall the import.
+                        logger.exception("Bulk import entry %s failed", item[0])
+                        outcome = Outcome(item[0], f"sub_import_{key[:8]}_{item[0]}", "", error=f"{type(exc).__name__}: {exc}")
+                    await done.put(outcome)
+            finally:
+                done.put_nowait(None)
+
+        limits = httpx.Limits(max_connections=self.concurrency)
+        async with httpx.AsyncClient(timeout=self.timeout, limits=limits, follow_redirects=True) as client:
+            tasks = [asyncio.create_task(produce())] + [asyncio.create_task(work(client)) for _ in range(self.concurrency)]
+            try:
+                imported, failed, position = await self._collect(done, tasks, key, project_id, resume)
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.to_thread(self._finish, key, "interrupted")
+                raise
+        await asyncio.to_thread(self._finish, key, "done")
+        summary = {
+            "manifest_key": key,
+            "project_id": project_id,
+            "resumed_from": resume,
+            "position": position,
+            "imported": imported,
+            "failed": failed,
+            "seconds": round(time.perf_counter() - started, 2),
+        }
+        logger.info("Bulk import %s: %s", key[:12], summary)
+        return summary
+
+    async def _collect(self, done: asyncio.Queue, tasks: List[asyncio.Task], key: str, project_id: int,
+                       position: int) -> Tuple[int, int, int]:
+        """Commit outcomes in manifest order, ``batch_size`` at a time."""
+        pending: Dict[int, Outcome] = {}
+        batch: List[Outcome] = []
+        imported = failed = 0
+        workers = self.concurrency
+        while workers:
+            outcome = await self._next(done, tasks)
+            if outcome is None:
+                workers -= 1
+            else:
+                pending[outcome.position] = outcome
+            while position in pending:
+                batch.append(pending.pop(position))
+                position += 1
+            if batch and (len(batch) >= self.batch_size or not workers):
+                await asyncio.to_thread(self._commit, key, project_id, batch, position)
+                imported += sum(o.event is not None for o in batch)
+                failed += sum(o.event is None for o in batch)
+                batch = []
+        return imported, failed, position
+
+
+    @staticmethod
+    async def _next(done: asyncio.Queue, tasks: List[asyncio.Task]) -> Optional[Outcome]:
+        """Next item of ``done``; raises as soon as a producer or worker task fails."""
+        getter = asyncio.ensure_future(done.get())
+        try:
+            while not getter.done():
+                live = [t for t in tasks if not t.done()]
+                await asyncio.wait([getter, *live], return_when=asyncio.FIRST_COMPLETED)
+                for task in tasks:
+                    if task.done() and not task.cancelled() and task.exception() is not None:
+                        raise task.exception()
+        finally:
+            getter.cancel()
+        return getter.result()
+
+
+class _Retry(Exception):
+    pass
+
+
+async def _aenumerate(manifest: Path, start: int) -> AsyncIterator[Tuple[int, Any]]:
+    """Manifest entries from ``start`` on, read in a thread a chunk at a time."""
+    entries = iter_manifest(manifest)
+    position = 0
+    while True:
+        chunk = await asyncio.to_thread(_take, entries, 256)
+        if not chunk:
+            return
+        for entry in chunk:
+            if position >= start:
+                yield position, entry
+            position += 1
+
+
+def _take(entries: Iterator[Any], n: int) -> List[Any]:
+    out = []
+    for entry in entries:
+        out.append(entry)
+        if len(out) == n:
+            break
+    return out
+
+
+def _now() -> str:
+    return datetime.datetime.utcnow().isoformat() + "Z"
+
+
+def importer_from_config(db_path: Path | str, codec: LedgerCodec, image_store: DerivativeStore,
+                         duplicate_index: DuplicateIndex, policy: Dict[str, Any], **overrides: Any) -> BulkImporter:
+    """Build a :class:`BulkImporter` from the ``bulk_import`` block of ``policy.yaml``."""
+    options = {**(policy.get("bulk_import") or {}), **{k: v for k, v in overrides.items() if v is not None}}
+    return BulkImporter(db_path, codec, image_store, duplicate_index, **options)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Command line entry point: ``python -m app.bulk_import``."""
+    from app.core.config import load_config
+    from app.core.paths import DB_PATH
+    from app.ledger_codec import load_ledger_codec
+    from app.main import init_db
+
+    parser = argparse.ArgumentParser(description="Import submissions from a manifest")
+    parser.add_argument("manifest", type=Path)
+    parser.add_argument("--project", required=True, help="Project name; created if missing")
+    parser.add_argument("--concurrency", type=int)
+    parser.add_argument("--retries", type=int)
+    parser.add_argument("--batch-size", type=int)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    config = load_config()
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        codec = load_ledger_codec(conn, config.ledger)
+    finally:
+        conn.close()
+    duplicates = config.policy.get("duplicates", {})
+    importer = importer_from_config(
+        DB_PATH,
+        codec,
+        DerivativeStore(DB_PATH, max_side=config.models.vision_max_side, quality=config.models.vision_jpeg_quality),
+        DuplicateIndex(
+            DB_PATH,
+            phash_threshold=int(duplicates.get("phash_threshold", 6)),
+            dhash_threshold=int(duplicates.get("dhash_threshold", 10)),
+        ),
+        config.policy,
+        concurrency=args.concurrency,
+        retries=args.retries,
+        batch_size=args.batch_size,
+        allow_local=True,
+    )
+    summary = asyncio.run(importer.run(args.manifest, args.project))
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@ from __future__ import annotations
 import os
 from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 import yaml
 from pydantic import BaseModel
@@ -12,18 +12,117 @@ from pydantic import BaseModel
 class ModelsConfig(BaseModel):
     base_url: str = "http://localhost:11434"
     model: str = "llama2"
+    # /rag-agent runs at most this many agents at once; extra requests wait
+    # up to agent_queue_timeout seconds before getting a 503.
+    agent_concurrency: int = 4
+    agent_queue_timeout: float = 30.0
+    # Keyword pre-router answering obvious RAG/chat questions without the
+    # ReAct loop; queries scoring below the threshold go to the agent.
+    router_enabled: bool = True
+    router_rag_threshold: float = 2.0
+    # Vision inputs are downsized to this longest side and re-encoded as JPEG
+    # before being sent to the vision model.
+    vision_model: str = "llava:7b"
+    vision_max_side: int = 672
+    vision_jpeg_quality: int = 85
+    vision_cache_size: int = 128
+    # After breaker_failure_threshold consecutive backend failures, model
+    # calls fail fast with 503 for breaker_reset_seconds; then one probe call
+    # decides whether the backend is back.
+    breaker_failure_threshold: int = 5
+    breaker_reset_seconds: float = 30.0
+    # With preload_models, these models are loaded at startup and pinged
+    # every keep_warm_interval seconds (0: load once) so they stay resident
+    # for keep_alive.  Empty means ``model`` and ``vision_model``.
+    preload_models: bool = True
+    keep_warm_models: list[str] = []
+    keep_warm_interval: float = 240
+    keep_alive: str = "10m"
+
+    def warm_models(self) -> list[str]:
+        return list(dict.fromkeys(self.keep_warm_models or [self.model, self.vision_model]))
 
 
 class RagConfig(BaseModel):
     expert_url: str = ""
     evaluation_url: str = ""
     timeout: float = 30.0
+    # Periodic background re-index; 0 disables it.  Each wait is stretched or
+    # shrunk by up to ``refresh_jitter`` (fraction of the interval).
+    refresh_interval_minutes: float = 0
+    refresh_jitter: float = 0.1
+    # Keyword hits per rubric ``evidence_queries`` entry in evidence bundles.
+    evidence_top_k: int = 3
+    # Hybrid retrieval for /rag-eval: each corpus (guideline, expert,
+    # evaluation) returns ``retrieval_per_source_k`` passages, rankings are
+    # fused with RRF (``rrf_k``), near-duplicates whose shingle overlap
+    # reaches ``dedupe_threshold`` are merged, and the best
+    # ``retrieval_top_k`` go to one synthesis call.
+    retrieval_per_source_k: int = 8
+    retrieval_top_k: int = 6
+    rrf_k: float = 60.0
+    dedupe_threshold: float = 0.6
+    # Answer cache for /rag-eval and /search-guideline.  Queries whose
+    # embedding is within ``cache_semantic_threshold`` cosine similarity of a
+    # cached one, and have the same content words, reuse its answer; 1.0
+    # (the default) keeps only exact matches.
+    cache_enabled: bool = True
+    cache_max_entries: int = 1024
+    cache_semantic_threshold: float = 1.0
+    cache_ttl_seconds: float = 0
+    # Embeddings for the vector indexes: "ollama" (/api/embed on
+    # embed_base_url, default models.base_url), "local" (sentence-transformers
+    # on CPU), "hashed" (no model) or "default" (LlamaIndex settings).
+    # Vectors are cached in SQLite by (model, text hash) when embed_cache is on.
+    embed_backend: str = "ollama"
+    embed_model: str = "nomic-embed-text"
+    embed_base_url: str = ""
+    embed_batch_size: int = 32
+    embed_concurrency: int = 4
+    embed_cache: bool = True
+
+
+class ProfilingConfig(BaseModel):
+    """Request profiling; see :mod:`app.profiling`."""
+
+    enabled: bool = False
+    # Requests carrying this header are profiled with stack samples.  With a
+    # ``token`` (or PROFILE_TOKEN) the header value must equal it, and the
+    # /admin/profiles endpoints require it in the same header.
+    header: str = "X-Profile"
+    token: str = ""
+    # Fraction of requests profiled with stack samples.
+    sample_rate: float = 0.0
+    # > 0: record span timings for every request, keep those at least this slow.
+    slow_threshold_ms: float = 0.0
+    sampler_interval_ms: float = 5.0
+    max_spans: int = 500
+    keep_slowest: int = 20
+    keep_recent: int = 20
+    # Path prefixes to profile; empty profiles every path.
+    paths: List[str] = []
 
 
 class ObservabilityConfig(BaseModel):
     """Configuration block for observability hooks."""
 
     enabled: bool = False
+    profiling: ProfilingConfig = ProfilingConfig()
+
+
+class LedgerConfig(BaseModel):
+    """Storage options for the evidence ledger."""
+
+    compression: str = "zstd"
+    level: int = 3
+    min_size: int = 64
+    dict_size: int = 16384
+    # Write-behind ledger writer: "commit" waits for the grouped transaction,
+    # "async" returns as soon as the event is queued.
+    durability: str = "commit"
+    flush_interval_ms: float = 20
+    max_batch: int = 256
+    max_queue: int = 10000
 
 
 class AppConfig(BaseModel):
@@ -33,6 +132,12 @@ class AppConfig(BaseModel):
     policy: Dict[str, Any] = {}
     lora: Dict[str, Any] = {}
     observability: ObservabilityConfig = ObservabilityConfig()
+    ledger: LedgerConfig = LedgerConfig()
+    # "full" serves every endpoint; "judging" never loads the LangChain /
+    # LlamaIndex stacks and disables the endpoints that need them.
+    mode: str = "full"
+    # Build RAG indexes and the agent at startup instead of on first use.
+    preload_ml: bool = False
 
 
 def _load_yaml(path: Path) -> Dict[str, Any]:
@@ -54,6 +159,7 @@ def load_config() -> AppConfig:
     observability = _load_yaml(
         Path(os.getenv("OBSERVABILITY_CONFIG", base / "observability.yaml"))
     )
+    ledger = _load_yaml(Path(os.getenv("LEDGER_CONFIG", base / "ledger.yaml")))
     return AppConfig(
         models=ModelsConfig(**models),
         rag=RagConfig(**rag),
@@ -61,4 +167,7 @@ def load_config() -> AppConfig:
         policy=policy,
         lora=lora,
         observability=ObservabilityConfig(**observability),
+        ledger=LedgerConfig(**ledger),
+        mode=os.getenv("APP_MODE", "full"),
+        preload_ml=os.getenv("PRELOAD_ML", "0").lower() in {"1", "true", "yes"},
     )
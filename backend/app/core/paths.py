@@ -10,9 +10,14 @@ DATA_DIR = Path(os.getenv("DATA_DIR", APP_DIR / "data"))
 SCHEMAS_DIR = Path(os.getenv("SCHEMAS_DIR", APP_DIR / "schemas"))
 SEEDS_DIR = Path(os.getenv("SEEDS_DIR", APP_DIR / "seeds"))
 DB_PATH = Path(os.getenv("DB_PATH", DATA_DIR / "slice.db"))
+ARCHIVE_DIR = Path(os.getenv("ARCHIVE_DIR", DATA_DIR / "archive"))
+SNAPSHOT_DIR = Path(os.getenv("SNAPSHOT_DIR", DATA_DIR / "snapshots"))
+IMPORTS_DIR = Path(os.getenv("IMPORTS_DIR", DATA_DIR / "imports"))
+TRAINING_DIR = Path(os.getenv("TRAINING_DIR", DATA_DIR / "training"))
 
 GUIDELINE_FILE = Path(os.getenv("GUIDELINE_FILE", SEEDS_DIR / "guidelines" / "kda_2025_guideline.md"))
 RUBRIC_FILE = Path(os.getenv("RUBRIC_FILE", SEEDS_DIR / "rubrics" / "kda_2025_v1.json"))
+RUBRICS_DIR = Path(os.getenv("RUBRICS_DIR", SEEDS_DIR / "rubrics"))
 
 def ensure_dirs():
     DATA_DIR.mkdir(parents=True, exist_ok=True)
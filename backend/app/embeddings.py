@@ -0,0 +1,289 @@
+"""Embedding backends and a persistent embedding cache for the RAG indexes.
+
+LlamaIndex's default embedding model calls a hosted API, which is not
+reachable from air-gapped deployments, and ``from_documents`` re-embeds every
+chunk on every refresh.  :class:`Embedder` wraps a pluggable
+:class:`EmbeddingBackend` (Ollama ``/api/embed``, a local sentence-transformers
+model, or feature hashing), sends cache misses in batches with bounded
+concurrency, and stores vectors in SQLite keyed by ``(model, sha256(text))`` so
+unchanged text is embedded once across refreshes and restarts.  Only document
+chunks are stored; query vectors would grow the table with every question.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Type
+
+import httpx
+import numpy as np
+
+from app.observability import metrics, span
+
+if TYPE_CHECKING:
+    from llama_index.core.base.embeddings.base import BaseEmbedding
+
+    from app.core.config import AppConfig
+
+
+class EmbeddingBackend(ABC):
+    """Turns batches of texts into vectors."""
+
+    #: Identifies the vector space; part of the cache key.
+    model_id: str
+
+    @abstractmethod
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        """Embed ``texts``; one vector per text, in order."""
+
+    async def aembed(self, texts: Sequence[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self.embed, texts)
+
+
+class OllamaEmbeddings(EmbeddingBackend):
+    """Ollama ``/api/embed`` (accepts a list of inputs per request)."""
+
+    def __init__(self, model: str, base_url: str = "http://localhost:11434", timeout: float = 60.0) -> None:
+        self.model = model
+        self.url = f"{base_url.rstrip('/')}/api/embed"
+        self.timeout = httpx.Timeout(timeout, connect=10.0)
+        self.model_id = f"ollama:{model}"
+
+    def _parse(self, response: httpx.Response, count: int) -> List[List[float]]:
+        vectors = response.json().get("embeddings") or []
+        if len(vectors) != count:
+            raise RuntimeError(f"Ollama returned {len(vectors)} embeddings for {count} inputs")
+        return vectors
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        try:
+            response = httpx.post(self.url, json={"model": self.model, "input": list(texts)}, timeout=self.timeout)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            raise RuntimeError(f"embedding request failed: {e}") from e
+        return self._parse(response, len(texts))
+
+    async def aembed(self, texts: Sequence[str]) -> List[List[float]]:
+        try:
+            async with httpx.AsyncClient(timeout=self.timeout) as client:
+                response = await client.post(self.url, json={"model": self.model, "input": list(texts)})
+                response.raise_for_status()
+        except httpx.HTTPError as e:
+            raise RuntimeError(f"embedding request failed: {e}") from e
+        return self._parse(response, len(texts))
+
+
+class LocalEmbeddings(EmbeddingBackend):
+    """CPU sentence-transformers model (optional dependency, loaded lazily)."""
+
+    def __init__(self, model: str, **_: object) -> None:
+        self.model = model
+        self.model_id = f"local:{model}"
+        self._encoder = None
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        if self._encoder is None:
+            try:
+                from sentence_transformers import SentenceTransformer
+            except ImportError as e:
+                raise RuntimeError("embed_backend 'local' requires the sentence-transformers package") from e
+            self._encoder = SentenceTransformer(self.model, device="cpu")
+        return self._encoder.encode(list(texts), normalize_embeddings=True).tolist()
+
+
+class HashedEmbeddings(EmbeddingBackend):
+    """Feature-hashed tokens; no model at all, for tests and smoke runs."""
+
+    def __init__(self, model: str = "", dim: int = 512, **_: object) -> None:
+        self.dim = dim
+        self.model_id = f"hashed:{dim}"
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        from app.query_cache import hashed_embedding
+
+        return [hashed_embedding(t, self.dim).tolist() for t in texts]
+
+
+BACKENDS: Dict[str, Type[EmbeddingBackend]] = {
+    "ollama": OllamaEmbeddings,
+    "local": LocalEmbeddings,
+    "hashed": HashedEmbeddings,
+}
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Vectors in the ``embedding_cache`` table, stored as float32 blobs."""
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = db_path
+
+    def get_many(self, model_id: str, hashes: Sequence[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        conn = sqlite3.connect(self.db_path)
+        try:
+            # Stay well below SQLite's bound-parameter limit.
+            for i in range(0, len(hashes), 500):
+                chunk = hashes[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM embedding_cache WHERE model=? "
+                    f"AND text_hash IN ({','.join('?' * len(chunk))})",
+                    (model_id, *chunk),
+                ).fetchall()
+                for h, blob in rows:
+                    found[h] = np.frombuffer(blob, dtype=np.float32).tolist()
+        finally:
+            conn.close()
+        return found
+
+    def put_many(self, model_id: str, items: Iterable[tuple[str, Sequence[float]]]) -> None:
+        now = time.time()
+        rows = [
+            (model_id, h, len(v), np.asarray(v, dtype=np.float32).tobytes(), now)
+            for h, v in items
+        ]
+        if not rows:
+            return
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embedding_cache(model, text_hash, dim, vector, created_at) VALUES(?,?,?,?,?)",
+                rows,
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+
+class Embedder:
+    """Cached, batched embedding calls against one backend."""
+
+    def __init__(
+        self,
+        backend: EmbeddingBackend,
+        cache: Optional[EmbeddingCache] = None,
+        batch_size: int = 32,
+        concurrency: int = 4,
+    ) -> None:
+        self.backend = backend
+        self.cache = cache
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+
+    @property
+    def model_id(self) -> str:
+        return self.backend.model_id
+
+    def _plan(self, texts: Sequence[str]) -> tuple[List[str], Dict[str, str]]:
+        hashes = [text_hash(t) for t in texts]
+        unique = dict(zip(hashes, texts))
+        return hashes, unique
+
+    def _lookup(self, unique: Dict[str, str]) -> Dict[str, List[float]]:
+        found = self.cache.get_many(self.model_id, list(unique)) if self.cache else {}
+        metrics.inc("embeddings.cache.hit", len(found))
+        metrics.inc("embeddings.cache.miss", len(unique) - len(found))
+        return found
+
+    def _batches(self, unique: Dict[str, str], found: Dict[str, List[float]]) -> List[List[tuple[str, str]]]:
+        missing = [(h, t) for h, t in unique.items() if h not in found]
+        return [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+
+    def _store(self, found: Dict[str, List[float]], batch: List[tuple[str, str]], vectors: List[List[float]],
+               persist: bool) -> None:
+        pairs = [(h, v) for (h, _), v in zip(batch, vectors)]
+        found.update(pairs)
+        if self.cache and persist:
+            self.cache.put_many(self.model_id, pairs)
+
+    def embed(self, texts: Sequence[str], persist: bool = True) -> List[List[float]]:
+        """Embed ``texts``; ``persist=False`` reads the cache but does not add to it."""
+        hashes, unique = self._plan(texts)
+        found = self._lookup(unique)
+        batches = self._batches(unique, found)
+
+        def run(batch: List[tuple[str, str]]) -> List[List[float]]:
+            start = time.perf_counter()
+            vectors = self.backend.embed([t for _, t in batch])
+            metrics.observe("embeddings.batch_ms", (time.perf_counter() - start) * 1000)
+            return vectors
+
+        with span("embeddings.embed"):
+            if len(batches) == 1:
+                self._store(found, batches[0], run(batches[0]), persist)
+            elif batches:
+                with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                    for batch, vectors in zip(batches, pool.map(run, batches)):
+                        self._store(found, batch, vectors, persist)
+        return [found[h] for h in hashes]
+
+    async def aembed(self, texts: Sequence[str], persist: bool = True) -> List[List[float]]:
+        hashes, unique = self._plan(texts)
+        found = await asyncio.to_thread(self._lookup, unique)
+        sem = asyncio.Semaphore(self.concurrency)
+
+        async def run(batch: List[tuple[str, str]]) -> None:
+            async with sem:
+                start = time.perf_counter()
+                vectors = await self.backend.aembed([t for _, t in batch])
+                metrics.observe("embeddings.batch_ms", (time.perf_counter() - start) * 1000)
+            await asyncio.to_thread(self._store, found, batch, vectors, persist)
+
+        with span("embeddings.aembed"):
+            await asyncio.gather(*(run(b) for b in self._batches(unique, found)))
+        return [found[h] for h in hashes]
+
+
+def build_embedder(config: "AppConfig", db_path: Optional[Path] = None) -> Optional[Embedder]:
+    """Embedder configured by ``rag.embed_*``; ``None`` keeps LlamaIndex defaults."""
+    rag = config.rag
+    if rag.embed_backend == "default":
+        return None
+    backend_cls = BACKENDS.get(rag.embed_backend)
+    if backend_cls is None:
+        raise ValueError(f"Unknown embed_backend: {rag.embed_backend}")
+    if backend_cls is OllamaEmbeddings:
+        backend = OllamaEmbeddings(rag.embed_model, rag.embed_base_url or config.models.base_url, rag.timeout)
+    else:
+        backend = backend_cls(rag.embed_model)
+    cache = EmbeddingCache(db_path) if rag.embed_cache and db_path is not None else None
+    return Embedder(backend, cache, rag.embed_batch_size, rag.embed_concurrency)
+
+
+def llama_embed_model(embedder: Embedder) -> "BaseEmbedding":
+    """Expose ``embedder`` as a LlamaIndex embedding model (for query vectors)."""
+    from llama_index.core.base.embeddings.base import BaseEmbedding
+    from pydantic import PrivateAttr
+
+    class _CachedEmbedding(BaseEmbedding):
+        _embedder: Embedder = PrivateAttr()
+
+        def __init__(self, embedder: Embedder) -> None:
+            super().__init__(model_name=embedder.model_id, embed_batch_size=embedder.batch_size)
+            self._embedder = embedder
+
+        # Queries are one-off; keep them out of the persistent cache.
+        def _get_query_embedding(self, query: str) -> List[float]:
+            return self._embedder.embed([query], persist=False)[0]
+
+        async def _aget_query_embedding(self, query: str) -> List[float]:
+            return (await self._embedder.aembed([query], persist=False))[0]
+
+        def _get_text_embedding(self, text: str) -> List[float]:
+            return self._embedder.embed([text])[0]
+
+        def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+            return self._embedder.embed(texts)
+
+        async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+            return await self._embedder.aembed(texts)
+
+    return _CachedEmbedding(embedder)
@@ -0,0 +1,115 @@
+"""Per-criterion evidence bundles resolved from rubric definitions.
+
+Rubric criteria declare ``guideline_refs`` (``"§4.1"``) and
+``evidence_queries``.  :func:`build_bundles` resolves both against the
+guideline chunks once: section references first, then the top keyword hits
+of every query, deduplicated by citation id.  :class:`EvidenceCache` keeps
+the bundles per ``(award_id, version)`` and rebuilds them only when the
+rubric or guideline corpus fingerprint changes, so request handlers read
+citations without running any retrieval.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Sequence, Tuple
+
+from app.guidelines import chunks_for_section, corpus_fingerprint, hit, search_hits
+from app.observability import metrics
+
+
+@dataclass
+class EvidenceBundle:
+    criterion_id: str
+    label: str
+    guideline_refs: List[str] = field(default_factory=list)
+    evidence_queries: List[str] = field(default_factory=list)
+    # Hits in the /search-guideline shape plus ``match`` ("section"/"query")
+    citations: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def citation_ids(self) -> List[str]:
+        return [c["citation_id"] for c in self.citations]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def rubric_fingerprint(rubric: Dict[str, Any]) -> str:
+    data = json.dumps(rubric, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha1(data).hexdigest()
+
+
+def build_bundles(rubric: Dict[str, Any], chunks: Sequence[Dict[str, Any]], top_k: int = 3) -> Dict[str, EvidenceBundle]:
+    """Resolve the evidence bundle of every criterion in ``rubric``."""
+    bundles = {}
+    for crit in rubric.get("criteria", []):
+        bundle = EvidenceBundle(
+            criterion_id=crit["id"],
+            label=crit.get("label", crit["id"]),
+            guideline_refs=list(crit.get("guideline_refs", [])),
+            evidence_queries=list(crit.get("evidence_queries", [])),
+        )
+        seen = set()
+        for ref in bundle.guideline_refs:
+            for ch in chunks_for_section(chunks, ref):
+                if ch["citation_id"] not in seen:
+                    seen.add(ch["citation_id"])
+                    bundle.citations.append({**hit(ch, 0.0), "match": "section", "ref": ref})
+        for query in bundle.evidence_queries:
+            for h in search_hits(chunks, query, top_k):
+                if h["citation_id"] not in seen:
+                    seen.add(h["citation_id"])
+                    bundle.citations.append({**h, "match": "query", "query": query})
+        bundles[bundle.criterion_id] = bundle
+    return bundles
+
+
+class EvidenceCache:
+    """Evidence bundles per rubric version, invalidated by content fingerprints."""
+
+    def __init__(self, top_k: int = 3) -> None:
+        self.top_k = top_k
+        self._entries: Dict[Tuple[str, str], Tuple[str, Dict[str, EvidenceBundle]]] = {}
+        self._lock = threading.Lock()
+        self._corpus: Tuple[int, str] | None = None
+        self._rubrics: Dict[Tuple[str, str], Tuple[Dict[str, Any], str]] = {}
+
+    def _corpus_fp(self, chunks: Sequence[Dict[str, Any]]) -> str:
+        # The chunk list is replaced, never mutated, when the corpus reloads,
+        # so its identity is enough to skip rehashing on every call.
+        cached = self._corpus
+        if cached is None or cached[0] != id(chunks):
+            cached = (id(chunks), corpus_fingerprint(chunks))
+            self._corpus = cached
+        return cached[1]
+
+    def _rubric_fp(self, key: Tuple[str, str], rubric: Dict[str, Any]) -> str:
+        # Rubrics are likewise replaced on reload; holding the object keeps
+        # the identity check sound, so each /analyze hashes it at most once.
+        cached = self._rubrics.get(key)
+        if cached is None or cached[0] is not rubric:
+            cached = (rubric, rubric_fingerprint(rubric))
+            self._rubrics[key] = cached
+        return cached[1]
+
+    def bundles(self, rubric: Dict[str, Any], chunks: Sequence[Dict[str, Any]]) -> Dict[str, EvidenceBundle]:
+        key = (rubric.get("award_id", ""), rubric.get("version", ""))
+        fingerprint = f"{self._rubric_fp(key, rubric)}:{self._corpus_fp(chunks)}"
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                metrics.inc("evidence.cache.hit")
+                return entry[1]
+            metrics.inc("evidence.cache.rebuild")
+            bundles = build_bundles(rubric, chunks, self.top_k)
+            self._entries[key] = (fingerprint, bundles)
+            return bundles
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._rubrics.clear()
+            self._corpus = None
@@ -0,0 +1,90 @@
+"""Guideline corpus: section chunking and keyword search.
+
+The award guideline markdown is split into one chunk per ``§`` heading.
+Each chunk keeps its citation id, the parsed section number (``"2.3"``) used
+to resolve rubric ``guideline_refs``, and the plain keyword search used by
+``/search-guideline`` and the evidence bundles.
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+from app.core.paths import GUIDELINE_FILE
+
+SECTION_RE = re.compile(r"§\s*(\d+(?:\.\d+)*)")
+
+
+def load_guideline_chunks(path: Path = GUIDELINE_FILE) -> List[Dict[str, Any]]:
+    text = path.read_text(encoding="utf-8")
+    chunks = []
+    current = {"section_path": "Doc", "text": ""}
+    for line in text.splitlines():
+        if line.startswith("§") or line.startswith("# "):
+            if current["text"].strip():
+                chunks.append(current)
+            current = {"section_path": line.strip(), "text": ""}
+        else:
+            current["text"] += line + "\\n"
+    if current["text"].strip():
+        chunks.append(current)
+    for i, ch in enumerate(chunks):
+        # Citation ids stay in their historical format; ledger payloads
+        # already reference them.
+        m = re.search(r"§([\\d\\.]+)", ch["section_path"])
+        sec = m.group(1).replace(".", "_") if m else f"0_{i}"
+        section = SECTION_RE.search(ch["section_path"])
+        ch.update({
+            "doc_id": "kda_2025_guideline_v1",
+            "version": "1.0.0",
+            "citation_id": f"cit_kda_v1_{sec}_{i:03d}",
+            "section": section.group(1) if section else None,
+        })
+    return chunks
+
+
+def search_hits(chunks: Iterable[Dict[str, Any]], query: str, top_k: int = 3) -> List[Dict[str, Any]]:
+    """Rank chunks by occurrences of ``query`` in text and section title."""
+    q = query.lower()
+    scored = []
+    for ch in chunks:
+        score = ch["text"].lower().count(q) + ch["section_path"].lower().count(q)
+        if score > 0:
+            scored.append((score, ch))
+    scored.sort(key=lambda x: x[0], reverse=True)
+    return [hit(ch, score) for score, ch in scored[:top_k]]
+
+
+def hit(ch: Dict[str, Any], score: float) -> Dict[str, Any]:
+    return {
+        "citation_id": ch["citation_id"],
+        "doc_id": ch["doc_id"],
+        "section_path": ch["section_path"],
+        "excerpt": ch["text"].strip()[:240],
+        "score": float(score),
+        "version": ch["version"],
+    }
+
+
+def chunks_for_section(chunks: Iterable[Dict[str, Any]], ref: str) -> List[Dict[str, Any]]:
+    """Chunks under guideline reference ``ref`` (``"§2"`` also matches ``2.1``)."""
+    m = SECTION_RE.search(ref)
+    if not m:
+        return []
+    sec = m.group(1)
+    return [
+        ch for ch in chunks
+        if ch.get("section") and (ch["section"] == sec or ch["section"].startswith(sec + "."))
+    ]
+
+
+def corpus_fingerprint(chunks: Iterable[Dict[str, Any]]) -> str:
+    """Hash of the chunked corpus; changes whenever any chunk changes."""
+    h = hashlib.sha1()
+    for ch in chunks:
+        for key in ("citation_id", "version", "section_path", "text"):
+            h.update(str(ch.get(key, "")).encode("utf-8"))
+            h.update(b"\0")
+    return h.hexdigest()
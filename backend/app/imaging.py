@@ -0,0 +1,231 @@
+"""Model-ready image derivatives for vision inference.
+
+Uploads keep their original bytes in the evidence ledger, but the vision
+model only needs an image at its input resolution.  :func:`prepare_image`
+applies the EXIF orientation, drops all metadata, flattens to RGB, downsizes
+to ``max_side`` and re-encodes as JPEG.  :class:`DerivativeStore` caches the
+result by the SHA-256 of the original bytes, in memory and in the
+``image_derivatives`` table, so ``/chat`` never re-reads the original and
+identical uploads are only processed once.  ``vision_results`` keeps the
+vision model's answers per image, model and prompt for reuse by duplicates.
+
+Pillow is imported on first use.
+"""
+from __future__ import annotations
+
+import base64
+import datetime
+import hashlib
+import io
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from app.observability import metrics
+
+# llava 1.6 tiles images into 336px patches on a grid up to 672px.
+DEFAULT_MAX_SIDE = 672
+DEFAULT_QUALITY = 85
+# Largest image decoded, checked from the header before any pixel is read.
+# A few-KB PNG can declare 15000x15000 pixels (900 MB once decoded).
+MAX_IMAGE_PIXELS = 40_000_000
+
+
+class InvalidImageError(ValueError):
+    """Raised when upload bytes cannot be decoded as an image."""
+
+
+@dataclass
+class ImageDerivative:
+    """Downsized JPEG rendition of an uploaded image."""
+
+    sha256: str
+    image_b64: str
+    width: int
+    height: int
+    source_bytes: int
+
+    @property
+    def size(self) -> int:
+        """Size of the encoded JPEG in bytes."""
+        return len(self.image_b64) * 3 // 4
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def open_image(content: bytes, max_pixels: int = MAX_IMAGE_PIXELS) -> Any:
+    """Lazily opened Pillow image of ``content``, at most ``max_pixels`` large.
+
+    Raises :class:`InvalidImageError` for undecodable images and for
+    decompression bombs, before their pixels are decoded.
+    """
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        img = Image.open(io.BytesIO(content))
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as exc:
+        raise InvalidImageError("Unsupported or corrupt image") from exc
+    width, height = img.size
+    if width * height > max_pixels:
+        img.close()
+        raise InvalidImageError(f"Image too large: {width}x{height} pixels (limit {max_pixels})")
+    return img
+
+
+def prepare_image(content: bytes, max_side: int = DEFAULT_MAX_SIDE, quality: int = DEFAULT_QUALITY) -> bytes:
+    """Return ``content`` as an EXIF-free RGB JPEG no larger than ``max_side``."""
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    img = open_image(content)
+    try:
+        # Let libjpeg decode at a reduced scale when the source is far
+        # larger than the target; no-op for other formats.
+        img.draft("RGB", (max_side, max_side))
+        img = ImageOps.exif_transpose(img)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as exc:
+        raise InvalidImageError("Unsupported or corrupt image") from exc
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        rgba = img.convert("RGBA")
+        img = Image.new("RGB", rgba.size, (255, 255, 255))
+        img.paste(rgba, mask=rgba.getchannel("A"))
+    elif img.mode != "RGB":
+        img = img.convert("RGB")
+    img.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+    out = io.BytesIO()
+    # A fresh save without exif=/icc_profile= writes no metadata.
+    img.save(out, "JPEG", quality=quality, optimize=True)
+    return out.getvalue()
+
+
+class DerivativeStore:
+    """Content-addressed cache of vision derivatives (LRU over SQLite)."""
+
+    def __init__(
+        self,
+        db_path: Path | str,
+        max_side: int = DEFAULT_MAX_SIDE,
+        quality: int = DEFAULT_QUALITY,
+        cache_size: int = 128,
+    ) -> None:
+        self.db_path = db_path
+        self.max_side = max_side
+        self.quality = quality
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, ImageDerivative]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def variant(self) -> str:
+        return f"jpeg-{self.max_side}-q{self.quality}"
+
+    def _remember(self, derivative: ImageDerivative) -> None:
+        with self._lock:
+            self._cache[derivative.sha256] = derivative
+            self._cache.move_to_end(derivative.sha256)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _cached(self, sha256: str) -> ImageDerivative | None:
+        with self._lock:
+            derivative = self._cache.get(sha256)
+            if derivative is not None:
+                self._cache.move_to_end(sha256)
+            return derivative
+
+    def get(self, sha256: str) -> ImageDerivative | None:
+        """Return the derivative for an original with hash ``sha256``."""
+        derivative = self._cached(sha256)
+        if derivative is not None:
+            metrics.inc("imaging.cache.memory_hit")
+            return derivative
+        conn = sqlite3.connect(self.db_path)
+        try:
+            row = conn.execute(
+                "SELECT image_b64, width, height, source_bytes FROM image_derivatives WHERE sha256=? AND variant=?",
+                (sha256, self.variant),
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        metrics.inc("imaging.cache.db_hit")
+        derivative = ImageDerivative(sha256, row[0], row[1], row[2], row[3])
+        self._remember(derivative)
+        return derivative
+
+    def ingest(self, content: bytes) -> ImageDerivative:
+        """Return the derivative of ``content``, creating and storing it if needed."""
+        sha256 = content_hash(content)
+        derivative = self.get(sha256)
+        if derivative is not None:
+            return derivative
+        metrics.inc("imaging.cache.miss")
+        start = time.perf_counter()
+        data = prepare_image(content, self.max_side, self.quality)
+        metrics.observe("imaging.prepare_ms", (time.perf_counter() - start) * 1000)
+        metrics.observe("imaging.size_ratio", len(data) / max(len(content), 1))
+        from PIL import Image
+
+        with Image.open(io.BytesIO(data)) as img:
+            width, height = img.size
+        derivative = ImageDerivative(
+            sha256, base64.b64encode(data).decode("ascii"), width, height, len(content)
+        )
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute(
+                "INSERT OR IGNORE INTO image_derivatives(sha256, variant, width, height, source_bytes, image_b64, created_at) "
+                "VALUES(?,?,?,?,?,?,?)",
+                (
+                    sha256,
+                    self.variant,
+                    width,
+                    height,
+                    len(content),
+                    derivative.image_b64,
+                    datetime.datetime.utcnow().isoformat() + "Z",
+                ),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        self._remember(derivative)
+        return derivative
+
+    def ingest_b64(self, image_b64: str) -> ImageDerivative:
+        """:meth:`ingest` for base64 originals such as legacy ledger rows."""
+        return self.ingest(base64.b64decode(image_b64))
+
+
+def _prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def load_vision_result(conn: sqlite3.Connection, sha256s: list[str], model: str, prompt: str) -> tuple[str, str] | None:
+    """Return ``(answer, model_version)`` cached for the first of ``sha256s``."""
+    prompt_hash = _prompt_hash(prompt)
+    for sha256 in sha256s:
+        row = conn.execute(
+            "SELECT answer, model_version FROM vision_results WHERE sha256=? AND model=? AND prompt_hash=?",
+            (sha256, model, prompt_hash),
+        ).fetchone()
+        if row is not None:
+            return row[0], row[1]
+    return None
+
+
+def store_vision_result(
+    conn: sqlite3.Connection, sha256: str, model: str, prompt: str, answer: str, model_version: str
+) -> None:
+    conn.execute(
+        "INSERT OR REPLACE INTO vision_results(sha256, model, prompt_hash, answer, model_version, created_at) "
+        "VALUES(?,?,?,?,?,?)",
+        (sha256, model, _prompt_hash(prompt), answer, model_version, datetime.datetime.utcnow().isoformat() + "Z"),
+    )
+    conn.commit()
@@ -0,0 +1,290 @@
+"""Monthly partitioning and Parquet archival of the evidence ledger.
+
+The SQLite ``evidence_ledger`` table is the hot partition: it only keeps the
+months inside the retention window configured under ``retention`` in
+``policy.yaml``.  Closed months are rolled into one zstd compressed Parquet
+file per run under ``ARCHIVE_DIR/evidence_ledger/month=YYYY-MM/`` and deleted
+from SQLite.  ``ledger_partitions`` lists the archived files and
+``ledger_archive_index`` maps each submission to the months holding its
+events, so report and export reads only open the files they need.
+
+Archived files store decoded text, compression is left to Parquet.
+"""
+from __future__ import annotations
+
+import argparse
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+
+from app.ledger_codec import LedgerCodec
+
+logger = logging.getLogger(__name__)
+
+LEDGER_COLUMNS = ["id", "kind", "submission_id", "user_id", "at", "payload_json", "raw_output", "image"]
+
+
+def _month_start(month: str) -> str:
+    return f"{month}-01T00:00:00"
+
+
+def _next_month(month: str) -> str:
+    year, mon = (int(p) for p in month.split("-"))
+    year, mon = (year + 1, 1) if mon == 12 else (year, mon + 1)
+    return f"{year:04d}-{mon:02d}"
+
+
+def _shift_month(month: str, delta: int) -> str:
+    year, mon = (int(p) for p in month.split("-"))
+    total = year * 12 + (mon - 1) + delta
+    return f"{total // 12:04d}-{total % 12 + 1:02d}"
+
+
+def current_month(now: datetime.datetime | None = None) -> str:
+    now = now or datetime.datetime.utcnow()
+    return now.strftime("%Y-%m")
+
+
+def _arrow_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("id", pa.int64()),
+        ("kind", pa.string()),
+        ("submission_id", pa.string()),
+        ("user_id", pa.string()),
+        ("at", pa.string()),
+        ("payload_json", pa.string()),
+        ("raw_output", pa.string()),
+        ("image", pa.string()),
+    ])
+
+
+def closed_months(conn: sqlite3.Connection, hot_months: int, now: datetime.datetime | None = None) -> List[str]:
+    """Return months in the hot table older than the ``hot_months`` window."""
+    cutoff = _shift_month(current_month(now), -(max(hot_months, 1) - 1))
+    cur = conn.execute(
+        "SELECT DISTINCT substr(at, 1, 7) FROM evidence_ledger WHERE at<? ORDER BY 1",
+        (_month_start(cutoff),),
+    )
+    return [m for (m,) in cur.fetchall()]
+
+
+def archive_month(
+    conn: sqlite3.Connection,
+    codec: LedgerCodec,
+    archive_dir: Path,
+    month: str,
+    batch_size: int = 5000,
+) -> int:
+    """Move all hot rows of ``month`` into a Parquet file; returns the row count."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    start, end = _month_start(month), _month_start(_next_month(month))
+    bounds = conn.execute(
+        "SELECT COUNT(*), MIN(id), MAX(id) FROM evidence_ledger WHERE at>=? AND at<?",
+        (start, end),
+    ).fetchone()
+    count, min_id, max_id = bounds
+    if not count:
+        return 0
+    part_dir = archive_dir / "evidence_ledger" / f"month={month}"
+    part_dir.mkdir(parents=True, exist_ok=True)
+    path = part_dir / f"part-{max_id:012d}.parquet"
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    schema = _arrow_schema()
+    # Sorted by submission so report lookups prune row groups by statistics.
+    cur = conn.execute(
+        f"SELECT {', '.join(LEDGER_COLUMNS)} FROM evidence_ledger WHERE at>=? AND at<? AND id<=? "
+        "ORDER BY submission_id, id",
+        (start, end, max_id),
+    )
+    index: Dict[str, int] = {}
+    with pq.ParquetWriter(tmp, schema, compression="zstd") as writer:
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            columns: Dict[str, list] = {name: [] for name in LEDGER_COLUMNS}
+            for row in rows:
+                values = dict(zip(LEDGER_COLUMNS, row))
+                values["payload_json"] = codec.decode(values["payload_json"])
+                values["raw_output"] = codec.decode(values["raw_output"])
+                for name in LEDGER_COLUMNS:
+                    columns[name].append(values[name])
+                sid = values["submission_id"]
+                index[sid] = max(index.get(sid, 0), values["id"])
+            writer.write_table(pa.table(columns, schema=schema))
+    now = datetime.datetime.utcnow().isoformat() + "Z"
+    try:
+        # Another archival run may have moved the month while we were writing.
+        conn.execute("BEGIN IMMEDIATE")
+        remaining = conn.execute(
+            "SELECT COUNT(*) FROM evidence_ledger WHERE at>=? AND at<? AND id<=?",
+            (start, end, max_id),
+        ).fetchone()[0]
+        if remaining != count:
+            conn.rollback()
+            tmp.unlink(missing_ok=True)
+            return 0
+        os.replace(tmp, path)
+        conn.execute(
+            "INSERT INTO ledger_partitions(path, month, row_count, min_id, max_id, archived_at) VALUES(?,?,?,?,?,?)",
+            (str(path.relative_to(archive_dir)), month, count, min_id, max_id, now),
+        )
+        conn.executemany(
+            "INSERT INTO ledger_archive_index(submission_id, month, max_id) VALUES(?,?,?) "
+            "ON CONFLICT(submission_id, month) DO UPDATE SET max_id=MAX(max_id, excluded.max_id)",
+            [(sid, month, mid) for sid, mid in index.items()],
+        )
+        conn.execute("DELETE FROM evidence_ledger WHERE at>=? AND at<? AND id<=?", (start, end, max_id))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        tmp.unlink(missing_ok=True)
+        raise
+    return count
+
+
+def expire_archives(conn: sqlite3.Connection, archive_dir: Path, archive_months: int, now: datetime.datetime | None = None) -> List[str]:
+    """Delete archived partitions older than ``archive_months``; returns their months."""
+    if archive_months <= 0:
+        return []
+    cutoff = _shift_month(current_month(now), -archive_months)
+    rows = conn.execute("SELECT path, month FROM ledger_partitions WHERE month<?", (cutoff,)).fetchall()
+    for path, _ in rows:
+        (archive_dir / path).unlink(missing_ok=True)
+    conn.execute("DELETE FROM ledger_partitions WHERE month<?", (cutoff,))
+    conn.execute("DELETE FROM ledger_archive_index WHERE month<?", (cutoff,))
+    conn.execute("DELETE FROM ledger_fts WHERE at<?", (_month_start(cutoff),))
+    conn.commit()
+    return sorted({m for _, m in rows})
+
+
+def run_retention(
+    conn: sqlite3.Connection,
+    codec: LedgerCodec,
+    archive_dir: Path,
+    policy: Dict[str, Any],
+    now: datetime.datetime | None = None,
+) -> Dict[str, Any]:
+    """Archive closed months and expire old archives according to ``policy``."""
+    hot_months = int(policy.get("hot_months", 3))
+    archive_months = int(policy.get("archive_months", 0))
+    archived = {}
+    for month in closed_months(conn, hot_months, now):
+        archived[month] = archive_month(conn, codec, archive_dir, month)
+        logger.info("Archived %d ledger rows for %s", archived[month], month)
+    expired = expire_archives(conn, archive_dir, archive_months, now)
+    return {"archived": archived, "expired": expired}
+
+
+def _partition_paths(conn: sqlite3.Connection, archive_dir: Path, months: Iterable[str] | None = None) -> List[Path]:
+    if months is None:
+        rows = conn.execute("SELECT path FROM ledger_partitions ORDER BY min_id").fetchall()
+    else:
+        months = list(months)
+        if not months:
+            return []
+        rows = conn.execute(
+            f"SELECT path FROM ledger_partitions WHERE month IN ({','.join('?' * len(months))}) ORDER BY min_id",
+            months,
+        ).fetchall()
+    return [archive_dir / p for (p,) in rows]
+
+
+def archived_max_id(conn: sqlite3.Connection, submission_id: str) -> int:
+    """Return the newest archived ledger id for ``submission_id`` (0 if none)."""
+    row = conn.execute(
+        "SELECT MAX(max_id) FROM ledger_archive_index WHERE submission_id=?",
+        (submission_id,),
+    ).fetchone()
+    return row[0] or 0
+
+
+def read_archived_events(
+    conn: sqlite3.Connection,
+    archive_dir: Path,
+    submission_id: str,
+    columns: Sequence[str],
+    kinds: Sequence[str] = (),
+    after: int | None = None,
+    limit: int | None = None,
+) -> List[tuple]:
+    """Return archived rows of ``submission_id`` as tuples of ``columns``, id ordered."""
+    months = [
+        m for (m,) in conn.execute(
+            "SELECT month FROM ledger_archive_index WHERE submission_id=? ORDER BY month",
+            (submission_id,),
+        )
+    ]
+    paths = _partition_paths(conn, archive_dir, months)
+    if not paths:
+        return []
+    import pyarrow.parquet as pq
+
+    filters: List[tuple] = [("submission_id", "=", submission_id)]
+    if kinds:
+        filters.append(("kind", "in", list(kinds)))
+    if after is not None:
+        filters.append(("id", ">", after))
+    rows: List[tuple] = []
+    for path in paths:
+        table = pq.read_table(path, columns=list(columns), filters=filters)
+        data = table.to_pydict()
+        rows.extend(zip(*(data[c] for c in columns)))
+        if limit is not None and len(rows) >= limit:
+            break
+    rows.sort(key=lambda r: r[columns.index("id")] if "id" in columns else 0)
+    return rows[:limit] if limit is not None else rows
+
+
+def iter_archived(
+    conn: sqlite3.Connection,
+    archive_dir: Path,
+    columns: Sequence[str],
+    kinds: Sequence[str] = (),
+) -> Iterator[tuple]:
+    """Yield archived rows of the given ``kinds`` across all partitions."""
+    paths = _partition_paths(conn, archive_dir)
+    if not paths:
+        return
+    import pyarrow.parquet as pq
+
+    filters = [("kind", "in", list(kinds))] if kinds else None
+    for path in paths:
+        data = pq.read_table(path, columns=list(columns), filters=filters).to_pydict()
+        yield from zip(*(data[c] for c in columns))
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Command line entry point: ``python -m app.ledger_archive``."""
+    from app.core.config import load_config
+    from app.core.paths import ARCHIVE_DIR, DB_PATH
+    from app.ledger_codec import load_ledger_codec
+
+    parser = argparse.ArgumentParser(description="Archive closed ledger months to Parquet")
+    parser.add_argument("--hot-months", type=int, help="Override retention.hot_months")
+    args = parser.parse_args(argv)
+    config = load_config()
+    policy = dict(config.policy.get("retention", {}))
+    if args.hot_months is not None:
+        policy["hot_months"] = args.hot_months
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        result = run_retention(conn, load_ledger_codec(conn, config.ledger), ARCHIVE_DIR, policy)
+    finally:
+        conn.close()
+    for month, count in result["archived"].items():
+        print(f"archived {month}: {count} rows")
+    for month in result["expired"]:
+        print(f"expired {month}")
+
+
+if __name__ == "__main__":
+    main()
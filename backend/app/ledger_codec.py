@@ -0,0 +1,340 @@
+"""Column compression for the evidence ledger.
+
+``payload_json`` and ``raw_output`` are the bulk of the ledger.  Values are
+stored either as plain TEXT (legacy rows and values below ``min_size``) or as
+a BLOB whose first byte names the codec that produced it.  Decoding dispatches
+on that tag, so the configured codec can change without rewriting old rows.
+
+The zstd codec can use per ``(kind, column)`` dictionaries trained from
+existing rows; they live in ``ledger_dictionaries`` and are referenced by the
+dictionary id embedded in every zstd frame.  A frame with an unknown id makes
+the codec reload the table, so ``train``/``recompress`` can run while the API
+is up.
+"""
+from __future__ import annotations
+
+import argparse
+import datetime
+import logging
+import sqlite3
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Callable, ClassVar, Dict, Iterable, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+COMPRESSED_COLUMNS = ("payload_json", "raw_output")
+
+
+class Codec(ABC):
+    """Abstract byte compressor identified by a one byte ``tag``."""
+
+    tag: ClassVar[bytes]
+
+    @abstractmethod
+    def compress(self, data: bytes, kind: str, column: str) -> bytes:
+        """Compress ``data`` stored in ``column`` of a ``kind`` event."""
+
+    @abstractmethod
+    def decompress(self, data: bytes) -> bytes:
+        """Inverse of :meth:`compress`."""
+
+
+class ZlibCodec(Codec):
+    """Standard library fallback codec."""
+
+    tag = b"z"
+
+    def __init__(self, level: int = 6, **_: Any) -> None:
+        self.level = level
+
+    def compress(self, data: bytes, kind: str, column: str) -> bytes:
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data: bytes) -> bytes:
+        return zlib.decompress(data)
+
+
+class ZstdCodec(Codec):
+    """zstd codec with optional trained dictionaries per ``(kind, column)``."""
+
+    tag = b"Z"
+
+    def __init__(
+        self,
+        level: int = 3,
+        dictionaries: Iterable[Tuple[str, str, bytes]] = (),
+        loader: Callable[[], Iterable[Tuple[str, str, bytes]]] | None = None,
+        **_: Any,
+    ) -> None:
+        import zstandard  # optional dependency, checked by CodecFactory
+
+        self._zstd = zstandard
+        self.level = level
+        self._loader = loader
+        self._reload_lock = threading.Lock()
+        self._by_key: Dict[Tuple[str, str], Any] = {}
+        self._by_id: Dict[int, Any] = {}
+        self._generation = 0
+        self._add(dictionaries)
+        # zstd (de)compressor objects must not be shared between threads.
+        self._local = threading.local()
+
+    def _add(self, dictionaries: Iterable[Tuple[str, str, bytes]]) -> None:
+        # Dictionaries arrive oldest first: the newest one per key is used for
+        # compression, all of them stay available for decompression.
+        by_key, by_id = dict(self._by_key), dict(self._by_id)
+        for kind, column, data in dictionaries:
+            d = self._zstd.ZstdCompressionDict(data)
+            if d.dict_id() in by_id:
+                by_key[(kind, column)] = by_id[d.dict_id()]
+                continue
+            d.precompute_compress(level=self.level)
+            by_key[(kind, column)] = d
+            by_id[d.dict_id()] = d
+        self._by_key, self._by_id = by_key, by_id
+        # Per-thread (de)compressors built from older dictionaries are stale.
+        self._generation += 1
+
+    def reload(self) -> None:
+        """Pick up dictionaries trained since the codec was built."""
+        if self._loader is None:
+            return
+        with self._reload_lock:
+            self._add(self._loader())
+        logger.info("Reloaded zstd dictionaries (%d known)", len(self._by_id))
+
+    def _cache(self, name: str) -> Dict[Any, Any]:
+        local = self._local
+        if getattr(local, "generation", None) != self._generation:
+            local.generation = self._generation
+            local.compressors, local.decompressors = {}, {}
+        return getattr(local, name)
+
+    def _compressor(self, key: Tuple[str, str]):
+        cache = self._cache("compressors")
+        if key not in cache:
+            d = self._by_key.get(key)
+            cache[key] = self._zstd.ZstdCompressor(level=self.level, dict_data=d)
+        return cache[key]
+
+    def _decompressor(self, dict_id: int):
+        cache = self._cache("decompressors")
+        if dict_id not in cache:
+            d = self._by_id.get(dict_id) if dict_id else None
+            if dict_id and d is None:
+                # Trained after startup (``python -m app.ledger_codec train``).
+                self.reload()
+                d = self._by_id.get(dict_id)
+                if d is None:
+                    raise ValueError(f"Unknown zstd dictionary id {dict_id}")
+                cache = self._cache("decompressors")
+            cache[dict_id] = self._zstd.ZstdDecompressor(dict_data=d)
+        return cache[dict_id]
+
+    def compress(self, data: bytes, kind: str, column: str) -> bytes:
+        return self._compressor((kind, column)).compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        dict_id = self._zstd.get_frame_parameters(data).dict_id
+        return self._decompressor(dict_id).decompress(data)
+
+
+class CodecFactory:
+    """Factory returning codec instances by configured name."""
+
+    _registry: Dict[str, Type[Codec]] = {
+        "zlib": ZlibCodec,
+        "zstd": ZstdCodec,
+    }
+
+    @classmethod
+    def get(cls, name: str, **kwargs: Any) -> Codec | None:
+        """Return a codec for ``name`` or ``None`` for ``"none"``.
+
+        Raises:
+            ValueError: If the codec name is unknown.
+        """
+        if name == "none":
+            return None
+        codec_cls = cls._registry.get(name)
+        if codec_cls is None:
+            raise ValueError(f"Unknown ledger codec: {name}")
+        try:
+            return codec_cls(**kwargs)
+        except ImportError as exc:
+            logger.warning("%s codec unavailable (%s); falling back to zlib", name, exc)
+            return ZlibCodec()
+
+
+class LedgerCodec:
+    """Encode ledger column values with one codec and decode any known tag."""
+
+    def __init__(self, codec: Codec | None = None, min_size: int = 64) -> None:
+        self.codec = codec
+        self.min_size = min_size
+        self._decoders: Dict[bytes, Codec] = {ZlibCodec.tag: ZlibCodec()}
+        if isinstance(codec, ZstdCodec):
+            self._decoders[ZstdCodec.tag] = codec
+        elif codec is not None:
+            self._decoders[codec.tag] = codec
+
+    def encode(self, text: str | None, kind: str, column: str) -> str | bytes | None:
+        """Return the stored representation of ``text``."""
+        if text is None or self.codec is None:
+            return text
+        data = text.encode("utf-8")
+        if len(data) < self.min_size:
+            return text
+        return self.codec.tag + self.codec.compress(data, kind, column)
+
+    def decode(self, value: str | bytes | None) -> str | None:
+        """Return the original text for a stored column value."""
+        if value is None or isinstance(value, str):
+            return value
+        return self.decode_bytes(value).decode("utf-8")
+
+    def decode_bytes(self, value: str | bytes) -> bytes:
+        """Like :meth:`decode` but returns UTF-8 bytes without decoding them."""
+        if isinstance(value, str):
+            return value.encode("utf-8")
+        tag, body = value[:1], value[1:]
+        decoder = self._decoders.get(tag)
+        if decoder is None and tag == ZstdCodec.tag:
+            decoder = self._decoders[tag] = ZstdCodec()
+        if decoder is None:
+            raise ValueError(f"Unknown ledger codec tag {tag!r}")
+        return decoder.decompress(body)
+
+
+def load_dictionaries(conn: sqlite3.Connection) -> list[Tuple[str, str, bytes]]:
+    """Return all trained dictionaries as ``(kind, column, data)``, oldest first."""
+    cur = conn.execute(
+        "SELECT kind, column_name, data FROM ledger_dictionaries ORDER BY created_at ASC, rowid ASC"
+    )
+    return [(k, c, bytes(d)) for (k, c, d) in cur.fetchall()]
+
+
+def _dictionary_loader(conn: sqlite3.Connection) -> Callable[[], list[Tuple[str, str, bytes]]] | None:
+    """Return a function re-reading the dictionaries of ``conn``'s database file."""
+    path = next((row[2] for row in conn.execute("PRAGMA database_list") if row[1] == "main"), "")
+    if not path:
+        return None  # in-memory database
+
+    def load() -> list[Tuple[str, str, bytes]]:
+        other = sqlite3.connect(path)
+        try:
+            return load_dictionaries(other)
+        finally:
+            other.close()
+
+    return load
+
+
+def load_ledger_codec(conn: sqlite3.Connection, config: Any) -> LedgerCodec:
+    """Build the configured :class:`LedgerCodec` including stored dictionaries."""
+    kwargs: Dict[str, Any] = {"level": config.level}
+    if config.compression == "zstd":
+        kwargs["dictionaries"] = load_dictionaries(conn)
+        kwargs["loader"] = _dictionary_loader(conn)
+    codec = CodecFactory.get(config.compression, **kwargs)
+    return LedgerCodec(codec, min_size=config.min_size)
+
+
+def train_dictionaries(
+    conn: sqlite3.Connection,
+    dict_size: int = 16384,
+    sample_limit: int = 2000,
+    kinds: Iterable[str] | None = None,
+) -> Dict[Tuple[str, str], int]:
+    """Train zstd dictionaries from existing rows and store them.
+
+    Returns the new dictionary id per ``(kind, column)``.  Kinds without
+    enough samples for training are skipped.
+    """
+    import zstandard
+
+    decoder = LedgerCodec(ZstdCodec(dictionaries=load_dictionaries(conn)))
+    if kinds is None:
+        kinds = [r[0] for r in conn.execute("SELECT DISTINCT kind FROM evidence_ledger")]
+    trained: Dict[Tuple[str, str], int] = {}
+    now = datetime.datetime.utcnow().isoformat() + "Z"
+    for kind in kinds:
+        for column in COMPRESSED_COLUMNS:
+            cur = conn.execute(
+                f"SELECT {column} FROM evidence_ledger WHERE kind=? AND {column} IS NOT NULL "
+                "ORDER BY id DESC LIMIT ?",
+                (kind, sample_limit),
+            )
+            samples = [decoder.decode_bytes(r[0]) for r in cur.fetchall()]
+            if len(samples) < 8:
+                continue
+            try:
+                d = zstandard.train_dictionary(dict_size, samples)
+            except zstandard.ZstdError as exc:
+                logger.info("Skipping dictionary for %s.%s: %s", kind, column, exc)
+                continue
+            conn.execute(
+                "INSERT OR REPLACE INTO ledger_dictionaries(dict_id, kind, column_name, created_at, data) "
+                "VALUES(?,?,?,?,?)",
+                (d.dict_id(), kind, column, now, d.as_bytes()),
+            )
+            trained[(kind, column)] = d.dict_id()
+    conn.commit()
+    return trained
+
+
+def recompress(conn: sqlite3.Connection, codec: LedgerCodec, batch_size: int = 500) -> int:
+    """Rewrite every ledger row with ``codec``; returns the number of rows."""
+    done = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, kind, payload_json, raw_output FROM evidence_ledger WHERE id>? ORDER BY id LIMIT ?",
+            (last_id, batch_size),
+        ).fetchall()
+        if not rows:
+            break
+        conn.executemany(
+            "UPDATE evidence_ledger SET payload_json=?, raw_output=? WHERE id=?",
+            [
+                (
+                    codec.encode(codec.decode(p), k, "payload_json"),
+                    codec.encode(codec.decode(r), k, "raw_output"),
+                    i,
+                )
+                for (i, k, p, r) in rows
+            ],
+        )
+        conn.commit()
+        done += len(rows)
+        last_id = rows[-1][0]
+    return done
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Command line entry point: ``python -m app.ledger_codec train|recompress``."""
+    from app.core.config import load_config
+    from app.core.paths import DB_PATH
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("command", choices=["train", "recompress"])
+    parser.add_argument("--kind", action="append", help="Limit training to these kinds")
+    args = parser.parse_args(argv)
+    config = load_config().ledger
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        if args.command == "train":
+            trained = train_dictionaries(conn, config.dict_size, kinds=args.kind)
+            for (kind, column), dict_id in sorted(trained.items()):
+                print(f"{kind}.{column}: dictionary {dict_id}")
+        else:
+            count = recompress(conn, load_ledger_codec(conn, config))
+            print(f"recompressed {count} rows")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""Full-text search over the evidence ledger.
+
+Ledger payloads may be stored compressed, so the index cannot be kept in
+sync by SQL triggers.  :func:`app.ledger_writer.insert_events` calls
+:func:`index_events` in the same transaction instead, with the text
+:func:`extract_text` pulls from each payload: chat messages and answers,
+finding labels and explanations, judge reasons, upload titles.
+
+The ``ledger_fts`` FTS5 table (``evidence_ledger.schema.sql``) uses the
+ledger id as rowid.  :func:`backfill` indexes events written before the
+table existed, and :func:`search` ranks matches with BM25 and returns
+highlighted snippets.
+"""
+from __future__ import annotations
+
+import json
+import re
+import sqlite3
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.ledger_codec import LedgerCodec
+from app.observability import metrics
+
+HIGHLIGHT = ("<mark>", "</mark>")
+SNIPPET_TOKENS = 16
+ORDERS = {"rank": "bm25(ledger_fts)", "recent": "rowid DESC"}
+
+
+def _strings(value: Any) -> Iterable[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for v in value.values():
+            yield from _strings(v)
+    elif isinstance(value, list):
+        for v in value:
+            yield from _strings(v)
+
+
+def _chat(p: Dict[str, Any]) -> Iterable[Any]:
+    return p.get("message"), p.get("answer")
+
+
+def _analyze(p: Dict[str, Any]) -> Iterable[Any]:
+    for f in p.get("findings") or []:
+        yield f.get("label")
+        yield f.get("explanation")
+
+
+def _evaluate(p: Dict[str, Any]) -> Iterable[Any]:
+    for s in p.get("scores") or []:
+        yield s.get("reason")
+
+
+def _upload(p: Dict[str, Any]) -> Iterable[Any]:
+    return p.get("title"), p.get("filename")
+
+
+# Searchable fields per event kind; other kinds index every string value.
+EXTRACTORS: Dict[str, Callable[[Dict[str, Any]], Iterable[Any]]] = {
+    "chat": _chat,
+    "analyze": _analyze,
+    "evaluate": _evaluate,
+    "upload": _upload,
+}
+
+
+def extract_text(kind: str, payload: Any) -> str:
+    if not isinstance(payload, dict):
+        return " ".join(_strings(payload))
+    extractor = EXTRACTORS.get(kind)
+    values = extractor(payload) if extractor else _strings(payload)
+    return "\n".join(v for v in values if isinstance(v, str) and v)
+
+
+def index_events(conn: sqlite3.Connection, rows: Sequence[Tuple[int, str, str, str, Any]]) -> None:
+    """Index ``(id, kind, submission_id, at, payload)`` rows; does not commit."""
+    conn.executemany(
+        "INSERT INTO ledger_fts(rowid, body, kind, submission_id, at) VALUES(?,?,?,?,?)",
+        [(eid, extract_text(kind, payload), kind, sid, at) for eid, kind, sid, at, payload in rows],
+    )
+
+
+def backfill(conn: sqlite3.Connection, codec: LedgerCodec, batch_size: int = 1000) -> int:
+    """Index hot ledger rows missing from ``ledger_fts``; returns the count.
+
+    Safe to run next to the writer: it indexes rows in the same transaction
+    that inserts them, so a row visible here without an index entry is old.
+    """
+    last = total = 0
+    while True:
+        rows = conn.execute(
+            """
+            SELECT id, kind, submission_id, at, payload_json FROM evidence_ledger e
+            WHERE id>? AND NOT EXISTS (SELECT 1 FROM ledger_fts f WHERE f.rowid = e.id)
+            ORDER BY id LIMIT ?
+            """,
+            (last, batch_size),
+        ).fetchall()
+        if not rows:
+            break
+        index_events(conn, [(eid, kind, sid, at, json.loads(codec.decode(p))) for eid, kind, sid, at, p in rows])
+        conn.commit()
+        last = rows[-1][0]
+        total += len(rows)
+    return total
+
+
+_TERM_RE = re.compile(r'[^\s"]+\*?')
+
+
+def match_expression(query: str) -> str:
+    """Quote each term so user input is never parsed as FTS5 syntax.
+
+    Terms are ANDed; a trailing ``*`` keeps prefix matching.
+    """
+    terms = []
+    for term in _TERM_RE.findall(query):
+        prefix = term.endswith("*")
+        term = term.rstrip("*")
+        if term:
+            terms.append(f'"{term}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+def search(
+    conn: sqlite3.Connection,
+    query: str,
+    kinds: Sequence[str] = (),
+    submission_id: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0,
+    order: str = "rank",
+) -> Dict[str, Any]:
+    """Matching events, best first or with ``order="recent"`` newest first.
+
+    Ranking scores every match, so terms found in most events take hundreds
+    of milliseconds on a million-row ledger; newest-first walks the index
+    backwards and stops after one page.  ``until`` is exclusive, dates
+    compare as ISO strings.
+    """
+    if order not in ORDERS:
+        raise ValueError(f"Unknown order: {order}")
+    expression = match_expression(query)
+    if not expression:
+        return {"results": [], "next_offset": None}
+    where = ["ledger_fts MATCH ?"]
+    params: List[Any] = [expression]
+    if kinds:
+        where.append(f"kind IN ({','.join('?' * len(kinds))})")
+        params.extend(kinds)
+    if submission_id:
+        where.append("submission_id = ?")
+        params.append(submission_id)
+    if since:
+        where.append("at >= ?")
+        params.append(since)
+    if until:
+        where.append("at < ?")
+        params.append(until)
+    start = time.perf_counter()
+    rows = conn.execute(
+        f"""
+        SELECT rowid, kind, submission_id, at, bm25(ledger_fts),
+               snippet(ledger_fts, 0, ?, ?, '…', {SNIPPET_TOKENS})
+        FROM ledger_fts WHERE {' AND '.join(where)}
+        ORDER BY {ORDERS[order]} LIMIT ? OFFSET ?
+        """,
+        [*HIGHLIGHT, *params, limit + 1, offset],
+    ).fetchall()
+    metrics.observe("ledger.search_ms", (time.perf_counter() - start) * 1000)
+    results = [
+        {"id": eid, "kind": kind, "submission_id": sid, "at": at, "score": round(-rank, 4), "snippet": snippet}
+        for eid, kind, sid, at, rank, snippet in rows[:limit]
+    ]
+    return {"results": results, "next_offset": offset + limit if len(rows) > limit else None}
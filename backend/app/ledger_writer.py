@@ -0,0 +1,208 @@
+"""Write-behind batching for evidence ledger inserts.
+
+Request handlers enqueue :class:`LedgerEvent` objects; a dedicated thread
+serializes, compresses and inserts them in grouped transactions, flushing
+every ``flush_interval_ms`` or ``max_batch`` events, whichever comes first.
+
+Each submitted event returns a ``concurrent.futures.Future`` resolved with
+the new ledger id once its transaction committed.  Callers pick the
+durability: ``"commit"`` waits for that future, ``"async"`` fires and forgets.
+"""
+from __future__ import annotations
+
+import datetime
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, List, Sequence
+
+from app.ledger_codec import LedgerCodec
+from app.ledger_search import index_events
+from app.serialization import dumps_str
+from app.observability import metrics
+
+logger = logging.getLogger(__name__)
+
+DURABILITY_MODES = ("commit", "async")
+
+# Queue markers: _FLUSH resolves once the preceding events are written,
+# _STOP additionally ends the writer thread.
+_FLUSH = object()
+_STOP = object()
+
+
+@dataclass
+class LedgerEvent:
+    """A ledger row waiting to be written."""
+
+    kind: str
+    submission_id: str
+    payload: Any
+    user_id: str | None = None
+    raw_output: str | None = None
+    image: str | None = None
+    at: str = field(default_factory=lambda: datetime.datetime.utcnow().isoformat() + "Z")
+
+
+def insert_events(conn: sqlite3.Connection, codec: LedgerCodec, events: Sequence[LedgerEvent]) -> List[int]:
+    """Insert and full-text index ``events`` without committing; returns their ledger ids."""
+    ids = []
+    for ev in events:
+        payload_json = dumps_str(ev.payload)
+        cur = conn.execute(
+            "INSERT INTO evidence_ledger(kind, submission_id, user_id, at, payload_json, raw_output, image) VALUES(?,?,?,?,?,?,?)",
+            (
+                ev.kind,
+                ev.submission_id,
+                ev.user_id,
+                ev.at,
+                codec.encode(payload_json, ev.kind, "payload_json"),
+                codec.encode(ev.raw_output, ev.kind, "raw_output"),
+                ev.image,
+            ),
+        )
+        ids.append(cur.lastrowid)
+    index_events(conn, [(eid, ev.kind, ev.submission_id, ev.at, ev.payload) for eid, ev in zip(ids, events)])
+    return ids
+
+
+class LedgerWriter:
+    """Background thread flushing queued ledger events in batches."""
+
+    def __init__(
+        self,
+        db_path: Path | str,
+        codec: LedgerCodec | None = None,
+        flush_interval_ms: float = 20,
+        max_batch: int = 256,
+        max_queue: int = 10000,
+    ) -> None:
+        self.db_path = db_path
+        self.codec = codec or LedgerCodec()
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[tuple[Any, Future]]" = queue.Queue(max_queue)
+        self._thread: threading.Thread | None = None
+        metrics.set_gauge("ledger_writer.queue_depth", self._queue.qsize)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._run, name="ledger-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = 10.0) -> None:
+        """Flush everything queued so far and stop the thread."""
+        if not self.running:
+            return
+        done: Future = Future()
+        self._queue.put((_STOP, done))
+        done.result(timeout)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, event: LedgerEvent) -> Future:
+        """Queue ``event``; the future resolves with its id after commit.
+
+        When the queue is full the event is written synchronously by the
+        caller, which applies backpressure instead of dropping evidence.
+        Async callers should use :meth:`try_submit` and only fall back to
+        this from a worker thread.
+        """
+        fut = self.try_submit(event)
+        if fut is None:
+            fut = Future()
+            self._write([(event, fut)])
+        return fut
+
+    def try_submit(self, event: LedgerEvent) -> Future | None:
+        """Queue ``event`` without blocking; ``None`` when the queue is full."""
+        fut: Future = Future()
+        try:
+            self._queue.put_nowait((event, fut))
+        except queue.Full:
+            metrics.inc("ledger_writer.queue_full")
+            return None
+        return fut
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Block until all events queued before this call are committed."""
+        if not self.running:
+            return
+        marker: Future = Future()
+        self._queue.put((_FLUSH, marker))
+        marker.result(timeout)
+
+    def _run(self) -> None:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            stopping = False
+            while not stopping:
+                first = self._queue.get()
+                batch = [first]
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.max_batch and first[0] is not _STOP:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    batch.append(item)
+                    if item[0] is _STOP:
+                        break
+                if batch[-1][0] is _STOP:
+                    stopping = True
+                    # Drain whatever raced in before the stop marker.
+                    while True:
+                        try:
+                            batch.insert(-1, self._queue.get_nowait())
+                        except queue.Empty:
+                            break
+                self._write(batch, conn)
+        finally:
+            conn.close()
+
+    def _write(self, batch: List[tuple], conn: sqlite3.Connection | None = None) -> None:
+        events = [(ev, fut) for ev, fut in batch if isinstance(ev, LedgerEvent)]
+        markers = [fut for ev, fut in batch if not isinstance(ev, LedgerEvent)]
+        own = conn is None
+        if own:
+            conn = sqlite3.connect(self.db_path)
+        start = time.perf_counter()
+        try:
+            if events:
+                try:
+                    ids = insert_events(conn, self.codec, [ev for ev, _ in events])
+                    conn.commit()
+                except Exception as exc:
+                    conn.rollback()
+                    if len(events) > 1:
+                        # Isolate the offending event instead of failing the batch.
+                        for item in events:
+                            self._write([item], conn)
+                        return
+                    logger.exception("Ledger event %s failed", events[0][0].kind)
+                    metrics.inc("ledger_writer.failed_events")
+                    events[0][1].set_exception(exc)
+                else:
+                    for (_, fut), eid in zip(events, ids):
+                        fut.set_result(eid)
+                    metrics.inc("ledger_writer.events", len(events))
+                    metrics.observe("ledger_writer.batch_size", len(events))
+                    metrics.observe("ledger_writer.flush_ms", (time.perf_counter() - start) * 1000)
+        finally:
+            if own:
+                conn.close()
+            for fut in markers:
+                fut.set_result(None)
@@ -1,10 +1,13 @@
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from functools import lru_cache
+from typing import TYPE_CHECKING
+from pathlib import Path
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.concurrency import run_in_threadpool
-import json, re, time, sqlite3, datetime, base64, os, asyncio
-from fastapi.responses import RedirectResponse
-from langchain.agents import AgentExecutor
+import json, time, sqlite3, datetime, base64, os, asyncio, hashlib
+from collections import Counter
+from fastapi.responses import JSONResponse, PlainTextResponse, RedirectResponse
 import logging
 
 from app.schemas import (
@@ -30,29 +33,70 @@ from app.schemas import (
 )
 
 from app.core.paths import (
-    SCHEMAS_DIR, SEEDS_DIR, DB_PATH,
-    GUIDELINE_FILE, RUBRIC_FILE, ensure_dirs
+    SCHEMAS_DIR, SEEDS_DIR, DB_PATH, ARCHIVE_DIR,
+    RUBRIC_FILE, RUBRICS_DIR, GUIDELINE_FILE, SNAPSHOT_DIR, IMPORTS_DIR, ensure_dirs
 )
 
-from app.providers import ProviderFactory, generate_structured
+from app.providers import ProviderFactory, compact_raw_response, generate_structured, keep_warm
+from app.analyzer import ANALYZER_VERSION, analyze_image
+from app.bulk_import import importer_from_config
+from app.imaging import (
+    DerivativeStore,
+    ImageDerivative,
+    InvalidImageError,
+    load_vision_result,
+    store_vision_result,
+)
+from app.ledger_codec import LedgerCodec, load_ledger_codec
+from app.ledger_archive import archived_max_id, iter_archived, read_archived_events, run_retention
+from app.ledger_writer import DURABILITY_MODES, LedgerEvent, LedgerWriter, insert_events
+from app import ledger_search
+from app.phash import DuplicateIndex, DuplicateMatch, compute_hashes
+from app.query_cache import QueryCache, normalize_query
 from app.rag import RagService
-from app.agent import build_agent, run_agent
+from app.retrieval import DEFAULT_PROMPT, HybridRetriever, LexicalIndex, synthesize
+from app.rubrics import CompiledRubric, RubricRegistry, ScoreValidationError, compile_rubric
+from app.admission import AdmissionController
+from app.agent import AgentBusyError, AgentLimiter, arun_agent, build_agent
+from app.router import QueryRouter, RouteDecision
 from app.security import mask_pii, detect_prompt_injection, filter_output
+from app.serialization import FastJSONResponse, dumps_str, loads, raw
 from pydantic import ValidationError
-from langchain.output_parsers import PydanticOutputParser
 from app.core.config import AppConfig, load_config
-from app.observability import init_observability
+from app.embeddings import build_embedder
+from app.evidence import EvidenceBundle, EvidenceCache
+from app.guidelines import load_guideline_chunks, search_hits as search_chunks
+from app.observability import init_observability, metrics, span
+from app.profiling import Profiler, ProfilingMiddleware
+from app.snapshot import Snapshot, SnapshotStore, source_fingerprint
+from app.warmup import Readiness, jittered
+
+# LangChain and LlamaIndex are only imported by the code paths that use them
+# (see ensure_rag/ensure_agent) so judging-only workers never load them.
+if TYPE_CHECKING:
+    from langchain.agents import AgentExecutor
+    from langchain.output_parsers import PydanticOutputParser
 
 
 def init_db():
     ensure_dirs()
     conn = sqlite3.connect(DB_PATH)
+    # WAL lets report/export readers run while the ledger writer commits.
+    conn.execute("PRAGMA journal_mode=WAL")
     for name in [
         "evidence_ledger.schema.sql",
         "projects.schema.sql",
         "submissions.schema.sql",
         "judges.schema.sql",
         "assignments.schema.sql",
+        "ledger_dictionaries.schema.sql",
+        "ledger_partitions.schema.sql",
+        "image_derivatives.schema.sql",
+        "image_hashes.schema.sql",
+        "vision_results.schema.sql",
+        "embedding_cache.schema.sql",
+        "bulk_imports.schema.sql",
+        "training_exports.schema.sql",
     ]:
         sql = (SCHEMAS_DIR / name).read_text(encoding="utf-8")
         conn.executescript(sql)
@@ -66,6 +110,13 @@ def init_db():
     conn.commit()
     conn.close()
 
+def _durability(durability: str | None) -> str:
+    mode = durability or (CONFIG.ledger.durability if CONFIG else "commit")
+    if mode not in DURABILITY_MODES:
+        raise ValueError(f"Unknown ledger durability: {mode}")
+    return mode
+
+
 def log_evidence(
     kind: str,
     submission_id: str,
@@ -73,107 +124,488 @@ def log_evidence(
     user_id: str | None = None,
     raw_output: str | None = None,
     image: str | None = None,
+    durability: str | None = None,
 ):
-    conn = sqlite3.connect(DB_PATH)
-    now = datetime.datetime.utcnow().isoformat() + "Z"
-    conn.execute(
-        "INSERT INTO evidence_ledger(kind, submission_id, user_id, at, payload_json, raw_output, image) VALUES(?,?,?,?,?,?,?)",
-        (kind, submission_id, user_id, now, json.dumps(payload, ensure_ascii=False), raw_output, image)
-    )
-    conn.commit()
-    conn.close()
+    """Record a ledger event, blocking until committed in ``"commit"`` mode.
+
+    For use from sync handlers (run in the threadpool); ``async def``
+    handlers should await :func:`record_evidence` instead.
+    """
+    event = LedgerEvent(kind, submission_id, payload, user_id, raw_output, image)
+    if ledger_writer is None or not ledger_writer.running:
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            insert_events(conn, ledger_codec, [event])
+            conn.commit()
+        finally:
+            conn.close()
+        return
+    fut = ledger_writer.submit(event)
+    if _durability(durability) == "commit":
+        fut.result()
 
-def load_guideline_chunks():
-    text = GUIDELINE_FILE.read_text(encoding="utf-8")
-    chunks = []
-    current = {"section_path": "Doc", "text": ""}
-    for line in text.splitlines():
-        if line.startswith("§") or line.startswith("# "):
-            if current["text"].strip():
-                chunks.append(current)
-            current = {"section_path": line.strip(), "text": ""}
-        else:
-            current["text"] += line + "\\n"
-    if current["text"].strip():
-        chunks.append(current)
-    for i, ch in enumerate(chunks):
-        m = re.search(r"§([\\d\\.]+)", ch["section_path"])
-        sec = m.group(1).replace(".", "_") if m else f"0_{i}"
-        ch.update({
-            "doc_id": "kda_2025_guideline_v1",
-            "version": "1.0.0",
-            "citation_id": f"cit_kda_v1_{sec}_{i:03d}"
-        })
-    return chunks
+
+async def record_evidence(
+    kind: str,
+    submission_id: str,
+    payload: dict,
+    user_id: str | None = None,
+    raw_output: str | None = None,
+    image: str | None = None,
+    durability: str | None = None,
+):
+    """Async variant of :func:`log_evidence` that never blocks the event loop."""
+    with span("ledger.record"):
+        if ledger_writer is None or not ledger_writer.running:
+            await run_in_threadpool(
+                log_evidence, kind, submission_id, payload, user_id, raw_output, image
+            )
+            return
+        event = LedgerEvent(kind, submission_id, payload, user_id, raw_output, image)
+        fut = ledger_writer.try_submit(event)
+        if fut is None:
+            # Queue full: the synchronous write must not run on the loop.
+            fut = await run_in_threadpool(ledger_writer.submit, event)
+        if _durability(durability) == "commit":
+            await asyncio.wrap_future(fut)
 
 CHUNKS = []
 RUBRIC = {}
+rubric_registry = RubricRegistry()
+evidence_cache = EvidenceCache()
+# Mapped guideline/rubric snapshot shared by all workers; None before lifespan.
+snapshot_store: SnapshotStore | None = None
+# Plain-text codec until lifespan loads the configured one
+ledger_codec = LedgerCodec()
+ledger_writer: LedgerWriter | None = None
+# Default derivative settings until lifespan applies models.yaml
+image_store = DerivativeStore(DB_PATH)
+duplicate_index = DuplicateIndex(DB_PATH)
 
 # Loaded configuration
 CONFIG: AppConfig | None = None
 rag_service: RagService | None = None
-agent_executor: AgentExecutor | None = None
-rag_ready: bool = False
+agent_executor: "AgentExecutor | None" = None
+agent_limiter: AgentLimiter | None = None
+# Per-caller rate limits and per-model fair queues for LLM calls.
+admission = AdmissionController(enabled=False)
+query_router: QueryRouter | None = None
+# Route counts behind rag_agent.skip_ratio; outlive router rebuilds on reload.
+route_decisions: Counter = Counter()
+# Running /bulk-imports by manifest key
+bulk_import_tasks: dict[str, asyncio.Task] = {}
+# Answer caches; None when rag.cache_enabled is off.
+rag_cache: QueryCache | None = None
+search_cache: QueryCache | None = None
+# BM25 over CHUNKS for hybrid retrieval; rebuilt when CHUNKS is replaced.
+_lexical_index: LexicalIndex | None = None
+readiness = Readiness()
+_rag_task: asyncio.Task | None = None
+_agent_task: asyncio.Task | None = None
+
+
+def _run_retention_once(policy: dict) -> dict:
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        return run_retention(conn, ledger_codec, ARCHIVE_DIR, policy)
+    finally:
+        conn.close()
+
+
+async def retention_loop(policy: dict) -> None:
+    """Periodically archive closed ledger months in a worker thread."""
+    interval = float(policy.get("archive_interval_hours", 0)) * 3600
+    while True:
+        try:
+            await run_in_threadpool(_run_retention_once, policy)
+        except Exception:
+            logging.exception("Ledger archival failed")
+        await asyncio.sleep(interval)
+
+
+def snapshot_sources() -> list[Path]:
+    return [GUIDELINE_FILE, RUBRIC_FILE, *RUBRICS_DIR.glob("*.json")]
+
 
+def build_snapshot_contents():
+    """Parse and validate the source files; run by whichever worker builds."""
+    registry = RubricRegistry.load_dir(RUBRICS_DIR, default_file=RUBRIC_FILE)
+    return load_guideline_chunks(), [r.data for r in registry], {"default_rubric": list(registry.default_key)}
+
+
+def apply_snapshot(snap: Snapshot) -> None:
+    """Point the guideline and rubric globals at ``snap``."""
+    global CHUNKS, RUBRIC, rubric_registry, query_router
+    registry = RubricRegistry([compile_rubric(data) for data in snap.rubrics()], tuple(snap.meta["default_rubric"]))
+    CHUNKS = snap.chunks()
+    rubric_registry = registry
+    RUBRIC = registry.default.data
+    # Resolve citations per rubric criterion once, off the request path.
+    for rubric in registry:
+        rubric_evidence(rubric.data)
+    if CONFIG is not None and CONFIG.models.router_enabled:
+        query_router = QueryRouter(
+            CHUNKS, [r.data for r in registry], CONFIG.models.router_rag_threshold, route_decisions
+        )
+    if search_cache is not None:
+        search_cache.invalidate(snap.generation)
+    if rag_cache is not None:
+        rag_cache.invalidate((rag_service.generation if rag_service is not None else 0, snap.generation))
+
+
+async def snapshot_watch_loop(interval: float = 2.0) -> None:
+    """Swap to snapshots published by other workers."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            snap = snapshot_store.poll()
+            if snap is not None:
+                apply_snapshot(snap)
+                logging.info("Switched to guideline snapshot generation %d", snap.generation)
+        except Exception:
+            logging.exception("Guideline snapshot swap failed")
+
+
+def _backfill_ledger_search() -> int:
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        return ledger_search.backfill(conn, ledger_codec)
+    finally:
+        conn.close()
+
+
+async def index_ledger_backlog() -> None:
+    """Full-text index ledger events written before ``ledger_fts`` existed."""
+    readiness.begin("ledger_search")
+    try:
+        count = await run_in_threadpool(_backfill_ledger_search)
+    except Exception as err:
+        logging.exception("Ledger search backfill failed")
+        readiness.finish("ledger_search", err)
+        return
+    if count:
+        logging.info("Indexed %d ledger events for search", count)
+    readiness.finish("ledger_search")
+
+
+async def rag_refresh_loop(interval: float, jitter: float) -> None:
+    """Re-index the RAG corpora every ``interval`` seconds (with jitter).
+
+    Only services that were already started are refreshed; a lazily loaded
+    service stays unloaded until its first use.
+    """
+    while True:
+        await asyncio.sleep(jittered(interval, jitter))
+        if rag_service is None or _rag_task is None or not _rag_task.done():
+            continue
+        ok, err = await refresh_rag(rag_service)
+        if not ok:
+            logging.warning("Periodic RAG refresh failed: %s", err)
+
+
+async def keep_models_warm(models: list[str], interval: float, keep_alive: str) -> None:
+    """Pre-load ``models`` now and re-ping them every ``interval`` seconds.
+
+    The first round is recorded under ``models`` in readiness.  Pings go
+    through the provider's circuit breaker, so while Ollama is down they
+    double as the half-open probe that detects recovery.
+    """
+    first = True
+    while True:
+        try:
+            provider = ProviderFactory.get(os.getenv("LLM_PROVIDER", "ollama"))
+            if first:
+                readiness.begin("models")
+            errors = await keep_warm(provider, models, keep_alive)
+            failed = {m: e for m, e in errors.items() if e}
+            if failed:
+                logging.warning("Model keep-warm failed: %s", failed)
+            if first:
+                readiness.finish("models", RuntimeError(str(failed)) if failed else None)
+        except Exception as err:
+            logging.warning("Model keep-warm failed: %s", err)
+            if first:
+                readiness.finish("models", err)
+        first = False
+        if interval <= 0:
+            return
+        await asyncio.sleep(jittered(interval, 0.1))
 
-def read_json_no_bom(p):
-    return json.loads(p.read_text(encoding="utf-8-sig"))
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 여기서 기존 startup 작업 수행
+    global CHUNKS, RUBRIC, CONFIG, rubric_registry, agent_limiter, query_router, ledger_codec, ledger_writer, image_store
+    global duplicate_index, evidence_cache, rag_cache, search_cache, snapshot_store, admission
+    global readiness, rag_service, agent_executor, _rag_task, _agent_task
+    readiness = Readiness()
+    rag_service, agent_executor, _rag_task, _agent_task = None, None, None, None
+    readiness.begin("database")
     init_db()
-    global CHUNKS, RUBRIC, CONFIG, rag_service, agent_executor, rag_ready
     CONFIG = load_config()
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        ledger_codec = load_ledger_codec(conn, CONFIG.ledger)
+    finally:
+        conn.close()
+    readiness.finish("database")
+    ledger_writer = LedgerWriter(
+        DB_PATH,
+        ledger_codec,
+        flush_interval_ms=CONFIG.ledger.flush_interval_ms,
+        max_batch=CONFIG.ledger.max_batch,
+        max_queue=CONFIG.ledger.max_queue,
+    )
+    ledger_writer.start()
+    readiness.register("ledger_writer", state="ready")
+    image_store = DerivativeStore(
+        DB_PATH,
+        max_side=CONFIG.models.vision_max_side,
+        quality=CONFIG.models.vision_jpeg_quality,
+        cache_size=CONFIG.models.vision_cache_size,
+    )
+    duplicates = CONFIG.policy.get("duplicates", {})
+    duplicate_index = DuplicateIndex(
+        DB_PATH,
+        phash_threshold=int(duplicates.get("phash_threshold", 6)),
+        dhash_threshold=int(duplicates.get("dhash_threshold", 10)),
+    )
     init_observability(CONFIG.observability)
-    CHUNKS = load_guideline_chunks()
-    RUBRIC = read_json_no_bom(RUBRIC_FILE)
-    rag_service = RagService(
-        CONFIG.rag.expert_url,
-        CONFIG.rag.evaluation_url,
-        CONFIG.rag.timeout,
+    profiler.configure(CONFIG.observability.profiling)
+    readiness.begin("guidelines")
+    evidence_cache = EvidenceCache(CONFIG.rag.evidence_top_k)
+    rag_cache = search_cache = None
+    if CONFIG.rag.cache_enabled:
+        rag_cache = QueryCache(
+            "rag_eval",
+            max_entries=CONFIG.rag.cache_max_entries,
+            semantic_threshold=CONFIG.rag.cache_semantic_threshold,
+            ttl_seconds=CONFIG.rag.cache_ttl_seconds,
+        )
+        # Keyword hits depend on the literal query; only exact reuse is safe.
+        search_cache = QueryCache("search_guideline", max_entries=CONFIG.rag.cache_max_entries, semantic_threshold=1.0)
+    # The first worker parses the sources into a snapshot; the others map it.
+    snapshot_store = SnapshotStore(SNAPSHOT_DIR)
+    snap = await run_in_threadpool(snapshot_store.ensure, source_fingerprint(snapshot_sources()), build_snapshot_contents)
+    apply_snapshot(snap)
+    readiness.finish("guidelines")
+    # Search over older events only lags until the backfill catches up.
+    readiness.register("ledger_search", required=False)
+    background: list[asyncio.Task] = [
+        asyncio.create_task(snapshot_watch_loop()),
+        asyncio.create_task(index_ledger_backlog()),
+    ]
+    ProviderFactory.configure(
+        failure_threshold=CONFIG.models.breaker_failure_threshold,
+        reset_timeout=CONFIG.models.breaker_reset_seconds,
+        keep_alive=CONFIG.models.keep_alive,
     )
-    rag_ready = False
-    try:
-        await rag_service.refresh()
-        rag_ready = True
-    except Exception:
-        logging.exception("Failed to refresh RAG index")
-    agent_executor = build_agent(rag_service, CONFIG.models)
+    if CONFIG.mode == "judging":
+        readiness.register("rag", state="disabled")
+        readiness.register("agent", state="disabled")
+        readiness.register("models", state="disabled")
+    else:
+        # Without PRELOAD_ML the ML stacks load on first use and do not gate
+        # readiness; with it they warm up in the background and /readyz
+        # reports ready once they are built.
+        readiness.register("rag", required=CONFIG.preload_ml)
+        readiness.register("agent", required=CONFIG.preload_ml)
+        if CONFIG.preload_ml:
+            start_agent_warmup()
+        if CONFIG.models.preload_models:
+            # Model loading never gates readiness; a cold model only makes
+            # the first call slow.
+            readiness.register("models", required=False)
+            background.append(asyncio.create_task(keep_models_warm(
+                CONFIG.models.warm_models(), CONFIG.models.keep_warm_interval, CONFIG.models.keep_alive
+            )))
+        else:
+            readiness.register("models", state="disabled")
+        if CONFIG.rag.refresh_interval_minutes > 0:
+            background.append(asyncio.create_task(
+                rag_refresh_loop(CONFIG.rag.refresh_interval_minutes * 60, CONFIG.rag.refresh_jitter)
+            ))
+    agent_limiter = AgentLimiter(CONFIG.models.agent_concurrency, CONFIG.models.agent_queue_timeout)
+    admission = AdmissionController.from_policy(CONFIG.policy)
+    retention = CONFIG.policy.get("retention", {})
+    if float(retention.get("archive_interval_hours", 0)) > 0:
+        background.append(asyncio.create_task(retention_loop(retention)))
     yield
-    # 필요 시 종료(cleanup) 로직 작성 (지금은 없음)
+    for task in [*background, *bulk_import_tasks.values(), _agent_task, _rag_task]:
+        if task is not None and not task.done():
+            task.cancel()
+    # Drain queued ledger events before the process exits.
+    await run_in_threadpool(ledger_writer.stop)
 
 # ⚠️ app 생성 시 lifespan 파라미터로 등록
-app = FastAPI(title="Design Evaluation Vertical Slice", version="0.1.0", lifespan=lifespan)
+app = FastAPI(
+    title="Design Evaluation Vertical Slice",
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
+)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+# Innermost, so profiled requests run their endpoint in the profiled task.
+profiler = Profiler()
+app.add_middleware(ProfilingMiddleware, profiler=profiler)
  
 
+def require_ml() -> None:
+    """Reject LLM/RAG endpoints when running in judging-only mode."""
+    if CONFIG is not None and CONFIG.mode == "judging":
+        raise HTTPException(status_code=503, detail="Disabled in judging-only mode")
+
+
+async def refresh_rag(service: RagService) -> tuple[bool, Exception | None]:
+    """Rebuild the RAG indexes, recording the run under ``rag`` in readiness."""
+    readiness.begin("rag")
+    ok, err = await service.refresh()
+    readiness.finish("rag", err)
+    if ok and rag_cache is not None:
+        rag_cache.invalidate(rag_generation())
+    return ok, err
+
+
+async def _warm_rag(service: RagService) -> None:
+    ok, err = await refresh_rag(service)
+    if not ok:
+        logging.error("Failed to refresh RAG index: %s", err)
+
+
+def start_rag_warmup() -> asyncio.Task:
+    """Start building the RAG indexes in the background (once)."""
+    global rag_service, _rag_task
+    if _rag_task is None:
+        config = CONFIG or load_config()
+        rag_service = RagService(
+            config.rag.expert_url,
+            config.rag.evaluation_url,
+            config.rag.timeout,
+            embedder=build_embedder(config, DB_PATH),
+        )
+        _rag_task = asyncio.create_task(_warm_rag(rag_service))
+    return _rag_task
+
+
+async def _warm_agent() -> None:
+    global agent_executor
+    rag = await ensure_rag()
+    config = CONFIG or load_config()
+    readiness.begin("agent")
+    try:
+        agent_executor = await run_in_threadpool(build_agent, rag, config.models)
+    except Exception as exc:
+        readiness.finish("agent", exc)
+        logging.exception("Failed to build agent")
+    else:
+        readiness.finish("agent")
+
+
+def start_agent_warmup() -> asyncio.Task:
+    """Start building the agent (and RAG) in the background.
+
+    A failed build is retried by the next call instead of caching the error.
+    """
+    global _agent_task
+    if _agent_task is None or (_agent_task.done() and agent_executor is None):
+        _agent_task = asyncio.create_task(_warm_agent())
+    return _agent_task
+
+
+async def ensure_rag() -> RagService:
+    """Return the RAG service, waiting for its warmup if still in progress.
+
+    A failed warmup is not retried per request; ``/rag-index/refresh`` or the
+    periodic refresh rebuild the indexes.
+    """
+    require_ml()
+    # shield: a cancelled request must not cancel the shared warmup task.
+    await asyncio.shield(start_rag_warmup())
+    return rag_service
+
+
+async def ensure_agent() -> "AgentExecutor":
+    """Return the LangChain agent, building it on first use (imports LangChain)."""
+    require_ml()
+    await asyncio.shield(start_agent_warmup())
+    if agent_executor is None:
+        raise RuntimeError(f"Agent not available: {readiness.snapshot()['subsystems']['agent']['error']}")
+    return agent_executor
+
+
+@lru_cache
+def chat_parser() -> "PydanticOutputParser":
+    from langchain.output_parsers import PydanticOutputParser
+
+    return PydanticOutputParser(pydantic_object=LLMChatResponse)
+
+
+# Rubric criterion whose evidence bundle backs each analyzer finding.
+FINDING_CRITERIA = {
+    "Low Contrast": "C3",
+    "Palette Deviation": "C4",
+    "Crowded Layout": "C2",
+    "Inconsistent Alignment": "C2",
+}
+
+
+def rubric_evidence(rubric: dict) -> dict[str, EvidenceBundle]:
+    return evidence_cache.bundles(rubric, CHUNKS)
+
+
+def finding_citations(label: str, limit: int = 3) -> list[str]:
+    bundle = rubric_evidence(RUBRIC).get(FINDING_CRITERIA.get(label, ""))
+    return bundle.citation_ids[:limit] if bundle else []
+
+
 def search_hits(query: str, top_k: int = 3):
-    q = query.lower()
-    scored = []
-    for ch in CHUNKS:
-        score = ch["text"].lower().count(q) + ch["section_path"].lower().count(q)
-        if score > 0:
-            scored.append((score, ch))
-    scored.sort(key=lambda x: x[0], reverse=True)
-    hits = []
-    for score, ch in scored[:top_k]:
-        hits.append({
-            "citation_id": ch["citation_id"],
-            "doc_id": ch["doc_id"],
-            "section_path": ch["section_path"],
-            "excerpt": ch["text"].strip()[:240],
-            "score": float(score),
-            "version": ch["version"]
-        })
-    return hits
+    if snapshot_store is not None and snapshot_store.current is not None:
+        return snapshot_store.current.search(query, top_k)
+    return search_chunks(CHUNKS, query, top_k)
+
+
+def snapshot_generation() -> int:
+    snap = snapshot_store.current if snapshot_store is not None else None
+    return snap.generation if snap is not None else 0
+
+
+def rag_generation() -> tuple[int, int]:
+    """/rag-eval answers depend on the vector indexes and the guideline snapshot."""
+    return (rag_service.generation if rag_service is not None else 0, snapshot_generation())
+
+
+def lexical_index() -> LexicalIndex:
+    global _lexical_index
+    if _lexical_index is None or _lexical_index.chunks is not CHUNKS:
+        _lexical_index = LexicalIndex(CHUNKS)
+    return _lexical_index
+
+
+async def hybrid_answer(query: str) -> dict:
+    """Fused guideline/expert/evaluation passages and one synthesis call over them."""
+    rag = CONFIG.rag
+    retriever = HybridRetriever(
+        lexical_index(),
+        rag_service,
+        per_source_k=rag.retrieval_per_source_k,
+        top_k=rag.retrieval_top_k,
+        rrf_k=rag.rrf_k,
+        dedupe_threshold=rag.dedupe_threshold,
+    )
+    passages = await retriever.retrieve(query)
+    provider = ProviderFactory.get(os.getenv("LLM_PROVIDER", "ollama"))
+    template = CONFIG.prompts.get("rag_synthesis", DEFAULT_PROMPT)
+    result = await synthesize(provider, CONFIG.models.model, query, passages, template)
+    cited = set(result["citations"])
+    # Fall back to everything retrieved when the model cited nothing usable.
+    sources = [p.to_dict() for p in passages if p.citation_id in cited] or [p.to_dict() for p in passages]
+    return {"answer": result["answer"], "sources": sources}
 
 
 @app.post("/rag-index/refresh")
 async def rag_index_refresh():
-    if rag_service is None or not rag_ready:
-        raise HTTPException(status_code=503, detail="RAG not initialized")
-    ok, err = await rag_service.refresh()
+    service = await ensure_rag()
+    ok, err = await refresh_rag(service)
     if not ok:
         status = 502 if isinstance(err, RuntimeError) else 503
         raise HTTPException(status_code=status, detail=str(err))
@@ -181,82 +613,330 @@ async def rag_index_refresh():
 
 
 @app.post("/rag-eval", response_model=RagEvalResponse)
-async def rag_eval(payload: RagEvalRequest) -> RagEvalResponse:
+async def rag_eval(payload: RagEvalRequest, request: Request) -> RagEvalResponse:
     query = payload.query
     if detect_prompt_injection(query):
         raise HTTPException(status_code=400, detail="Prompt injection detected")
     sanitized_query = mask_pii(query)
-    if rag_service is None or not rag_ready:
+    service = await ensure_rag()
+    if not service.ready:
         raise HTTPException(status_code=503, detail="RAG not initialized")
-    try:
-        result = rag_service.query(sanitized_query)
-    except RuntimeError as exc:
-        raise HTTPException(status_code=503, detail=str(exc))
-    if filter_output(json.dumps(result, ensure_ascii=False)):
-        raise HTTPException(status_code=403, detail="Disallowed content")
-    result = json.loads(mask_pii(json.dumps(result, ensure_ascii=False)))
-    citations = [RagCitation(doc_id=s.get("doc_id", ""), text=s.get("text", "")) for s in result.get("sources", [])]
-    return RagEvalResponse(answer=result.get("answer", ""), citations=citations)
+    generation = rag_generation()
+    hit = rag_cache.get(sanitized_query, generation) if rag_cache is not None else None
+    if hit is not None:
+        result = hit.value
+    else:
+        try:
+            async with admission.admit(request, "rag_eval", CONFIG.models.model):
+                result = await hybrid_answer(sanitized_query)
+        except ValueError as exc:
+            raise HTTPException(status_code=500, detail=str(exc))
+        except RuntimeError as exc:
+            raise HTTPException(status_code=503, detail=str(exc))
+        if filter_output(json.dumps(result, ensure_ascii=False)):
+            raise HTTPException(status_code=403, detail="Disallowed content")
+        result = json.loads(mask_pii(json.dumps(result, ensure_ascii=False)))
+        if rag_cache is not None:
+            rag_cache.put(sanitized_query, result, generation)
+    citations = [
+        RagCitation(
+            doc_id=s.get("doc_id", ""),
+            text=s.get("text", ""),
+            citation_id=s.get("citation_id", ""),
+            source=s.get("source", ""),
+        )
+        for s in result.get("sources", [])
+    ]
+    return RagEvalResponse(
+        answer=result.get("answer", ""),
+        citations=citations,
+        cache=hit.kind if hit is not None else None,
+    )
 
 
 @app.post("/rag-agent")
-async def rag_agent_endpoint(payload: dict) -> dict[str, str]:
-    """Run the LangChain agent to route ``query`` to tools."""
+async def rag_agent_endpoint(payload: dict, request: Request) -> dict[str, str]:
+    """Answer ``query`` via RAG, a single chat call or the LangChain agent.
+
+    The pre-router handles obvious questions directly; only ambiguous ones
+    pay for the ReAct loop.
+    """
     query = payload.get("query")
     if not query:
         raise HTTPException(status_code=400, detail="query required")
-    if detect_prompt_injection(query):
-        raise HTTPException(status_code=400, detail="Prompt injection detected")
-    sanitized_query = mask_pii(query)
-    if agent_executor is None:
-        raise HTTPException(status_code=503, detail="Agent not initialized")
+    with span("security.screen_input"):
+        if detect_prompt_injection(query):
+            raise HTTPException(status_code=400, detail="Prompt injection detected")
+        sanitized_query = mask_pii(query)
+    require_ml()
+    with span("router.route"):
+        decision = query_router.route(sanitized_query) if query_router else RouteDecision("agent", 0.0)
+    route = decision.route
+    if route == "rag" and not (await ensure_rag()).ready:
+        route = "agent"
+    start = time.perf_counter()
     try:
-        result = await run_in_threadpool(lambda: run_agent(agent_executor, sanitized_query))
-    except ValidationError as exc:
-        err = StructuredError(error="Agent output validation failed")
-        raise HTTPException(status_code=502, detail=err.model_dump()) from exc
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=str(exc))
-    if filter_output(result.answer):
-        raise HTTPException(status_code=403, detail="Disallowed content")
-    answer = mask_pii(result.answer)
+        async with admission.admit(request, "rag_agent", CONFIG.models.model):
+            if route == "rag":
+                try:
+                    answer = (await hybrid_answer(sanitized_query))["answer"]
+                except (RuntimeError, ValueError) as exc:
+                    raise HTTPException(status_code=503, detail=str(exc))
+            elif route == "chat":
+                try:
+                    provider = ProviderFactory.get(os.getenv("LLM_PROVIDER", "ollama"))
+                except ValueError as exc:
+                    raise HTTPException(status_code=500, detail=str(exc))
+                raw = await provider.generate(sanitized_query, CONFIG.models.model, stream=False)
+                answer = raw.get("response", "").strip()
+            else:
+                if agent_limiter is None:
+                    raise HTTPException(status_code=503, detail="Agent not initialized")
+                try:
+                    agent = await ensure_agent()
+                    async with agent_limiter.slot():
+                        result = await arun_agent(agent, sanitized_query)
+                except AgentBusyError as exc:
+                    raise HTTPException(status_code=503, detail=str(exc)) from exc
+                except ValidationError as exc:
+                    err = StructuredError(error="Agent output validation failed")
+                    raise HTTPException(status_code=502, detail=err.model_dump()) from exc
+                except Exception as exc:
+                    raise HTTPException(status_code=500, detail=str(exc))
+                answer = result.answer
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        metrics.inc(f"rag_agent.route.{route}")
+        metrics.observe(f"rag_agent.{route}_ms", elapsed_ms)
+        logging.info(
+            "rag-agent route=%s confidence=%.2f latency=%.1fms", route, decision.confidence, elapsed_ms
+        )
+    with span("security.screen_output"):
+        if filter_output(answer):
+            raise HTTPException(status_code=403, detail="Disallowed content")
+        answer = mask_pii(answer)
     return {"answer": answer}
 
 @app.post("/uploads", response_model=UploadResponse)
 async def uploads(
     title: str = Form("Unnamed"),
     author_id: str = Form("unknown"),
+    meta: str | None = Form(None),
     file: UploadFile | None = File(None),
 ) -> UploadResponse:
     sid = f"sub_{int(time.time() * 1000)}"
+    try:
+        meta_obj = json.loads(meta) if meta else None
+    except json.JSONDecodeError as exc:
+        raise HTTPException(400, "meta must be a JSON object") from exc
+    if meta_obj is not None and not isinstance(meta_obj, dict):
+        raise HTTPException(400, "meta must be a JSON object")
     out = UploadResponse(
         submission_id=sid,
         created_at=datetime.datetime.utcnow(),
     )
     image_b64: str | None = None
+    derivative: ImageDerivative | None = None
+    match: DuplicateMatch | None = None
     if file is not None:
         if file.content_type not in {"image/jpeg", "image/png"}:
             raise HTTPException(400, "Only JPEG/PNG images allowed")
         content = await file.read()
         if len(content) > 2 * 1024 * 1024:
             raise HTTPException(413, "Image too large")
+        # The original stays in the ledger as evidence; inference uses the
+        # downsized derivative cached under its content hash.
+        derivative = await vision_derivative(content)
+        match = await run_in_threadpool(register_image, content, derivative.sha256, sid)
         image_b64 = base64.b64encode(content).decode("utf-8")
     payload = {
         "title": title,
         "author_id": author_id,
         "filename": file.filename if file else None,
     }
-    log_evidence(
+    if meta_obj is not None:
+        payload["meta"] = meta_obj
+    if derivative is not None:
+        payload["image_sha256"] = derivative.sha256
+        if match is not None and match.submission_id not in (None, sid):
+            out.duplicate_of = match.submission_id
+            payload["duplicate_of"] = match.submission_id
+            payload["duplicate_distance"] = match.phash_distance
+    # /chat reads the image back, so uploads always wait for the commit.
+    await record_evidence(
         "upload",
         sid,
         payload,
         image=image_b64,
+        durability="commit",
     )
     return out
 
 
+async def vision_derivative(content: bytes) -> ImageDerivative:
+    try:
+        return await run_in_threadpool(image_store.ingest, content)
+    except InvalidImageError as exc:
+        raise HTTPException(400, str(exc)) from exc
+
+
+def register_image(content: bytes, sha256: str, sid: str | None = None) -> DuplicateMatch | None:
+    """Hash an image, return its closest earlier near-duplicate and index it."""
+    hashes = compute_hashes(content)
+    # Uploads look for an earlier submission; /analyze-vision for any image.
+    match = duplicate_index.find(hashes, with_submission=sid is not None)
+    duplicate_index.add(sha256, hashes, sid)
+    return match
+
+
+def reuse_results() -> bool:
+    return bool((CONFIG.policy if CONFIG else {}).get("duplicates", {}).get("reuse_results", True))
+
+
+def latest_event_payload(conn: sqlite3.Connection, sid: str, kind: str) -> dict | None:
+    """Return the newest ``kind`` payload of ``sid`` from the hot table or archive."""
+    row = conn.execute(
+        "SELECT payload_json FROM evidence_ledger WHERE submission_id=? AND kind=? ORDER BY id DESC LIMIT 1",
+        (sid, kind),
+    ).fetchone()
+    if row:
+        return loads(ledger_codec.decode_bytes(row[0]))
+    archived = read_archived_events(conn, ARCHIVE_DIR, sid, ["id", "payload_json"], kinds=[kind])
+    return loads(archived[-1][1]) if archived else None
+
+
+def reusable_payload(sid: str, kind: str, meta_keys: tuple[str, ...] = ()) -> tuple[str, dict] | None:
+    """Return ``(original_sid, payload)`` when ``sid`` duplicates an analysed upload.
+
+    ``meta_keys`` are upload ``meta`` fields the result depends on; both
+    uploads must agree on them.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        upload = latest_event_payload(conn, sid, "upload")
+        original = upload.get("duplicate_of") if upload else None
+        if not original:
+            return None
+        if meta_keys:
+            meta = upload.get("meta") or {}
+            original_meta = (latest_event_payload(conn, original, "upload") or {}).get("meta") or {}
+            if any(meta.get(k) != original_meta.get(k) for k in meta_keys):
+                return None
+        payload = latest_event_payload(conn, original, kind)
+    finally:
+        conn.close()
+    return (original, payload) if payload else None
+
+
+def latest_upload_image(conn: sqlite3.Connection, sid: str) -> str | None:
+    """Return the base64 original of the latest upload of ``sid``."""
+    row = conn.execute(
+        "SELECT image FROM evidence_ledger WHERE submission_id=? AND kind='upload' ORDER BY id DESC LIMIT 1",
+        (sid,),
+    ).fetchone()
+    if row is not None:
+        return row[0]
+    archived = read_archived_events(conn, ARCHIVE_DIR, sid, ["id", "image"], kinds=["upload"])
+    return archived[-1][1] if archived else None
+
+
+def load_submission_image(sid: str) -> ImageDerivative | None:
+    """Return the vision derivative of the latest upload of ``sid``.
+
+    Uploads record the derivative hash in their payload, so the original
+    image column is only read for rows written before derivatives existed.
+    """
+    with span("ledger.load_image"):
+        return _load_submission_image(sid)
+
+
+def _load_submission_image(sid: str) -> ImageDerivative | None:
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        row = conn.execute(
+            "SELECT id, payload_json FROM evidence_ledger WHERE submission_id=? AND kind='upload' ORDER BY id DESC LIMIT 1",
+            (sid,),
+        ).fetchone()
+        if row is not None:
+            payload = loads(ledger_codec.decode_bytes(row[1]))
+            derivative = image_store.get(payload["image_sha256"]) if payload.get("image_sha256") else None
+            if derivative is not None:
+                return derivative
+            image = conn.execute("SELECT image FROM evidence_ledger WHERE id=?", (row[0],)).fetchone()[0]
+        else:
+            archived = read_archived_events(conn, ARCHIVE_DIR, sid, ["id", "payload_json", "image"], kinds=["upload"])
+            if not archived:
+                return None
+            _, payload_json, image = archived[-1]
+            sha = json.loads(payload_json).get("image_sha256")
+            derivative = image_store.get(sha) if sha else None
+            if derivative is not None:
+                return derivative
+    finally:
+        conn.close()
+    return image_store.ingest_b64(image) if image else None
+
+
+def _log_bulk_import(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logging.error("Bulk import failed", exc_info=task.exception())
+
+
+@app.post("/bulk-imports", status_code=202)
+async def start_bulk_import(project: str = Form(...), manifest: UploadFile = File(...)):
+    """Import a submissions manifest in the background.
+
+    Posting the same manifest again resumes an interrupted import; only
+    http(s) ``asset_url`` values are fetched.
+    """
+    IMPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = IMPORTS_DIR / f"upload-{os.getpid()}-{time.monotonic_ns()}.part"
+    digest = hashlib.sha256()
+    with tmp.open("wb") as f:
+        while chunk := await manifest.read(1 << 20):
+            digest.update(chunk)
+            f.write(chunk)
+    key = digest.hexdigest()
+    suffix = ".jsonl" if (manifest.filename or "").endswith((".jsonl", ".ndjson")) else ".json"
+    path = IMPORTS_DIR / f"{key}{suffix}"
+    os.replace(tmp, path)
+    running = bulk_import_tasks.get(key)
+    if running is not None and not running.done():
+        raise HTTPException(status_code=409, detail="This manifest is already being imported")
+    importer = importer_from_config(
+        DB_PATH, ledger_codec, image_store, duplicate_index, CONFIG.policy, allow_local=False
+    )
+    task = bulk_import_tasks[key] = asyncio.create_task(importer.run(path, project))
+    task.add_done_callback(_log_bulk_import)
+    return {"manifest_key": key, "status_url": f"/bulk-imports/{key}"}
+
+
+@app.get("/bulk-imports/{manifest_key}")
+def bulk_import_status(manifest_key: str, failures: int = Query(20, ge=0, le=1000)):
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    try:
+        row = conn.execute("SELECT * FROM bulk_imports WHERE manifest_key=?", (manifest_key,)).fetchone()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Unknown import")
+        failed = conn.execute(
+            "SELECT position, submission_id, error FROM bulk_import_failures WHERE manifest_key=? ORDER BY position LIMIT ?",
+            (manifest_key, failures),
+        ).fetchall()
+    finally:
+        conn.close()
+    status = dict(row)
+    task = bulk_import_tasks.get(manifest_key)
+    if status["state"] == "running" and (task is None or task.done()):
+        # Left behind by a process that stopped mid-import.
+        status["state"] = "interrupted"
+    status["failures"] = [dict(f) for f in failed]
+    return status
+
+
 @app.post("/analyze-vision", response_model=VisionResponse)
 async def analyze_vision(
+    request: Request,
     file: UploadFile = File(...),
     prompt: str = Form("Describe the image"),
 ) -> VisionResponse:
@@ -268,82 +948,136 @@ async def analyze_vision(
     content = await file.read()
     if len(content) > 2 * 1024 * 1024:
         raise HTTPException(413, "Image too large")
-    image_b64 = base64.b64encode(content).decode("utf-8")
+    derivative = await vision_derivative(content)
+    model = CONFIG.models.vision_model
+    match = await run_in_threadpool(register_image, content, derivative.sha256)
+    if reuse_results():
+        # Exact copies first, then the closest near-duplicate.
+        candidates = [derivative.sha256] + ([match.sha256] if match else [])
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            cached = load_vision_result(conn, candidates, model, sanitized_prompt)
+        finally:
+            conn.close()
+        if cached is not None:
+            metrics.inc("duplicates.reused.vision")
+            return VisionResponse(answer=cached[0], model_version=cached[1])
     provider_name = os.getenv("LLM_PROVIDER", "ollama")
     try:
         provider = ProviderFactory.get(provider_name)
     except ValueError as exc:
         raise HTTPException(status_code=500, detail=str(exc))
     try:
-        raw = await provider.generate(sanitized_prompt, "llava:7b", images=[image_b64])
+        async with admission.admit(request, "analyze_vision", model):
+            raw = await provider.generate(sanitized_prompt, model, images=[derivative.image_b64])
     except HTTPException as exc:
-        raise HTTPException(status_code=exc.status_code, detail=exc.detail)
+        raise HTTPException(status_code=exc.status_code, detail=exc.detail, headers=exc.headers)
     answer = raw.get("response", "").strip()
     if filter_output(answer):
         raise HTTPException(status_code=403, detail="Disallowed content in response")
     masked_answer = mask_pii(answer)
-    return VisionResponse(answer=masked_answer, model_version=raw.get("model", "llava:7b"))
+    model_version = raw.get("model", model)
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        store_vision_result(conn, derivative.sha256, model, sanitized_prompt, masked_answer, model_version)
+    finally:
+        conn.close()
+    return VisionResponse(answer=masked_answer, model_version=model_version)
 
 
 @app.post("/analyze", response_model=AnalyzeResponse)
 def analyze(payload: AnalyzeRequest) -> AnalyzeResponse:
     sid = payload.submission_id
-    hits = search_hits("contrast") or search_hits("대비")
-    findings = [
-        AnalyzeFinding(
-            region=Region(x=0.18, y=0.22, w=0.42, h=0.28),
-            label="Low Contrast",
-            confidence=0.82,
-            explanation="Text/background contrast may be below recommended ratio.",
-            citations=[h["citation_id"] for h in hits],
+    # The palette check depends on the upload's own meta.colors.
+    reused = reusable_payload(sid, "analyze", ("colors",)) if reuse_results() else None
+    if reused is not None:
+        original, cached = reused
+        resp = AnalyzeResponse.model_validate(cached)
+        metrics.inc("duplicates.reused.analyze")
+        payload = resp.model_dump(mode="json")
+        log_evidence(
+            "analyze",
+            sid,
+            {**payload, "reused_from": original},
+            raw_output=dumps_str(payload),
         )
-    ]
+        return resp
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        upload = latest_event_payload(conn, sid, "upload") or {}
+        image_b64 = latest_upload_image(conn, sid)
+    finally:
+        conn.close()
+    findings: list[AnalyzeFinding] = []
+    checks: dict = {"color_contrast": {"passed": None, "reason": "no image"}}
+    if image_b64:
+        start = time.perf_counter()
+        try:
+            result = analyze_image(
+                base64.b64decode(image_b64),
+                declared_colors=(upload.get("meta") or {}).get("colors") or [],
+            )
+        except InvalidImageError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        except (OSError, ValueError) as exc:
+            raise HTTPException(status_code=422, detail=f"Image could not be analyzed: {exc}") from exc
+        metrics.observe("analyze.analyzer_ms", (time.perf_counter() - start) * 1000)
+        checks = {**result.checks, "metrics": result.metrics}
+        for f in result.findings:
+            findings.append(AnalyzeFinding(
+                region=Region(**f["region"]),
+                label=f["label"],
+                confidence=f["confidence"],
+                explanation=f["explanation"],
+                citations=finding_citations(f["label"]),
+            ))
     resp = AnalyzeResponse(
         findings=findings,
-        model_version="lmm_stub_v0",
-        prompt_snapshot="Analyze visual hierarchy, contrast, typography…",
+        model_version=ANALYZER_VERSION,
+        prompt_snapshot="Deterministic checks: WCAG contrast, palette vs meta.colors, white space, alignment",
+        checks=checks,
     )
-    raw_output = resp.model_dump_json(ensure_ascii=False)
-    log_evidence("analyze", sid, resp.model_dump(), raw_output=raw_output)
+    # One dump serves both the ledger payload and the raw output copy.
+    payload = resp.model_dump(mode="json")
+    log_evidence("analyze", sid, payload, raw_output=dumps_str(payload))
     return resp
 
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat(payload: ChatRequest) -> ChatResponse:
+async def chat(payload: ChatRequest, request: Request) -> ChatResponse:
     sid = payload.submission_id
     message = payload.message
-    if detect_prompt_injection(message):
-        raise HTTPException(status_code=400, detail="Prompt injection detected")
-    sanitized_message = mask_pii(message)
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.execute(
-        "SELECT image FROM evidence_ledger WHERE submission_id=? AND kind='upload' ORDER BY id DESC LIMIT 1",
-        (sid,),
-    )
-    row = cur.fetchone()
-    conn.close()
-    if not row or not row[0]:
+    with span("security.screen_input"):
+        if detect_prompt_injection(message):
+            raise HTTPException(status_code=400, detail="Prompt injection detected")
+        sanitized_message = mask_pii(message)
+    require_ml()
+    try:
+        derivative = await run_in_threadpool(load_submission_image, sid)
+    except InvalidImageError:
+        derivative = None
+    if derivative is None:
         raise HTTPException(status_code=404, detail="Image not found for submission")
-    image_b64 = row[0]
     provider_name = os.getenv("LLM_PROVIDER", "ollama")
     try:
         provider = ProviderFactory.get(provider_name)
     except ValueError as exc:
         raise HTTPException(status_code=500, detail=str(exc))
-    parser = PydanticOutputParser(pydantic_object=LLMChatResponse)
+    parser = chat_parser()
     prompt = f"{sanitized_message}\n{parser.get_format_instructions()}"
     start_time = time.monotonic()
     logging.info("generate_structured start")
     try:
-        parsed, raw = await generate_structured(
-            provider,
-            prompt,
-            "llava:7b",
-            parser,
-            images=[image_b64],
-            stream=False,
-            timeout=60,
-        )
+        async with admission.admit(request, "chat", CONFIG.models.vision_model):
+            parsed, raw = await generate_structured(
+                provider,
+                prompt,
+                CONFIG.models.vision_model,
+                parser,
+                images=[derivative.image_b64],
+                stream=False,
+                timeout=60,
+            )
     except HTTPException as exc:
         logging.info(
             "generate_structured failed in %.2f seconds",
@@ -371,22 +1105,23 @@ async def chat(payload: ChatRequest) -> ChatResponse:
             time.monotonic() - start_time,
         )
     answer = parsed.answer.strip()
-    if filter_output(answer):
-        raise HTTPException(status_code=403, detail="Disallowed content in response")
-    masked_answer = mask_pii(answer)
+    with span("security.screen_output"):
+        if filter_output(answer):
+            raise HTTPException(status_code=403, detail="Disallowed content in response")
+        masked_answer = mask_pii(answer)
     resp = ChatResponse(
         answer=answer,
         citations=parsed.citations,
-        model_version=raw.get("model", "llava:7b"),
+        model_version=raw.get("model", CONFIG.models.vision_model),
         prompt_snapshot=sanitized_message,
     )
     log_payload = resp.model_dump()
     log_payload["answer"] = masked_answer
-    log_evidence(
+    await record_evidence(
         "chat",
         sid,
         {"message": sanitized_message, **log_payload},
-        raw_output=mask_pii(json.dumps(raw, ensure_ascii=False)),
+        raw_output=mask_pii(json.dumps(compact_raw_response(raw), ensure_ascii=False)),
     )
     return resp
 
@@ -400,10 +1135,36 @@ def moderate(payload: ModerateRequest) -> ModerateResponse:
         reasons.append("disallowed_output")
     return ModerateResponse(compliant=not reasons, reasons=reasons)
 
+@app.post("/guidelines/reload")
+async def reload_guidelines():
+    """Rebuild the shared snapshot if the guideline or rubric files changed.
+
+    Other workers pick up the new generation within a few seconds.
+    """
+    source = source_fingerprint(snapshot_sources())
+    previous = snapshot_generation()
+    try:
+        snap = await run_in_threadpool(snapshot_store.ensure, source, build_snapshot_contents)
+    except (OSError, ValueError) as err:
+        raise HTTPException(status_code=422, detail=str(err))
+    if snap.generation != previous:
+        apply_snapshot(snap)
+    return {"generation": snap.generation, "changed": snap.generation != previous}
+
+
 @app.post("/search-guideline")
 def search_guideline(payload: dict):
-    q = payload.get("query", "")
-    return {"hits": search_hits(q) if q else []}
+    q = normalize_query(payload.get("query", ""))
+    if not q:
+        return {"hits": []}
+    generation = snapshot_generation()
+    hit = search_cache.get(q, generation) if search_cache is not None else None
+    if hit is not None:
+        return {"hits": hit.value}
+    hits = search_hits(q)
+    if search_cache is not None:
+        search_cache.put(q, hits, generation)
+    return {"hits": hits}
 
 
 # --- Project & Judging Management Endpoints ---
@@ -512,6 +1273,17 @@ def record_score(assignment_id: int, payload: dict):
     score = payload.get("score")
     if score is None:
         raise HTTPException(status_code=400, detail="score required")
+    if payload.get("rubric_version"):
+        # Per-criterion scores are checked against that criterion's scale,
+        # overall scores against the range of the weighted mean.
+        rubric = resolve_rubric(payload["rubric_version"], payload.get("award_id"))
+        if payload.get("criteria_id"):
+            errors = rubric.score_errors([(payload["criteria_id"], float(score))], complete=False)
+        else:
+            low, high = rubric.total_range()
+            errors = [] if low <= float(score) <= high else [f"score {float(score):g} outside [{low:g}, {high:g}]"]
+        if errors:
+            raise HTTPException(status_code=422, detail=errors)
     conn = sqlite3.connect(DB_PATH)
     conn.execute(
         "UPDATE assignments SET score=? WHERE id=?",
@@ -536,37 +1308,154 @@ def final_score(submission_id: int):
     avg = sum(scores) / len(scores)
     return {"submission_id": submission_id, "final_score": avg}
 
+def lookup_rubric(award_id: str, version: str) -> CompiledRubric:
+    rubric = rubric_registry.get(award_id, version)
+    if rubric is None:
+        raise HTTPException(status_code=404, detail="Rubric not found")
+    return rubric
+
+
+@app.get("/rubrics")
+def list_rubrics():
+    return {"rubrics": [
+        {"award_id": r.award_id, "version": r.version, "criteria": list(r.criteria)}
+        for r in rubric_registry
+    ]}
+
 @app.get("/rubrics/{award_id}/{version}")
-def get_rubric(award_id: str, version: str):
-    if RUBRIC.get("award_id") == award_id and RUBRIC.get("version") == version:
-        return RUBRIC
-    raise HTTPException(status_code=404, detail="Rubric not found")
+def get_rubric(award_id: str, version: str, request: Request, response: Response):
+    rubric = lookup_rubric(award_id, version)
+    # Rubrics are immutable per version; the ETag is a hash of the content.
+    headers = {"ETag": rubric.etag, "Cache-Control": "public, max-age=300"}
+    if etag_matches(request.headers.get("if-none-match"), rubric.etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return rubric.data
+
+@app.get("/rubrics/{award_id}/{version}/evidence")
+def get_rubric_evidence(award_id: str, version: str):
+    rubric = lookup_rubric(award_id, version)
+    bundles = rubric_evidence(rubric.data)
+    return {
+        "award_id": award_id,
+        "version": version,
+        "criteria": {cid: b.to_dict() for cid, b in bundles.items()},
+    }
+
+def resolve_rubric(version: str, award_id: str | None = None) -> CompiledRubric:
+    try:
+        return rubric_registry.resolve(version, award_id)
+    except KeyError as err:
+        raise HTTPException(status_code=422, detail=err.args[0])
+
 
 @app.post("/evaluate", response_model=EvaluateResponse)
 def evaluate(record: EvaluateRequest) -> EvaluateResponse:
     sid = record.submission_id
-    log_evidence("evaluate", sid, record.model_dump())
+    rubric = resolve_rubric(record.rubric_version, record.award_id)
+    try:
+        rubric.validate_scores((s.criteria_id, s.score) for s in record.scores)
+    except ScoreValidationError as err:
+        raise HTTPException(status_code=422, detail=err.errors)
+    payload = record.model_dump(mode="json")
+    payload["award_id"] = rubric.award_id
+    log_evidence("evaluate", sid, payload)
     return EvaluateResponse(ok=True)
 
+REPORT_OPTIONAL_FIELDS = {"image", "raw_output"}
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Return ``True`` if an ``If-None-Match`` header matches ``etag``."""
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
 @app.get("/report/{submission_id}")
-def report(submission_id: str):
+def report(
+    submission_id: str,
+    request: Request,
+    include: str | None = Query(None, description="Comma separated extra fields: image,raw_output"),
+    kind: list[str] | None = Query(None, description="Only return events of these kinds"),
+    after: int | None = Query(None, ge=0, description="Return events with id greater than this cursor"),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    fields = sorted({f.strip() for f in (include or "").split(",") if f.strip()})
+    unknown = set(fields) - REPORT_OPTIONAL_FIELDS
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown include fields: {', '.join(sorted(unknown))}")
+    kinds = sorted(set(kind or []))
     conn = sqlite3.connect(DB_PATH)
-    cur = conn.execute(
-        "SELECT kind, at, payload_json, raw_output, image FROM evidence_ledger WHERE submission_id=? ORDER BY id ASC",
-        (submission_id,),
+    try:
+        # The newest ledger id identifies the report contents; this is a
+        # covering index seek on ix_evidence_submission.
+        row = conn.execute(
+            "SELECT id FROM evidence_ledger WHERE submission_id=? ORDER BY id DESC LIMIT 1",
+            (submission_id,),
+        ).fetchone()
+        archived_max = archived_max_id(conn, submission_id)
+        max_id = max(row[0] if row else 0, archived_max)
+        variant = hashlib.sha1(
+            json.dumps([fields, kinds, after, limit]).encode("utf-8")
+        ).hexdigest()[:12]
+        etag = f'"{max_id}-{variant}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        columns = ["id", "kind", "at", "payload_json"] + fields
+        sql = f"SELECT {', '.join(columns)} FROM evidence_ledger WHERE submission_id=?"
+        params: list = [submission_id]
+        if kinds:
+            sql += f" AND kind IN ({','.join('?' * len(kinds))})"
+            params.extend(kinds)
+        if after is not None:
+            sql += " AND id>?"
+            params.append(after)
+        sql += " ORDER BY id ASC LIMIT ?"
+        params.append(limit + 1)
+        rows = conn.execute(sql, params).fetchall()
+        if archived_max and (after is None or after < archived_max):
+            archived = read_archived_events(
+                conn, ARCHIVE_DIR, submission_id, columns, kinds, after, limit + 1
+            )
+            rows = sorted(archived + rows, key=lambda r: r[0])[: limit + 1]
+    finally:
+        conn.close()
+    items = []
+    for row in rows[:limit]:
+        # Stored payloads are JSON already; they go out without a parse.
+        item = {"id": row[0], "kind": row[1], "at": row[2], "payload": raw(ledger_codec.decode_bytes(row[3]))}
+        item.update(zip(fields, row[4:]))
+        if "raw_output" in item:
+            item["raw_output"] = ledger_codec.decode(item["raw_output"])
+        items.append(item)
+    next_after = items[-1]["id"] if len(rows) > limit else None
+    return FastJSONResponse(
+        {"submission_id": submission_id, "events": items, "next_after": next_after}, headers=headers
     )
-    items = [
-        {
-            "kind": k,
-            "at": at,
-            "payload": json.loads(p),
-            "raw_output": r,
-            "image": img,
-        }
-        for (k, at, p, r, img) in cur.fetchall()
-    ]
-    conn.close()
-    return {"submission_id": submission_id, "events": items}
+
+
+@app.get("/ledger/search")
+def search_ledger(
+    q: str = Query(..., min_length=1, description="Terms to match (all required); a trailing * matches prefixes"),
+    kind: list[str] | None = Query(None, description="Only return events of these kinds"),
+    submission_id: str | None = None,
+    since: str | None = Query(None, description="ISO timestamp, inclusive"),
+    until: str | None = Query(None, description="ISO timestamp, exclusive"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10000),
+    order: str = Query("rank", pattern="^(rank|recent)$", description="rank: best match first; recent: newest first"),
+):
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        found = ledger_search.search(
+            conn, q, sorted(set(kind or [])), submission_id, since, until, limit, offset, order
+        )
+    finally:
+        conn.close()
+    return {"query": q, **found}
 
 
 @app.get("/dataset/export")
@@ -576,23 +1465,112 @@ def dataset_export():
     dataset = []
     cur.execute("SELECT submission_id, image FROM evidence_ledger WHERE kind='upload'")
     uploads = cur.fetchall()
-    for sid, image in uploads:
-        cur.execute(
-            "SELECT payload_json FROM evidence_ledger WHERE submission_id=? AND kind='analyze' ORDER BY id DESC LIMIT 1",
-            (sid,),
-        )
-        row = cur.fetchone()
-        findings = json.loads(row[0]).get("findings") if row else None
+    # Latest archived analyze/evaluate payload per submission, used when the
+    # hot table has none (e.g. the whole submission was archived).
+    archived_latest: dict[tuple[str, str], tuple[int, str]] = {}
+    archived_uploads = []
+    for sid, kind, eid, payload_json, image in iter_archived(
+        conn, ARCHIVE_DIR,
+        ["submission_id", "kind", "id", "payload_json", "image"],
+        kinds=["upload", "analyze", "evaluate"],
+    ):
+        if kind == "upload":
+            archived_uploads.append((eid, sid, image))
+        elif eid > archived_latest.get((sid, kind), (0, ""))[0]:
+            archived_latest[(sid, kind)] = (eid, payload_json)
+    uploads = [(sid, image) for _, sid, image in sorted(archived_uploads)] + uploads
+
+    def latest_payload(sid: str, kind: str) -> str | bytes | None:
+        """Encoded JSON of the newest ``kind`` payload."""
         cur.execute(
-            "SELECT payload_json FROM evidence_ledger WHERE submission_id=? AND kind='evaluate' ORDER BY id DESC LIMIT 1",
-            (sid,),
+            "SELECT payload_json FROM evidence_ledger WHERE submission_id=? AND kind=? ORDER BY id DESC LIMIT 1",
+            (sid, kind),
         )
         row = cur.fetchone()
-        corrections = json.loads(row[0]) if row else None
-        if image and findings and corrections:
-            dataset.append({"image": image, "findings": findings, "corrections": corrections})
+        if row:
+            return ledger_codec.decode_bytes(row[0])
+        if (sid, kind) in archived_latest:
+            return archived_latest[(sid, kind)][1]
+        return None
+
+    for sid, image in uploads:
+        if not image:
+            continue
+        corrections = latest_payload(sid, "evaluate")
+        if corrections is None or corrections in (b"{}", "{}"):
+            continue
+        analyzed = latest_payload(sid, "analyze")
+        findings = loads(analyzed).get("findings") if analyzed else None
+        if findings:
+            dataset.append({"image": image, "findings": findings, "corrections": raw(corrections)})
     conn.close()
-    return {"data": dataset}
+    # Returned directly so FastAPI does not walk the (large) result.
+    return FastJSONResponse({"data": dataset})
+
+@app.get("/healthz")
+def healthz() -> dict:
+    """Liveness: the process is up and serving requests."""
+    return {"status": "ok", "uptime_s": readiness.snapshot()["uptime_s"]}
+
+
+@app.get("/readyz")
+def readyz() -> JSONResponse:
+    """Readiness with per-subsystem state and warmup timings.
+
+    Answers 503 until every required subsystem is ready; the ML stacks only
+    count as required when ``PRELOAD_ML`` is set.
+    """
+    snapshot = readiness.snapshot()
+    snapshot["mode"] = CONFIG.mode if CONFIG is not None else None
+    return JSONResponse(snapshot, status_code=200 if snapshot["ready"] else 503)
+
+
+@app.get("/metrics")
+def metrics_snapshot():
+    return metrics.snapshot()
+
+
+def require_profile_token(request: Request) -> None:
+    if not profiler.authorized(request.headers.get(profiler.settings.header)):
+        raise HTTPException(status_code=403, detail="Profiling token required")
+
+
+@app.get("/admin/profiles")
+def list_profiles(request: Request):
+    """Summaries of the slowest and the latest explicitly profiled requests."""
+    require_profile_token(request)
+    return {
+        "enabled": profiler.settings.enabled,
+        "slowest": [p.summary() for p in profiler.store.slowest()],
+        "recent": [p.summary() for p in profiler.store.recent()],
+    }
+
+
+@app.get("/admin/profiles/{profile_id}")
+def get_profile(profile_id: str, request: Request):
+    require_profile_token(request)
+    profile = profiler.store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile.to_dict()
+
+
+@app.get("/admin/profiles/{profile_id}/flamegraph")
+def get_profile_flamegraph(profile_id: str, request: Request):
+    """Folded stacks for flamegraph.pl / speedscope."""
+    require_profile_token(request)
+    profile = profiler.store.get(profile_id)
+    if profile is None or not profile.stacks:
+        raise HTTPException(status_code=404, detail="No stack samples for this profile")
+    return PlainTextResponse(profile.folded())
+
+
+@app.delete("/admin/profiles")
+def clear_profiles(request: Request):
+    require_profile_token(request)
+    profiler.store.clear()
+    return {"ok": True}
+
 
 @app.get("/", include_in_schema=False)
 def root():
@@ -6,13 +6,23 @@ This module initializes an optional Langfuse client using environment
 variables and exposes a ``span`` context manager for tracing and timing
 operations.  If configuration or environment variables are missing, the
 functions degrade to no-ops that simply log timings locally.
+
+While a request is being profiled (:mod:`app.profiling`), ``span`` also
+records its timing into the request's profile.
+
+``metrics`` is a small in-process registry of counters, gauges and latency
+histograms served by the ``/metrics`` endpoint.
 """
 
 import logging
+import math
 import os
+import threading
 import time
+from collections import deque
 from contextlib import contextmanager
-from typing import Any
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict
 
 logger = logging.getLogger(__name__)
 
@@ -52,6 +62,8 @@ class LangfuseTracer:
 
 
 _tracer: Any = NoOpTracer()
+# Set by app.profiling.ProfilingMiddleware for profiled requests.
+active_profile: ContextVar[Any] = ContextVar("active_profile", default=None)
 
 
 def init_observability(config: Any) -> None:
@@ -80,4 +92,83 @@ def init_observability(config: Any) -> None:
 def span(name: str):
     """Public helper returning a tracing context manager."""
 
-    return _tracer.span(name)
+    profile = active_profile.get()
+    if profile is None:
+        return _tracer.span(name)
+    return profile.span(name, _tracer.span(name))
+
+
+class _Histogram:
+    """Running count/sum/max plus a bounded window for percentiles."""
+
+    def __init__(self, window: int) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.recent.append(value)
+
+    def summary(self) -> Dict[str, float]:
+        values = sorted(self.recent)
+
+        def pct(p: float) -> float:
+            if not values:
+                return 0.0
+            return values[min(len(values) - 1, math.ceil(p * len(values)) - 1)]
+
+        return {
+            "count": self.count,
+            "sum": round(self.total, 3),
+            "max": round(self.max, 3),
+            "p50": round(pct(0.50), 3),
+            "p95": round(pct(0.95), 3),
+            "p99": round(pct(0.99), 3),
+        }
+
+
+class Metrics:
+    """Thread-safe in-process metrics registry."""
+
+    def __init__(self, window: int = 1024) -> None:
+        self._lock = threading.Lock()
+        self._window = window
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float | Callable[[], float]] = {}
+        self._histograms: Dict[str, _Histogram] = {}
+
+    def inc(self, name: str, value: float = 1.0) -> None:
+        """Add ``value`` to counter ``name``."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0.0) + value
+
+    def set_gauge(self, name: str, value: float | Callable[[], float]) -> None:
+        """Set gauge ``name`` to a value or a callable evaluated on snapshot."""
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float) -> None:
+        """Record ``value`` (usually milliseconds) in histogram ``name``."""
+        with self._lock:
+            hist = self._histograms.get(name)
+            if hist is None:
+                hist = self._histograms[name] = _Histogram(self._window)
+            hist.observe(value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return all metrics as plain JSON-serializable data."""
+        with self._lock:
+            gauges = dict(self._gauges)
+            result = {
+                "counters": dict(self._counters),
+                "histograms": {k: h.summary() for k, h in self._histograms.items()},
+            }
+        result["gauges"] = {k: (v() if callable(v) else v) for k, v in gauges.items()}
+        return result
+
+
+metrics = Metrics()
@@ -0,0 +1,230 @@
+"""Perceptual hashes and near-duplicate lookup for uploaded images.
+
+Every upload gets a 64-bit pHash (low-frequency DCT signs) and dHash
+(horizontal gradient signs).  Both survive re-encoding, resizing and small
+edits, so the Hamming distance between two hashes measures how different two
+posters look.  Hashes are stored in the ``image_hashes`` table, one row per
+distinct image; :class:`DuplicateIndex` mirrors the table into a BK-tree
+keyed on the pHash and picks up rows written by other processes on each
+lookup.
+
+Pillow is imported on first use.
+"""
+from __future__ import annotations
+
+import datetime
+import math
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from app.imaging import open_image
+from app.observability import metrics
+
+_DCT_SIZE = 32
+_DCT_KEEP = 8
+# Orthogonal DCT-II basis rows for the coefficients kept by phash().
+_DCT = [
+    [math.cos((2 * x + 1) * u * math.pi / (2 * _DCT_SIZE)) for x in range(_DCT_SIZE)]
+    for u in range(_DCT_KEEP)
+]
+
+
+@dataclass(frozen=True)
+class ImageHashes:
+    phash: int
+    dhash: int
+
+
+@dataclass
+class DuplicateMatch:
+    """Closest previously seen image within the duplicate thresholds."""
+
+    sha256: str
+    submission_id: str | None
+    phash_distance: int
+    dhash_distance: int
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def to_hex(value: int) -> str:
+    return f"{value:016x}"
+
+
+def _bits(values: List[float], threshold: float) -> int:
+    out = 0
+    for v in values:
+        out = (out << 1) | (v > threshold)
+    return out
+
+
+def phash(img: Any) -> int:
+    """DCT based perceptual hash of a Pillow image."""
+    from PIL import Image
+
+    gray = img.convert("L").resize((_DCT_SIZE, _DCT_SIZE), Image.Resampling.LANCZOS)
+    px = gray.tobytes()
+    rows = [px[y * _DCT_SIZE:(y + 1) * _DCT_SIZE] for y in range(_DCT_SIZE)]
+    # Separable 2D DCT restricted to the 8x8 lowest frequencies.
+    partial = [[sum(c * p for c, p in zip(basis, row)) for row in rows] for basis in _DCT]
+    coeffs = [sum(c * p for c, p in zip(basis, col)) for col in partial for basis in _DCT]
+    # The DC term only encodes overall brightness.
+    median = sorted(coeffs[1:])[len(coeffs[1:]) // 2]
+    return _bits(coeffs, median)
+
+
+def dhash(img: Any) -> int:
+    """Gradient hash: is each pixel brighter than its right neighbour."""
+    from PIL import Image
+
+    gray = img.convert("L").resize((9, 8), Image.Resampling.LANCZOS)
+    px = gray.tobytes()
+    out = 0
+    for y in range(8):
+        row = px[y * 9:(y + 1) * 9]
+        for x in range(8):
+            out = (out << 1) | (row[x] > row[x + 1])
+    return out
+
+
+def compute_hashes(content: bytes) -> ImageHashes:
+    """Hash raw image bytes, decoding JPEGs at reduced scale.
+
+    Raises :class:`~app.imaging.InvalidImageError` like :func:`~app.imaging.open_image`.
+    """
+    from PIL import ImageOps
+
+    with open_image(content) as img:
+        img.draft("L", (64, 64))
+        img = ImageOps.exif_transpose(img)
+        return ImageHashes(phash(img), dhash(img))
+
+
+class BKTree:
+    """Burkhard-Keller tree over 64-bit hashes with Hamming distance."""
+
+    def __init__(self) -> None:
+        # node: (key, values, children keyed by distance to key)
+        self._root: Tuple[int, list, Dict[int, Any]] | None = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, key: int, value: Any) -> None:
+        self._size += 1
+        if self._root is None:
+            self._root = (key, [value], {})
+            return
+        node = self._root
+        while True:
+            d = hamming(key, node[0])
+            if d == 0:
+                node[1].append(value)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = (key, [value], {})
+                return
+            node = child
+
+    def search(self, key: int, radius: int) -> List[Tuple[int, int, Any]]:
+        """Return ``(distance, key, value)`` for entries within ``radius``."""
+        if self._root is None:
+            return []
+        found = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            d = hamming(key, node[0])
+            if d <= radius:
+                found.extend((d, node[0], v) for v in node[1])
+            # Triangle inequality: only children at distance d±radius can match.
+            for cd, child in node[2].items():
+                if d - radius <= cd <= d + radius:
+                    stack.append(child)
+        return found
+
+
+class DuplicateIndex:
+    """Near-duplicate lookup over the ``image_hashes`` table."""
+
+    def __init__(self, db_path: Path | str, phash_threshold: int = 6, dhash_threshold: int = 10) -> None:
+        self.db_path = db_path
+        self.phash_threshold = phash_threshold
+        self.dhash_threshold = dhash_threshold
+        self._tree = BKTree()
+        self._last_id = 0
+        self._lock = threading.Lock()
+        metrics.set_gauge("duplicates.indexed", lambda: len(self._tree))
+
+    def _sync(self, conn: sqlite3.Connection) -> None:
+        rows = conn.execute(
+            "SELECT id, sha256, phash, dhash FROM image_hashes WHERE id>? ORDER BY id",
+            (self._last_id,),
+        ).fetchall()
+        for row_id, sha256, ph, dh in rows:
+            self._tree.add(int(ph, 16), (row_id, sha256, int(dh, 16)))
+            self._last_id = row_id
+
+    def find(self, hashes: ImageHashes, with_submission: bool = False) -> DuplicateMatch | None:
+        """Return the closest earlier image within both thresholds.
+
+        With ``with_submission``, images not attached to a submission (seen
+        only by ``/analyze-vision``) are skipped, so they cannot hide an
+        earlier submission of the same poster.
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with self._lock:
+                self._sync(conn)
+                candidates = self._tree.search(hashes.phash, self.phash_threshold)
+            ranked = []
+            for pd, _, (row_id, sha256, dh) in candidates:
+                dd = hamming(hashes.dhash, dh)
+                if dd <= self.dhash_threshold:
+                    ranked.append(((pd + dd, row_id), sha256, pd, dd))
+            ranked.sort()
+            best = None
+            for _, sha256, pd, dd in ranked:
+                # Read the submission from the table: it may have been
+                # attached after the row was loaded into the tree.
+                (sid,) = conn.execute("SELECT submission_id FROM image_hashes WHERE sha256=?", (sha256,)).fetchone()
+                if sid is not None or not with_submission:
+                    best = DuplicateMatch(sha256, sid, pd, dd)
+                    break
+        finally:
+            conn.close()
+        metrics.inc("duplicates.hit" if best else "duplicates.miss")
+        return best
+
+    def add(self, sha256: str, hashes: ImageHashes, submission_id: str | None = None) -> None:
+        """Record an image; the first submission of an identical file wins."""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute(
+                "INSERT OR IGNORE INTO image_hashes(sha256, submission_id, phash, dhash, created_at) VALUES(?,?,?,?,?)",
+                (
+                    sha256,
+                    submission_id,
+                    to_hex(hashes.phash),
+                    to_hex(hashes.dhash),
+                    datetime.datetime.utcnow().isoformat() + "Z",
+                ),
+            )
+            # Images first seen via /analyze-vision get a submission later.
+            if submission_id is not None:
+                conn.execute(
+                    "UPDATE image_hashes SET submission_id=? WHERE sha256=? AND submission_id IS NULL",
+                    (submission_id, sha256),
+                )
+            conn.commit()
+            with self._lock:
+                self._sync(conn)
+        finally:
+            conn.close()
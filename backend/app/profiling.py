@@ -0,0 +1,385 @@
+"""On-demand request profiling.
+
+:class:`ProfilingMiddleware` decides per request whether to profile it:
+
+* ``header``: the request carries ``X-Profile`` (its value must equal
+  ``token`` when one is configured);
+* ``sample``: a random ``sample_rate`` fraction of requests;
+* ``slow``: with ``slow_threshold_ms`` set, every request records its span
+  timings and is kept only if it took at least that long.
+
+A profiled request collects every :func:`app.observability.span` it enters,
+including spans run in the threadpool (the profile travels in a context
+variable).  Header and sampled requests also get a stack-sampled
+flamegraph: a sampler thread, running only while such requests are in
+flight, records the request's event-loop stack when its task is running,
+the stacks of worker threads inside its spans, and the awaiting coroutine
+chain (``[await]``) otherwise.  Stacks are kept in folded format
+(``frame;frame;frame count``) as read by flamegraph.pl or speedscope.
+
+Kept profiles go to a :class:`ProfileStore` holding the slowest
+``keep_slowest`` requests plus the latest ``keep_recent`` explicitly
+requested ones.  When profiling is disabled the middleware only checks a
+flag, and ``span`` only reads an unset context variable.
+"""
+from __future__ import annotations
+
+import asyncio
+import hmac
+import heapq
+import itertools
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, ContextManager, Deque, Dict, Iterator, List, Optional
+
+from app.observability import active_profile, metrics
+
+MAX_STACK_DEPTH = 64
+_TIMING_NAME_RE = re.compile(r"[^\w.-]")
+_span_depth: ContextVar[int] = ContextVar("profile_span_depth", default=0)
+
+
+@dataclass
+class SpanRecord:
+    name: str
+    start_ms: float
+    duration_ms: float
+    depth: int
+    thread: str
+
+
+class Profile:
+    """Span timings and stack samples of one request."""
+
+    def __init__(self, method: str, path: str, reason: str, stacks: bool, max_spans: int = 500) -> None:
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.reason = reason
+        self.stacks = stacks
+        self.max_spans = max_spans
+        self.started_at = time.time()
+        self.status: Optional[int] = None
+        self.duration_ms = 0.0
+        self.spans: List[SpanRecord] = []
+        self.dropped_spans = 0
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        # Worker threads currently inside one of this request's spans.
+        self._threads: Counter = Counter()
+        self._loop_thread = threading.get_ident()
+        self.task: Optional[asyncio.Task] = asyncio.current_task()
+
+    @contextmanager
+    def span(self, name: str, inner: ContextManager[Any]) -> Iterator[Any]:
+        ident = threading.get_ident()
+        depth = _span_depth.get()
+        depth_token = _span_depth.set(depth + 1)
+        start = time.perf_counter()
+        if ident != self._loop_thread:
+            with self._lock:
+                self._threads[ident] += 1
+        try:
+            with inner as value:
+                yield value
+        finally:
+            end = time.perf_counter()
+            _span_depth.reset(depth_token)
+            with self._lock:
+                if ident != self._loop_thread:
+                    self._threads[ident] -= 1
+                    if not self._threads[ident]:
+                        del self._threads[ident]
+                if len(self.spans) < self.max_spans:
+                    self.spans.append(SpanRecord(
+                        name,
+                        round((start - self._t0) * 1000, 3),
+                        round((end - start) * 1000, 3),
+                        depth,
+                        "loop" if ident == self._loop_thread else "worker",
+                    ))
+                else:
+                    self.dropped_spans += 1
+
+    def finish(self, status: Optional[int]) -> None:
+        self.status = status
+        self.duration_ms = round((time.perf_counter() - self._t0) * 1000, 3)
+
+    def worker_threads(self) -> List[int]:
+        with self._lock:
+            return list(self._threads)
+
+    def breakdown(self) -> Dict[str, Dict[str, float]]:
+        """Per span name: call count and total milliseconds."""
+        out: Dict[str, Dict[str, float]] = {}
+        for s in self.spans:
+            entry = out.setdefault(s.name, {"count": 0, "total_ms": 0.0})
+            entry["count"] += 1
+            entry["total_ms"] = round(entry["total_ms"] + s.duration_ms, 3)
+        return dict(sorted(out.items(), key=lambda kv: -kv[1]["total_ms"]))
+
+    def folded(self) -> str:
+        return "\n".join(f"{stack} {n}" for stack, n in self.samples.most_common())
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "reason": self.reason,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "span_count": len(self.spans),
+            "sample_count": self.sample_count,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **self.summary(),
+            "breakdown": self.breakdown(),
+            "spans": [vars(s) for s in self.spans],
+            "dropped_spans": self.dropped_spans,
+            "flamegraph": self.folded() if self.stacks else None,
+        }
+
+
+def _frame_label(frame: Any) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def fold_frames(frame: Any) -> str:
+    """Root-first ``;``-joined labels of ``frame`` and its callers."""
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def fold_awaiting(task: asyncio.Task) -> Optional[str]:
+    """Stack of a suspended task: its coroutine ``cr_await`` chain plus ``[await]``."""
+    labels = []
+    coro: Any = task.get_coro()
+    while coro is not None and len(labels) < MAX_STACK_DEPTH:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        labels.append(_frame_label(frame))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return ";".join(labels + ["[await]"]) if labels else None
+
+
+class StackSampler:
+    """Samples profiled requests every ``interval`` seconds while any is active."""
+
+    def __init__(self, interval: float = 0.005) -> None:
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._active: Dict[Profile, asyncio.AbstractEventLoop] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, profile: Profile, loop: asyncio.AbstractEventLoop) -> None:
+        with self._lock:
+            self._active[profile] = loop
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+
+    def discard(self, profile: Profile) -> None:
+        with self._lock:
+            self._active.pop(profile, None)
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while True:
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                active = list(self._active.items())
+            frames = sys._current_frames()
+            for profile, loop in active:
+                try:
+                    self.sample(profile, loop, frames, me)
+                except Exception:  # frames can change under us; skip the tick
+                    continue
+            del frames
+            time.sleep(self.interval)
+
+    @staticmethod
+    def sample(profile: Profile, loop: asyncio.AbstractEventLoop, frames: Dict[int, Any], skip: int) -> None:
+        stacks = []
+        if profile.task is not None and asyncio.current_task(loop) is profile.task:
+            frame = frames.get(profile._loop_thread)
+            if frame is not None:
+                stacks.append(fold_frames(frame))
+        for ident in profile.worker_threads():
+            if ident != skip and ident in frames:
+                stacks.append(fold_frames(frames[ident]))
+        if not stacks and profile.task is not None and not profile.task.done():
+            awaiting = fold_awaiting(profile.task)
+            if awaiting:
+                stacks.append(awaiting)
+        with profile._lock:
+            profile.sample_count += 1
+            profile.samples.update(stacks)
+
+
+class ProfileStore:
+    """The ``keep_slowest`` slowest profiles plus the latest ``keep_recent`` requested ones."""
+
+    def __init__(self, keep_slowest: int = 20, keep_recent: int = 20) -> None:
+        self.keep_slowest = keep_slowest
+        self._lock = threading.Lock()
+        self._slowest: List[tuple] = []
+        self._recent: Deque[Profile] = deque(maxlen=keep_recent)
+        self._seq = itertools.count()
+
+    def add(self, profile: Profile) -> None:
+        with self._lock:
+            if profile.reason != "slow":
+                self._recent.append(profile)
+            entry = (profile.duration_ms, next(self._seq), profile)
+            if len(self._slowest) < self.keep_slowest:
+                heapq.heappush(self._slowest, entry)
+            elif self.keep_slowest and entry[0] > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def slowest(self) -> List[Profile]:
+        with self._lock:
+            return [p for _, _, p in sorted(self._slowest, key=lambda e: -e[0])]
+
+    def recent(self) -> List[Profile]:
+        with self._lock:
+            return list(reversed(self._recent))
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        with self._lock:
+            for p in itertools.chain((e[2] for e in self._slowest), self._recent):
+                if p.id == profile_id:
+                    return p
+        return None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._slowest.clear()
+            self._recent.clear()
+
+
+@dataclass
+class ProfilerSettings:
+    enabled: bool = False
+    header: str = "x-profile"
+    token: str = ""
+    sample_rate: float = 0.0
+    slow_threshold_ms: float = 0.0
+    sampler_interval_ms: float = 5.0
+    max_spans: int = 500
+    # Path prefixes to consider; empty means all except the admin endpoints.
+    paths: tuple = ()
+
+
+class Profiler:
+    """Settings, sampler and store shared by the middleware and admin endpoints."""
+
+    def __init__(self, settings: Optional[ProfilerSettings] = None, keep_slowest: int = 20, keep_recent: int = 20) -> None:
+        self.settings = settings or ProfilerSettings()
+        self.store = ProfileStore(keep_slowest, keep_recent)
+        self.sampler = StackSampler(self.settings.sampler_interval_ms / 1000)
+
+    def configure(self, config: Any) -> None:
+        """Apply an :class:`app.core.config.ProfilingConfig` (``PROFILE_TOKEN`` overrides ``token``)."""
+        self.settings = ProfilerSettings(
+            enabled=config.enabled,
+            header=config.header.lower(),
+            token=os.getenv("PROFILE_TOKEN", config.token),
+            sample_rate=config.sample_rate,
+            slow_threshold_ms=config.slow_threshold_ms,
+            sampler_interval_ms=config.sampler_interval_ms,
+            max_spans=config.max_spans,
+            paths=tuple(config.paths),
+        )
+        self.sampler.interval = config.sampler_interval_ms / 1000
+        self.store = ProfileStore(config.keep_slowest, config.keep_recent)
+
+    def authorized(self, value: Optional[str]) -> bool:
+        """Whether ``value`` may trigger profiling or read profiles."""
+        token = self.settings.token
+        if not token:
+            return True
+        return value is not None and hmac.compare_digest(value.encode(), token.encode())
+
+    def decide(self, path: str, headers: Dict[str, str]) -> Optional[str]:
+        """Why a request on ``path`` should be profiled, or ``None``."""
+        s = self.settings
+        if path.startswith("/admin/profiles") or (s.paths and not path.startswith(s.paths)):
+            return None
+        value = headers.get(s.header)
+        if value not in (None, "", "0") and self.authorized(value):
+            return "header"
+        if s.sample_rate and random.random() < s.sample_rate:
+            return "sample"
+        if s.slow_threshold_ms > 0:
+            return "slow"
+        return None
+
+
+class ProfilingMiddleware:
+    """ASGI middleware; profiles run in the request's own task."""
+
+    def __init__(self, app: Any, profiler: Profiler) -> None:
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        profiler = self.profiler
+        if scope["type"] != "http" or not profiler.settings.enabled:
+            await self.app(scope, receive, send)
+            return
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        reason = profiler.decide(scope["path"], headers)
+        if reason is None:
+            await self.app(scope, receive, send)
+            return
+        profile = Profile(scope.get("method", ""), scope["path"], reason, reason != "slow", profiler.settings.max_spans)
+        status: List[Optional[int]] = [None]
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                if reason != "slow":
+                    extra = [(b"x-profile-id", profile.id.encode())]
+                    timing = ", ".join(
+                        f"{_TIMING_NAME_RE.sub('_', name)};dur={v['total_ms']}" for name, v in profile.breakdown().items()
+                    )
+                    if timing:
+                        extra.append((b"server-timing", timing.encode()))
+                    message = {**message, "headers": [*message.get("headers", []), *extra]}
+            await send(message)
+
+        token = active_profile.set(profile)
+        if profile.stacks:
+            profiler.sampler.add(profile, asyncio.get_running_loop())
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            active_profile.reset(token)
+            profiler.sampler.discard(profile)
+            profile.finish(status[0])
+            if reason != "slow" or profile.duration_ms >= profiler.settings.slow_threshold_ms:
+                profiler.store.add(profile)
+                metrics.inc(f"profiling.captured.{reason}")
+                metrics.observe("profiling.captured_ms", profile.duration_ms)
@@ -3,20 +3,31 @@
 This module exposes a minimal provider factory so different backends
 (ollama, vLLM, TGI, etc.) can be swapped without changing the application
 logic.  Only the Ollama provider is implemented for now.
+
+Provider instances are shared per name so their resilience state is too: a
+:class:`CircuitBreaker` fails calls fast with 503 while the backend is down,
+identical concurrent generations are coalesced into one request, and
+:meth:`OllamaProvider.preload` keeps models resident between requests.
 """
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+import asyncio
+import hashlib
+import json
 import logging
 import os
-from typing import Any, Dict, Tuple, Type
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Iterable, Tuple, Type
 
 import httpx
 from fastapi import HTTPException
-from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, ValidationError
 from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_fixed
-from app.observability import span
+from app.observability import metrics, span
+
+if TYPE_CHECKING:
+    from langchain.output_parsers import PydanticOutputParser
 
 logger = logging.getLogger(__name__)
 
@@ -29,36 +40,189 @@ class Provider(ABC):
         """Execute a generation request against the provider."""
 
 
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half-open -> closed.
+
+    After ``failure_threshold`` failures in a row the breaker opens and
+    :meth:`before_call` raises 503 without touching the backend.  Once
+    ``reset_timeout`` seconds have passed a single probe call is let through;
+    its outcome closes the breaker again or re-opens it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        metrics.set_gauge(f"{name}.breaker.open", lambda: 0.0 if self.state == "closed" else 1.0)
+
+    def before_call(self) -> None:
+        if self.state == "closed":
+            return
+        remaining = self.opened_at + self.reset_timeout - self.clock()
+        if self.state == "open" and remaining <= 0:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._probing:
+            self._probing = True
+            return
+        metrics.inc(f"{self.name}.breaker.rejected")
+        raise HTTPException(
+            status_code=503,
+            detail=f"{self.name} unavailable; retry in {max(remaining, 1.0):.0f}s",
+            headers={"Retry-After": str(max(int(remaining + 0.999), 1))},
+        )
+
+    def record_success(self) -> None:
+        if self.state != "closed":
+            logger.info("%s circuit closed", self.name)
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning("%s circuit open after %d failure(s)", self.name, self.failures)
+                metrics.inc(f"{self.name}.breaker.opened")
+            self.state = "open"
+            self.opened_at = self.clock()
+
+    async def call(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.before_call()
+        try:
+            result = await fn()
+        except HTTPException as exc:
+            # Only backend trouble counts; 4xx are the caller's problem.
+            if exc.status_code >= 500:
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        except BaseException:
+            # Cancelled or unexpected: release a half-open probe slot.
+            self._probing = False
+            raise
+        self.record_success()
+        return result
+
+
+class SingleFlight:
+    """Coalesce identical concurrent async calls into one execution."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        data = json.dumps(parts, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.sha256(data).hexdigest()
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        fut = self._inflight.get(key)
+        if fut is not None:
+            metrics.inc(f"{self.name}.coalesced")
+            # shield: one waiter being cancelled must not cancel the others.
+            return await asyncio.shield(fut)
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task)
+
+    def _done(self, key: str, task: asyncio.Future) -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every waiter went away
+
+
+def _error_text(response: httpx.Response) -> str:
+    """Return the ``error`` message of an Ollama error response, else its body."""
+    try:
+        return str(response.json().get("error") or response.text)
+    except (ValueError, AttributeError):
+        return response.text
+
+
 class OllamaProvider(Provider):
     """Provider implementation that talks to an Ollama server."""
 
-    def __init__(self, base_url: str | None = None) -> None:
+    def __init__(
+        self,
+        base_url: str | None = None,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        keep_alive: str | None = None,
+    ) -> None:
         self.base_url = base_url or os.getenv("OLLAMA_URL", "http://localhost:11434")
+        self.keep_alive = keep_alive
+        self.breaker = CircuitBreaker("ollama", failure_threshold, reset_timeout)
+        self.flights = SingleFlight("ollama")
+
+    async def _post(self, path: str, payload: Dict[str, Any], timeout: httpx.Timeout) -> Dict[str, Any]:
+        url = f"{self.base_url}{path}"
+        try:
+            async with httpx.AsyncClient(timeout=timeout) as client:
+                response = await client.post(url, json=payload)
+                response.raise_for_status()
+        except httpx.ConnectError as exc:
+            logger.error("Ollama server unreachable at %s", url)
+            raise HTTPException(
+                status_code=503,
+                detail=f"Ollama server is unreachable at {url}",
+            ) from exc
+        except httpx.ReadTimeout as exc:
+            raise HTTPException(status_code=504, detail="Ollama server timed out") from exc
+        except httpx.HTTPStatusError as exc:
+            status = exc.response.status_code
+            # A rejected request (unknown model, bad options) is the caller's
+            # problem and must not count against the breaker; 429 is overload.
+            if 400 <= status < 500 and status != 429:
+                detail = f"Ollama rejected the request: {_error_text(exc.response)}"
+                raise HTTPException(status_code=status, detail=detail) from exc
+            raise HTTPException(status_code=502, detail=f"Ollama request failed: {exc}") from exc
+        except httpx.HTTPError as exc:
+            raise HTTPException(status_code=502, detail=f"Ollama request failed: {exc}") from exc
+
+        try:
+            return response.json()
+        except ValueError as exc:
+            raise HTTPException(status_code=502, detail="Invalid response from Ollama server") from exc
 
     async def generate(self, prompt: str, model: str, **kwargs: Any) -> Dict[str, Any]:
-        with span("ollama.generate"):
-            url = f"{self.base_url}/api/generate"
-            payload: Dict[str, Any] = {"model": model, "prompt": prompt, **kwargs}
-            try:
-                timeout = httpx.Timeout(60.0, connect=10.0)
-                async with httpx.AsyncClient(timeout=timeout) as client:
-                    response = await client.post(url, json=payload)
-                    response.raise_for_status()
-            except httpx.ConnectError as exc:
-                logger.error("Ollama server unreachable at %s", url)
-                raise HTTPException(
-                    status_code=503,
-                    detail=f"Ollama server is unreachable at {url}",
-                ) from exc
-            except httpx.ReadTimeout as exc:
-                raise HTTPException(status_code=504, detail="Ollama server timed out") from exc
-            except httpx.HTTPError as exc:
-                raise HTTPException(status_code=502, detail=f"Ollama request failed: {exc}") from exc
-
-            try:
-                return response.json()
-            except ValueError as exc:
-                raise HTTPException(status_code=502, detail="Invalid response from Ollama server") from exc
+        payload: Dict[str, Any] = {"model": model, "prompt": prompt, **kwargs}
+        if self.keep_alive is not None:
+            payload.setdefault("keep_alive", self.keep_alive)
+
+        async def call() -> Dict[str, Any]:
+            with span("ollama.generate"):
+                return await self.breaker.call(
+                    lambda: self._post("/api/generate", payload, httpx.Timeout(60.0, connect=10.0))
+                )
+
+        return await self.flights.do(SingleFlight.key(payload), call)
+
+    async def preload(self, model: str, keep_alive: str | None = None) -> None:
+        """Load ``model`` into memory (an empty prompt) and keep it resident."""
+        payload = {"model": model, "keep_alive": keep_alive or self.keep_alive or "5m"}
+        # Cold loads of large models are slow; allow them more time.
+        await self.breaker.call(lambda: self._post("/api/generate", payload, httpx.Timeout(300.0, connect=10.0)))
+
+
+# Fields of an Ollama ``/api/generate`` response that are not worth keeping in
+# the evidence ledger; ``context`` alone is thousands of token ids.
+BULKY_RESPONSE_FIELDS = frozenset({"context"})
+
+
+def compact_raw_response(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Return ``raw`` without fields listed in ``BULKY_RESPONSE_FIELDS``."""
+    return {k: v for k, v in raw.items() if k not in BULKY_RESPONSE_FIELDS}
 
 
 class ProviderFactory:
@@ -71,9 +235,18 @@ class ProviderFactory:
         # "tgi": TGIProvider,
     }
 
+    _options: Dict[str, Any] = {}
+    _instances: Dict[str, Provider] = {}
+
+    @classmethod
+    def configure(cls, **options: Any) -> None:
+        """Set constructor options for providers and drop cached instances."""
+        cls._options = options
+        cls._instances = {}
+
     @classmethod
     def get(cls, name: str) -> Provider:
-        """Return a provider instance for ``name``.
+        """Return the shared provider instance for ``name``.
 
         Args:
             name: Identifier for the provider (e.g. ``"ollama"``).
@@ -81,10 +254,29 @@ class ProviderFactory:
         Raises:
             ValueError: If the provider name is unknown.
         """
+        provider = cls._instances.get(name)
+        if provider is not None:
+            return provider
         provider_cls = cls._registry.get(name)
         if provider_cls is None:
             raise ValueError(f"Unknown provider: {name}")
-        return provider_cls()
+        provider = cls._instances[name] = provider_cls(**cls._options)
+        return provider
+
+
+async def keep_warm(provider: Provider, models: Iterable[str], keep_alive: str | None = None) -> Dict[str, str | None]:
+    """Preload ``models`` on ``provider``; returns the error per model, if any."""
+    errors: Dict[str, str | None] = {}
+    preload = getattr(provider, "preload", None)
+    if preload is None:
+        return errors
+    for model in dict.fromkeys(models):
+        try:
+            await preload(model, keep_alive)
+            errors[model] = None
+        except HTTPException as exc:
+            errors[model] = str(exc.detail)
+    return errors
 
 
 async def generate_structured(
@@ -0,0 +1,197 @@
+"""Two-level answer cache for guideline questions.
+
+Judges in one campaign ask the same questions in slightly different words.
+:class:`QueryCache` first looks up the normalized, PII-masked query exactly,
+then falls back to the cached query whose embedding is closest by cosine
+similarity, reusing its answer above ``semantic_threshold``.  Entries are
+tagged with the index generation they were computed against; a refresh bumps
+the generation and :meth:`QueryCache.invalidate` drops everything older.
+
+The default embedding is a feature-hashed bag of tokens and character
+trigrams: no model call, and word order and stopwords do not move it.
+Embeddings, hashed or learned, score questions that differ in one word
+("minimum"/"maximum", "3:1"/"7:1") as near-identical, so a semantic hit also
+requires both queries to have the same content words, numbers and codes.
+"""
+from __future__ import annotations
+
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.observability import metrics
+from app.router import STOPWORDS, TOKEN_RE
+
+Embedder = Callable[[str], Sequence[float]]
+
+_SPACE_RE = re.compile(r"\s+")
+_NUMERIC_RE = re.compile(r"\w*\d\w*(?:[.:/]\w+)*")
+
+
+def normalize_query(text: str) -> str:
+    """Case-fold, NFKC-normalize and collapse whitespace and trailing punctuation."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return _SPACE_RE.sub(" ", text).strip().rstrip("?!.。？ ")
+
+
+def _tokens(text: str) -> List[str]:
+    # Unlike ``router.tokenize``, keeps digits and short tokens ("a1", "7").
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def content_terms(text: str) -> FrozenSet[str]:
+    """Non-stopword tokens plus numbers and codes kept whole (``"3:1"``, ``"2.1"``)."""
+    return frozenset(_tokens(text)) | frozenset(_NUMERIC_RE.findall(text.lower()))
+
+
+def hashed_embedding(text: str, dim: int = 512) -> np.ndarray:
+    """Unit vector of hashed token and character-trigram features."""
+    vec = np.zeros(dim, dtype=np.float32)
+    for tok in _tokens(text):
+        features = [tok] + [tok[i:i + 3] for i in range(max(len(tok) - 2, 0))]
+        for j, feat in enumerate(features):
+            h = zlib.crc32(feat.encode("utf-8"))
+            # Whole tokens weigh as much as all their trigrams together.
+            weight = 1.0 if j == 0 else 1.0 / max(len(features) - 1, 1)
+            vec[h % dim] += weight if h & 0x80000000 else -weight
+    norm = float(np.linalg.norm(vec))
+    return vec / norm if norm else vec
+
+
+@dataclass
+class CacheHit:
+    value: Any
+    kind: str  # "exact" or "semantic"
+    similarity: float
+    matched_query: str
+
+
+@dataclass
+class _Entry:
+    value: Any
+    vector: Optional[np.ndarray]
+    stored_at: float
+    terms: FrozenSet[str] = frozenset()
+
+
+class QueryCache:
+    """Bounded LRU of answers with an exact and a semantic lookup level."""
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 1024,
+        semantic_threshold: float = 0.9,
+        ttl_seconds: float = 0,
+        embed: Optional[Embedder] = hashed_embedding,
+    ) -> None:
+        self.name = name
+        self.max_entries = max_entries
+        self.semantic_threshold = semantic_threshold
+        self.ttl_seconds = ttl_seconds
+        self.embed = embed
+        self._entries: "OrderedDict[Tuple[Hashable, str], _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Stacked vectors per generation, rebuilt lazily after writes.
+        self._matrix: Dict[Hashable, Tuple[list, np.ndarray, list]] = {}
+        self.hits = {"exact": 0, "semantic": 0}
+        self.misses = 0
+        metrics.set_gauge(f"{name}.cache.hit_rate", self.hit_rate)
+        metrics.set_gauge(f"{name}.cache.entries", lambda: float(len(self._entries)))
+
+    def get(self, query: str, generation: Hashable = 0) -> Optional[CacheHit]:
+        key = (generation, normalize_query(query))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._fresh(entry, now):
+                self._entries.move_to_end(key)
+                return self._hit(entry, "exact", 1.0, key[1])
+        match = self._semantic(key, now)
+        if match is not None:
+            return match
+        with self._lock:
+            self.misses += 1
+        metrics.inc(f"{self.name}.cache.miss")
+        return None
+
+    def put(self, query: str, value: Any, generation: Hashable = 0) -> None:
+        normalized = normalize_query(query)
+        vector = None
+        if self.embed is not None and self.semantic_threshold < 1:
+            vector = np.asarray(self.embed(normalized), dtype=np.float32)
+        with self._lock:
+            self._entries[(generation, normalized)] = _Entry(
+                value, vector, time.monotonic(), content_terms(normalized)
+            )
+            self._entries.move_to_end((generation, normalized))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                metrics.inc(f"{self.name}.cache.evict")
+            self._matrix.clear()
+
+    def invalidate(self, keep_generation: Hashable = None) -> int:
+        """Drop entries not computed against ``keep_generation``; return the count."""
+        with self._lock:
+            stale = [k for k in self._entries if k[0] != keep_generation]
+            for k in stale:
+                del self._entries[k]
+            self._matrix.clear()
+        metrics.inc(f"{self.name}.cache.invalidated", len(stale))
+        return len(stale)
+
+    def hit_rate(self) -> float:
+        total = sum(self.hits.values()) + self.misses
+        return round(sum(self.hits.values()) / total, 4) if total else 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _fresh(self, entry: _Entry, now: float) -> bool:
+        return not self.ttl_seconds or now - entry.stored_at <= self.ttl_seconds
+
+    def _hit(self, entry: _Entry, kind: str, similarity: float, matched: str) -> CacheHit:
+        self.hits[kind] += 1
+        metrics.inc(f"{self.name}.cache.hit.{kind}")
+        return CacheHit(entry.value, kind, similarity, matched)
+
+    def _semantic(self, key: Tuple[Hashable, str], now: float) -> Optional[CacheHit]:
+        if self.embed is None or self.semantic_threshold >= 1:
+            return None
+        generation, normalized = key
+        if not self._entries:
+            return None
+        probe = np.asarray(self.embed(normalized), dtype=np.float32)
+        probe_terms = content_terms(normalized)
+        with self._lock:
+            cached = self._matrix.get(generation)
+            if cached is None:
+                keys = [k for k, e in self._entries.items() if k[0] == generation and e.vector is not None]
+                if not keys:
+                    return None
+                cached = (
+                    keys,
+                    np.stack([self._entries[k].vector for k in keys]),
+                    [self._entries[k].terms for k in keys],
+                )
+                self._matrix[generation] = cached
+            keys, matrix, terms = cached
+            sims = matrix @ probe
+            # "minimum"/"maximum" or "3:1"/"7:1" embed alike but ask different things.
+            sims[[i for i, t in enumerate(terms) if t != probe_terms]] = -1.0
+            best = int(np.argmax(sims))
+            similarity = float(sims[best])
+            if similarity < self.semantic_threshold:
+                return None
+            entry = self._entries.get(keys[best])
+            if entry is None or not self._fresh(entry, now):
+                return None
+            self._entries.move_to_end(keys[best])
+            return self._hit(entry, "semantic", similarity, keys[best][1])
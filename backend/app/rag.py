@@ -3,14 +3,20 @@ from __future__ import annotations
 
 This module fetches expert guide documents and evaluation interpretation
 texts from external databases and builds vector indexes for retrieval.
+LlamaIndex is imported on first use so importing this module stays cheap.
 """
 
-from typing import Any, List
+import asyncio
+from typing import TYPE_CHECKING, Any, List
 
 import httpx
-from llama_index.core import Document, VectorStoreIndex
 from app.observability import span
 
+if TYPE_CHECKING:
+    from llama_index.core import Document, VectorStoreIndex
+
+    from app.embeddings import Embedder
+
 
 async def fetch_documents(url: str, timeout: float) -> List[Document]:
     """Fetch documents from an external REST endpoint.
@@ -19,6 +25,8 @@ async def fetch_documents(url: str, timeout: float) -> List[Document]:
     ``text`` fields. This structure keeps the function generic so different
     databases can expose a compatible API.
     """
+    from llama_index.core import Document
+
     async with httpx.AsyncClient() as client:
         try:
             resp = await client.get(url, timeout=timeout)
@@ -37,12 +45,23 @@ async def fetch_documents(url: str, timeout: float) -> List[Document]:
 class RagService:
     """Manage LlamaIndex vector indexes for RAG queries."""
 
-    def __init__(self, expert_url: str, evaluation_url: str, timeout: float = 30.0) -> None:
+    def __init__(
+        self,
+        expert_url: str,
+        evaluation_url: str,
+        timeout: float = 30.0,
+        embedder: Embedder | None = None,
+    ) -> None:
         self.expert_url = expert_url
         self.evaluation_url = evaluation_url
         self.timeout = timeout
+        # ``None`` leaves embedding to LlamaIndex's global settings.
+        self.embedder = embedder
+        self._embed_model = None
         self._expert_index: VectorStoreIndex | None = None
         self._evaluation_index: VectorStoreIndex | None = None
+        # Bumped on every successful refresh; answer caches key on it.
+        self.generation = 0
 
     async def refresh(self) -> tuple[bool, Exception | None]:
         """(Re)build indexes by fetching latest documents."""
@@ -53,28 +72,78 @@ class RagService:
             return False, e
         self._expert_index = expert_index
         self._evaluation_index = evaluation_index
+        self.generation += 1
         return True, None
 
     async def _build_index(self, url: str) -> VectorStoreIndex:
+        from llama_index.core import Settings, VectorStoreIndex
+        from llama_index.core.schema import MetadataMode
+
         docs = await fetch_documents(url, self.timeout)
-        return VectorStoreIndex.from_documents(docs)
+        if self.embedder is None:
+            return VectorStoreIndex.from_documents(docs)
+        if self._embed_model is None:
+            from app.embeddings import llama_embed_model
+
+            self._embed_model = llama_embed_model(self.embedder)
+        # Chunk like from_documents, but embed through the cached embedder;
+        # nodes that already carry a vector are not embedded again.
+        nodes = Settings.node_parser.get_nodes_from_documents(docs)
+        vectors = await self.embedder.aembed([n.get_content(metadata_mode=MetadataMode.EMBED) for n in nodes])
+        for node, vector in zip(nodes, vectors):
+            node.embedding = vector
+        return VectorStoreIndex(nodes, embed_model=self._embed_model)
+
+    @property
+    def ready(self) -> bool:
+        """``True`` once both indexes have been built."""
+        return self._expert_index is not None and self._evaluation_index is not None
+
+    def _check_ready(self) -> None:
+        if not self.ready:
+            raise RuntimeError("Indexes not initialized")
+
+    @staticmethod
+    def _aggregate(expert_res: Any, eval_res: Any) -> dict[str, Any]:
+        sources = []
+        for res in (expert_res, eval_res):
+            for sn in getattr(res, "source_nodes", []) or []:
+                sources.append({
+                    "doc_id": sn.node.doc_id,
+                    "text": sn.node.get_content(),
+                })
+        answer = "\n".join([
+            getattr(expert_res, "response", str(expert_res)),
+            getattr(eval_res, "response", str(eval_res)),
+        ])
+        return {"answer": answer.strip(), "sources": sources}
+
+    async def aretrieve(self, corpus: str, question: str, top_k: int) -> List[tuple[str, str, float]]:
+        """``(doc_id, text, score)`` for the best ``top_k`` nodes of ``corpus``.
+
+        ``corpus`` is ``"expert"`` or ``"evaluation"``.  Only the embedding
+        lookup runs; no LLM is involved.
+        """
+        with span(f"rag.retrieve.{corpus}"):
+            self._check_ready()
+            index = self._expert_index if corpus == "expert" else self._evaluation_index
+            nodes = await index.as_retriever(similarity_top_k=top_k).aretrieve(question)
+            return [(n.node.ref_doc_id or n.node.node_id, n.node.get_content(), float(n.score or 0.0)) for n in nodes]
 
     def query(self, question: str) -> dict[str, Any]:
         """Query both indexes and aggregate answers."""
         with span("rag.query"):
-            if not self._expert_index or not self._evaluation_index:
-                raise RuntimeError("Indexes not initialized")
+            self._check_ready()
             expert_res = self._expert_index.as_query_engine().query(question)
             eval_res = self._evaluation_index.as_query_engine().query(question)
-            sources = []
-            for res in (expert_res, eval_res):
-                for sn in getattr(res, "source_nodes", []) or []:
-                    sources.append({
-                        "doc_id": sn.node.doc_id,
-                        "text": sn.node.get_content(),
-                    })
-            answer = "\n".join([
-                getattr(expert_res, "response", str(expert_res)),
-                getattr(eval_res, "response", str(eval_res)),
-            ])
-            return {"answer": answer.strip(), "sources": sources}
+            return self._aggregate(expert_res, eval_res)
+
+    async def aquery(self, question: str) -> dict[str, Any]:
+        """Async variant of :meth:`query` querying both indexes concurrently."""
+        with span("rag.aquery"):
+            self._check_ready()
+            expert_res, eval_res = await asyncio.gather(
+                self._expert_index.as_query_engine().aquery(question),
+                self._evaluation_index.as_query_engine().aquery(question),
+            )
+            return self._aggregate(expert_res, eval_res)
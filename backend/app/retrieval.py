@@ -0,0 +1,212 @@
+"""Hybrid retrieval over the guideline, expert and evaluation corpora.
+
+The local KDA guideline is ranked lexically (BM25 over
+:func:`app.router.tokenize` terms); the remote expert and evaluation corpora
+come from the vector indexes of :class:`app.rag.RagService`.  All sources
+are queried concurrently and their rankings fused with reciprocal-rank
+fusion, ``sum(1 / (rrf_k + rank))``.  Passages whose shingles mostly
+overlap a better ranked one (chunk overlap, the same text in two corpora)
+are merged into it.  The top passages feed a single synthesis call.
+
+Every passage carries a ``citation_id`` that is stable across refreshes:
+the guideline's own ids, ``<source>:<doc_id>#<text hash>`` otherwise.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence
+
+from app.observability import metrics, span
+from app.router import tokenize
+from app.serialization import loads
+
+if TYPE_CHECKING:
+    from app.providers import Provider
+    from app.rag import RagService
+
+DEFAULT_PROMPT = (
+    "Answer the question using only the numbered passages below. Cite the "
+    "passages you used by their id in square brackets. If the passages do not "
+    "answer the question, say so.\n"
+    'Reply with JSON: {{"answer": "...", "citations": ["<id>", ...]}}\n\n'
+    "{passages}\n\nQuestion: {question}"
+)
+
+
+@dataclass
+class Passage:
+    citation_id: str
+    source: str
+    doc_id: str
+    text: str
+    # Fused score; ``ranks`` holds the 1-based rank per source list.
+    score: float = 0.0
+    ranks: Dict[str, int] = field(default_factory=dict)
+    merged: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "citation_id": self.citation_id,
+            "source": self.source,
+            "doc_id": self.doc_id,
+            "text": self.text,
+            "score": round(self.score, 6),
+        }
+
+
+def passage_id(source: str, doc_id: str, text: str) -> str:
+    return f"{source}:{doc_id}#{hashlib.sha1(text.encode('utf-8')).hexdigest()[:10]}"
+
+
+class LexicalIndex:
+    """BM25 over guideline chunks; rebuilt when the chunk list changes."""
+
+    def __init__(self, chunks: Sequence[Dict[str, Any]], k1: float = 1.2, b: float = 0.75) -> None:
+        self.chunks = chunks
+        self.k1, self.b = k1, b
+        self._tf = [Counter(tokenize(f"{ch['section_path']} {ch['text']}")) for ch in chunks]
+        self._len = [sum(tf.values()) for tf in self._tf]
+        self._avg = (sum(self._len) / len(self._len)) if self._len else 0.0
+        df: Counter = Counter()
+        for tf in self._tf:
+            df.update(tf.keys())
+        n = len(chunks)
+        self._idf = {t: math.log(1 + (n - d + 0.5) / (d + 0.5)) for t, d in df.items()}
+
+    def search(self, query: str, top_k: int) -> List[Passage]:
+        terms = [t for t in set(tokenize(query)) if t in self._idf]
+        scored = []
+        for i, tf in enumerate(self._tf):
+            score = 0.0
+            for t in terms:
+                f = tf.get(t, 0)
+                if f:
+                    norm = self.k1 * (1 - self.b + self.b * self._len[i] / (self._avg or 1))
+                    score += self._idf[t] * f * (self.k1 + 1) / (f + norm)
+            if score > 0:
+                scored.append((score, i))
+        scored.sort(key=lambda x: (-x[0], x[1]))
+        out = []
+        for score, i in scored[:top_k]:
+            ch = self.chunks[i]
+            out.append(Passage(ch["citation_id"], "guideline", ch["doc_id"], ch["text"].strip(), score))
+        return out
+
+
+def rrf(rankings: Dict[str, List[Passage]], k: float = 60.0) -> List[Passage]:
+    """Fuse ranked lists; passages with the same ``citation_id`` add up."""
+    fused: Dict[str, Passage] = {}
+    for source, ranked in rankings.items():
+        for rank, p in enumerate(ranked, start=1):
+            entry = fused.setdefault(p.citation_id, Passage(p.citation_id, p.source, p.doc_id, p.text))
+            entry.score += 1.0 / (k + rank)
+            entry.ranks[source] = rank
+    return sorted(fused.values(), key=lambda p: (-p.score, p.citation_id))
+
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _shingles(text: str, n: int = 4) -> set:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= n:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+
+def dedupe(passages: Sequence[Passage], threshold: float = 0.6) -> List[Passage]:
+    """Merge passages whose shingle overlap with a better one reaches ``threshold``.
+
+    Overlap is measured against the smaller passage, so a chunk contained
+    in a longer one counts as a duplicate.  Scores of merged passages are
+    added to the one kept.
+    """
+    kept: List[tuple[Passage, set]] = []
+    for p in passages:
+        sh = _shingles(p.text)
+        for other, other_sh in kept:
+            if sh and other_sh and len(sh & other_sh) / min(len(sh), len(other_sh)) >= threshold:
+                other.score += p.score
+                other.merged.append(p.citation_id)
+                for source, rank in p.ranks.items():
+                    other.ranks.setdefault(source, rank)
+                break
+        else:
+            kept.append((p, sh))
+    return sorted((p for p, _ in kept), key=lambda p: (-p.score, p.citation_id))
+
+
+class HybridRetriever:
+    def __init__(
+        self,
+        lexical: LexicalIndex,
+        rag: Optional["RagService"] = None,
+        per_source_k: int = 8,
+        top_k: int = 6,
+        rrf_k: float = 60.0,
+        dedupe_threshold: float = 0.6,
+    ) -> None:
+        self.lexical = lexical
+        self.rag = rag
+        self.per_source_k = per_source_k
+        self.top_k = top_k
+        self.rrf_k = rrf_k
+        self.dedupe_threshold = dedupe_threshold
+
+    async def _vector(self, source: str, query: str) -> List[Passage]:
+        hits = await self.rag.aretrieve(source, query, self.per_source_k)
+        return [Passage(passage_id(source, doc_id, text), source, doc_id, text, score) for doc_id, text, score in hits]
+
+    async def retrieve(self, query: str) -> List[Passage]:
+        with span("retrieval.hybrid"):
+            jobs = {"guideline": asyncio.to_thread(self.lexical.search, query, self.per_source_k)}
+            if self.rag is not None and self.rag.ready:
+                jobs["expert"] = self._vector("expert", query)
+                jobs["evaluation"] = self._vector("evaluation", query)
+            results = await asyncio.gather(*jobs.values(), return_exceptions=True)
+            rankings = {}
+            for source, result in zip(jobs, results):
+                if isinstance(result, BaseException):
+                    # One failing corpus should not sink the answer.
+                    metrics.inc(f"retrieval.{source}.error")
+                    continue
+                rankings[source] = result
+                metrics.observe(f"retrieval.{source}.hits", len(result))
+            if not rankings and results:
+                raise RuntimeError(f"retrieval failed: {results[0]}")
+            fused = dedupe(rrf(rankings, self.rrf_k), self.dedupe_threshold)
+            return fused[: self.top_k]
+
+
+def build_prompt(question: str, passages: Sequence[Passage], template: str = DEFAULT_PROMPT) -> str:
+    blocks = "\n\n".join(f"[{p.citation_id}] ({p.source})\n{p.text}" for p in passages)
+    return template.format(passages=blocks, question=question)
+
+
+def parse_answer(text: str, passages: Sequence[Passage]) -> Dict[str, Any]:
+    """``{"answer", "citations"}`` with citations limited to retrieved passage ids."""
+    known = {p.citation_id for p in passages}
+    try:
+        data = loads(text)
+        answer = str(data.get("answer", "")).strip() if isinstance(data, dict) else str(data)
+        cited = [c for c in (data.get("citations") or []) if isinstance(c, str)] if isinstance(data, dict) else []
+    except ValueError:
+        answer, cited = text.strip(), []
+    # Ids quoted inline in the answer count as citations too.
+    cited += re.findall(r"\[([^\[\]\s]+)\]", answer)
+    return {"answer": answer, "citations": [c for c in dict.fromkeys(cited) if c in known]}
+
+
+async def synthesize(provider: "Provider", model: str, question: str, passages: Sequence[Passage],
+                     template: str = DEFAULT_PROMPT) -> Dict[str, Any]:
+    """One generation call over ``passages``; see :func:`parse_answer`."""
+    if not passages:
+        return {"answer": "No relevant passages found.", "citations": []}
+    metrics.inc("retrieval.synthesis_calls")
+    raw = await provider.generate(build_prompt(question, passages, template), model, stream=False, format="json")
+    return parse_answer(raw.get("response", ""), passages)
@@ -0,0 +1,138 @@
+"""Deterministic pre-router for ``/rag-agent``.
+
+The ReAct agent spends a full LLM round trip deciding between ``rag_search``
+and ``free_chat``.  :class:`QueryRouter` makes that decision locally for the
+obvious cases: questions using guideline or rubric vocabulary go straight to
+RAG, greetings and small talk go to a single chat call, and anything in
+between falls back to the agent.  One guideline word on its own ("Write a poem
+about color") is not enough for RAG: the query also needs a second distinct
+term, a rubric phrase, a ``§`` reference or a domain hint such as "rubric".
+"""
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.observability import metrics
+
+TOKEN_RE = re.compile(r"[0-9a-zA-Z가-힣]+")
+SECTION_RE = re.compile(r"§\s*\d")
+
+STOPWORDS = frozenset(
+    """a an and are as at be by can do does for from how i in is it its me my of on or
+    our should the their this to was what when where which who why will with you your
+    use using e g""".split()
+)
+
+# Words that signal a question about the award documents even when they do
+# not occur in the guideline text itself.
+DOMAIN_HINTS = frozenset(
+    """guideline guidelines rubric criteria criterion score scoring judge judging
+    award wcag kda evaluation 가이드라인 루브릭 심사 평가 기준 점수""".split()
+)
+
+CHAT_PATTERNS = [
+    re.compile(p, re.IGNORECASE)
+    for p in [
+        r"^\s*(hi|hello|hey|thanks|thank you|good (morning|afternoon|evening))\b",
+        r"^\s*(안녕|고마워|감사합니다|반가워)",
+        r"\b(who|what) are you\b",
+        r"\b(tell me a joke|how are you)\b",
+        r"\b(translate|summari[sz]e|rephrase|rewrite)\b",
+    ]
+]
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS and (len(t) > 2 or not t.isascii())]
+
+
+@dataclass
+class RouteDecision:
+    """Routing outcome: ``route`` is ``"rag"``, ``"chat"`` or ``"agent"``."""
+
+    route: str
+    confidence: float
+    matched: List[str] = field(default_factory=list)
+
+
+class QueryRouter:
+    """Keyword classifier built from guideline chunks and rubric criteria."""
+
+    def __init__(
+        self,
+        chunks: Iterable[Dict[str, Any]],
+        rubrics: Iterable[Dict[str, Any]] = (),
+        rag_threshold: float = 2.0,
+        decisions: Optional[Counter] = None,
+    ) -> None:
+        self.rag_threshold = rag_threshold
+        docs: List[set[str]] = []
+        self.phrases: set[str] = set()
+        for ch in chunks:
+            docs.append(set(tokenize(f"{ch.get('section_path', '')} {ch.get('text', '')}")))
+        for rubric in rubrics:
+            for crit in rubric.get("criteria", []):
+                docs.append(set(tokenize(f"{crit.get('label', '')} {crit.get('description', '')}")))
+                for q in crit.get("evidence_queries", []):
+                    docs.append(set(tokenize(q)))
+                    if " " in q.strip():
+                        self.phrases.add(q.lower().strip())
+        df = Counter(t for doc in docs for t in doc)
+        n = max(len(docs), 1)
+        # Rare, specific terms ("typographic", "grid") weigh more than
+        # words spread over every section.
+        self.weights: Dict[str, float] = {t: 1.0 + math.log(n / c) for t, c in df.items()}
+        for hint in DOMAIN_HINTS:
+            self.weights[hint] = max(self.weights.get(hint, 0.0), 2.0)
+        # Pass a shared counter to keep statistics across router rebuilds.
+        self.decisions: Counter[str] = decisions if decisions is not None else Counter()
+        metrics.set_gauge("rag_agent.skip_ratio", self.skip_ratio)
+
+    def score(self, query: str) -> tuple[float, List[str]]:
+        """Return the domain score of ``query`` and the terms that matched.
+
+        Phrases come first in ``matched``, then ``"§"``, then single tokens.
+        """
+        lowered = query.lower()
+        matched = [p for p in self.phrases if p in lowered]
+        total = 3.0 * len(matched)
+        if SECTION_RE.search(query):
+            matched.append("§")
+            total += 3.0
+        for tok in dict.fromkeys(tokenize(query)):
+            w = self.weights.get(tok)
+            if w:
+                matched.append(tok)
+                total += w
+        return total, matched
+
+    def route(self, query: str) -> RouteDecision:
+        """Classify ``query``; ``"agent"`` means no confident shortcut."""
+        total, matched = self.score(query)
+        if total >= self.rag_threshold and self._specific(query, matched):
+            decision = RouteDecision("rag", min(1.0, total / (2 * self.rag_threshold)), matched)
+        elif total == 0 and any(p.search(query) for p in CHAT_PATTERNS):
+            decision = RouteDecision("chat", 0.9, [])
+        else:
+            decision = RouteDecision("agent", 0.0, matched)
+        self.decisions[decision.route] += 1
+        return decision
+
+    def _specific(self, query: str, matched: List[str]) -> bool:
+        tokens = [t for t in matched if t in self.weights]
+        return (
+            len(tokens) < len(matched)  # a phrase or § reference
+            or len(tokens) >= 2
+            or any(t in DOMAIN_HINTS for t in tokens)
+        )
+
+    def skip_ratio(self) -> float:
+        """Fraction of routed queries that did not need the ReAct agent."""
+        total = sum(self.decisions.values())
+        if not total:
+            return 0.0
+        return round(1 - self.decisions["agent"] / total, 4)
@@ -0,0 +1,197 @@
+"""Rubric registry: every rubric JSON in a directory, validated once.
+
+Each file is checked against ``rubric_dsl.schema.json`` plus the semantic
+rules the schema cannot express (unique criterion ids, ``min <= max``,
+positive total weight) and compiled into a :class:`CompiledRubric`.  The
+compiled form keeps per-criterion bounds in a dict so score validation for
+``/evaluate`` is a handful of lookups, and a content ETag so rubric responses
+can be cached by clients.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.core.paths import RUBRICS_DIR, SCHEMAS_DIR
+
+logger = logging.getLogger(__name__)
+
+
+class RubricError(ValueError):
+    """A rubric file failed schema or semantic validation."""
+
+
+class ScoreValidationError(ValueError):
+    """Submitted scores do not fit the rubric; ``errors`` lists every problem."""
+
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+@lru_cache
+def dsl_validator():
+    """Compiled Draft-07 validator for ``rubric_dsl.schema.json``."""
+    from jsonschema import Draft7Validator
+
+    schema = json.loads((SCHEMAS_DIR / "rubric_dsl.schema.json").read_text(encoding="utf-8-sig"))
+    Draft7Validator.check_schema(schema)
+    return Draft7Validator(schema)
+
+
+@dataclass(frozen=True)
+class CriterionSpec:
+    id: str
+    kind: str
+    low: float
+    high: float
+    weight: float
+
+    def check(self, score: float) -> Optional[str]:
+        if not self.low <= score <= self.high:
+            return f"{self.id}: score {score:g} outside [{self.low:g}, {self.high:g}]"
+        if self.kind in ("int", "enum") and score != int(score):
+            return f"{self.id}: score {score:g} must be an integer"
+        return None
+
+
+@dataclass(frozen=True)
+class CompiledRubric:
+    award_id: str
+    version: str
+    data: Dict[str, Any]
+    criteria: Dict[str, CriterionSpec]
+    etag: str
+    source: Optional[Path] = None
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return self.award_id, self.version
+
+    def score_errors(self, scores: Iterable[Tuple[str, float]], complete: bool = True) -> List[str]:
+        """Problems with ``(criterion_id, score)`` pairs; empty when valid."""
+        errors = []
+        seen = set()
+        for cid, score in scores:
+            spec = self.criteria.get(cid)
+            if spec is None:
+                errors.append(f"{cid}: unknown criterion for {self.award_id} {self.version}")
+                continue
+            if cid in seen:
+                errors.append(f"{cid}: scored more than once")
+            seen.add(cid)
+            problem = spec.check(score)
+            if problem:
+                errors.append(problem)
+        if complete:
+            missing = [cid for cid in self.criteria if cid not in seen]
+            if missing:
+                errors.append(f"missing criteria: {', '.join(missing)}")
+        return errors
+
+    def validate_scores(self, scores: Iterable[Tuple[str, float]], complete: bool = True) -> None:
+        errors = self.score_errors(scores, complete)
+        if errors:
+            raise ScoreValidationError(errors)
+
+    def total_range(self) -> Tuple[float, float]:
+        """Bounds of the weighted mean over all criteria."""
+        total = sum(c.weight for c in self.criteria.values())
+        low = sum(c.low * c.weight for c in self.criteria.values()) / total
+        high = sum(c.high * c.weight for c in self.criteria.values()) / total
+        return low, high
+
+
+def compile_rubric(data: Dict[str, Any], source: Optional[Path] = None) -> CompiledRubric:
+    where = source.name if source else data.get("award_id", "<rubric>")
+    errors = sorted(dsl_validator().iter_errors(data), key=lambda e: list(e.absolute_path))
+    if errors:
+        details = "; ".join(f"{'/'.join(map(str, e.absolute_path)) or '<root>'}: {e.message}" for e in errors)
+        raise RubricError(f"{where}: {details}")
+    criteria: Dict[str, CriterionSpec] = {}
+    for crit in data["criteria"]:
+        cid = crit["id"]
+        if cid in criteria:
+            raise RubricError(f"{where}: duplicate criterion id {cid}")
+        scale = crit["scale"]
+        kind = scale.get("type", "int")
+        if kind == "enum":
+            options = scale.get("enum") or []
+            if not options:
+                raise RubricError(f"{where}: {cid} enum scale has no options")
+            low, high = 0.0, float(len(options) - 1)
+        else:
+            low, high = float(scale.get("min", 1)), float(scale.get("max", 5))
+        if low > high:
+            raise RubricError(f"{where}: {cid} scale min {low:g} > max {high:g}")
+        if crit["weight"] < 0:
+            raise RubricError(f"{where}: {cid} has negative weight")
+        criteria[cid] = CriterionSpec(cid, kind, low, high, float(crit["weight"]))
+    if not criteria or sum(c.weight for c in criteria.values()) <= 0:
+        raise RubricError(f"{where}: criteria weights must sum to a positive value")
+    canonical = json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    etag = f'"{hashlib.sha1(canonical).hexdigest()[:16]}"'
+    return CompiledRubric(data["award_id"], data["version"], data, criteria, etag, source)
+
+
+class RubricRegistry:
+    """Compiled rubrics keyed by ``(award_id, version)``."""
+
+    def __init__(self, rubrics: Sequence[CompiledRubric] = (), default: Optional[Tuple[str, str]] = None):
+        self._by_key: Dict[Tuple[str, str], CompiledRubric] = {}
+        self._by_version: Dict[str, List[CompiledRubric]] = {}
+        for rubric in rubrics:
+            self.add(rubric)
+        self.default_key = default or (rubrics[0].key if rubrics else None)
+
+    @classmethod
+    def load_dir(cls, directory: Path = RUBRICS_DIR, default_file: Optional[Path] = None) -> "RubricRegistry":
+        """Load ``*.json`` under ``directory``; any invalid file aborts the load."""
+        paths = sorted(Path(directory).glob("*.json"))
+        if default_file is not None and default_file.resolve() not in {p.resolve() for p in paths}:
+            paths.append(default_file)
+        compiled = [compile_rubric(json.loads(p.read_text(encoding="utf-8-sig")), p) for p in paths]
+        default = None
+        if default_file is not None:
+            default = next(r.key for r in compiled if r.source.resolve() == default_file.resolve())
+        registry = cls(compiled, default)
+        logger.info("Loaded %d rubric(s) from %s", len(registry), directory)
+        return registry
+
+    def add(self, rubric: CompiledRubric) -> None:
+        if rubric.key in self._by_key:
+            raise RubricError(f"duplicate rubric {rubric.award_id} {rubric.version}")
+        self._by_key[rubric.key] = rubric
+        self._by_version.setdefault(rubric.version, []).append(rubric)
+
+    def get(self, award_id: str, version: str) -> Optional[CompiledRubric]:
+        return self._by_key.get((award_id, version))
+
+    def resolve(self, version: str, award_id: Optional[str] = None) -> CompiledRubric:
+        """Rubric for an evaluation; ``award_id`` may be omitted if ``version`` is unique."""
+        if award_id is not None:
+            rubric = self.get(award_id, version)
+            if rubric is None:
+                raise KeyError(f"Unknown rubric {award_id} {version}")
+            return rubric
+        matches = self._by_version.get(version, [])
+        if not matches:
+            raise KeyError(f"Unknown rubric version {version}")
+        if len(matches) > 1:
+            raise KeyError(f"Rubric version {version} is ambiguous; award_id required")
+        return matches[0]
+
+    @property
+    def default(self) -> Optional[CompiledRubric]:
+        return self._by_key.get(self.default_key) if self.default_key else None
+
+    def __iter__(self):
+        return iter(self._by_key.values())
+
+    def __len__(self) -> int:
+        return len(self._by_key)
@@ -0,0 +1,19 @@
+CREATE TABLE IF NOT EXISTS bulk_imports (
+  manifest_key TEXT PRIMARY KEY,
+  source TEXT NOT NULL,
+  project_id INTEGER NOT NULL REFERENCES projects(id),
+  -- every manifest entry before this position is committed
+  position INTEGER NOT NULL,
+  imported INTEGER NOT NULL,
+  failed INTEGER NOT NULL,
+  state TEXT NOT NULL,
+  started_at TEXT NOT NULL,
+  updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bulk_import_failures (
+  manifest_key TEXT NOT NULL,
+  position INTEGER NOT NULL,
+  submission_id TEXT,
+  error TEXT NOT NULL,
+  PRIMARY KEY (manifest_key, position)
+);
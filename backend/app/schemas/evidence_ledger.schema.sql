@@ -10,3 +10,15 @@
 );
 CREATE INDEX IF NOT EXISTS ix_evidence_submission ON evidence_ledger (submission_id);
 CREATE INDEX IF NOT EXISTS ix_evidence_kind ON evidence_ledger (kind);
+CREATE INDEX IF NOT EXISTS ix_evidence_at ON evidence_ledger (at);
+-- Full-text index over the text extracted from each event (see
+-- app/ledger_search.py); rowid is the ledger id.  Rows outlive archival
+-- and are dropped when the archive partition expires.
+CREATE VIRTUAL TABLE IF NOT EXISTS ledger_fts USING fts5(
+  body,
+  kind UNINDEXED,
+  submission_id UNINDEXED,
+  at UNINDEXED,
+  prefix = '2 3',
+  tokenize = 'unicode61 remove_diacritics 2'
+);
@@ -0,0 +1,10 @@
+CREATE TABLE IF NOT EXISTS image_derivatives (
+  sha256 TEXT NOT NULL,
+  variant TEXT NOT NULL,
+  width INTEGER NOT NULL,
+  height INTEGER NOT NULL,
+  source_bytes INTEGER NOT NULL,
+  image_b64 TEXT NOT NULL,
+  created_at TEXT NOT NULL,
+  PRIMARY KEY (sha256, variant)
+);
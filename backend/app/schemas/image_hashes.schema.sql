@@ -0,0 +1,8 @@
+CREATE TABLE IF NOT EXISTS image_hashes (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  sha256 TEXT NOT NULL UNIQUE,
+  submission_id TEXT,
+  phash TEXT NOT NULL,
+  dhash TEXT NOT NULL,
+  created_at TEXT NOT NULL
+);
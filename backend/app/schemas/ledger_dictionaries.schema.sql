@@ -0,0 +1,7 @@
+CREATE TABLE IF NOT EXISTS ledger_dictionaries (
+  dict_id INTEGER PRIMARY KEY,
+  kind TEXT NOT NULL,
+  column_name TEXT NOT NULL,
+  created_at TEXT NOT NULL,
+  data BLOB NOT NULL
+);
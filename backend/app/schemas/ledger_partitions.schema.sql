@@ -0,0 +1,15 @@
+CREATE TABLE IF NOT EXISTS ledger_partitions (
+  path TEXT PRIMARY KEY,
+  month TEXT NOT NULL,
+  row_count INTEGER NOT NULL,
+  min_id INTEGER NOT NULL,
+  max_id INTEGER NOT NULL,
+  archived_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_ledger_partitions_month ON ledger_partitions (month);
+CREATE TABLE IF NOT EXISTS ledger_archive_index (
+  submission_id TEXT NOT NULL,
+  month TEXT NOT NULL,
+  max_id INTEGER NOT NULL,
+  PRIMARY KEY (submission_id, month)
+);
@@ -15,6 +15,8 @@ class UploadRequest(BaseModel):
 class UploadResponse(BaseModel):
     submission_id: str
     created_at: datetime.datetime
+    # Earlier submission whose image is a near-duplicate of this upload
+    duplicate_of: Optional[str] = None
 
 
 class AnalyzeRequest(BaseModel):
@@ -40,6 +42,9 @@ class AnalyzeResponse(BaseModel):
     findings: List[AnalyzeFinding]
     model_version: str
     prompt_snapshot: str
+    # Results of deterministic checks keyed by rubric ``required_checks``
+    # names, e.g. ``color_contrast``
+    checks: Optional[dict[str, Any]] = None
 
 
 class ChatRequest(BaseModel):
@@ -73,6 +78,8 @@ class EvaluateRequest(BaseModel):
     submission_id: str
     judge_id: str
     rubric_version: str
+    # Needed only when several awards share ``rubric_version``
+    award_id: Optional[str] = None
     scores: List[EvaluationScore]
     model_suggestions: List[ModelSuggestion] = []
     submitted_at: Optional[datetime.datetime] = None
@@ -100,6 +107,9 @@ class RagCitation(BaseModel):
 
     doc_id: str
     text: str
+    # Stable id the answer cites; ``source`` is guideline/expert/evaluation.
+    citation_id: str = ""
+    source: str = ""
 
 
 class RagEvalRequest(BaseModel):
@@ -109,6 +119,8 @@ class RagEvalRequest(BaseModel):
 class RagEvalResponse(BaseModel):
     answer: str
     citations: List[RagCitation] = []
+    # "exact" or "semantic" when served from the answer cache
+    cache: Optional[str] = None
 
 
 class ModerateRequest(BaseModel):
@@ -0,0 +1,13 @@
+CREATE TABLE IF NOT EXISTS training_exports (
+  run INTEGER PRIMARY KEY AUTOINCREMENT,
+  started_at TEXT NOT NULL,
+  finished_at TEXT,
+  -- ledger ids in (watermark_from, watermark_to] were exported
+  watermark_from INTEGER NOT NULL,
+  watermark_to INTEGER NOT NULL,
+  state TEXT NOT NULL,
+  samples INTEGER NOT NULL DEFAULT 0,
+  shards INTEGER NOT NULL DEFAULT 0,
+  -- run directory under TRAINING_DIR; NULL when nothing was exported
+  path TEXT
+);
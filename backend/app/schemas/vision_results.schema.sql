@@ -0,0 +1,9 @@
+CREATE TABLE IF NOT EXISTS vision_results (
+  sha256 TEXT NOT NULL,
+  model TEXT NOT NULL,
+  prompt_hash TEXT NOT NULL,
+  answer TEXT NOT NULL,
+  model_version TEXT NOT NULL,
+  created_at TEXT NOT NULL,
+  PRIMARY KEY (sha256, model, prompt_hash)
+);
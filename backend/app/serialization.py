@@ -0,0 +1,76 @@
+"""JSON encoding for API responses and ledger rows.
+
+Uses orjson when it is installed and falls back to the stdlib otherwise.
+Ledger payloads are already JSON text; wrapping them in :func:`raw` embeds
+them in a response as-is instead of parsing and re-encoding every event.
+Endpoints returning raw fragments must return a :class:`FastJSONResponse`
+themselves, because FastAPI's ``jsonable_encoder`` does not know them.
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+
+if orjson is not None:
+    Fragment = orjson.Fragment
+    OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+else:  # pragma: no cover
+
+    class Fragment:  # type: ignore[no-redef]
+        __slots__ = ("contents",)
+
+        def __init__(self, contents: str | bytes) -> None:
+            self.contents = contents
+
+
+def _default(obj: Any) -> Any:
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, Path):
+        return str(obj)
+    if orjson is None:
+        if isinstance(obj, Fragment):
+            return json.loads(obj.contents)
+        if hasattr(obj, "isoformat"):
+            return obj.isoformat()
+        if hasattr(obj, "tolist"):
+            return obj.tolist()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact UTF-8 JSON (non-ASCII characters are not escaped)."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=OPTIONS)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_str(obj: Any) -> str:
+    return dumps(obj).decode("utf-8")
+
+
+def loads(data: str | bytes) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def raw(text: str | bytes) -> Fragment:
+    """Embed already encoded JSON ``text`` without parsing it."""
+    return Fragment(text)
+
+
+class FastJSONResponse(JSONResponse):
+    """Default response class; understands :func:`raw` fragments."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,333 @@
+"""Memory-mapped snapshot of the guideline corpus and rubrics.
+
+Every uvicorn worker used to parse the guideline markdown and rubric files
+into its own dicts.  A snapshot file holds them once in a flat layout that
+all workers ``mmap`` read-only, so the pages are shared by the OS:
+
+- a string table (UTF-8 blob plus ``uint64`` end offsets)
+- one record of string ids per chunk (original and lower-cased text)
+- rubric JSON documents
+- a character-trigram index: sorted terms with ``uint32`` posting arrays of
+  chunk ids, used to narrow substring searches to candidate chunks
+
+Snapshots are written to a new file and published by atomically replacing
+the ``CURRENT`` pointer, which carries a generation counter.  Workers
+:meth:`SnapshotStore.poll` the pointer and swap to the new mapping; readers
+holding the old one keep a valid view until they drop it.  Arrays use the
+host's native byte order, so a snapshot is only meant for the machine that
+wrote it.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+from array import array
+from collections.abc import Mapping
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from app.observability import metrics
+
+try:  # POSIX only; without it concurrent builders may race harmlessly.
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"DESNAP01"
+# magic, generation, strings, chunks, rubrics, terms, meta string id,
+# then byte offsets of: blob, string ends, chunk records, rubric ids,
+# term records, postings
+HEADER = struct.Struct("<8sQIIIIIQQQQQQ")
+CHUNK_FIELDS = ("citation_id", "doc_id", "section_path", "text", "version", "section", "_lower_section", "_lower_text")
+NONE_ID = 0xFFFFFFFF
+
+
+def trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def source_fingerprint(paths: Iterable[Path]) -> str:
+    """Content hash of the files a snapshot is built from."""
+    h = hashlib.sha1()
+    for path in sorted(Path(p) for p in paths):
+        h.update(path.name.encode("utf-8") + b"\0")
+        h.update(path.read_bytes() if path.exists() else b"")
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def write_snapshot(
+    path: Path,
+    chunks: Sequence[Dict[str, Any]],
+    rubrics: Sequence[Dict[str, Any]],
+    generation: int,
+    meta: Optional[Dict[str, Any]] = None,
+) -> None:
+    """Serialize ``chunks`` and ``rubrics`` to ``path``."""
+    strings: List[bytes] = []
+    ids: Dict[str, int] = {}
+
+    def sid(value: Optional[str]) -> int:
+        if value is None:
+            return NONE_ID
+        if value not in ids:
+            ids[value] = len(strings)
+            strings.append(value.encode("utf-8"))
+        return ids[value]
+
+    records = array("I")
+    postings: Dict[str, List[int]] = {}
+    for i, ch in enumerate(chunks):
+        lower_section, lower_text = ch["section_path"].lower(), ch["text"].lower()
+        values = {**ch, "_lower_section": lower_section, "_lower_text": lower_text}
+        records.extend(sid(values.get(f)) for f in CHUNK_FIELDS)
+        for tri in trigrams(lower_section) | trigrams(lower_text):
+            postings.setdefault(tri, []).append(i)
+    rubric_ids = array("I", (sid(json.dumps(r, ensure_ascii=False, sort_keys=True)) for r in rubrics))
+    meta_id = sid(json.dumps(meta or {}, ensure_ascii=False, sort_keys=True))
+    term_records = array("I")
+    posting_ids = array("I")
+    for term in sorted(postings):
+        term_records.extend((sid(term), len(posting_ids), len(postings[term])))
+        posting_ids.extend(postings[term])
+
+    blob = b"".join(strings)
+    ends = array("Q")
+    total = 0
+    for s in strings:
+        total += len(s)
+        ends.append(total)
+    offsets = []
+    body = bytearray()
+    for part in (blob, ends.tobytes(), records.tobytes(), rubric_ids.tobytes(), term_records.tobytes(), posting_ids.tobytes()):
+        # 8-byte alignment keeps the array casts cheap.
+        body.extend(b"\0" * (-(HEADER.size + len(body)) % 8))
+        offsets.append(HEADER.size + len(body))
+        body.extend(part)
+    header = HEADER.pack(
+        MAGIC, generation, len(strings), len(chunks), len(rubrics), len(term_records) // 3, meta_id, *offsets
+    )
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(header)
+        f.write(body)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class ChunkView(Mapping):
+    """Read-only chunk dict whose fields are decoded from the mapping on access."""
+
+    __slots__ = ("_snap", "_index", "_cache")
+
+    def __init__(self, snap: "Snapshot", index: int) -> None:
+        self._snap = snap
+        self._index = index
+        self._cache: Dict[str, Any] = {}
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._cache:
+            if key not in CHUNK_FIELDS[:6]:
+                raise KeyError(key)
+            pos = CHUNK_FIELDS.index(key)
+            self._cache[key] = self._snap.string(self._snap._records[self._index * len(CHUNK_FIELDS) + pos])
+        return self._cache[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(CHUNK_FIELDS[:6])
+
+    def __len__(self) -> int:
+        return 6
+
+
+class Snapshot:
+    """A mapped snapshot file."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.generation, n_strings, self.n_chunks, n_rubrics, n_terms, meta_id,
+         blob_off, ends_off, rec_off, rub_off, term_off, post_off) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a snapshot file")
+        view = memoryview(self._mm)
+        self._blob_off = blob_off
+        self._ends = view[ends_off:ends_off + 8 * n_strings].cast("Q")
+        self._records = view[rec_off:rec_off + 4 * len(CHUNK_FIELDS) * self.n_chunks].cast("I")
+        self._rubric_ids = view[rub_off:rub_off + 4 * n_rubrics].cast("I")
+        self._postings = view[post_off:].cast("I") if post_off < len(self._mm) else memoryview(array("I"))
+        terms = view[term_off:term_off + 12 * n_terms].cast("I")
+        # The term dictionary is small; posting arrays stay in the mapping.
+        self._terms = {self.string(terms[3 * i]): (terms[3 * i + 1], terms[3 * i + 2]) for i in range(n_terms)}
+        self.meta: Dict[str, Any] = json.loads(self.string(meta_id))
+
+    def _span(self, i: int) -> Tuple[int, int]:
+        start = self._ends[i - 1] if i else 0
+        return self._blob_off + start, self._blob_off + self._ends[i]
+
+    def string(self, i: int) -> Optional[str]:
+        if i == NONE_ID:
+            return None
+        start, end = self._span(i)
+        return self._mm[start:end].decode("utf-8")
+
+    def _count(self, i: int, needle: bytes) -> int:
+        """Non-overlapping occurrences of ``needle`` in string ``i``, without copying it."""
+        if not needle:
+            return 0
+        start, end = self._span(i)
+        count = 0
+        pos = self._mm.find(needle, start, end)
+        while pos != -1:
+            count += 1
+            pos = self._mm.find(needle, pos + len(needle), end)
+        return count
+
+    def chunks(self) -> List[ChunkView]:
+        return [ChunkView(self, i) for i in range(self.n_chunks)]
+
+    def rubrics(self) -> List[Dict[str, Any]]:
+        return [json.loads(self.string(i)) for i in self._rubric_ids]
+
+    def candidates(self, query: str) -> Iterable[int]:
+        """Chunks containing every trigram of lower-cased ``query``."""
+        grams = trigrams(query)
+        if not grams:
+            return range(self.n_chunks)
+        result: Optional[set[int]] = None
+        for gram in sorted(grams, key=lambda g: self._terms.get(g, (0, 0))[1]):
+            entry = self._terms.get(gram)
+            if entry is None:
+                return ()
+            start, length = entry
+            ids = set(self._postings[start:start + length])
+            result = ids if result is None else result & ids
+            if not result:
+                return ()
+        return sorted(result)
+
+    def search(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
+        """Same ranking as :func:`app.guidelines.search_hits`, on the mapping.
+
+        An empty query matches nothing.
+        """
+        from app.guidelines import hit
+
+        q = query.lower()
+        if not q:
+            return []
+        needle = q.encode("utf-8")
+        width = len(CHUNK_FIELDS)
+        scored = []
+        for i in self.candidates(q):
+            rec = i * width
+            score = self._count(self._records[rec + 7], needle) + self._count(self._records[rec + 6], needle)
+            if score > 0:
+                scored.append((score, i))
+        scored.sort(key=lambda x: x[0], reverse=True)
+        return [hit(ChunkView(self, i), score) for score, i in scored[:top_k]]
+
+
+class SnapshotStore:
+    """Directory of snapshot files plus the ``CURRENT`` generation pointer."""
+
+    def __init__(self, directory: Path, keep: int = 3) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.pointer = self.directory / "CURRENT"
+        self.keep = keep
+        self.current: Optional[Snapshot] = None
+        self._pointer_mtime = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._lock, open(self.directory / ".lock", "a+") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_pointer(self) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads(self.pointer.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def _open(self, pointer: Dict[str, Any]) -> Snapshot:
+        snap = Snapshot(self.directory / pointer["file"])
+        self.current = snap
+        metrics.set_gauge("snapshot.generation", float(snap.generation))
+        return snap
+
+    def ensure(self, source: str, build: Callable[[], Tuple[Sequence[Dict[str, Any]], Sequence[Dict[str, Any]], Dict[str, Any]]]) -> Snapshot:
+        """Map the published snapshot, building one first if ``source`` changed.
+
+        ``build`` returns ``(chunks, rubrics, meta)``; only the first worker
+        to take the lock runs it, the others map its result.
+        """
+        with self._locked():
+            pointer = self._read_pointer()
+            if pointer is not None and pointer.get("source") == source:
+                try:
+                    return self._open(pointer)
+                except (OSError, ValueError) as err:
+                    logger.warning("Snapshot %s unusable, rebuilding: %s", pointer.get("file"), err)
+            return self._publish(pointer, source, *build())
+
+    def publish(self, source: str, chunks, rubrics, meta=None) -> Snapshot:
+        with self._locked():
+            return self._publish(self._read_pointer(), source, chunks, rubrics, meta)
+
+    def _publish(self, pointer, source, chunks, rubrics, meta) -> Snapshot:
+        generation = (pointer or {}).get("generation", 0) + 1
+        name = f"snapshot-{generation:06d}.bin"
+        write_snapshot(self.directory / name, chunks, rubrics, generation, meta)
+        new_pointer = {"generation": generation, "file": name, "source": source}
+        tmp = self.pointer.with_name("CURRENT.tmp")
+        tmp.write_text(json.dumps(new_pointer), encoding="utf-8")
+        os.replace(tmp, self.pointer)
+        logger.info("Published guideline snapshot generation %d", generation)
+        self._prune(generation)
+        return self._open(new_pointer)
+
+    def _prune(self, generation: int) -> None:
+        # Unlinking a mapped file is safe on POSIX; workers still on an old
+        # generation keep their mapping until they swap.
+        for path in self.directory.glob("snapshot-*.bin"):
+            try:
+                if int(path.stem.split("-")[1]) <= generation - self.keep:
+                    path.unlink()
+            except (ValueError, OSError):
+                continue
+
+    def poll(self) -> Optional[Snapshot]:
+        """Swap to a newer published generation; returns it, else ``None``."""
+        try:
+            mtime = self.pointer.stat().st_mtime_ns
+        except OSError:
+            return None
+        if mtime == self._pointer_mtime:
+            return None
+        self._pointer_mtime = mtime
+        pointer = self._read_pointer()
+        if pointer is None or (self.current is not None and pointer["generation"] == self.current.generation):
+            return None
+        try:
+            return self._open(pointer)
+        except (OSError, ValueError) as err:
+            logger.warning("Could not map snapshot generation %s: %s", pointer.get("generation"), err)
+            return None
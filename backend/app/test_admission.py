@@ -0,0 +1,118 @@
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.admission import AdmissionController  # noqa:E402
+
+
+def _request(user=None, judge=None, host="10.0.0.1"):
+    headers = {}
+    if user:
+        headers["x-user-id"] = user
+    if judge:
+        headers["x-judge-id"] = judge
+    return SimpleNamespace(headers=headers, client=SimpleNamespace(host=host))
+
+
+def test_token_bucket_rejects_with_retry_after():
+    ctrl = AdmissionController(rate=1, burst=2, costs={"rag_agent": 2})
+
+    async def run():
+        async with ctrl.admit(_request(user="u1"), "chat", "m"):
+            pass
+        with pytest.raises(HTTPException) as exc:
+            async with ctrl.admit(_request(user="u1"), "rag_agent", "m"):
+                pass
+        # Other callers have their own buckets.
+        async with ctrl.admit(_request(user="u2"), "rag_agent", "m"):
+            pass
+        return exc.value
+
+    err = asyncio.run(run())
+    assert err.status_code == 429 and err.headers["Retry-After"] == "1"
+    assert ctrl.identify(_request(judge="j", user="u").headers, None) == ("judge:j", 1.0)
+    assert ctrl.identify({}, "1.2.3.4") == ("anonymous:1.2.3.4", 1.0)
+
+
+def test_fair_queue_serves_light_caller_before_flooder():
+    ctrl = AdmissionController(rate=100, burst=100, model_concurrency={"m": 1}, weights={"judge": 2})
+    order = []
+
+    async def call(req, name):
+        async with ctrl.admit(req, "chat", "m"):
+            order.append(name)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        tasks = [asyncio.create_task(call(_request(user="spam"), f"spam{i}")) for i in range(6)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(call(_request(user="quiet"), "quiet")))
+        tasks += [asyncio.create_task(call(_request(judge="j1"), f"judge{i}")) for i in range(2)]
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    # Judges weigh 2, so both their calls fit in before spam's next one.
+    assert order[:5] == ["spam0", "quiet", "judge0", "judge1", "spam1"]
+    assert ctrl.gate("m").inflight == 0 and ctrl.gate("m").queued == 0
+
+
+def test_queue_deadline_and_overflow_shed_with_429():
+    ctrl = AdmissionController(rate=100, burst=3, model_concurrency={"m": 1}, max_queue=1, queue_timeout=0.05)
+
+    async def run():
+        gate_open = asyncio.Event()
+
+        async def holder():
+            async with ctrl.admit(_request(user="a"), "chat", "m"):
+                await gate_open.wait()
+
+        held = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(ctrl.admit(_request(user="b"), "chat", "m").__aenter__())
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as full:
+            async with ctrl.admit(_request(user="c"), "chat", "m"):
+                pass
+        with pytest.raises(HTTPException) as late:
+            await waiting
+        gate_open.set()
+        await held
+        return full.value, late.value
+
+    full, late = asyncio.run(run())
+    assert full.status_code == late.status_code == 429
+    assert "full" in full.detail and "exceeded" in late.detail
+    # Shed requests keep their tokens.
+    assert ctrl._buckets["user:c"].tokens == pytest.approx(3, abs=0.1)
+    assert ctrl.gate("m").inflight == 0
+
+
+def test_forwarded_for_only_from_trusted_proxy_and_address_bucket_caps_identities():
+    ctrl = AdmissionController(rate=100, burst=10, address_rate=0.001, address_burst=3,
+                               trusted_proxies=["10.0.0.0/8"])
+    xff = {"x-forwarded-for": "6.6.6.6, 203.0.113.5, 10.0.0.2"}
+    assert ctrl.client_address(xff, "10.0.0.1") == "203.0.113.5"
+    assert ctrl.client_address(xff, "198.51.100.1") == "198.51.100.1"
+    assert AdmissionController().client_address(xff, "10.0.0.1") == "10.0.0.1"
+
+    async def run():
+        for i in range(3):
+            async with ctrl.admit(_request(user=f"fresh{i}"), "chat", "m"):
+                pass
+        with pytest.raises(HTTPException) as exc:
+            async with ctrl.admit(_request(user="fresh3"), "chat", "m"):
+                pass
+        # Another client address has its own bucket.
+        async with ctrl.admit(_request(user="fresh3", host="10.0.0.9"), "chat", "m"):
+            pass
+        return exc.value
+
+    assert asyncio.run(run()).status_code == 429
+    # The rejected call's identity bucket got its token back.
+    assert ctrl._buckets["user:fresh3"].tokens == pytest.approx(9, abs=0.1)
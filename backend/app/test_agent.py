@@ -0,0 +1,48 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.agent import AgentBusyError, AgentLimiter, arun_agent  # noqa:E402
+
+
+class FakeAgent:
+    def __init__(self, outputs):
+        self.outputs = outputs
+        self.calls = 0
+
+    async def ainvoke(self, inputs):
+        out = self.outputs[self.calls]
+        self.calls += 1
+        return {"input": inputs["input"], "output": out}
+
+
+@pytest.mark.asyncio
+async def test_arun_agent_parses_output():
+    agent = FakeAgent(['{"answer": "4.5:1 for body text"}'])
+    result = await arun_agent(agent, "contrast?")
+    assert result.answer == "4.5:1 for body text"
+    assert agent.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_limiter_rejects_when_saturated():
+    limiter = AgentLimiter(max_concurrency=1, queue_timeout=0.05)
+    release = asyncio.Event()
+
+    async def hold():
+        async with limiter.slot():
+            await release.wait()
+
+    task = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    with pytest.raises(AgentBusyError):
+        async with limiter.slot():
+            pass
+    release.set()
+    await task
+    async with limiter.slot():
+        pass
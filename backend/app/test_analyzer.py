@@ -0,0 +1,89 @@
+import io
+import json
+import sys
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.analyzer import (  # noqa:E402
+    analyze_image,
+    contrast_ratio,
+    dominant_colors,
+    relative_luminance,
+)
+
+
+def _poster(text_fill, bg=(255, 255, 255), size=(1200, 1700), lines=8):
+    img = Image.new("RGB", size, bg)
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default(size=36)
+    for i in range(lines):
+        draw.text((80, 200 + i * 60), f"Body copy line number {i}", fill=text_fill, font=font)
+    return img
+
+
+def _jpeg(img):
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=92)
+    return buf.getvalue()
+
+
+def test_wcag_reference_values():
+    lum = relative_luminance(np.array([[[0, 0, 0], [255, 255, 255], [118, 118, 118]]], dtype=np.uint8))[0]
+    assert round(float(contrast_ratio(lum[0], lum[1])), 1) == 21.0
+    # #767676 on white is the classic 4.5:1 boundary.
+    assert 4.4 < float(contrast_ratio(lum[1], lum[2])) < 4.6
+
+
+def test_low_contrast_text_is_flagged_with_region():
+    result = analyze_image(_jpeg(_poster((190, 190, 190))))
+    low = [f for f in result.findings if f["label"] == "Low Contrast"]
+    assert len(low) == 1
+    region = low[0]["region"]
+    assert 0.0 < region["x"] < 0.1 and 0.08 < region["y"] < 0.15
+    assert region["h"] > 0.2
+    assert result.checks["color_contrast"]["passed"] is False
+    assert result.checks["color_contrast"]["min_ratio"] < 2.5
+
+
+def test_high_contrast_text_passes():
+    result = analyze_image(_jpeg(_poster((0, 0, 0))))
+    assert not [f for f in result.findings if f["label"] == "Low Contrast"]
+    assert result.checks["color_contrast"]["passed"] is True
+    assert result.checks["color_contrast"]["min_ratio"] > 7
+
+
+def test_blank_image_has_no_contrast_verdict():
+    result = analyze_image(_jpeg(Image.new("RGB", (400, 600), (240, 240, 240))))
+    assert result.checks["color_contrast"]["passed"] is None
+    assert result.metrics["whitespace_share"] > 0.9
+
+
+def test_palette_against_declared_colors():
+    img = _poster((18, 18, 18), bg=(255, 212, 0))
+    assert dominant_colors(np.asarray(img))[0][0] == "#F8D808"
+    ok = analyze_image(_jpeg(img), declared_colors=["#121212", "#FFD400"])
+    assert ok.checks["palette"]["missing"] == []
+    assert not [f for f in ok.findings if f["label"] == "Palette Deviation"]
+
+    off = analyze_image(_jpeg(_poster((18, 18, 18), bg=(30, 90, 200))), declared_colors=["#121212", "#FFD400"])
+    assert off.checks["palette"]["missing"] == ["#FFD400"]
+    assert off.checks["palette"]["off_palette"]
+    assert [f for f in off.findings if f["label"] == "Palette Deviation"]
+
+
+@pytest.mark.parametrize("size", [(8, 8), (400, 10), (1, 1)])
+def test_images_smaller_than_a_tile_have_no_nan_metrics(size):
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", RuntimeWarning)
+        result = analyze_image(rgb=np.asarray(Image.new("RGB", size, (30, 90, 200))), declared_colors=["#FFD400"])
+    encoded = json.dumps({"checks": result.checks, "metrics": result.metrics, "findings": result.findings}, allow_nan=False)
+    assert "NaN" not in encoded
+    assert result.checks["color_contrast"]["passed"] is None
+    assert result.metrics["whitespace_share"] is None and "left_alignment" not in result.metrics
+    assert result.checks["palette"]["missing"] == ["#FFD400"]
@@ -0,0 +1,63 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BACKEND_DIR))
+
+from app import main  # noqa:E402
+from app.core.config import load_config  # noqa:E402
+
+
+@pytest.fixture
+def judging_client(tmp_path, monkeypatch):
+    monkeypatch.setenv("APP_MODE", "judging")
+    monkeypatch.setattr(main, "ensure_dirs", lambda: None)
+    for name in ("ARCHIVE_DIR", "SNAPSHOT_DIR", "IMPORTS_DIR"):
+        monkeypatch.setattr(main, name, tmp_path / name.lower())
+    monkeypatch.setattr(main, "DB_PATH", tmp_path / "t.db")
+    monkeypatch.setattr(main, "CONFIG", main.CONFIG)  # restored after the test
+    # load_config is cached; drop the copy read without APP_MODE.
+    load_config.cache_clear()
+    try:
+        with TestClient(main.app) as c:
+            yield c
+    finally:
+        load_config.cache_clear()
+
+
+def test_judging_mode_disables_ml_endpoints_only(judging_client):
+    c = judging_client
+    assert main.CONFIG.mode == "judging"
+    for path, body in [
+        ("/rag-eval", {"query": "What contrast ratio is required?"}),
+        ("/rag-agent", {"query": "What contrast ratio is required?"}),
+        ("/chat", {"submission_id": "s1", "message": "Is the contrast ok?"}),
+        ("/rag-index/refresh", None),
+    ]:
+        res = c.post(path, json=body)
+        assert res.status_code == 503, path
+        assert "judging-only" in res.json()["detail"]
+    assert main.rag_service is None and main.agent_executor is None
+
+    assert c.get("/rubrics").status_code == 200
+    judge = c.post("/judges", json={"name": "J"})
+    assert judge.status_code == 200
+    assert [j["name"] for j in c.get("/judges").json()["judges"]] == ["J"]
+    hits = c.post("/search-guideline", json={"award_id": "aw_2025_kda", "query": "contrast"})
+    assert hits.status_code == 200 and hits.json()["hits"]
+    assert c.get("/report/s1").json()["events"] == []
+
+
+def test_importing_app_does_not_load_ml_stacks():
+    code = (
+        "import sys, app.main\n"
+        "print(sorted({m.split('.')[0] for m in sys.modules if m.startswith(('langchain', 'llama_index'))}))\n"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    assert out.strip().splitlines()[-1] == "[]"
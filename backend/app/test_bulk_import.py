@@ -0,0 +1,179 @@
+import asyncio
+import io
+import json
+import random
+import sqlite3
+import sys
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+from PIL import Image, ImageDraw
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.bulk_import import BulkImporter, iter_manifest  # noqa:E402
+from app.core.paths import SCHEMAS_DIR  # noqa:E402
+from app.imaging import DerivativeStore  # noqa:E402
+from app.ledger_codec import LedgerCodec  # noqa:E402
+from app.phash import DuplicateIndex  # noqa:E402
+
+SCHEMAS = [
+    "evidence_ledger.schema.sql", "projects.schema.sql", "submissions.schema.sql", "image_derivatives.schema.sql",
+    "image_hashes.schema.sql", "bulk_imports.schema.sql",
+]
+
+
+def _poster(seed):
+    rnd = random.Random(seed)
+    img = Image.new("RGB", (320, 440), tuple(rnd.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(img)
+    for _ in range(8):
+        x, y = rnd.randrange(320), rnd.randrange(440)
+        draw.rectangle([x, y, x + 120, y + 90], fill=tuple(rnd.randrange(256) for _ in range(3)))
+    buf = io.BytesIO()
+    img.save(buf, "PNG")
+    return buf.getvalue()
+
+
+@pytest.fixture
+def assets(tmp_path):
+    """Static file server whose first request for each path answers 503."""
+    root = tmp_path / "assets"
+    root.mkdir()
+    for i in range(5):
+        (root / f"p{i}.png").write_bytes(_poster(i))
+    (root / "copy.png").write_bytes(_poster(0))
+    (root / "notes.txt").write_text("not an image")
+    seen = set()
+
+    class Handler(SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=str(root), **kwargs)
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path not in seen:
+                seen.add(self.path)
+                self.send_error(503)
+                return
+            super().do_GET()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def _importer(db, **kwargs):
+    conn = sqlite3.connect(db)
+    for name in SCHEMAS:
+        conn.executescript((SCHEMAS_DIR / name).read_text(encoding="utf-8-sig"))
+    conn.close()
+    return BulkImporter(db, LedgerCodec(), DerivativeStore(db), DuplicateIndex(db), backoff=0.01, **kwargs)
+
+
+def _manifest(tmp_path, base):
+    entries = [{"title": f"Poster {i}", "author_id": "u1", "asset_url": f"{base}/p{i}.png", "meta": {"n": i}} for i in range(5)]
+    entries.insert(2, {"submission_id": "sub_missing", "title": "Gone", "author_id": "u2", "asset_url": f"{base}/gone.png"})
+    entries.insert(4, {"title": "Text", "author_id": "u3", "asset_url": f"{base}/notes.txt"})
+    entries.append({"submission_id": "sub_copy", "title": "Copy", "author_id": "u4", "asset_url": f"{base}/copy.png"})
+    entries.append({"title": "No asset", "author_id": "u5"})
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps({"version": 1, "submissions": entries}, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+def test_manifest_streaming_formats(tmp_path):
+    entries = [{"title": f"t{i}", "author_id": "a", "meta": {"s": "x" * i}} for i in range(50)]
+    obj = tmp_path / "m.json"
+    obj.write_text("﻿" + json.dumps({"submissions": entries}, indent=2), encoding="utf-8")
+    lines = tmp_path / "m.jsonl"
+    lines.write_text("\n".join(json.dumps(e) for e in entries) + "\n", encoding="utf-8")
+    arr = tmp_path / "m2.json"
+    arr.write_text(json.dumps(entries), encoding="utf-8")
+    for path in (obj, lines, arr):
+        assert list(iter_manifest(path, chunk_size=64)) == entries
+
+
+@pytest.mark.parametrize("text", [
+    '{"submissions": null}',
+    '{"submissions": null, "other": [1]}',
+    '{"version": 1, "submissions"',
+    '{"submissions": [{"title": "t"}, {"ti',
+])
+def test_malformed_manifest_raises(tmp_path, text):
+    path = tmp_path / "bad.json"
+    path.write_text(text, encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_manifest(path, chunk_size=8))
+
+
+def test_import_retries_and_records_failures(tmp_path, assets):
+    importer = _importer(tmp_path / "t.db", concurrency=3, batch_size=2, retries=2)
+    summary = asyncio.run(importer.run(_manifest(tmp_path, assets), "KDA 2025"))
+    assert (summary["imported"], summary["failed"], summary["position"]) == (7, 2, 9)
+
+    conn = sqlite3.connect(tmp_path / "t.db")
+    uploads = {sid: json.loads(p) for sid, p in conn.execute("SELECT submission_id, payload_json FROM evidence_ledger")}
+    assert len(uploads) == 7
+    rows = dict(conn.execute("SELECT id, project_id FROM submissions"))
+    assert len(rows) == 7
+    assert {p["project_submission_id"] for p in uploads.values()} == set(rows)
+    assert all(rows[p["project_submission_id"]] == p["project_id"] for p in uploads.values())
+    assert conn.execute("SELECT COUNT(*) FROM projects WHERE name='KDA 2025'").fetchone()[0] == 1
+    assert uploads["sub_copy"]["duplicate_of"] == f"sub_import_{summary['manifest_key'][:8]}_0"
+    assert all(p.get("image_sha256") for sid, p in uploads.items() if p["title"] != "No asset")
+    failures = dict(conn.execute("SELECT position, error FROM bulk_import_failures"))
+    assert sorted(failures) == [2, 4]
+    assert "HTTP 404" in failures[2] and "not a JPEG or PNG" in failures[4]
+    assert conn.execute("SELECT state FROM bulk_imports").fetchone()[0] == "done"
+
+
+def test_interrupted_import_resumes_by_position(tmp_path, assets, monkeypatch):
+    db = tmp_path / "t.db"
+    manifest = _manifest(tmp_path, assets)
+    importer = _importer(db, concurrency=2, batch_size=3)
+    commit = importer._commit
+    calls = []
+
+    def crash_on_second_batch(*args):
+        calls.append(args)
+        if len(calls) == 2:
+            raise RuntimeError("disk full")
+        commit(*args)
+
+    monkeypatch.setattr(importer, "_commit", crash_on_second_batch)
+    with pytest.raises(RuntimeError):
+        asyncio.run(importer.run(manifest, "KDA 2025"))
+    conn = sqlite3.connect(db)
+    assert conn.execute("SELECT position, state FROM bulk_imports").fetchone() == (3, "interrupted")
+
+    summary = asyncio.run(_importer(db, concurrency=2, batch_size=3).run(manifest, "KDA 2025"))
+    assert summary["resumed_from"] == 3 and summary["position"] == 9
+    assert conn.execute("SELECT COUNT(*) FROM evidence_ledger").fetchone()[0] == 7
+    assert conn.execute("SELECT COUNT(DISTINCT submission_id) FROM evidence_ledger").fetchone()[0] == 7
+
+
+def test_unexpected_errors_fail_the_entry_or_the_run_without_hanging(tmp_path, assets, monkeypatch):
+    importer = _importer(tmp_path / "t.db", concurrency=2, batch_size=2)
+    process = importer.process
+
+    async def explode_on_first(client, key, position, raw, base_dir):
+        if position == 0:
+            raise MemoryError("decompression bomb")
+        return await process(client, key, position, raw, base_dir)
+
+    monkeypatch.setattr(importer, "process", explode_on_first)
+    summary = asyncio.run(asyncio.wait_for(importer.run(_manifest(tmp_path, assets), "KDA 2025"), 30))
+    assert summary["position"] == 9 and summary["failed"] == 3
+    conn = sqlite3.connect(tmp_path / "t.db")
+    assert "MemoryError" in conn.execute("SELECT error FROM bulk_import_failures WHERE position=0").fetchone()[0]
+
+    truncated = tmp_path / "truncated.json"
+    truncated.write_text('{"submissions": [{"title": "t", "author_id": "a"}, {"ti', encoding="utf-8")
+    with pytest.raises(ValueError):
+        asyncio.run(asyncio.wait_for(_importer(tmp_path / "t2.db").run(truncated, "KDA 2025"), 30))
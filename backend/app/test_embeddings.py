@@ -0,0 +1,89 @@
+import asyncio
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app import rag  # noqa:E402
+from app.core.paths import SCHEMAS_DIR  # noqa:E402
+from app.embeddings import Embedder, EmbeddingBackend, EmbeddingCache, HashedEmbeddings  # noqa:E402
+
+
+class CountingBackend(EmbeddingBackend):
+    model_id = "counting:1"
+
+    def __init__(self):
+        self.batches = []
+
+    def embed(self, texts):
+        self.batches.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+def _cache(tmp_path):
+    db = tmp_path / "e.db"
+    conn = sqlite3.connect(db)
+    conn.executescript((SCHEMAS_DIR / "embedding_cache.schema.sql").read_text(encoding="utf-8"))
+    conn.close()
+    return EmbeddingCache(db)
+
+
+def test_batches_dedupes_and_persists(tmp_path):
+    cache = _cache(tmp_path)
+    backend = CountingBackend()
+    embedder = Embedder(backend, cache, batch_size=2, concurrency=2)
+    texts = ["a", "bb", "a", "ccc", "dddd"]
+    assert embedder.embed(texts) == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0], [3.0, 1.0], [4.0, 1.0]]
+    assert sorted(len(b) for b in backend.batches) == [2, 2]
+
+    # A new process with the same cache only embeds unseen text.
+    again = CountingBackend()
+    vectors = asyncio.run(Embedder(again, cache, batch_size=2).aembed(["dddd", "eeeee", "a"]))
+    assert vectors == [[4.0, 1.0], [5.0, 1.0], [1.0, 1.0]]
+    assert again.batches == [["eeeee"]]
+
+    # persist=False reads the cache without adding to it.
+    Embedder(again, cache).embed(["a", "ffffff"], persist=False)
+    assert again.batches[-1] == ["ffffff"]
+    Embedder(again, cache).embed(["ffffff"])
+    assert again.batches[-1] == ["ffffff"] and len(again.batches) == 3
+
+    # Different model, different cache entries.
+    other = CountingBackend()
+    other.model_id = "counting:2"
+    Embedder(other, cache).embed(["a"])
+    assert other.batches == [["a"]]
+
+
+def test_rag_index_builds_with_local_embeddings(tmp_path, monkeypatch):
+    from llama_index.core import Document
+
+    async def fake_fetch(url, timeout):
+        return [
+            Document(text="Body text needs a contrast ratio of at least 4.5:1.", doc_id="contrast"),
+            Document(text="Posters use a twelve column grid with generous margins.", doc_id="grid"),
+        ]
+
+    monkeypatch.setattr(rag, "fetch_documents", fake_fetch)
+    backend = CountingBackend()
+    backend.embed = HashedEmbeddings().embed
+    cache = _cache(tmp_path)
+    service = rag.RagService("http://expert", "http://eval", embedder=Embedder(backend, cache))
+    ok, err = asyncio.run(service.refresh())
+    assert ok, err
+    assert service.generation == 1
+
+    def cached_rows():
+        conn = sqlite3.connect(cache.db_path)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+        finally:
+            conn.close()
+
+    stored = cached_rows()
+    assert stored > 0
+    nodes = service._expert_index.as_retriever(similarity_top_k=1).retrieve("required contrast ratio")
+    assert nodes[0].node.ref_doc_id == "contrast"
+    # Query vectors are not persisted.
+    assert cached_rows() == stored
@@ -0,0 +1,67 @@
+import copy
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app import evidence  # noqa:E402
+from app.core.paths import RUBRIC_FILE  # noqa:E402
+from app.evidence import EvidenceCache, build_bundles  # noqa:E402
+from app.guidelines import chunks_for_section, load_guideline_chunks  # noqa:E402
+from app.observability import metrics  # noqa:E402
+
+
+def _rubric():
+    return json.loads(RUBRIC_FILE.read_text(encoding="utf-8-sig"))
+
+
+def test_section_refs_resolve_with_prefix():
+    chunks = load_guideline_chunks()
+    assert [c["section"] for c in chunks_for_section(chunks, "§4.1")] == ["4.1"]
+    assert {c["section"] for c in chunks_for_section(chunks, "§3")} == {"3.1", "3.2"}
+    assert chunks_for_section(chunks, "no ref") == []
+
+
+def test_bundles_put_section_matches_first_and_dedupe():
+    chunks = load_guideline_chunks()
+    bundles = build_bundles(_rubric(), chunks)
+    c3 = bundles["C3"]
+    sections = [c for c in c3.citations if c["match"] == "section"]
+    assert {c["section_path"].split()[0] for c in sections} == {"§4.1", "§4.2"}
+    assert c3.citations[: len(sections)] == sections
+    assert len(c3.citation_ids) == len(set(c3.citation_ids))
+    known = {c["citation_id"] for c in chunks}
+    assert all(cid in known for b in bundles.values() for cid in b.citation_ids)
+
+
+def test_cache_rebuilds_only_when_rubric_or_corpus_changes():
+    chunks = load_guideline_chunks()
+    rubric = _rubric()
+    cache = EvidenceCache()
+    first = cache.bundles(rubric, chunks)
+    before = metrics.snapshot()["counters"].get("evidence.cache.rebuild", 0)
+    assert cache.bundles(rubric, chunks) is first
+
+    edited = copy.deepcopy(rubric)
+    edited["criteria"][0]["guideline_refs"] = ["§5.1"]
+    assert cache.bundles(edited, chunks)["C1"].citations[0]["section_path"].startswith("§5.1")
+
+    reloaded = load_guideline_chunks()
+    reloaded[0] = {**reloaded[0], "text": reloaded[0]["text"] + " revised"}
+    assert cache.bundles(edited, reloaded) is not first
+    after = metrics.snapshot()["counters"].get("evidence.cache.rebuild", 0)
+    assert after - before == 2
+
+
+def test_cache_hashes_each_rubric_object_once(monkeypatch):
+    chunks = load_guideline_chunks()
+    rubric = _rubric()
+    calls = []
+    monkeypatch.setattr(evidence, "rubric_fingerprint", lambda r: calls.append(r) or "fp")
+    cache = EvidenceCache()
+    for _ in range(5):
+        cache.bundles(rubric, chunks)
+    assert len(calls) == 1
+    cache.bundles(copy.deepcopy(rubric), chunks)
+    assert len(calls) == 2
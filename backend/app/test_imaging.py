@@ -0,0 +1,102 @@
+import base64
+import io
+import sqlite3
+import struct
+import sys
+import zlib
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.core.paths import SCHEMAS_DIR  # noqa:E402
+from app.analyzer import load_rgb  # noqa:E402
+from app.imaging import DerivativeStore, InvalidImageError, prepare_image  # noqa:E402
+from app.phash import compute_hashes  # noqa:E402
+
+
+def _jpeg(size=(2000, 1000), orientation=None):
+    img = Image.new("RGB", size, (200, 30, 30))
+    exif = Image.Exif()
+    exif[0x010F] = "CameraMaker"
+    if orientation:
+        exif[0x0112] = orientation
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=95, exif=exif.tobytes())
+    return buf.getvalue()
+
+
+def _open(data):
+    return Image.open(io.BytesIO(data))
+
+
+def test_prepare_image_resizes_and_strips_exif():
+    out = _open(prepare_image(_jpeg(), max_side=672))
+    assert out.format == "JPEG"
+    assert max(out.size) == 672
+    assert out.size == (672, 336)
+    assert not out.getexif()
+
+
+def test_prepare_image_applies_orientation():
+    # Orientation 6: stored landscape, displayed rotated 90 degrees.
+    out = _open(prepare_image(_jpeg(orientation=6), max_side=500))
+    assert out.size == (250, 500)
+
+
+def test_prepare_image_flattens_alpha_and_keeps_small_images():
+    img = Image.new("RGBA", (100, 80), (0, 0, 0, 0))
+    buf = io.BytesIO()
+    img.save(buf, "PNG")
+    out = _open(prepare_image(buf.getvalue(), max_side=672))
+    assert out.mode == "RGB"
+    assert out.size == (100, 80)
+    assert out.getpixel((10, 10))[0] > 240
+
+
+def test_prepare_image_rejects_garbage():
+    with pytest.raises(InvalidImageError):
+        prepare_image(b"not an image")
+
+
+def test_store_caches_by_content_hash(tmp_path):
+    db = tmp_path / "t.db"
+    conn = sqlite3.connect(db)
+    conn.executescript((SCHEMAS_DIR / "image_derivatives.schema.sql").read_text(encoding="utf-8"))
+    conn.close()
+    content = _jpeg()
+    store = DerivativeStore(db, max_side=320, cache_size=1)
+    first = store.ingest(content)
+    assert first.size < len(content)
+    assert store.ingest(content) is first
+    assert store.ingest_b64(base64.b64encode(content).decode()) is first
+
+    # A fresh store (new process) finds the derivative in SQLite.
+    other = DerivativeStore(db, max_side=320)
+    cached = other.get(first.sha256)
+    assert cached.image_b64 == first.image_b64
+    assert (cached.width, cached.height) == (320, 160)
+    # Different settings are a different variant.
+    assert DerivativeStore(db, max_side=640).get(first.sha256) is None
+
+
+def _png_header(width, height):
+    """A tiny PNG that declares ``width`` x ``height`` pixels."""
+    buf = io.BytesIO()
+    Image.new("RGB", (1, 1)).save(buf, "PNG")
+    data = bytearray(buf.getvalue())
+    ihdr = struct.pack(">II", width, height) + bytes(data[24:29])
+    data[16:29] = ihdr
+    data[29:33] = struct.pack(">I", zlib.crc32(b"IHDR" + ihdr))
+    return bytes(data)
+
+
+@pytest.mark.parametrize("size", [(15000, 15000), (7000, 7000)])
+def test_decoders_reject_decompression_bombs(size):
+    bomb = _png_header(*size)
+    assert len(bomb) < 1024
+    for decode in (prepare_image, compute_hashes, load_rgb):
+        with pytest.raises(InvalidImageError):
+            decode(bomb)
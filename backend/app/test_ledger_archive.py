@@ -0,0 +1,71 @@
+import datetime
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+pytest.importorskip("pyarrow")
+
+from app.ledger_archive import (  # noqa:E402
+    archived_max_id,
+    iter_archived,
+    read_archived_events,
+    run_retention,
+)
+from app.ledger_codec import LedgerCodec, ZlibCodec  # noqa:E402
+
+SCHEMAS = Path(__file__).resolve().parent / "schemas"
+NOW = datetime.datetime(2025, 6, 15)
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    for name in ["evidence_ledger.schema.sql", "ledger_partitions.schema.sql"]:
+        conn.executescript((SCHEMAS / name).read_text(encoding="utf-8-sig"))
+    yield conn
+    conn.close()
+
+
+def _insert(conn, codec, at, sid, kind="chat", text="x" * 100):
+    conn.execute(
+        "INSERT INTO evidence_ledger(kind, submission_id, at, payload_json) VALUES(?,?,?,?)",
+        (kind, sid, at, codec.encode(f'{{"text":"{text}"}}', kind, "payload_json")),
+    )
+
+
+def test_closed_months_move_to_parquet(conn, tmp_path):
+    codec = LedgerCodec(ZlibCodec())
+    _insert(conn, codec, "2025-01-10T00:00:00Z", "s1", kind="upload")
+    _insert(conn, codec, "2025-02-10T00:00:00Z", "s1")
+    _insert(conn, codec, "2025-05-01T00:00:00Z", "s1")
+    _insert(conn, codec, "2025-06-01T00:00:00Z", "s2")
+    conn.commit()
+
+    result = run_retention(conn, codec, tmp_path, {"hot_months": 2}, now=NOW)
+
+    assert result["archived"] == {"2025-01": 1, "2025-02": 1}
+    assert conn.execute("SELECT COUNT(*) FROM evidence_ledger").fetchone()[0] == 2
+    assert archived_max_id(conn, "s1") == 2
+    rows = read_archived_events(conn, tmp_path, "s1", ["id", "kind", "payload_json"])
+    assert [(r[0], r[1]) for r in rows] == [(1, "upload"), (2, "chat")]
+    assert rows[0][2] == '{"text":"' + "x" * 100 + '"}'
+    assert read_archived_events(conn, tmp_path, "s1", ["id"], kinds=["chat"], after=1) == [(2,)]
+    assert [r[0] for r in iter_archived(conn, tmp_path, ["id"], kinds=["upload"])] == [1]
+
+
+def test_expired_archives_are_deleted(conn, tmp_path):
+    codec = LedgerCodec()
+    _insert(conn, codec, "2023-01-10T00:00:00Z", "old")
+    conn.commit()
+    run_retention(conn, codec, tmp_path, {"hot_months": 1}, now=NOW)
+    assert archived_max_id(conn, "old") == 1
+
+    result = run_retention(conn, codec, tmp_path, {"hot_months": 1, "archive_months": 12}, now=NOW)
+
+    assert result["expired"] == ["2023-01"]
+    assert archived_max_id(conn, "old") == 0
+    assert not list(tmp_path.rglob("*.parquet"))
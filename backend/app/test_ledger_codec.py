@@ -0,0 +1,100 @@
+import sqlite3
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.ledger_codec import (  # noqa:E402
+    LedgerCodec,
+    ZlibCodec,
+    ZstdCodec,
+    load_dictionaries,
+    load_ledger_codec,
+    train_dictionaries,
+)
+from app.providers import compact_raw_response  # noqa:E402
+
+SCHEMAS = Path(__file__).resolve().parent / "schemas"
+TEXT = '{"message":"대비가 충분한가요?","answer":"' + "텍스트 대비 " * 40 + '"}'
+
+
+def _ledger() -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    for name in ["evidence_ledger.schema.sql", "ledger_dictionaries.schema.sql"]:
+        conn.executescript((SCHEMAS / name).read_text(encoding="utf-8-sig"))
+    return conn
+
+
+def test_zlib_roundtrip_and_small_values_stay_text():
+    codec = LedgerCodec(ZlibCodec(), min_size=64)
+    stored = codec.encode(TEXT, "chat", "payload_json")
+    assert isinstance(stored, bytes) and len(stored) < len(TEXT.encode("utf-8"))
+    assert codec.decode(stored) == TEXT
+    assert codec.encode("{}", "chat", "payload_json") == "{}"
+    assert codec.decode(None) is None
+
+
+def test_legacy_text_and_other_codecs_decode():
+    old = LedgerCodec(ZlibCodec()).encode(TEXT, "chat", "payload_json")
+    plain = LedgerCodec(None)
+    assert plain.encode(TEXT, "chat", "payload_json") == TEXT
+    assert plain.decode(old) == TEXT
+    assert plain.decode(TEXT) == TEXT
+
+
+def test_zstd_trained_dictionary_roundtrip():
+    pytest.importorskip("zstandard")
+    conn = _ledger()
+    rows = [
+        ("chat", f"sub_{i}", "2025-01-01T00:00:00Z", TEXT.replace("대비", f"대비{i}"))
+        for i in range(200)
+    ]
+    conn.executemany(
+        "INSERT INTO evidence_ledger(kind, submission_id, at, payload_json) VALUES(?,?,?,?)", rows
+    )
+    old_value = LedgerCodec(ZstdCodec()).encode(TEXT, "chat", "payload_json")
+    trained = train_dictionaries(conn, dict_size=4096)
+    assert ("chat", "payload_json") in trained
+    codec = LedgerCodec(ZstdCodec(dictionaries=load_dictionaries(conn)))
+    stored = codec.encode(TEXT, "chat", "payload_json")
+    assert codec.decode(stored) == TEXT
+    assert codec.decode(old_value) == TEXT
+
+
+def test_running_codec_picks_up_dictionaries_trained_later(tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    db = tmp_path / "ledger.db"
+    conn = sqlite3.connect(db)
+    for name in ["evidence_ledger.schema.sql", "ledger_dictionaries.schema.sql"]:
+        conn.executescript((SCHEMAS / name).read_text(encoding="utf-8-sig"))
+    config = SimpleNamespace(compression="zstd", level=3, min_size=64)
+    running = load_ledger_codec(conn, config)  # the API, started before training
+    conn.close()
+
+    # Training and recompression run in another process.
+    other = sqlite3.connect(db)
+    other.executemany(
+        "INSERT INTO evidence_ledger(kind, submission_id, at, payload_json) VALUES(?,?,?,?)",
+        [("chat", f"sub_{i}", "2025-01-01T00:00:00Z", TEXT.replace("대비", f"대비{i}")) for i in range(200)],
+    )
+    trained = train_dictionaries(other, dict_size=4096)
+    stored = load_ledger_codec(other, config).encode(TEXT, "chat", "payload_json")
+    other.close()
+
+    assert running.decode(stored) == TEXT
+    # New rows written by the running codec use the new dictionary too.
+    again = running.encode(TEXT, "chat", "payload_json")
+    assert zstandard.get_frame_parameters(again[1:]).dict_id == trained[("chat", "payload_json")]
+
+    # Ids that are not in the table even after a reload still fail.
+    stray = zstandard.train_dictionary(4096, [TEXT.encode("utf-8") + bytes([i]) * i for i in range(64)])
+    with pytest.raises(ValueError, match="Unknown zstd dictionary"):
+        running.decode(ZstdCodec.tag + zstandard.ZstdCompressor(dict_data=stray).compress(TEXT.encode("utf-8")))
+
+
+def test_compact_raw_response_drops_context():
+    raw = {"model": "llava:7b", "response": "ok", "context": list(range(4096)), "done": True}
+    assert compact_raw_response(raw) == {"model": "llava:7b", "response": "ok", "done": True}
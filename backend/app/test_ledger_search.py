@@ -0,0 +1,67 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app import ledger_search  # noqa:E402
+from app.ledger_codec import LedgerCodec, ZlibCodec  # noqa:E402
+from app.ledger_writer import LedgerEvent, insert_events  # noqa:E402
+
+SCHEMAS = Path(__file__).resolve().parent / "schemas"
+
+
+def _conn(tmp_path):
+    conn = sqlite3.connect(tmp_path / "ledger.db")
+    conn.executescript((SCHEMAS / "evidence_ledger.schema.sql").read_text(encoding="utf-8-sig"))
+    return conn
+
+
+def test_indexed_on_insert_with_filters_and_pages(tmp_path):
+    conn = _conn(tmp_path)
+    codec = LedgerCodec(ZlibCodec(), min_size=8)
+    insert_events(conn, codec, [
+        LedgerEvent("chat", "s1", {"message": "Is the logo contrast enough?", "answer": "The logo contrast is low."}, at="2025-01-05T10:00:00Z"),
+        LedgerEvent("analyze", "s1", {"findings": [{"label": "Low Contrast", "explanation": "Text over photo", "region": {"x": 0}}]}, at="2025-02-01T10:00:00Z"),
+        LedgerEvent("evaluate", "s2", {"scores": [{"criteria_id": "C3", "score": 2, "reason": "contrast fails AA"}], "judge": "secret"}, at="2025-02-03T10:00:00Z"),
+        LedgerEvent("upload", "s3", {"title": "Spring poster", "author_id": "a1"}, at="2025-02-04T10:00:00Z"),
+    ])
+    conn.commit()
+
+    found = ledger_search.search(conn, "contrast")
+    scores = [r["score"] for r in found["results"]]
+    assert scores == sorted(scores, reverse=True)
+    assert {r["submission_id"] for r in found["results"]} == {"s1", "s2"}
+    assert all("<mark>contrast</mark>" in r["snippet"].lower() for r in found["results"])
+    assert ledger_search.search(conn, "secret")["results"] == []  # only extracted fields
+
+    assert [r["kind"] for r in ledger_search.search(conn, "contrast", kinds=["evaluate"])["results"]] == ["evaluate"]
+    dated = ledger_search.search(conn, "contrast", since="2025-02-01", until="2025-02-02")
+    assert [r["kind"] for r in dated["results"]] == ["analyze"]
+    assert ledger_search.search(conn, "post*")["results"][0]["submission_id"] == "s3"
+    # FTS5 syntax in user input is treated as text.
+    assert ledger_search.search(conn, 'logo" OR NEAR(')["results"] == []
+
+    first = ledger_search.search(conn, "contrast", limit=2)
+    rest = ledger_search.search(conn, "contrast", limit=2, offset=first["next_offset"])
+    assert first["next_offset"] == 2 and rest["next_offset"] is None
+    ids = [r["id"] for r in first["results"] + rest["results"]]
+    assert len(set(ids)) == 3
+
+
+def test_backfill_indexes_only_missing_rows(tmp_path):
+    conn = _conn(tmp_path)
+    codec = LedgerCodec(ZlibCodec(), min_size=8)
+    insert_events(conn, codec, [LedgerEvent("chat", f"s{i}", {"message": f"grid margin {i}"}) for i in range(5)])
+    conn.execute("DELETE FROM ledger_fts WHERE rowid IN (1, 3)")
+    conn.commit()
+    assert ledger_search.backfill(conn, codec, batch_size=1) == 2
+    assert ledger_search.backfill(conn, codec) == 0
+    assert len(ledger_search.search(conn, "margin", limit=10)["results"]) == 5
+
+
+def test_recent_order(tmp_path):
+    conn = _conn(tmp_path)
+    insert_events(conn, LedgerCodec(), [LedgerEvent("chat", f"s{i}", {"message": "palette " * (i + 1)}) for i in range(3)])
+    found = ledger_search.search(conn, "palette", order="recent")
+    assert [r["submission_id"] for r in found["results"]] == ["s2", "s1", "s0"]
@@ -0,0 +1,88 @@
+import asyncio
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app import main  # noqa:E402
+from app.ledger_codec import LedgerCodec  # noqa:E402
+from app.ledger_writer import LedgerEvent, LedgerWriter  # noqa:E402
+from app.observability import metrics  # noqa:E402
+
+SCHEMAS = Path(__file__).resolve().parent / "schemas"
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "ledger.db"
+    conn = sqlite3.connect(path)
+    conn.executescript((SCHEMAS / "evidence_ledger.schema.sql").read_text(encoding="utf-8-sig"))
+    conn.close()
+    return path
+
+
+def _count(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM evidence_ledger").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_events_are_committed_in_batches(db_path):
+    writer = LedgerWriter(db_path, LedgerCodec(), flush_interval_ms=50, max_batch=100)
+    writer.start()
+    futures = [writer.submit(LedgerEvent("chat", "s1", {"i": i})) for i in range(50)]
+    ids = [f.result(timeout=5) for f in futures]
+    writer.stop()
+    assert ids == sorted(ids) and len(set(ids)) == 50
+    assert _count(db_path) == 50
+    assert metrics.snapshot()["histograms"]["ledger_writer.batch_size"]["max"] > 1
+
+
+def test_stop_drains_fire_and_forget_events(db_path):
+    writer = LedgerWriter(db_path, flush_interval_ms=1000)
+    writer.start()
+    for i in range(20):
+        writer.submit(LedgerEvent("chat", "s1", {"i": i}))
+    writer.stop()
+    assert _count(db_path) == 20
+    assert not writer.running
+
+
+def test_bad_event_does_not_fail_batch(db_path):
+    writer = LedgerWriter(db_path, flush_interval_ms=100)
+    writer.start()
+    good = writer.submit(LedgerEvent("chat", "s1", {"ok": True}))
+    bad = writer.submit(LedgerEvent("chat", "s1", {"obj": threading.Lock()}))
+    writer.flush(timeout=5)
+    assert good.result(timeout=5) > 0
+    with pytest.raises(TypeError):
+        bad.result(timeout=5)
+    writer.stop()
+    assert _count(db_path) == 1
+
+
+def test_full_queue_is_written_off_the_event_loop(db_path, monkeypatch):
+    class Stalled(LedgerWriter):
+        running = True  # no writer thread, so the queue stays full
+
+    writer = Stalled(db_path, max_queue=1)
+    assert writer.try_submit(LedgerEvent("chat", "s1", {"i": 0})) is not None
+    assert writer.try_submit(LedgerEvent("chat", "s1", {"i": 1})) is None
+    threads = []
+    write = writer._write
+    monkeypatch.setattr(writer, "_write", lambda *a: (threads.append(threading.get_ident()), write(*a)))
+    monkeypatch.setattr(main, "ledger_writer", writer)
+
+    async def run():
+        await main.record_evidence("chat", "s1", {"i": 2}, durability="commit")
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+    assert threads and loop_thread not in threads
+    assert _count(db_path) == 1
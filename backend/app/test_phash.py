@@ -0,0 +1,132 @@
+import io
+import json
+import random
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from PIL import Image, ImageDraw
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app import main  # noqa:E402
+from app.core.paths import SCHEMAS_DIR  # noqa:E402
+from app.phash import BKTree, DuplicateIndex, compute_hashes, hamming  # noqa:E402
+
+
+def _poster(seed, size=(800, 1100)):
+    rnd = random.Random(seed)
+    img = Image.new("RGB", size, tuple(rnd.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x, y = rnd.randrange(size[0]), rnd.randrange(size[1])
+        draw.rectangle([x, y, x + rnd.randrange(50, 400), y + rnd.randrange(50, 400)],
+                       fill=tuple(rnd.randrange(256) for _ in range(3)))
+    return img
+
+
+def _encode(img, fmt="JPEG", **kw):
+    buf = io.BytesIO()
+    img.save(buf, fmt, **kw)
+    return buf.getvalue()
+
+
+def test_hashes_survive_reencode_and_resize():
+    img = _poster(1)
+    a = compute_hashes(_encode(img, quality=95))
+    b = compute_hashes(_encode(img.resize((400, 550)), quality=60))
+    c = compute_hashes(_encode(img, "PNG"))
+    other = compute_hashes(_encode(_poster(2)))
+    assert hamming(a.phash, b.phash) <= 6 and hamming(a.dhash, b.dhash) <= 10
+    assert hamming(a.phash, c.phash) <= 6
+    assert hamming(a.phash, other.phash) > 12
+
+
+def test_bktree_matches_brute_force():
+    rnd = random.Random(3)
+    keys = [rnd.getrandbits(64) for _ in range(500)]
+    tree = BKTree()
+    for i, k in enumerate(keys):
+        tree.add(k, i)
+    probe = keys[10] ^ 0b1011  # three bits away from keys[10]
+    expected = {i for i, k in enumerate(keys) if hamming(probe, k) <= 8}
+    found = {v for _, _, v in tree.search(probe, 8)}
+    assert found == expected
+    assert 10 in found
+    assert len(tree) == 500
+
+
+def test_duplicate_index_finds_near_copies_across_instances(tmp_path):
+    db = tmp_path / "t.db"
+    conn = sqlite3.connect(db)
+    conn.executescript((SCHEMAS_DIR / "image_hashes.schema.sql").read_text(encoding="utf-8"))
+    conn.close()
+    first = DuplicateIndex(db)
+    img = _poster(5)
+    original = compute_hashes(_encode(img, quality=95))
+    assert first.find(original) is None
+    first.add("sha-original", original, "sub_1")
+    first.add("sha-other", compute_hashes(_encode(_poster(6))), "sub_2")
+
+    # A second process sees rows written by the first one.
+    second = DuplicateIndex(db)
+    edited = img.copy()
+    ImageDraw.Draw(edited).rectangle([10, 10, 40, 30], fill=(255, 255, 255))
+    match = second.find(compute_hashes(_encode(edited, quality=70)))
+    assert match is not None
+    assert match.sha256 == "sha-original"
+    assert match.submission_id == "sub_1"
+
+    # Images first seen without a submission get one attached later.
+    lone = compute_hashes(_encode(_poster(7)))
+    second.add("sha-lone", lone)
+    first.add("sha-lone", lone, "sub_3")
+    assert second.find(lone).submission_id == "sub_3"
+
+
+def test_submission_lookups_skip_images_without_a_submission(tmp_path):
+    db = tmp_path / "t.db"
+    conn = sqlite3.connect(db)
+    conn.executescript((SCHEMAS_DIR / "image_hashes.schema.sql").read_text(encoding="utf-8"))
+    conn.close()
+    index = DuplicateIndex(db)
+    img = _poster(5)
+    edited = img.copy()
+    ImageDraw.Draw(edited).rectangle([10, 10, 40, 30], fill=(255, 255, 255))
+    index.add("sha-submitted", compute_hashes(_encode(edited, quality=70)), "sub_1")
+    # An exact copy checked through /analyze-vision only, with no submission.
+    exact = compute_hashes(_encode(img, quality=95))
+    index.add("sha-vision", exact)
+
+    assert index.find(exact).sha256 == "sha-vision"
+    match = index.find(exact, with_submission=True)
+    assert match.sha256 == "sha-submitted"
+    assert match.submission_id == "sub_1"
+
+
+def test_analyze_reuses_a_duplicate_only_with_the_same_declared_colors(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "ensure_dirs", lambda: None)
+    for name in ("ARCHIVE_DIR", "SNAPSHOT_DIR", "IMPORTS_DIR"):
+        monkeypatch.setattr(main, name, tmp_path / name.lower())
+    monkeypatch.setattr(main, "DB_PATH", tmp_path / "t.db")
+    calls = []
+    real = main.analyze_image
+    monkeypatch.setattr(main, "analyze_image", lambda *a, **kw: calls.append(kw) or real(*a, **kw))
+    content = _encode(_poster(5, size=(200, 280)), "PNG")
+
+    def upload(colors):
+        time.sleep(0.002)  # submission ids are millisecond timestamps
+        res = c.post("/uploads", data={"meta": json.dumps({"colors": colors})},
+                     files={"file": ("p.png", content, "image/png")})
+        return res.json()["submission_id"]
+
+    with TestClient(main.app) as c:
+        first = upload(["#112233"])
+        assert c.post("/analyze", json={"submission_id": first}).status_code == 200
+        assert c.post("/analyze", json={"submission_id": upload(["#112233"])}).status_code == 200
+        assert len(calls) == 1
+        other = c.post("/analyze", json={"submission_id": upload(["#ffffff"])})
+        assert other.status_code == 200
+        assert [kw["declared_colors"] for kw in calls] == [["#112233"], ["#ffffff"]]
@@ -0,0 +1,96 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import httpx
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.observability import active_profile, span  # noqa:E402
+from app.profiling import Profiler, ProfilingMiddleware  # noqa:E402
+
+
+def _settings(**overrides):
+    base = dict(
+        enabled=True, header="X-Profile", token="", sample_rate=0.0, slow_threshold_ms=0.0,
+        sampler_interval_ms=1.0, max_spans=500, keep_slowest=2, keep_recent=5, paths=[],
+    )
+    return SimpleNamespace(**{**base, **overrides})
+
+
+def _app(profiler):
+    app = FastAPI()
+
+    def busy_sqlite_lookup():
+        with span("ledger.load_image"):
+            end = time.perf_counter() + 0.03
+            while time.perf_counter() < end:
+                pass
+
+    @app.get("/work")
+    async def work(ms: float = 0):
+        with span("security.screen_input"):
+            await asyncio.sleep(0.001)
+        await run_in_threadpool(busy_sqlite_lookup)
+        with span("ollama.generate"):
+            await asyncio.sleep(ms / 1000)
+        return {"profiled": active_profile.get() is not None}
+
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+    return app
+
+
+async def _get(app, path, **kwargs):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://t") as client:
+        return await client.get(path, **kwargs)
+
+
+def test_disabled_profiler_is_passthrough():
+    profiler = Profiler()
+    resp = asyncio.run(_get(_app(profiler), "/work"))
+    assert resp.json() == {"profiled": False}
+    assert "x-profile-id" not in resp.headers
+    assert profiler.store.slowest() == []
+
+
+def test_header_request_records_spans_and_stacks():
+    profiler = Profiler()
+    profiler.configure(_settings())
+    resp = asyncio.run(_get(_app(profiler), "/work?ms=20", headers={"X-Profile": "1"}))
+    assert resp.json() == {"profiled": True}
+    profile = profiler.store.get(resp.headers["x-profile-id"])
+    assert profile.reason == "header" and profile.status == 200
+    breakdown = profile.breakdown()
+    assert set(breakdown) == {"security.screen_input", "ledger.load_image", "ollama.generate"}
+    assert breakdown["ledger.load_image"]["total_ms"] >= 25
+    assert "ledger.load_image" in resp.headers["server-timing"]
+    worker = next(s for s in profile.spans if s.name == "ledger.load_image")
+    assert worker.thread == "worker"
+    folded = profile.folded()
+    assert "busy_sqlite_lookup" in folded
+    assert "[await]" in folded and "work (test_profiling.py" in folded
+
+
+def test_token_threshold_and_slowest_ring():
+    profiler = Profiler()
+    profiler.configure(_settings(token="s3cret", slow_threshold_ms=40))
+    app = _app(profiler)
+
+    async def run():
+        ignored = await _get(app, "/work", headers={"X-Profile": "1"})
+        assert "x-profile-id" not in ignored.headers
+        for ms in (5, 60, 80, 100):
+            await _get(app, f"/work?ms={ms}")
+
+    asyncio.run(run())
+    slowest = profiler.store.slowest()
+    assert [p.reason for p in slowest] == ["slow", "slow"]
+    assert slowest[0].duration_ms > slowest[1].duration_ms >= 80
+    assert slowest[0].to_dict()["flamegraph"] is None
+    assert profiler.store.recent() == []
+    assert not profiler.authorized("wrong") and profiler.authorized("s3cret")
@@ -0,0 +1,150 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app import providers  # noqa:E402
+from app.providers import CircuitBreaker, OllamaProvider, ProviderFactory, keep_warm  # noqa:E402
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _provider(monkeypatch, handler, **kw):
+    provider = OllamaProvider("http://ollama", **kw)
+    calls = []
+
+    async def fake_post(path, payload, timeout):
+        calls.append((path, payload))
+        return await handler(payload)
+
+    monkeypatch.setattr(provider, "_post", fake_post)
+    return provider, calls
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_fails_fast_and_recovers():
+    clock = Clock()
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=10, clock=clock)
+
+    async def down():
+        raise HTTPException(status_code=503, detail="down")
+
+    async def up():
+        return "ok"
+
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            await breaker.call(down)
+    assert breaker.state == "open"
+    calls = []
+
+    async def tracked():
+        calls.append(1)
+        return "ok"
+
+    with pytest.raises(HTTPException) as err:
+        await breaker.call(tracked)
+    assert err.value.status_code == 503 and err.value.headers["Retry-After"] == "10"
+    assert calls == []
+
+    clock.now = 11
+    with pytest.raises(HTTPException):  # failed probe re-opens
+        await breaker.call(down)
+    assert breaker.state == "open"
+    clock.now = 22
+    assert await breaker.call(up) == "ok"
+    assert breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_client_errors_do_not_trip_breaker():
+    breaker = CircuitBreaker("test4xx", failure_threshold=1)
+
+    async def bad_request():
+        raise HTTPException(status_code=400, detail="bad")
+
+    with pytest.raises(HTTPException):
+        await breaker.call(bad_request)
+    assert breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_ollama_client_errors_stay_4xx_and_do_not_trip_breaker(monkeypatch):
+    statuses = []
+
+    def handler(request):
+        status = statuses.pop(0)
+        return httpx.Response(status, json={"error": f"status {status}"})
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(providers.httpx, "AsyncClient",
+                        lambda **kw: real_client(transport=httpx.MockTransport(handler), **kw))
+    provider = OllamaProvider("http://ollama", failure_threshold=1)
+
+    statuses.append(404)
+    with pytest.raises(HTTPException) as err:
+        await provider.generate("hi", "missing-model")
+    assert err.value.status_code == 404 and "status 404" in err.value.detail
+    assert provider.breaker.state == "closed"
+
+    statuses.append(500)
+    with pytest.raises(HTTPException) as err:
+        await provider.generate("hi", "m")
+    assert err.value.status_code == 502
+    assert provider.breaker.state == "open"
+
+
+@pytest.mark.asyncio
+async def test_identical_generations_are_coalesced(monkeypatch):
+    release = asyncio.Event()
+
+    async def slow(payload):
+        await release.wait()
+        return {"response": payload["prompt"]}
+
+    provider, calls = _provider(monkeypatch, slow, keep_alive="10m")
+    same = [asyncio.create_task(provider.generate("hi", "m", images=["x"])) for _ in range(3)]
+    other = asyncio.create_task(provider.generate("bye", "m", images=["x"]))
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*same, other)
+    assert [r["response"] for r in results] == ["hi", "hi", "hi", "bye"]
+    assert len(calls) == 2
+    assert calls[0][1]["keep_alive"] == "10m"
+    # Finished flights are not reused.
+    await provider.generate("hi", "m", images=["x"])
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_keep_warm_preloads_each_model_once(monkeypatch):
+    async def ok(payload):
+        return {}
+
+    provider, calls = _provider(monkeypatch, ok)
+    errors = await keep_warm(provider, ["llava:7b", "llama2", "llava:7b"], "30m")
+    assert errors == {"llava:7b": None, "llama2": None}
+    assert calls == [
+        ("/api/generate", {"model": "llava:7b", "keep_alive": "30m"}),
+        ("/api/generate", {"model": "llama2", "keep_alive": "30m"}),
+    ]
+
+
+def test_factory_shares_configured_instances():
+    ProviderFactory.configure(failure_threshold=3)
+    first = ProviderFactory.get("ollama")
+    assert ProviderFactory.get("ollama") is first
+    assert first.breaker.failure_threshold == 3
+    ProviderFactory.configure()
+    assert ProviderFactory.get("ollama") is not first
@@ -0,0 +1,66 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.query_cache import QueryCache, normalize_query  # noqa:E402
+
+
+def test_exact_and_semantic_hits():
+    cache = QueryCache("test_rag", semantic_threshold=0.9)
+    assert cache.get("What contrast ratio is required?") is None
+    cache.put("What contrast ratio is required?", {"answer": "4.5:1"})
+
+    exact = cache.get("  what CONTRAST ratio is required ")
+    assert exact.kind == "exact" and exact.value == {"answer": "4.5:1"}
+
+    reworded = cache.get("What is the required contrast ratio")
+    assert reworded.kind == "semantic" and reworded.similarity > 0.9
+    assert reworded.matched_query == normalize_query("What contrast ratio is required?")
+
+    assert cache.get("What grid system should posters use?") is None
+    assert cache.get("What contrast ratio is required for large text?") is None
+    assert cache.hit_rate() == 0.4
+
+
+def test_generation_invalidation_and_bounds():
+    cache = QueryCache("test_rag_gen", max_entries=2)
+    cache.put("grid", "g1", generation=1)
+    assert cache.get("grid", generation=2) is None
+    assert cache.invalidate(keep_generation=2) == 1
+    assert cache.get("grid", generation=1) is None
+
+    for q in ("white space", "logo placement", "alt text"):
+        cache.put(q, q, generation=2)
+    assert len(cache) == 2
+    assert cache.get("white space", generation=2) is None
+    assert cache.get("alt text", generation=2).value == "alt text"
+
+
+def test_exact_only_mode():
+    cache = QueryCache("test_search", semantic_threshold=1.0)
+    cache.put("contrast ratio", [1])
+    assert cache.get("Contrast ratio?").value == [1]
+    assert cache.get("ratio contrast") is None
+
+
+def test_semantic_hit_requires_same_numbers():
+    cache = QueryCache("test_rag_numbers", semantic_threshold=0.9)
+    cache.put("Is 3:1 contrast enough for headings?", "3:1")
+    cache.put("What does section 2.1 say about margins?", "2.1")
+    cache.put("Can the poster be A1?", "A1")
+    assert cache.get("Is 7:1 contrast enough for headings?") is None
+    assert cache.get("What does section 4.2 say about margins?") is None
+    assert cache.get("Can the poster be A4?") is None
+    assert cache.get("Is 3:1 contrast enough for the headings").value == "3:1"
+    assert cache.get("What does section 2.1 say about the margins").value == "2.1"
+
+
+def test_semantic_hit_requires_same_content_words():
+    cache = QueryCache("test_rag_words", semantic_threshold=0.9)
+    cache.put("What is the minimum font size allowed for body text on the award poster?", "min")
+    cache.put("Is a logo required in the footer of the submitted poster?", "req")
+    assert cache.get("What is the maximum font size allowed for body text on the award poster?") is None
+    assert cache.get("Is a logo forbidden in the footer of the submitted poster?") is None
+    hit = cache.get("For body text on the award poster, what is the minimum font size allowed")
+    assert hit.kind == "semantic" and hit.value == "min"
@@ -0,0 +1,63 @@
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app import main  # noqa:E402
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "ensure_dirs", lambda: None)
+    for name in ("ARCHIVE_DIR", "SNAPSHOT_DIR", "IMPORTS_DIR"):
+        monkeypatch.setattr(main, name, tmp_path / name.lower())
+    monkeypatch.setattr(main, "DB_PATH", tmp_path / "t.db")
+    with TestClient(main.app) as c:
+        yield c
+
+
+def _log(n, sid="s1"):
+    for i in range(n):
+        kind = "analyze" if i % 2 else "chat"
+        main.log_evidence(kind, sid, {"i": i}, raw_output=f"raw{i}", durability="commit")
+
+
+def test_report_etag_round_trip(client):
+    _log(3)
+    first = client.get("/report/s1")
+    assert first.status_code == 200 and len(first.json()["events"]) == 3
+    etag = first.headers["etag"]
+    assert client.get("/report/s1", headers={"If-None-Match": etag}).status_code == 304
+    # Other parameters are a different representation.
+    assert client.get("/report/s1?kind=chat", headers={"If-None-Match": etag}).status_code == 200
+
+    _log(1)
+    changed = client.get("/report/s1", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert len(changed.json()["events"]) == 4
+
+
+def test_report_include_kind_and_cursor_paging(client):
+    _log(5)
+    _log(2, sid="other")
+    plain = client.get("/report/s1").json()["events"][0]
+    assert "raw_output" not in plain and "image" not in plain
+    full = client.get("/report/s1?include=raw_output,image").json()["events"][0]
+    assert full["raw_output"] == "raw0" and full["image"] is None
+    assert client.get("/report/s1?include=secret").status_code == 400
+
+    kinds = {e["kind"] for e in client.get("/report/s1?kind=analyze").json()["events"]}
+    assert kinds == {"analyze"}
+
+    pages, after = [], None
+    while True:
+        params = {"limit": 2} if after is None else {"limit": 2, "after": after}
+        body = client.get("/report/s1", params=params).json()
+        pages.append([e["payload"]["i"] for e in body["events"]])
+        after = body["next_after"]
+        if after is None:
+            break
+    assert pages == [[0, 1], [2, 3], [4]]
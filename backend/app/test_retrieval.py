@@ -0,0 +1,81 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.guidelines import load_guideline_chunks  # noqa:E402
+from app.retrieval import HybridRetriever, LexicalIndex, Passage, dedupe, passage_id, rrf, synthesize  # noqa:E402
+
+SHARED = "Body text must keep a contrast ratio of at least 4.5 to 1 against its background colour."
+
+
+class FakeRag:
+    ready = True
+    generation = 1
+
+    def __init__(self):
+        self.corpora = {
+            "expert": [("exp-1", SHARED + " Jurors check this first.", 0.9), ("exp-2", "Kerning tips for display type.", 0.4)],
+            "evaluation": [("ev-7", "Low contrast entries scored poorly on accessibility.", 0.8)],
+        }
+
+    async def aretrieve(self, corpus, question, top_k):
+        return self.corpora[corpus][:top_k]
+
+
+class FakeProvider:
+    def __init__(self, reply):
+        self.reply = reply
+        self.prompts = []
+
+    async def generate(self, prompt, model, **kwargs):
+        self.prompts.append((prompt, kwargs))
+        return {"response": self.reply}
+
+
+def _p(cid, source="expert", text=None):
+    return Passage(cid, source, cid, text or f"unique passage about {cid} with words {cid}")
+
+
+def test_rrf_rewards_agreement_across_sources():
+    a, b, c = _p("a"), _p("b"), _p("c")
+    fused = rrf({"expert": [a, b, c], "evaluation": [c, b]}, k=60)
+    assert [p.citation_id for p in fused] == ["c", "b", "a"]
+    assert fused[1].ranks == {"expert": 2, "evaluation": 2}
+    assert abs(fused[1].score - 2 / 62) < 1e-12
+    assert fused[2].score < fused[1].score
+
+
+def test_dedupe_merges_contained_passages():
+    long = _p("long", text=SHARED + " Jurors check this first.")
+    short = _p("short", source="guideline", text=SHARED)
+    other = _p("other")
+    long.score, short.score, other.score = 0.03, 0.02, 0.025
+    kept = dedupe([long, other, short], threshold=0.6)
+    assert [p.citation_id for p in kept] == ["long", "other"]
+    assert kept[0].merged == ["short"] and abs(kept[0].score - 0.05) < 1e-12
+
+
+def test_hybrid_retrieval_uses_one_synthesis_call():
+    chunks = load_guideline_chunks()
+    retriever = HybridRetriever(LexicalIndex(chunks), FakeRag(), per_source_k=4, top_k=5)
+    passages = asyncio.run(retriever.retrieve("What contrast ratio is required for body text?"))
+    sources = {p.source for p in passages}
+    assert {"guideline", "expert", "evaluation"} <= sources
+    assert len({p.citation_id for p in passages}) == len(passages)
+    expert = next(p for p in passages if p.source == "expert")
+    assert expert.citation_id == passage_id("expert", "exp-1", SHARED + " Jurors check this first.")
+
+    guideline = next(p for p in passages if p.source == "guideline")
+    reply = json.dumps({"answer": f"Use 4.5:1 [{guideline.citation_id}].", "citations": [expert.citation_id, "made-up"]})
+    provider = FakeProvider(reply)
+    result = asyncio.run(synthesize(provider, "m", "contrast?", passages))
+    assert len(provider.prompts) == 1
+    assert provider.prompts[0][1] == {"stream": False, "format": "json"}
+    assert all(f"[{p.citation_id}]" in provider.prompts[0][0] for p in passages)
+    assert result["citations"] == [expert.citation_id, guideline.citation_id]
+
+    fallback = asyncio.run(synthesize(FakeProvider("not json"), "m", "contrast?", passages))
+    assert fallback == {"answer": "not json", "citations": []}
@@ -0,0 +1,61 @@
+import json
+import sys
+from collections import Counter
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.router import QueryRouter  # noqa:E402
+
+SEEDS = Path(__file__).resolve().parent / "seeds"
+
+
+def _router(decisions=None) -> QueryRouter:
+    text = (SEEDS / "guidelines" / "kda_2025_guideline.md").read_text(encoding="utf-8-sig")
+    chunks = []
+    for line in text.splitlines():
+        if line.startswith("§"):
+            chunks.append({"section_path": line, "text": ""})
+        elif chunks:
+            chunks[-1]["text"] += line + "\n"
+    rubric = json.loads((SEEDS / "rubrics" / "kda_2025_v1.json").read_text(encoding="utf-8-sig"))
+    return QueryRouter(chunks, [rubric], decisions=decisions)
+
+
+def test_domain_questions_route_to_rag():
+    router = _router()
+    assert router.route("What contrast ratio does the guideline require?").route == "rag"
+    assert router.route("How should the typographic scale be applied?").route == "rag"
+    assert router.route("§3.1 에 대해 알려줘").route == "rag"
+
+
+def test_small_talk_routes_to_chat():
+    router = _router()
+    decision = router.route("Hello, how are you?")
+    assert decision.route == "chat"
+    assert decision.matched == []
+
+
+def test_ambiguous_questions_fall_back_to_agent():
+    router = _router()
+    assert router.route("Is this any good?").route == "agent"
+    assert router.skip_ratio() == 0.0
+    router.route("Explain the grid system in the guideline")
+    assert router.skip_ratio() == 0.5
+
+
+def test_single_common_term_does_not_route_to_rag():
+    router = _router()
+    for query in ("Translate this text into English", "Write a poem about color", "Explain the grid system"):
+        decision = router.route(query)
+        assert decision.route == "agent", (query, decision)
+        assert len(decision.matched) == 1
+    assert router.route("How is color contrast scored?").route == "rag"
+
+
+def test_statistics_survive_router_rebuild():
+    decisions = Counter()
+    _router(decisions).route("What contrast ratio does the guideline require?")
+    rebuilt = _router(decisions)
+    rebuilt.route("Is this any good?")
+    assert rebuilt.skip_ratio() == 0.5
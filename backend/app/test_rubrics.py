@@ -0,0 +1,70 @@
+import copy
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.core.paths import RUBRIC_FILE  # noqa:E402
+from app.rubrics import RubricError, RubricRegistry, ScoreValidationError, compile_rubric  # noqa:E402
+
+
+def _rubric():
+    return json.loads(RUBRIC_FILE.read_text(encoding="utf-8-sig"))
+
+
+def _write(directory, name, data):
+    (directory / name).write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+
+def test_compiled_rubric_checks_scores():
+    rubric = compile_rubric(_rubric())
+    rubric.validate_scores([("C1", 5), ("C2", 1), ("C3", 3), ("C4", 4)])
+    with pytest.raises(ScoreValidationError) as err:
+        rubric.validate_scores([("C1", 6), ("C2", 2.5), ("C9", 3), ("C1", 3)])
+    text = " | ".join(err.value.errors)
+    assert "C1: score 6 outside [1, 5]" in text
+    assert "C2: score 2.5 must be an integer" in text
+    assert "C9: unknown criterion" in text
+    assert "C1: scored more than once" in text
+    assert "missing criteria: C3, C4" in text
+    assert rubric.score_errors([("C2", 4)], complete=False) == []
+
+
+def test_invalid_rubrics_are_rejected():
+    missing = _rubric()
+    del missing["aggregation"]
+    with pytest.raises(RubricError, match="aggregation"):
+        compile_rubric(missing)
+    dup = _rubric()
+    dup["criteria"][1]["id"] = "C1"
+    with pytest.raises(RubricError, match="duplicate criterion"):
+        compile_rubric(dup)
+    inverted = _rubric()
+    inverted["criteria"][0]["scale"] = {"type": "int", "min": 5, "max": 1}
+    with pytest.raises(RubricError, match="min 5 > max 1"):
+        compile_rubric(inverted)
+
+
+def test_registry_lookup_and_version_resolution(tmp_path):
+    base = _rubric()
+    other = copy.deepcopy(base)
+    other["award_id"] = "aw_2025_other"
+    other["criteria"][0]["scale"] = {"type": "enum", "enum": ["low", "mid", "high"]}
+    _write(tmp_path, "a.json", base)
+    _write(tmp_path, "b.json", other)
+    registry = RubricRegistry.load_dir(tmp_path, default_file=tmp_path / "a.json")
+    assert len(registry) == 2
+    assert registry.default.award_id == "aw_2025_kda"
+    enum_rubric = registry.get("aw_2025_other", "1.0.0")
+    assert enum_rubric.score_errors([("C1", 2)], complete=False) == []
+    assert enum_rubric.score_errors([("C1", 3)], complete=False)
+    with pytest.raises(KeyError, match="ambiguous"):
+        registry.resolve("1.0.0")
+    assert registry.resolve("1.0.0", "aw_2025_other") is enum_rubric
+    with pytest.raises(KeyError):
+        registry.resolve("9.9.9")
+    # Same content, same ETag; any edit changes it.
+    assert compile_rubric(base).etag == registry.default.etag != enum_rubric.etag
@@ -0,0 +1,25 @@
+import datetime
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.schemas import EvaluateRequest  # noqa:E402
+from app.serialization import FastJSONResponse, dumps_str, raw  # noqa:E402
+
+
+def test_raw_fragments_are_embedded_verbatim():
+    stored = '{"answer":"대비가 낮습니다","scores":[1,2.5]}'
+    body = FastJSONResponse({"events": [{"id": 1, "payload": raw(stored)}, {"id": 2, "payload": raw(stored.encode())}]}).body
+    assert body.decode("utf-8") == f'{{"events":[{{"id":1,"payload":{stored}}},{{"id":2,"payload":{stored}}}]}}'
+
+
+def test_dumps_matches_compact_stdlib_output():
+    record = EvaluateRequest(
+        submission_id="s", judge_id="j", rubric_version="1.0.0", scores=[],
+        submitted_at=datetime.datetime(2025, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc),
+    )
+    payload = record.model_dump(mode="json")
+    assert dumps_str(payload) == json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    assert json.loads(dumps_str({"t": {1, 2}, 3: "키"})) == {"t": [1, 2], "3": "키"}
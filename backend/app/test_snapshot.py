@@ -0,0 +1,42 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.guidelines import load_guideline_chunks, search_hits  # noqa:E402
+from app.snapshot import Snapshot, SnapshotStore  # noqa:E402
+
+RUBRIC = {"award_id": "KDA", "version": "v1", "criteria": [{"id": "C1", "label": "대비", "weight": 1}]}
+
+
+def test_snapshot_matches_in_memory_search(tmp_path):
+    chunks = load_guideline_chunks()
+    store = SnapshotStore(tmp_path)
+    snap = store.ensure("src-1", lambda: (chunks, [RUBRIC], {"default_rubric": ["KDA", "v1"]}))
+    assert snap.generation == 1
+    assert [dict(c) for c in snap.chunks()] == chunks
+    assert snap.rubrics() == [RUBRIC]
+    assert snap.meta == {"default_rubric": ["KDA", "v1"]}
+    for query in ("contrast", "대비", "여백", "ab", "no such phrase"):
+        assert snap.search(query, 5) == search_hits(chunks, query, 5), query
+    assert snap.search("") == []
+
+
+def test_generation_swap_between_stores(tmp_path):
+    chunks = [{"citation_id": "g#1", "doc_id": "g", "section_path": "A", "text": "Logo clear space", "version": "1"}]
+    builder = SnapshotStore(tmp_path)
+    worker = SnapshotStore(tmp_path)
+    first = builder.ensure("src-1", lambda: (chunks, [], {}))
+
+    # Same sources: a second worker maps the existing file instead of rebuilding.
+    mapped = worker.ensure("src-1", lambda: (_ for _ in ()).throw(AssertionError("rebuilt")))
+    assert mapped.generation == first.generation
+    assert worker.poll() is None
+
+    builder.publish("src-2", [{**chunks[0], "text": "Palette contrast"}], [], {})
+    swapped = worker.poll()
+    assert swapped is not None and swapped.generation == 2
+    assert swapped.search("palette")[0]["citation_id"] == "g#1"
+    # Readers of the old generation still see their data.
+    assert mapped.search("logo")[0]["citation_id"] == "g#1"
+    assert isinstance(Snapshot(tmp_path / "snapshot-000002.bin").chunks()[0]["text"], str)
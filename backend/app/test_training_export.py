@@ -0,0 +1,114 @@
+import base64
+import io
+import json
+import sqlite3
+import sys
+import tarfile
+from pathlib import Path
+
+import pyarrow.parquet as pq
+from PIL import Image
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.core.paths import SCHEMAS_DIR  # noqa:E402
+from app.ledger_codec import LedgerCodec, ZlibCodec  # noqa:E402
+from app.ledger_writer import LedgerEvent, insert_events  # noqa:E402
+from app.training_export import TrainingExporter, sample_key, split_for  # noqa:E402
+
+SCHEMAS = ["evidence_ledger.schema.sql", "ledger_partitions.schema.sql", "training_exports.schema.sql"]
+CODEC = LedgerCodec(ZlibCodec(), min_size=16)
+
+
+def _png(i):
+    buf = io.BytesIO()
+    Image.new("RGB", (40 + i, 30), (i * 20 % 256, 80, 160)).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def _submission(sid, i, evaluated=True):
+    image = base64.b64encode(_png(i)).decode("ascii")
+    events = [
+        LedgerEvent("upload", sid, {"title": f"Poster {i}"}, image=image),
+        LedgerEvent("analyze", sid, {"findings": [{"label": "low_contrast", "score": 0.1 * i}]}),
+    ]
+    if evaluated:
+        scores = [{"criterion": "C1", "score": i % 5, "reason": "ok"}]
+        events.append(LedgerEvent("evaluate", sid, {"scores": scores, "total": i}))
+    return events
+
+
+def _db(tmp_path, n=7):
+    db = tmp_path / "t.db"
+    conn = sqlite3.connect(db)
+    for name in SCHEMAS:
+        conn.executescript((SCHEMAS_DIR / name).read_text(encoding="utf-8-sig"))
+    for i in range(n):
+        insert_events(conn, CODEC, _submission(f"sub.{i}", i, evaluated=i != 3))
+    conn.commit()
+    conn.close()
+    return db
+
+
+def _exporter(db, tmp_path, **kwargs):
+    options = dict(workers=2, task_size=3, shard_max_samples=2, val_fraction=0.3, split_salt="t")
+    return TrainingExporter(db, tmp_path / "archive", tmp_path / "out", **{**options, **kwargs})
+
+
+def test_split_is_deterministic_and_salted():
+    sids = [f"sub_{i}" for i in range(2000)]
+    splits = [split_for(s, 0.1, "a") for s in sids]
+    assert splits == [split_for(s, 0.1, "a") for s in sids]
+    assert 140 < splits.count("val") < 260
+    assert splits != [split_for(s, 0.1, "b") for s in sids]
+    assert "." not in sample_key("sub.1") and sample_key("sub.1") != sample_key("sub_1")
+
+
+def test_export_writes_bounded_webdataset_shards_and_parquet(tmp_path):
+    db = _db(tmp_path)
+    manifest = _exporter(db, tmp_path).run()
+    assert manifest["samples"]["total"] == 6 and manifest["skipped"] == 1
+    run_dir = tmp_path / "out" / "run-000001"
+    assert not (tmp_path / "out" / "run-000001.partial").exists()
+
+    rows = []
+    for split in ("train", "val"):
+        if manifest["samples"][split]:
+            rows += pq.read_table(run_dir / f"{split}.parquet").to_pylist()
+    assert sorted(r["submission_id"] for r in rows) == [f"sub.{i}" for i in range(7) if i != 3]
+    assert all(r["split"] == split_for(r["submission_id"], 0.3, "t") for r in rows)
+    assert {r["split"] for r in rows} == {"train", "val"}
+
+    seen = 0
+    for shard in manifest["shards"]:
+        assert shard["samples"] <= 2
+        with tarfile.open(run_dir / shard["name"]) as tar:
+            names = tar.getnames()
+            assert len(names) == 2 * shard["samples"]
+            for row in (r for r in rows if r["shard"] == shard["name"]):
+                image = tar.extractfile(f"{row['key']}.png").read()
+                meta = json.loads(tar.extractfile(f"{row['key']}.json").read())
+                i = int(row["submission_id"].split(".")[1])
+                assert image == _png(i)
+                assert meta["corrections"]["total"] == i and json.loads(row["findings_json"]) == meta["findings"]
+                seen += 1
+    assert seen == 6
+
+
+def test_incremental_export_resumes_from_watermark(tmp_path):
+    db = _db(tmp_path)
+    exporter = _exporter(db, tmp_path, workers=1)
+    first = exporter.run()
+    assert exporter.run()["samples"]["total"] == 0
+
+    conn = sqlite3.connect(db)
+    scores = [{"criterion": "C1", "score": 4, "reason": "fixed"}]
+    insert_events(conn, CODEC, [LedgerEvent("evaluate", "sub.3", {"scores": scores, "total": 9})])
+    insert_events(conn, CODEC, _submission("sub.new", 9))
+    conn.commit()
+    third = exporter.run()
+    assert third["watermark_from"] == first["watermark_to"]
+    assert third["samples"]["total"] == 2 and third["submissions"] == 2
+    states = conn.execute("SELECT run, state, samples, path FROM training_exports ORDER BY run").fetchall()
+    assert states == [(1, "done", 6, "run-000001"), (2, "done", 0, None), (3, "done", 2, "run-000003")]
+    assert exporter.run(full=True)["samples"]["total"] == 8
@@ -0,0 +1,53 @@
+import random
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.warmup import Readiness, jittered  # noqa:E402
+
+
+def test_required_subsystems_gate_readiness():
+    readiness = Readiness()
+    readiness.register("database")
+    readiness.register("rag", required=False)
+    assert not readiness.ready
+    readiness.begin("database")
+    assert readiness.state("database") == "warming"
+    readiness.finish("database")
+    assert readiness.ready
+    snap = readiness.snapshot()
+    assert snap["subsystems"]["database"]["warmup_ms"] is not None
+    assert snap["subsystems"]["rag"]["state"] == "pending"
+
+
+def test_failed_refresh_keeps_ready_subsystem_serving():
+    readiness = Readiness()
+    readiness.begin("rag")
+    readiness.finish("rag", RuntimeError("fetch failed"))
+    assert readiness.state("rag") == "failed"
+    assert not readiness.ready
+    readiness.begin("rag")
+    readiness.finish("rag")
+    assert readiness.state("rag") == "ready"
+    readiness.begin("rag")
+    assert readiness.state("rag") == "ready"
+    readiness.finish("rag", RuntimeError("fetch failed"))
+    sub = readiness.snapshot()["subsystems"]["rag"]
+    assert sub["state"] == "ready"
+    assert sub["error"] == "fetch failed"
+    assert sub["failures"] == 2
+
+
+def test_disabled_subsystem_counts_as_ready():
+    readiness = Readiness()
+    readiness.register("agent", state="disabled")
+    assert readiness.ready
+
+
+def test_jittered_stays_within_bounds():
+    rng = random.Random(0)
+    values = [jittered(100, 0.2, rng) for _ in range(200)]
+    assert all(80 <= v <= 120 for v in values)
+    assert len(set(values)) > 1
+    assert jittered(100, 0) == 100
@@ -0,0 +1,444 @@
+"""Sharded training-data export for LoRA fine-tuning.
+
+Writes the (image, findings, corrections) triple of every submission that
+has an upload image, analyze findings and a non-empty evaluate payload.
+This is the same selection as ``/dataset/export``, but each run is written
+to its own directory under ``TRAINING_DIR``::
+
+    run-000003/
+      train-00000-000.tar     WebDataset shards: <key>.jpg|png raw image bytes
+      val-00000-000.tar       and <key>.json {submission_id, findings, corrections}
+      train.parquet           one metadata row per sample, with its shard
+      val.parquet
+      manifest.json           watermarks, shard list and sample counts
+
+Submissions land in ``val`` when ``sha256(split_salt + submission_id)``
+falls below ``val_fraction``, so a submission keeps its split across runs.
+Each run exports the submissions with ledger events after the previous
+run's watermark (the whole ledger, archives included, the first time or
+with ``--full``).  A submission that changed is exported again; readers
+should keep the newest ``run`` per ``submission_id``.
+
+Submissions are split into tasks of ``task_size`` and written by
+``workers`` processes, each rolling to a new shard before
+``shard_max_bytes`` or ``shard_max_samples`` is exceeded.  The run
+directory is renamed into place and the watermark advanced only once
+every shard is written.  Run from ``backend/``::
+
+    python -m app.training_export [--full] [--workers 8]
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import binascii
+import datetime
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import tarfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.bulk_import import AssetError, sniff_image
+from app.ledger_archive import read_archived_events
+from app.ledger_codec import LedgerCodec, load_ledger_codec
+from app.serialization import dumps, loads
+
+try:  # POSIX only; without it concurrent exports are not prevented.
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+KINDS = ("upload", "analyze", "evaluate")
+SPLITS = ("train", "val")
+IMAGE_EXT = {"jpeg": "jpg", "png": "png"}
+_KEY_RE = re.compile(r"[^A-Za-z0-9_-]")
+
+
+def split_for(submission_id: str, val_fraction: float, salt: str = "") -> str:
+    """Deterministic ``"train"``/``"val"`` assignment of a submission."""
+    digest = hashlib.sha256(f"{salt}{submission_id}".encode("utf-8")).digest()
+    return "val" if int.from_bytes(digest[:8], "big") / 2**64 < val_fraction else "train"
+
+
+def sample_key(submission_id: str) -> str:
+    """WebDataset key: no dots (they start the extension), unique per submission."""
+    digest = hashlib.sha1(submission_id.encode("utf-8")).hexdigest()[:8]
+    return f"{_KEY_RE.sub('_', submission_id)}_{digest}"
+
+
+@dataclass
+class ExportTask:
+    db_path: str
+    archive_dir: str
+    out_dir: str
+    split: str
+    index: int
+    submission_ids: List[str]
+    max_id: int
+    run: int
+    shard_max_bytes: int
+    shard_max_samples: int
+    ledger_config: Any = None
+
+
+@dataclass
+class TaskResult:
+    split: str
+    rows: List[Dict[str, Any]] = field(default_factory=list)
+    shards: List[Dict[str, Any]] = field(default_factory=list)
+    skipped: int = 0
+
+
+def _latest(conn: sqlite3.Connection, codec: LedgerCodec, archive_dir: Path, sid: str, kind: str,
+            max_id: int) -> Optional[Tuple[int, bytes, Optional[str]]]:
+    """Newest ``(id, payload JSON, image)`` of ``kind`` for ``sid`` up to ``max_id``."""
+    row = conn.execute(
+        "SELECT id, payload_json, image FROM evidence_ledger WHERE submission_id=? AND kind=? AND id<=? "
+        "ORDER BY id DESC LIMIT 1",
+        (sid, kind, max_id),
+    ).fetchone()
+    if row is not None:
+        return row[0], codec.decode_bytes(row[1]), row[2]
+    archived = read_archived_events(conn, archive_dir, sid, ["id", "payload_json", "image"], kinds=[kind])
+    if archived:
+        eid, payload_json, image = archived[-1]
+        return eid, payload_json.encode("utf-8"), image
+    return None
+
+
+def load_sample(conn: sqlite3.Connection, codec: LedgerCodec, archive_dir: Path, sid: str,
+                max_id: int) -> Optional[Dict[str, Any]]:
+    """The training triple of ``sid``, or ``None`` when it is incomplete."""
+    upload = _latest(conn, codec, archive_dir, sid, "upload", max_id)
+    evaluate = _latest(conn, codec, archive_dir, sid, "evaluate", max_id)
+    analyze = _latest(conn, codec, archive_dir, sid, "analyze", max_id)
+    if upload is None or not upload[2] or evaluate is None or analyze is None:
+        return None
+    corrections = loads(evaluate[1])
+    findings = loads(analyze[1]).get("findings")
+    if not corrections or not findings:
+        return None
+    try:
+        image = base64.b64decode(upload[2], validate=True)
+        fmt = sniff_image(image)
+    except (binascii.Error, ValueError, AssetError):
+        return None
+    return {
+        "submission_id": sid,
+        "image": image,
+        "image_format": fmt,
+        "findings": findings,
+        "corrections": corrections,
+        "upload_id": upload[0],
+        "analyze_id": analyze[0],
+        "evaluate_id": evaluate[0],
+    }
+
+
+class ShardWriter:
+    """Tar shards ``<prefix>-NNN.tar`` bounded in bytes and samples."""
+
+    def __init__(self, out_dir: Path, prefix: str, max_bytes: int, max_samples: int) -> None:
+        self.out_dir = out_dir
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_samples = max_samples
+        self.shards: List[Dict[str, Any]] = []
+        self._tar: Optional[tarfile.TarFile] = None
+        self._bytes = 0
+        self._samples = 0
+
+    def _open(self) -> None:
+        name = f"{self.prefix}-{len(self.shards):03d}.tar"
+        self._tar = tarfile.open(self.out_dir / name, "w", format=tarfile.USTAR_FORMAT)
+        self.shards.append({"name": name, "samples": 0, "bytes": 0})
+        self._bytes = self._samples = 0
+
+    def _add(self, name: str, data: bytes) -> None:
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mode = 0o444
+        self._tar.addfile(info, io.BytesIO(data))
+
+    def write(self, key: str, files: Sequence[Tuple[str, bytes]]) -> str:
+        """Add one sample (``(extension, bytes)`` members); returns its shard name."""
+        # Each member costs a 512-byte header plus padding to 512 bytes.
+        size = sum(512 + -(-len(data) // 512) * 512 for _, data in files)
+        if self._tar is None or (self._samples and (
+            self._bytes + size > self.max_bytes or self._samples >= self.max_samples
+        )):
+            self.close()
+            self._open()
+        for ext, data in files:
+            self._add(f"{key}.{ext}", data)
+        self._bytes += size
+        self._samples += 1
+        shard = self.shards[-1]
+        shard["samples"] = self._samples
+        shard["bytes"] = self._bytes
+        return shard["name"]
+
+    def close(self) -> None:
+        if self._tar is not None:
+            self._tar.close()
+            self._tar = None
+
+
+def write_task(task: ExportTask) -> TaskResult:
+    """Write the shards of one task; runs in a worker process."""
+    conn = sqlite3.connect(task.db_path)
+    try:
+        codec = load_ledger_codec(conn, task.ledger_config) if task.ledger_config is not None else LedgerCodec()
+        writer = ShardWriter(
+            Path(task.out_dir), f"{task.split}-{task.index:05d}", task.shard_max_bytes, task.shard_max_samples
+        )
+        result = TaskResult(task.split)
+        try:
+            for sid in task.submission_ids:
+                sample = load_sample(conn, codec, Path(task.archive_dir), sid, task.max_id)
+                if sample is None:
+                    result.skipped += 1
+                    continue
+                key = sample_key(sid)
+                meta = {"submission_id": sid, "findings": sample["findings"], "corrections": sample["corrections"]}
+                shard = writer.write(key, [(IMAGE_EXT[sample["image_format"]], sample["image"]), ("json", dumps(meta))])
+                result.rows.append({
+                    "key": key,
+                    "submission_id": sid,
+                    "split": task.split,
+                    "shard": shard,
+                    "run": task.run,
+                    "image_format": sample["image_format"],
+                    "image_bytes": len(sample["image"]),
+                    "upload_id": sample["upload_id"],
+                    "analyze_id": sample["analyze_id"],
+                    "evaluate_id": sample["evaluate_id"],
+                    "findings_json": dumps(sample["findings"]).decode("utf-8"),
+                    "corrections_json": dumps(sample["corrections"]).decode("utf-8"),
+                })
+        finally:
+            writer.close()
+        result.shards = writer.shards
+        return result
+    finally:
+        conn.close()
+
+
+def _metadata_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("key", pa.string()),
+        ("submission_id", pa.string()),
+        ("split", pa.string()),
+        ("shard", pa.string()),
+        ("run", pa.int64()),
+        ("image_format", pa.string()),
+        ("image_bytes", pa.int64()),
+        ("upload_id", pa.int64()),
+        ("analyze_id", pa.int64()),
+        ("evaluate_id", pa.int64()),
+        ("findings_json", pa.string()),
+        ("corrections_json", pa.string()),
+    ])
+
+
+class TrainingExporter:
+    def __init__(
+        self,
+        db_path: Path | str,
+        archive_dir: Path | str,
+        out_dir: Path | str,
+        ledger_config: Any = None,
+        workers: int = 4,
+        task_size: int = 500,
+        shard_max_bytes: int = 256 * 1024 * 1024,
+        shard_max_samples: int = 10000,
+        val_fraction: float = 0.05,
+        split_salt: str = "",
+    ) -> None:
+        self.db_path = Path(db_path)
+        self.archive_dir = Path(archive_dir)
+        self.out_dir = Path(out_dir)
+        self.ledger_config = ledger_config
+        self.workers = workers
+        self.task_size = task_size
+        self.shard_max_bytes = shard_max_bytes
+        self.shard_max_samples = shard_max_samples
+        self.val_fraction = val_fraction
+        self.split_salt = split_salt
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.out_dir / ".lock", "a+") as f:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError as exc:
+                    raise RuntimeError(f"another export is running in {self.out_dir}") from exc
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def watermark(conn: sqlite3.Connection) -> int:
+        """Ledger id covered by the last completed export (0 if none)."""
+        row = conn.execute("SELECT MAX(watermark_to) FROM training_exports WHERE state='done'").fetchone()
+        return row[0] or 0
+
+    def changed_submissions(self, conn: sqlite3.Connection, after: int, max_id: int) -> List[str]:
+        kinds = ",".join("?" * len(KINDS))
+        sids = {
+            sid for (sid,) in conn.execute(
+                f"SELECT DISTINCT submission_id FROM evidence_ledger WHERE id>? AND id<=? AND kind IN ({kinds})",
+                (after, max_id, *KINDS),
+            )
+        }
+        if after == 0:
+            sids.update(sid for (sid,) in conn.execute("SELECT DISTINCT submission_id FROM ledger_archive_index"))
+        return sorted(sids)
+
+    def tasks(self, run: int, run_dir: Path, sids: Sequence[str], max_id: int) -> List[ExportTask]:
+        by_split: Dict[str, List[str]] = {s: [] for s in SPLITS}
+        for sid in sids:
+            by_split[split_for(sid, self.val_fraction, self.split_salt)].append(sid)
+        tasks = []
+        for split, members in by_split.items():
+            for index, start in enumerate(range(0, len(members), self.task_size)):
+                tasks.append(ExportTask(
+                    str(self.db_path), str(self.archive_dir), str(run_dir), split, index,
+                    members[start:start + self.task_size], max_id, run,
+                    self.shard_max_bytes, self.shard_max_samples, self.ledger_config,
+                ))
+        return tasks
+
+    def _execute(self, tasks: List[ExportTask]) -> List[TaskResult]:
+        if self.workers <= 1 or len(tasks) <= 1:
+            return [write_task(t) for t in tasks]
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(tasks))) as pool:
+            return list(pool.map(write_task, tasks))
+
+    def run(self, full: bool = False) -> Dict[str, Any]:
+        """Export everything changed since the last watermark; returns the manifest."""
+        with self._locked():
+            conn = sqlite3.connect(self.db_path)
+            try:
+                after = 0 if full else self.watermark(conn)
+                max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM evidence_ledger").fetchone()[0]
+                max_id = max(max_id, after)
+                now = datetime.datetime.utcnow().isoformat() + "Z"
+                cur = conn.execute(
+                    "INSERT INTO training_exports(started_at, watermark_from, watermark_to, state) VALUES(?,?,?,?)",
+                    (now, after, max_id, "running"),
+                )
+                run = cur.lastrowid
+                conn.commit()
+                sids = self.changed_submissions(conn, after, max_id)
+            finally:
+                conn.close()
+            name = f"run-{run:06d}"
+            partial = self.out_dir / f"{name}.partial"
+            shutil.rmtree(partial, ignore_errors=True)
+            partial.mkdir(parents=True)
+            try:
+                manifest = self._write_run(run, partial, sids, after, max_id)
+                final = self.out_dir / name if manifest["samples"]["total"] else None
+                if final is not None:
+                    os.replace(partial, final)
+                else:
+                    shutil.rmtree(partial)
+            except BaseException:
+                shutil.rmtree(partial, ignore_errors=True)
+                self._finish(run, "failed")
+                raise
+            self._finish(run, "done", manifest["samples"]["total"], len(manifest["shards"]), name if final else None)
+            logger.info(
+                "Training export %s: %d samples in %d shards (ledger ids %d-%d)",
+                name, manifest["samples"]["total"], len(manifest["shards"]), after + 1, max_id,
+            )
+            return manifest
+
+    def _write_run(self, run: int, run_dir: Path, sids: Sequence[str], after: int, max_id: int) -> Dict[str, Any]:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        results = self._execute(self.tasks(run, run_dir, sids, max_id))
+        schema = _metadata_schema()
+        samples: Dict[str, int] = {}
+        shards: List[Dict[str, Any]] = []
+        for split in SPLITS:
+            rows = [row for r in results if r.split == split for row in r.rows]
+            samples[split] = len(rows)
+            shards.extend({"split": split, **s} for r in results if r.split == split for s in r.shards)
+            if rows:
+                table = pa.Table.from_pylist(rows, schema=schema)
+                pq.write_table(table, run_dir / f"{split}.parquet", compression="zstd")
+        samples["total"] = sum(samples.values())
+        manifest = {
+            "run": run,
+            "watermark_from": after,
+            "watermark_to": max_id,
+            "submissions": len(sids),
+            "skipped": sum(r.skipped for r in results),
+            "samples": samples,
+            "shards": shards,
+        }
+        (run_dir / "manifest.json").write_bytes(dumps(manifest))
+        return manifest
+
+    def _finish(self, run: int, state: str, samples: int = 0, shards: int = 0, path: Optional[str] = None) -> None:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute(
+                "UPDATE training_exports SET state=?, finished_at=?, samples=?, shards=?, path=? WHERE run=?",
+                (state, datetime.datetime.utcnow().isoformat() + "Z", samples, shards, path, run),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def exporter_from_config(db_path: Path | str, archive_dir: Path | str, out_dir: Path | str, lora: Dict[str, Any],
+                         ledger_config: Any = None, **overrides: Any) -> TrainingExporter:
+    """Build a :class:`TrainingExporter` from the ``export`` block of ``lora.yaml``."""
+    options = {**(lora.get("export") or {}), **{k: v for k, v in overrides.items() if v is not None}}
+    return TrainingExporter(db_path, archive_dir, out_dir, ledger_config=ledger_config, **options)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Command line entry point: ``python -m app.training_export``."""
+    from app.core.config import load_config
+    from app.core.paths import ARCHIVE_DIR, DB_PATH, TRAINING_DIR
+    from app.main import init_db
+
+    parser = argparse.ArgumentParser(description="Export LoRA training shards from the evidence ledger")
+    parser.add_argument("--full", action="store_true", help="Ignore the watermark and export every submission")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--out", type=Path, default=TRAINING_DIR)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    config = load_config()
+    exporter = exporter_from_config(DB_PATH, ARCHIVE_DIR, args.out, config.lora, config.ledger, workers=args.workers)
+    manifest = exporter.run(full=args.full)
+    summary = {k: v for k, v in manifest.items() if k != "shards"}
+    print(json.dumps({**summary, "shards": len(manifest["shards"])}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Readiness tracking for subsystems that warm up after the API starts.
+
+``lifespan`` only does the cheap startup work (database, ledger writer,
+guideline chunks) inline; RAG indexing and agent construction run as
+background tasks.  Each subsystem reports its progress to :class:`Readiness`
+which backs the ``/readyz`` endpoint, so traffic that does not need the ML
+stacks is served while they are still warming up.
+"""
+from __future__ import annotations
+
+import datetime
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Dict
+
+from app.observability import metrics
+
+STATES = ("pending", "warming", "ready", "failed", "disabled")
+
+
+@dataclass
+class Subsystem:
+    """Warmup and refresh state of one subsystem."""
+
+    name: str
+    required: bool = True
+    state: str = "pending"
+    warmup_ms: float | None = None
+    last_run_at: str | None = None
+    last_run_ms: float | None = None
+    error: str | None = None
+    failures: int = 0
+
+
+class Readiness:
+    """Registry of subsystem states reported by ``/readyz``."""
+
+    def __init__(self) -> None:
+        self.started_at = time.monotonic()
+        self._subsystems: Dict[str, Subsystem] = {}
+        self._running: Dict[str, float] = {}
+
+    def register(self, name: str, required: bool = True, state: str = "pending") -> Subsystem:
+        if state not in STATES:
+            raise ValueError(f"Unknown state: {state}")
+        sub = Subsystem(name, required=required, state=state)
+        self._subsystems[name] = sub
+        return sub
+
+    def _get(self, name: str) -> Subsystem:
+        if name not in self._subsystems:
+            self.register(name)
+        return self._subsystems[name]
+
+    def state(self, name: str) -> str:
+        return self._get(name).state
+
+    def begin(self, name: str) -> None:
+        """Mark the start of a warmup or refresh run.
+
+        A subsystem that is already ready keeps serving (and stays ``ready``)
+        while it refreshes.
+        """
+        sub = self._get(name)
+        self._running[name] = time.perf_counter()
+        if sub.state != "ready":
+            sub.state = "warming"
+
+    def finish(self, name: str, error: BaseException | str | None = None) -> None:
+        """Record the outcome of the run started by :meth:`begin`."""
+        sub = self._get(name)
+        started = self._running.pop(name, None)
+        elapsed_ms = (time.perf_counter() - started) * 1000 if started is not None else 0.0
+        sub.last_run_at = datetime.datetime.utcnow().isoformat() + "Z"
+        sub.last_run_ms = round(elapsed_ms, 1)
+        if error is not None:
+            sub.error = str(error) or type(error).__name__
+            sub.failures += 1
+            metrics.inc(f"warmup.{name}.failed")
+            if sub.state != "ready":
+                sub.state = "failed"
+            return
+        sub.error = None
+        if sub.state != "ready":
+            sub.state = "ready"
+            sub.warmup_ms = sub.last_run_ms
+            metrics.observe(f"warmup.{name}_ms", elapsed_ms)
+
+    @property
+    def ready(self) -> bool:
+        """``True`` when every required subsystem is ready or disabled."""
+        return all(
+            sub.state in ("ready", "disabled")
+            for sub in self._subsystems.values()
+            if sub.required
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "uptime_s": round(time.monotonic() - self.started_at, 3),
+            "subsystems": {
+                name: {
+                    "state": sub.state,
+                    "required": sub.required,
+                    "warmup_ms": sub.warmup_ms,
+                    "last_run_at": sub.last_run_at,
+                    "last_run_ms": sub.last_run_ms,
+                    "error": sub.error,
+                    "failures": sub.failures,
+                }
+                for name, sub in self._subsystems.items()
+            },
+        }
+
+
+def jittered(interval: float, jitter: float, rng: random.Random | None = None) -> float:
+    """Return ``interval`` randomly stretched or shrunk by up to ``jitter``.
+
+    ``jitter`` is a fraction of the interval (``0.1`` = +/-10%), so replicas
+    started together do not refresh against the document servers in lockstep.
+    """
+    jitter = min(max(jitter, 0.0), 1.0)
+    rng = rng or random
+    return max(interval * (1 + rng.uniform(-jitter, jitter)), 0.0)
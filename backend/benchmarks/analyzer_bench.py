@@ -0,0 +1,69 @@
+"""Latency of the deterministic ``/analyze`` checks on 4K posters.
+
+Renders synthetic 4K posters (text blocks in several contrasts, colored
+panels, a noisy photo area), encodes them as JPEG like uploads and times
+decode + :func:`app.analyzer.analyze_image`.  Run from ``backend/``::
+
+    python -m benchmarks.analyzer_bench --posters 10
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from PIL import Image, ImageDraw, ImageFont
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.analyzer import analyze_image  # noqa:E402
+
+
+def poster_4k(seed: int, portrait: bool = True) -> bytes:
+    rnd = random.Random(seed)
+    size = (2160, 3840) if portrait else (3840, 2160)
+    img = Image.new("RGB", size, tuple(rnd.randrange(200, 256) for _ in range(3)))
+    draw = ImageDraw.Draw(img)
+    photo = Image.effect_noise((size[0] // 2, size[1] // 4), 60).convert("RGB")
+    img.paste(photo, (size[0] // 4, size[1] // 2))
+    for _ in range(4):
+        x, y = rnd.randrange(size[0] - 800), rnd.randrange(size[1] - 600)
+        draw.rectangle([x, y, x + 800, y + 600], fill=tuple(rnd.randrange(256) for _ in range(3)))
+    font = ImageFont.load_default(size=rnd.choice([48, 64, 96]))
+    for i in range(12):
+        grey = rnd.choice([0, 60, 150, 200])
+        draw.text((160, 200 + i * 140), f"Headline and body copy {i}", fill=(grey, grey, grey), font=font)
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=90)
+    return buf.getvalue()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posters", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    posters = [poster_4k(i, portrait=i % 2 == 0) for i in range(args.posters)]
+    analyze_image(posters[0])  # warm up lazy imports
+    timings = []
+    findings = 0
+    for content in posters:
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = analyze_image(content, declared_colors=["#121212", "#FFD400"])
+            timings.append((time.perf_counter() - start) * 1000)
+        findings += len(result.findings)
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{args.posters} 4K posters, {len(timings)} runs, {findings} findings")
+    print(f"decode+analyze ms: mean {statistics.mean(timings):.1f}  p50 {statistics.median(timings):.1f}  "
+          f"p95 {p95:.1f}  max {timings[-1]:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Startup-time profile of the API process.
+
+Runs ``python -X importtime`` on ``app.main`` in a fresh interpreter and
+reports the slowest imports by cumulative time, then starts the app's
+lifespan to measure boot time, peak RSS and which heavy ML stacks ended up
+loaded.  Run from ``backend/``::
+
+    python -m benchmarks.import_profile
+    APP_MODE=judging python -m benchmarks.import_profile --top 15
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+HEAVY_PACKAGES = ("langchain", "langchain_core", "langchain_community", "langchain_ollama", "llama_index")
+LINE_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+STARTUP_SNIPPET = """
+import json, resource, sys, tempfile, time, os
+os.environ.setdefault("DB_PATH", os.path.join(tempfile.mkdtemp(), "profile.db"))
+start = time.perf_counter()
+import app.main as m
+from fastapi.testclient import TestClient
+imported = time.perf_counter()
+with TestClient(m.app):
+    ready = time.perf_counter()
+print(json.dumps({
+    "import_s": round(imported - start, 3),
+    "startup_s": round(ready - imported, 3),
+    "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    "heavy_loaded": sorted(p for p in %r if p in sys.modules),
+}))
+""" % (HEAVY_PACKAGES,)
+
+
+def import_times(module: str = "app.main") -> list[tuple[int, int, int, str]]:
+    """Return ``(self_us, cumulative_us, depth, name)`` for every import."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        env=os.environ.copy(),
+        check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = LINE_RE.match(line)
+        if m:
+            rows.append((int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2, m.group(4)))
+    return rows
+
+
+def startup_profile() -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-c", STARTUP_SNIPPET],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        env=os.environ.copy(),
+        check=True,
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top", type=int, default=20, help="Number of packages to list")
+    parser.add_argument("--json", action="store_true", help="Print machine readable output")
+    args = parser.parse_args()
+
+    rows = import_times()
+    total_us = max((r[1] for r in rows if r[3] == "app.main"), default=0)
+    # Top-level packages only: nested imports are included in their parent.
+    packages: dict[str, int] = {}
+    for _, cumulative, _, name in rows:
+        root = name.split(".")[0]
+        packages[root] = max(packages.get(root, 0), cumulative)
+    top = sorted(packages.items(), key=lambda kv: kv[1], reverse=True)[: args.top]
+    startup = startup_profile()
+    report = {
+        "mode": os.getenv("APP_MODE", "full"),
+        "import_app_main_ms": round(total_us / 1000, 1),
+        "top_packages_ms": {name: round(us / 1000, 1) for name, us in top},
+        **startup,
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"mode: {report['mode']}")
+    print(f"import app.main: {report['import_app_main_ms']} ms")
+    print(f"lifespan startup: {startup['startup_s']} s, peak RSS {startup['peak_rss_mb']} MB")
+    print(f"heavy stacks loaded: {', '.join(startup['heavy_loaded']) or 'none'}")
+    print("slowest packages (cumulative ms):")
+    for name, ms in report["top_packages_ms"].items():
+        print(f"  {name:30} {ms:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Size and throughput benchmark for ledger column codecs.
+
+Builds a synthetic ledger resembling production traffic (uploads, analyze
+findings, chat turns with full Ollama responses and evaluations, Korean text
+included) and reports stored bytes plus encode/decode throughput for every
+codec.  Run from ``backend/``::
+
+    python -m benchmarks.ledger_codec_bench --events 20000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.ledger_codec import (  # noqa:E402
+    LedgerCodec,
+    ZlibCodec,
+    ZstdCodec,
+    load_dictionaries,
+    train_dictionaries,
+)
+from app.providers import compact_raw_response  # noqa:E402
+
+SCHEMAS = Path(__file__).resolve().parents[1] / "app" / "schemas"
+PHRASES = [
+    "텍스트와 배경의 대비가 낮습니다.",
+    "Text/background contrast may be below recommended ratio.",
+    "시각적 계층이 명확합니다.",
+    "Consistent 8pt grid with generous white space.",
+    "로고 여백 규정을 확인하세요.",
+]
+
+
+def synthetic_events(n: int, seed: int = 7):
+    """Yield ``(kind, payload_json, raw_output)`` tuples as the app stores them."""
+    rnd = random.Random(seed)
+    for i in range(n):
+        kind = rnd.choice(["upload", "analyze", "chat", "chat", "evaluate"])
+        text = " ".join(rnd.choice(PHRASES) for _ in range(rnd.randint(2, 8)))
+        raw = None
+        if kind == "upload":
+            payload = {"title": f"Poster {i}", "author_id": f"u_{i % 97}", "filename": f"p{i}.jpg"}
+        elif kind == "analyze":
+            payload = {
+                "findings": [
+                    {
+                        "region": {k: round(rnd.random(), 2) for k in "xywh"},
+                        "label": "Low Contrast",
+                        "confidence": round(rnd.random(), 2),
+                        "explanation": text,
+                        "citations": ["cit_kda_v1_2_3_006"],
+                    }
+                ],
+                "model_version": "lmm_stub_v0",
+                "prompt_snapshot": "Analyze visual hierarchy, contrast, typography…",
+            }
+            raw = json.dumps(payload, ensure_ascii=False)
+        elif kind == "chat":
+            payload = {"message": "대비가 충분한가요?", "answer": text, "citations": [], "model_version": "llava:7b"}
+            ollama = {
+                "model": "llava:7b",
+                "created_at": "2025-01-01T00:00:00Z",
+                "response": json.dumps({"answer": text, "citations": []}, ensure_ascii=False),
+                "done": True,
+                "context": [rnd.randint(0, 32000) for _ in range(rnd.randint(600, 2000))],
+                "total_duration": rnd.randint(10**9, 10**10),
+                "eval_count": rnd.randint(20, 200),
+            }
+            raw = ollama
+        else:
+            payload = {
+                "submission_id": f"sub_{i}",
+                "judge_id": f"j_{i % 13}",
+                "rubric_version": "1.0.0",
+                "scores": [{"criteria_id": f"C{c}", "score": rnd.randint(1, 5), "reason": text} for c in range(1, 5)],
+            }
+        yield kind, payload, raw
+
+
+def run(events: int) -> dict:
+    """Return a result dict keyed by codec variant."""
+    legacy_rows = []
+    compact_rows = []
+    for kind, payload, raw in synthetic_events(events):
+        raw_legacy = raw if isinstance(raw, str) or raw is None else json.dumps(raw, ensure_ascii=False)
+        raw_compact = raw if isinstance(raw, str) or raw is None else json.dumps(compact_raw_response(raw), ensure_ascii=False)
+        legacy_rows.append((kind, json.dumps(payload, ensure_ascii=False), raw_legacy))
+        compact_rows.append((kind, json.dumps(payload, ensure_ascii=False, separators=(",", ":")), raw_compact))
+
+    conn = sqlite3.connect(":memory:")
+    for name in ["evidence_ledger.schema.sql", "ledger_dictionaries.schema.sql"]:
+        conn.executescript((SCHEMAS / name).read_text(encoding="utf-8-sig"))
+    conn.executemany(
+        "INSERT INTO evidence_ledger(kind, submission_id, at, payload_json, raw_output) VALUES(?,'s','t',?,?)",
+        compact_rows[: min(len(compact_rows), 5000)],
+    )
+    train_dictionaries(conn)
+    variants = {
+        "legacy (pretty, with context)": (LedgerCodec(None), legacy_rows),
+        "none": (LedgerCodec(None), compact_rows),
+        "zlib": (LedgerCodec(ZlibCodec()), compact_rows),
+        "zstd": (LedgerCodec(ZstdCodec()), compact_rows),
+        "zstd+dict": (LedgerCodec(ZstdCodec(dictionaries=load_dictionaries(conn))), compact_rows),
+    }
+    results = {}
+    for name, (codec, rows) in variants.items():
+        raw_bytes = sum(len(p.encode()) + len((r or "").encode()) for _, p, r in rows)
+        start = time.perf_counter()
+        stored = [
+            (codec.encode(p, k, "payload_json"), codec.encode(r, k, "raw_output")) for k, p, r in rows
+        ]
+        encode_s = time.perf_counter() - start
+        stored_bytes = sum(
+            len(v if isinstance(v, bytes) else v.encode()) for pair in stored for v in pair if v is not None
+        )
+        start = time.perf_counter()
+        for p, r in stored:
+            codec.decode(p)
+            codec.decode(r)
+        decode_s = time.perf_counter() - start
+        results[name] = {
+            "stored_mb": round(stored_bytes / 1e6, 2),
+            "ratio_vs_legacy": None,
+            "encode_mb_s": round(raw_bytes / 1e6 / encode_s, 1),
+            "decode_mb_s": round(raw_bytes / 1e6 / decode_s, 1),
+        }
+    legacy = results["legacy (pretty, with context)"]["stored_mb"]
+    for r in results.values():
+        r["ratio_vs_legacy"] = round(legacy / r["stored_mb"], 2) if r["stored_mb"] else None
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--json", action="store_true", help="Print raw JSON results")
+    args = parser.parse_args()
+    results = run(args.events)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'codec':32} {'stored MB':>10} {'x legacy':>9} {'enc MB/s':>9} {'dec MB/s':>9}")
+    for name, r in results.items():
+        print(
+            f"{name:32} {r['stored_mb']:>10} {r['ratio_vs_legacy']:>9} {r['encode_mb_s']:>9} {r['decode_mb_s']:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+"""Load and latency benchmark of the API against local stub backends.
+
+Starts :mod:`benchmarks.stubs` (fake Ollama and document servers), seeds a
+ledger, launches the API under uvicorn in a subprocess on a temporary
+database and runs scripted workloads over HTTP:
+
+- ``uploads``: bursts of concurrent poster uploads
+- ``scoring``: a storm of judge ``/evaluate`` submissions
+- ``chat``: concurrent ``/chat`` turns through the fake vision model
+- ``export``: ``/dataset/export`` and ``/report`` over the seeded ledger
+- ``rag_refresh``: re-indexing the fake corpora through ``/rag-index/refresh``
+
+Each workload reports p50/p95/p99 latency and throughput; the server's peak
+RSS is read at the end.  ``--save`` writes the results as a JSON baseline
+and ``--baseline`` compares a run against one.  Run from ``backend/``::
+
+    python -m benchmarks.load_bench --save benchmarks/baselines/local.json
+    python -m benchmarks.load_bench --baseline benchmarks/baselines/local.json --max-regression 25
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from PIL import Image, ImageDraw
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.stubs import FakeDocs, FakeOllama  # noqa:E402
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+WORKLOADS = ("uploads", "scoring", "chat", "export", "rag_refresh")
+
+
+@dataclass
+class WorkloadResult:
+    name: str
+    requests: int
+    concurrency: int
+    errors: Dict[str, int] = field(default_factory=dict)
+    wall_s: float = 0.0
+    throughput_rps: float = 0.0
+    mean_ms: float = 0.0
+    p50_ms: float = 0.0
+    p95_ms: float = 0.0
+    p99_ms: float = 0.0
+    max_ms: float = 0.0
+
+
+def percentile(sorted_ms: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_ms:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_ms) + 0.5 - 1e-9)))
+    return sorted_ms[min(rank, len(sorted_ms)) - 1]
+
+
+async def run_workload(
+    name: str,
+    total: int,
+    concurrency: int,
+    make_request: Callable[[int], Awaitable[httpx.Response]],
+) -> WorkloadResult:
+    """Issue ``total`` requests with at most ``concurrency`` in flight."""
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    counter = iter(range(total))
+
+    async def worker() -> None:
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                resp = await make_request(i)
+                ok, label = resp.status_code < 400, str(resp.status_code)
+            except httpx.HTTPError as exc:
+                ok, label = False, type(exc).__name__
+            elapsed = (time.perf_counter() - start) * 1000
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors[label] = errors.get(label, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return WorkloadResult(
+        name=name,
+        requests=total,
+        concurrency=concurrency,
+        errors=errors,
+        wall_s=round(wall, 3),
+        throughput_rps=round(len(latencies) / wall, 2) if wall else 0.0,
+        mean_ms=round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        p50_ms=round(percentile(latencies, 50), 2),
+        p95_ms=round(percentile(latencies, 95), 2),
+        p99_ms=round(percentile(latencies, 99), 2),
+        max_ms=round(latencies[-1], 2) if latencies else 0.0,
+    )
+
+
+def poster_png(seed: int, size: int = 512) -> bytes:
+    rnd = random.Random(seed)
+    img = Image.new("RGB", (size, size), tuple(rnd.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(img)
+    for _ in range(8):
+        x, y = rnd.randrange(size), rnd.randrange(size)
+        draw.rectangle([x, y, x + rnd.randrange(20, 200), y + rnd.randrange(20, 200)],
+                       fill=tuple(rnd.randrange(256) for _ in range(3)))
+    draw.text((20, 20), f"Poster {seed}", fill=(0, 0, 0))
+    buf = io.BytesIO()
+    img.save(buf, "PNG")
+    return buf.getvalue()
+
+
+def seed_ledger(env: Dict[str, str], submissions: int) -> None:
+    """Write upload/analyze/evaluate events for ``submissions`` ids.
+
+    Runs in a subprocess so ``app.core.paths`` picks up the benchmark
+    ``DB_PATH`` and the ledger codec matches what the server will load.
+    """
+    script = f"""
+import base64, random, sqlite3
+from app.main import init_db, DB_PATH
+from app.core.config import load_config
+from app.ledger_codec import load_ledger_codec
+from app.ledger_writer import LedgerEvent, insert_events
+from benchmarks.load_bench import poster_png
+init_db()
+conn = sqlite3.connect(DB_PATH)
+codec = load_ledger_codec(conn, load_config().ledger)
+images = [base64.b64encode(poster_png(i, 256)).decode() for i in range(16)]
+rnd = random.Random(0)
+batch = []
+for i in range({submissions}):
+    sid = f"sub_seed_{{i:06d}}"
+    batch.append(LedgerEvent("upload", sid, {{"submission_id": sid, "title": f"Seed {{i}}"}}, image=images[i % 16]))
+    batch.append(LedgerEvent("analyze", sid, {{"findings": [{{"label": "Low Contrast", "confidence": 0.7}}]}}))
+    batch.append(LedgerEvent("evaluate", sid, {{"scores": [{{"criteria_id": "C1", "score": rnd.randint(1, 5)}}]}}))
+    if len(batch) >= 3000:
+        insert_events(conn, codec, batch); conn.commit(); batch = []
+insert_events(conn, codec, batch)
+conn.commit()
+conn.close()
+"""
+    subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR, env=env, check=True)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def peak_rss_mb(pid: int) -> Optional[float]:
+    """``VmHWM`` of ``pid`` (Linux only)."""
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+async def wait_ready(client: httpx.AsyncClient, proc: subprocess.Popen, timeout: float = 120) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"API exited with code {proc.returncode}")
+        try:
+            if (await client.get("/readyz")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("API did not become ready")
+
+
+async def run_suite(args: argparse.Namespace, base_url: str) -> List[WorkloadResult]:
+    results = []
+    limits = httpx.Limits(max_connections=max(args.concurrency, 64))
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        posters = [poster_png(i) for i in range(args.uploads)]
+        sids: List[str] = []
+
+        async def upload(i: int) -> httpx.Response:
+            resp = await client.post(
+                "/uploads",
+                data={"title": f"Poster {i}", "author_id": f"u_{i % 50}"},
+                files={"file": (f"p{i}.png", posters[i], "image/png")},
+            )
+            if resp.status_code == 200:
+                sids.append(resp.json()["submission_id"])
+            return resp
+
+        rubric = (await client.get("/rubrics")).json()["rubrics"][0]
+        criteria = rubric["criteria"]
+
+        async def score(i: int) -> httpx.Response:
+            sid = sids[i % len(sids)] if sids else f"sub_seed_{i % args.seed_submissions:06d}"
+            return await client.post("/evaluate", json={
+                "submission_id": sid,
+                "judge_id": f"judge_{i % 40}",
+                "award_id": rubric["award_id"],
+                "rubric_version": rubric["version"],
+                "scores": [{"criteria_id": c, "score": 1 + (i + n) % 5} for n, c in enumerate(criteria)],
+            })
+
+        async def chat(i: int) -> httpx.Response:
+            return await client.post("/chat", json={
+                "submission_id": sids[i % len(sids)],
+                "message": f"How could the hierarchy of this poster improve? ({i % args.chat_variety})",
+            })
+
+        async def export(i: int) -> httpx.Response:
+            if i % 20 == 0:
+                return await client.get("/dataset/export")
+            return await client.get(f"/report/sub_seed_{(i * 7919) % args.seed_submissions:06d}", params={"limit": 100})
+
+        async def rag_refresh(i: int) -> httpx.Response:
+            return await client.post("/rag-index/refresh")
+
+        plan = {
+            "uploads": (args.uploads, args.concurrency, upload),
+            "scoring": (args.evaluations, args.concurrency, score),
+            "chat": (args.chats, args.chat_concurrency, chat),
+            "export": (args.exports, min(args.concurrency, 8), export),
+            "rag_refresh": (args.refreshes, 1, rag_refresh),
+        }
+        for name in args.workloads:
+            if name == "chat" and not sids:
+                continue
+            total, concurrency, fn = plan[name]
+            result = await run_workload(name, total, concurrency, fn)
+            results.append(result)
+            print(format_result(result), flush=True)
+    return results
+
+
+def format_result(r: WorkloadResult) -> str:
+    errors = f"  errors {r.errors}" if r.errors else ""
+    return (f"{r.name:<12} n={r.requests:<5} c={r.concurrency:<3} {r.throughput_rps:8.1f} req/s  "
+            f"p50 {r.p50_ms:8.1f}  p95 {r.p95_ms:8.1f}  p99 {r.p99_ms:8.1f} ms{errors}")
+
+
+def compare(current: dict, baseline: dict, max_regression: float) -> List[str]:
+    """Return regressions beyond ``max_regression`` percent (p95 and throughput)."""
+    old = {w["name"]: w for w in baseline["workloads"]}
+    regressions = []
+    for w in current["workloads"]:
+        prev = old.get(w["name"])
+        if prev is None:
+            continue
+        p95 = (w["p95_ms"] / prev["p95_ms"] - 1) * 100 if prev["p95_ms"] else 0.0
+        rps = (w["throughput_rps"] / prev["throughput_rps"] - 1) * 100 if prev["throughput_rps"] else 0.0
+        print(f"{w['name']:<12} p95 {prev['p95_ms']:8.1f} -> {w['p95_ms']:8.1f} ms ({p95:+.1f}%)  "
+              f"throughput {prev['throughput_rps']:.1f} -> {w['throughput_rps']:.1f} ({rps:+.1f}%)")
+        if p95 > max_regression:
+            regressions.append(f"{w['name']}: p95 +{p95:.1f}%")
+        if rps < -max_regression:
+            regressions.append(f"{w['name']}: throughput {rps:.1f}%")
+    old_rss, rss = baseline.get("server_peak_rss_mb"), current.get("server_peak_rss_mb")
+    if old_rss and rss:
+        delta = (rss / old_rss - 1) * 100
+        print(f"{'peak rss':<12} {old_rss:.1f} -> {rss:.1f} MB ({delta:+.1f}%)")
+        if delta > max_regression:
+            regressions.append(f"peak RSS +{delta:.1f}%")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workloads", nargs="+", choices=WORKLOADS, default=list(WORKLOADS))
+    parser.add_argument("--uploads", type=int, default=200)
+    parser.add_argument("--evaluations", type=int, default=2000)
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--chat-variety", type=int, default=50,
+                        help="distinct chat prompts; repeats exercise request coalescing")
+    parser.add_argument("--exports", type=int, default=100)
+    parser.add_argument("--refreshes", type=int, default=3)
+    parser.add_argument("--seed-submissions", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--chat-concurrency", type=int, default=16)
+    parser.add_argument("--ollama-latency-ms", type=float, default=200.0)
+    parser.add_argument("--ollama-token-ms", type=float, default=2.0)
+    parser.add_argument("--ollama-error-rate", type=float, default=0.0)
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--save", type=Path, help="write results to this JSON baseline")
+    parser.add_argument("--baseline", type=Path, help="compare against this JSON baseline")
+    parser.add_argument("--max-regression", type=float, default=20.0,
+                        help="percent; exit 1 when p95, throughput or RSS regress further")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="design-eval-bench-"))
+    with FakeOllama(latency_ms=args.ollama_latency_ms, token_ms=args.ollama_token_ms,
+                    error_rate=args.ollama_error_rate) as ollama, FakeDocs(count=args.docs) as docs:
+        rag_yaml = workdir / "rag.yaml"
+        rag_yaml.write_text(json.dumps({
+            "expert_url": f"{docs.url}/expert",
+            "evaluation_url": f"{docs.url}/evaluation",
+            "embed_backend": "ollama",
+            "embed_base_url": ollama.url,
+        }), encoding="utf-8")
+        env = {
+            **os.environ,
+            "DATA_DIR": str(workdir),
+            "DB_PATH": str(workdir / "bench.db"),
+            "ARCHIVE_DIR": str(workdir / "archive"),
+            "OLLAMA_URL": ollama.url,
+            "RAG_CONFIG": str(rag_yaml),
+            "PYTHONPATH": str(BACKEND_DIR),
+        }
+        print(f"seeding {args.seed_submissions} submissions into {env['DB_PATH']}", flush=True)
+        seed_ledger(env, args.seed_submissions)
+        port = free_port()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=env,
+        )
+        try:
+            async def go() -> List[WorkloadResult]:
+                async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as probe:
+                    await wait_ready(probe, proc)
+                return await run_suite(args, f"http://127.0.0.1:{port}")
+
+            results = asyncio.run(go())
+            rss = peak_rss_mb(proc.pid)
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                # Requests still running in worker threads block a graceful exit.
+                proc.kill()
+                proc.wait()
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "settings": {k: v for k, v in vars(args).items() if k not in {"save", "baseline"}},
+        "server_peak_rss_mb": rss,
+        "workloads": [asdict(r) for r in results],
+    }
+    print(f"server peak RSS: {rss} MB")
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"baseline written to {args.save}")
+    if args.baseline:
+        regressions = compare(report, json.loads(args.baseline.read_text(encoding="utf-8")), args.max_regression)
+        if regressions:
+            print("REGRESSIONS: " + "; ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
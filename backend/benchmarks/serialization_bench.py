@@ -0,0 +1,110 @@
+"""Serialization benchmark for reports, exports and ledger writes.
+
+Compares the previous path (``json.loads`` every stored payload, let FastAPI
+``jsonable_encoder`` walk the result, render with the stdlib) with the
+current one (stored payloads embedded as raw fragments, rendered by
+:class:`app.serialization.FastJSONResponse`).  Run from ``backend/``::
+
+    python -m benchmarks.serialization_bench --events 20000 --submissions 500
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from fastapi.encoders import jsonable_encoder  # noqa:E402
+from starlette.responses import JSONResponse  # noqa:E402
+
+from app.schemas import AnalyzeResponse  # noqa:E402
+from app.serialization import FastJSONResponse, dumps_str, loads, raw  # noqa:E402
+from benchmarks.ledger_codec_bench import synthetic_events  # noqa:E402
+
+
+def best_of(fn: Callable[[], object], repeat: int) -> float:
+    """Fastest of ``repeat`` runs in milliseconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times)
+
+
+def run(events: int, submissions: int, image_kb: int, repeat: int = 3) -> Dict[str, Dict[str, float]]:
+    stored = [(i, kind, "2025-01-01T00:00:00Z", json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
+              for i, (kind, payload, _) in enumerate(synthetic_events(events))]
+    rnd = random.Random(3)
+    image = base64.b64encode(rnd.randbytes(image_kb * 1024)).decode("ascii")
+    analyzed = [p for _, k, _, p in stored if k == "analyze"]
+    evaluated = [p for _, k, _, p in stored if k == "evaluate"]
+    export_rows = [(image, analyzed[i % len(analyzed)], evaluated[i % len(evaluated)]) for i in range(submissions)]
+
+    def report_old():
+        items = [{"id": i, "kind": k, "at": at, "payload": json.loads(p)} for i, k, at, p in stored]
+        return JSONResponse(jsonable_encoder({"submission_id": "s", "events": items, "next_after": None})).body
+
+    def report_new():
+        items = [{"id": i, "kind": k, "at": at, "payload": raw(p)} for i, k, at, p in stored]
+        return FastJSONResponse({"submission_id": "s", "events": items, "next_after": None}).body
+
+    def export_old():
+        data = [{"image": img, "findings": json.loads(a)["findings"], "corrections": json.loads(e)} for img, a, e in export_rows]
+        return JSONResponse(jsonable_encoder({"data": data})).body
+
+    def export_new():
+        data = [{"image": img, "findings": loads(a)["findings"], "corrections": raw(e)} for img, a, e in export_rows]
+        return FastJSONResponse({"data": data}).body
+
+    responses = [AnalyzeResponse.model_validate(json.loads(p)) for p in analyzed[:2000]]
+
+    def analyze_log_old():
+        for resp in responses:
+            resp.model_dump_json()
+            json.dumps(resp.model_dump(), ensure_ascii=False, separators=(",", ":"))
+
+    def analyze_log_new():
+        for resp in responses:
+            payload = resp.model_dump(mode="json")
+            dumps_str(payload)
+            dumps_str(payload)
+
+    assert json.loads(report_old()) == json.loads(report_new())
+    assert json.loads(export_old()) == json.loads(export_new())
+    cases = {
+        f"report ({events} events)": (report_old, report_new),
+        f"export ({submissions} x {image_kb} KB images)": (export_old, export_new),
+        f"analyze ledger write ({len(responses)}x)": (analyze_log_old, analyze_log_new),
+    }
+    results = {}
+    for name, (old, new) in cases.items():
+        old_ms, new_ms = best_of(old, repeat), best_of(new, repeat)
+        results[name] = {"old_ms": round(old_ms, 1), "new_ms": round(new_ms, 1), "speedup": round(old_ms / new_ms, 1)}
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--submissions", type=int, default=500)
+    parser.add_argument("--image-kb", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="Print raw JSON results")
+    args = parser.parse_args()
+    results = run(args.events, args.submissions, args.image_kb)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'case':44} {'old ms':>9} {'new ms':>9} {'speedup':>8}")
+    for name, r in results.items():
+        print(f"{name:44} {r['old_ms']:>9} {r['new_ms']:>9} {r['speedup']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""Local stand-ins for Ollama and the RAG document servers.
+
+:class:`FakeOllama` answers ``/api/generate`` (plain and NDJSON streaming,
+with a configurable first-token latency, per-token delay and error rate),
+``/api/embed`` with deterministic vectors, and ``keep_alive`` preloads.
+Generations return a JSON ``{"answer", "citations"}`` string so the
+structured ``/chat`` parser accepts them.  :class:`FakeDocs` serves the
+``[{"id", "text"}]`` lists that :func:`app.rag.fetch_documents` expects.
+
+Both run on a background thread; use them as context managers.  To point a
+manually started API at them, run from ``backend/``::
+
+    python -m benchmarks.stubs --ollama-port 11434 --latency-ms 300
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import random
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+WORDS = (
+    "contrast hierarchy grid margin palette logo typography spacing balance "
+    "대비 여백 정렬 위계 팔레트 색상 가독성"
+).split()
+
+
+class _Server:
+    """ThreadingHTTPServer on an ephemeral (or given) port in a daemon thread."""
+
+    def __init__(self, port: int = 0) -> None:
+        self.port = port
+        self._httpd: ThreadingHTTPServer | None = None
+        self.requests = 0
+
+    def handler(self) -> type[BaseHTTPRequestHandler]:
+        raise NotImplementedError
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def start(self) -> "_Server":
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", self.port), self.handler())
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args: Any) -> None:  # keep benchmark output clean
+        pass
+
+    def _json(self, status: int, body: Any) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+
+class FakeOllama(_Server):
+    def __init__(
+        self,
+        port: int = 0,
+        latency_ms: float = 200.0,
+        token_ms: float = 5.0,
+        tokens: int = 40,
+        error_rate: float = 0.0,
+        embed_dim: int = 64,
+        seed: int = 0,
+    ) -> None:
+        super().__init__(port)
+        self.latency_ms = latency_ms
+        self.token_ms = token_ms
+        self.tokens = tokens
+        self.error_rate = error_rate
+        self.embed_dim = embed_dim
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.loaded: set[str] = set()
+
+    def _fail(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            return self.rng.random() < self.error_rate
+
+    def answer_tokens(self, prompt: str) -> List[str]:
+        rnd = random.Random(hashlib.sha256(prompt.encode("utf-8")).digest())
+        return [rnd.choice(WORDS) for _ in range(self.tokens)]
+
+    def embed(self, text: str) -> List[float]:
+        digest = hashlib.shake_256(text.encode("utf-8")).digest(self.embed_dim * 2)
+        return [v / 32768.0 for v in struct.unpack(f"<{self.embed_dim}h", digest)]
+
+    def handler(self) -> type[BaseHTTPRequestHandler]:
+        fake = self
+
+        class Handler(_Handler):
+            def do_POST(self) -> None:
+                body = self._body()
+                if fake._fail():
+                    self._json(500, {"error": "injected failure"})
+                    return
+                if self.path == "/api/embed":
+                    inputs = body.get("input") or []
+                    inputs = [inputs] if isinstance(inputs, str) else inputs
+                    self._json(200, {"model": body.get("model"), "embeddings": [fake.embed(t) for t in inputs]})
+                elif self.path == "/api/generate":
+                    self._generate(body)
+                else:
+                    self._json(404, {"error": "not found"})
+
+            def _generate(self, body: Dict[str, Any]) -> None:
+                model = body.get("model", "")
+                if not body.get("prompt"):
+                    # keep_alive preload: the first load of a model is slow.
+                    if model not in fake.loaded:
+                        time.sleep(fake.latency_ms / 1000)
+                        fake.loaded.add(model)
+                    self._json(200, {"model": model, "response": "", "done": True})
+                    return
+                time.sleep(fake.latency_ms / 1000)
+                tokens = fake.answer_tokens(body["prompt"])
+                answer = json.dumps({"answer": " ".join(tokens), "citations": []}, ensure_ascii=False)
+                if not body.get("stream", True):
+                    time.sleep(fake.token_ms * len(tokens) / 1000)
+                    self._json(200, {"model": model, "response": answer, "done": True, "eval_count": len(tokens)})
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                step = max(1, len(answer) // len(tokens))
+                for i in range(0, len(answer), step):
+                    time.sleep(fake.token_ms / 1000)
+                    self._chunk({"model": model, "response": answer[i:i + step], "done": False})
+                self._chunk({"model": model, "response": "", "done": True, "eval_count": len(tokens)})
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _chunk(self, obj: Dict[str, Any]) -> None:
+                data = json.dumps(obj, ensure_ascii=False).encode("utf-8") + b"\n"
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+        return Handler
+
+
+class FakeDocs(_Server):
+    """Serves ``count`` synthetic guideline documents at any GET path."""
+
+    def __init__(self, port: int = 0, count: int = 200, words: int = 120, seed: int = 0) -> None:
+        super().__init__(port)
+        rnd = random.Random(seed)
+        self.docs = [
+            {"id": f"doc_{i:05d}", "text": " ".join(rnd.choice(WORDS) for _ in range(words))}
+            for i in range(count)
+        ]
+
+    def handler(self) -> type[BaseHTTPRequestHandler]:
+        fake = self
+
+        class Handler(_Handler):
+            def do_GET(self) -> None:
+                fake.requests += 1
+                self._json(200, fake.docs)
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ollama-port", type=int, default=11434)
+    parser.add_argument("--docs-port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--token-ms", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    with FakeOllama(args.ollama_port, args.latency_ms, args.token_ms, error_rate=args.error_rate) as ollama, \
+            FakeDocs(args.docs_port) as docs:
+        print(f"fake ollama at {ollama.url}, documents at {docs.url}/docs (Ctrl+C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""End-to-end latency of vision calls with original vs. derivative images.
+
+Generates sample posters (print-resolution JPEGs with EXIF, just under the
+2 MB upload limit) and times a vision request three ways: sending the
+original upload, preprocessing on a cold cache, and reusing the cached
+derivative.  By default requests go to a local stand-in server that decodes
+and resizes the image like the model runner does; pass ``--ollama-url`` to
+measure against a real Ollama with the vision model pulled.  Run from
+``backend/``::
+
+    python -m benchmarks.vision_preprocess_bench --posters 5
+    python -m benchmarks.vision_preprocess_bench --ollama-url http://localhost:11434 --repeat 2
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import io
+import json
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+from PIL import Image, ImageDraw
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.imaging import DerivativeStore  # noqa:E402
+
+SCHEMAS = Path(__file__).resolve().parents[1] / "app" / "schemas"
+UPLOAD_LIMIT = 2 * 1024 * 1024
+
+
+def sample_poster(seed: int, size=(2480, 3508)) -> bytes:
+    """A4 @ 300 dpi poster with blocks, text bars and noise, JPEG under 2 MB."""
+    rnd = random.Random(seed)
+    img = Image.effect_noise(size, 40).convert("RGB")
+    draw = ImageDraw.Draw(img)
+    for _ in range(40):
+        x, y = rnd.randrange(size[0]), rnd.randrange(size[1])
+        w, h = rnd.randrange(100, 900), rnd.randrange(20, 600)
+        draw.rectangle([x, y, x + w, y + h], fill=tuple(rnd.randrange(256) for _ in range(3)))
+    exif = Image.Exif()
+    exif[0x010F] = "BenchCamera"
+    exif[0x0112] = 1
+    for quality in (92, 85, 75, 60, 45):
+        buf = io.BytesIO()
+        img.save(buf, "JPEG", quality=quality, exif=exif.tobytes())
+        if buf.tell() <= UPLOAD_LIMIT:
+            return buf.getvalue()
+    return buf.getvalue()
+
+
+class _FakeVisionHandler(BaseHTTPRequestHandler):
+    """Decode every image and resize it to the vision encoder input."""
+
+    def do_POST(self):  # noqa: N802
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        for image_b64 in body.get("images", []):
+            img = Image.open(io.BytesIO(base64.b64decode(image_b64))).convert("RGB")
+            img.resize((336, 336))
+        out = json.dumps({"model": body.get("model"), "response": "ok"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_fake_server() -> tuple[ThreadingHTTPServer, str]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeVisionHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def call(client: httpx.Client, url: str, model: str, image_b64: str) -> None:
+    resp = client.post(
+        f"{url}/api/generate",
+        json={"model": model, "prompt": "Describe the poster", "images": [image_b64], "stream": False},
+        timeout=300,
+    )
+    resp.raise_for_status()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posters", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5, help="Timed calls per poster and variant")
+    parser.add_argument("--max-side", type=int, default=672)
+    parser.add_argument("--quality", type=int, default=85)
+    parser.add_argument("--ollama-url", help="Benchmark a real Ollama instead of the local stand-in")
+    parser.add_argument("--model", default="llava:7b")
+    args = parser.parse_args()
+
+    server = None
+    url = args.ollama_url
+    if url is None:
+        server, url = start_fake_server()
+    posters = [sample_poster(i) for i in range(args.posters)]
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "bench.db"
+        conn = sqlite3.connect(db)
+        conn.executescript((SCHEMAS / "image_derivatives.schema.sql").read_text(encoding="utf-8"))
+        conn.close()
+        store = DerivativeStore(db, max_side=args.max_side, quality=args.quality)
+        timings = {"original": [], "derivative_cold": [], "derivative_cached": []}
+        sizes = {"original": [], "derivative": []}
+        with httpx.Client() as client:
+            for content in posters:
+                sizes["original"].append(len(content))
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    call(client, url, args.model, base64.b64encode(content).decode())
+                    timings["original"].append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                derivative = store.ingest(content)
+                call(client, url, args.model, derivative.image_b64)
+                timings["derivative_cold"].append(time.perf_counter() - start)
+                sizes["derivative"].append(derivative.size)
+
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    derivative = store.ingest(content)
+                    call(client, url, args.model, derivative.image_b64)
+                    timings["derivative_cached"].append(time.perf_counter() - start)
+    if server is not None:
+        server.shutdown()
+
+    target = "ollama" if args.ollama_url else "local stand-in"
+    print(f"{args.posters} posters, target: {target}")
+    print(
+        f"payload: original {statistics.mean(sizes['original']) / 1024:.0f} KiB, "
+        f"derivative {statistics.mean(sizes['derivative']) / 1024:.0f} KiB"
+    )
+    print(f"{'variant':20} {'mean ms':>9} {'p50 ms':>9} {'max ms':>9}")
+    for name, values in timings.items():
+        ms = [v * 1000 for v in values]
+        print(f"{name:20} {statistics.mean(ms):9.1f} {statistics.median(ms):9.1f} {max(ms):9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,13 @@
 import { useEffect, useState } from "react";
-import api from "./api";
+import api, { setIdentity } from "./api";
 import { ReportEvent } from "./types";
 import RagEval from "./components/RagEval";
 import VisionAnalyze from "./components/VisionAnalyze";
 import Moderate from "./components/Moderate";
 
+const DEMO_USER = "u_demo";
+setIdentity({ userId: DEMO_USER });
+
 export default function App(){
   const [sid, setSid] = useState<string>("");
   const [events, setEvents] = useState<ReportEvent[]>([]);
@@ -43,7 +46,7 @@ export default function App(){
     try {
       const u = await api.upload({
         title: "Demo",
-        author_id: "u_demo",
+        author_id: DEMO_USER,
         file: imageFile,
       });
       submissionId = u.submission_id;
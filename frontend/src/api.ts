@@ -17,6 +17,21 @@ const API_BASE = (
   "http://localhost:8000"
 ).replace(/\/+$/, "");
 
+// Judge/user the UI acts as; sent on every call so the API's admission
+// control gives each of them their own rate limit.
+const identity: { judgeId?: string; userId?: string } = {};
+
+export const setIdentity = (next: { judgeId?: string; userId?: string }) => {
+  Object.assign(identity, next);
+};
+
+const identityHeaders = (): Record<string, string> => {
+  const h: Record<string, string> = {};
+  if (identity.judgeId) h["X-Judge-Id"] = identity.judgeId;
+  if (identity.userId) h["X-User-Id"] = identity.userId;
+  return h;
+};
+
 const j = async <T>(
   method: string,
   path: string,
@@ -25,7 +40,9 @@ const j = async <T>(
   try {
     const res = await fetch(API_BASE + path, {
       method,
-      headers: body ? { "Content-Type": "application/json" } : undefined,
+      headers: body
+        ? { "Content-Type": "application/json", ...identityHeaders() }
+        : identityHeaders(),
       body: body ? JSON.stringify(body) : undefined,
     });
     if (!res.ok) {
@@ -47,12 +64,18 @@ upload: (p: {
     file?: File;
     meta?: any;
   }) => {
+    setIdentity({ userId: p.author_id });
     if (p.file) {
       const form = new FormData();
       form.append("title", p.title);
       form.append("author_id", p.author_id);
+      if (p.meta) form.append("meta", JSON.stringify(p.meta));
       form.append("file", p.file);
-      return fetch(API_BASE + "/uploads", { method: "POST", body: form }).then(
+      return fetch(API_BASE + "/uploads", {
+        method: "POST",
+        headers: identityHeaders(),
+        body: form,
+      }).then(
         async (r) => {
           if (!r.ok) {
             const msg = await r.text();
@@ -74,6 +97,7 @@ upload: (p: {
     if (prompt) form.append("prompt", prompt);
     return fetch(API_BASE + "/analyze-vision", {
       method: "POST",
+      headers: identityHeaders(),
       body: form,
     }).then(async (r) => {
       if (!r.ok) {
@@ -90,7 +114,7 @@ upload: (p: {
     try {
       const res = await fetch(API_BASE + "/chat", {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
+        headers: { "Content-Type": "application/json", ...identityHeaders() },
         body: JSON.stringify({ submission_id, message }),
         signal: controller.signal,
       });
@@ -124,13 +148,29 @@ upload: (p: {
 
   rubric: () => j<RubricDSL>("GET", "/rubrics/aw_2025_kda/1.0.0"),
 
-  evaluate: (rec: any) => j<any>("POST", "/evaluate", rec),
+  evaluate: (rec: any) => {
+    if (rec?.judge_id) setIdentity({ judgeId: String(rec.judge_id) });
+    return j<any>("POST", "/evaluate", rec);
+  },
 
-  report: (sid: string) =>
-    j<{ submission_id: string; events: ReportEvent[] }>(
-      "GET",
-      `/report/${sid}`,
-    ),
+  // /report pages by ledger id; follow next_after so long reports are whole.
+  report: async (sid: string) => {
+    const events: ReportEvent[] = [];
+    let after: number | null = null;
+    do {
+      const page: {
+        submission_id: string;
+        events: ReportEvent[];
+        next_after: number | null;
+      } = await j(
+        "GET",
+        `/report/${sid}?limit=1000` + (after === null ? "" : `&after=${after}`),
+      );
+      events.push(...page.events);
+      after = page.next_after;
+    } while (after !== null);
+    return { submission_id: sid, events };
+  },
 
   createProject: (name: string) => j<Project>("POST", "/projects", { name }),
   listProjects: () =>
@@ -12,6 +12,7 @@ export default function RubricForm({ rubric, submissionId, onSubmitted }: Props)
       submission_id: submissionId,
       judge_id: "u_demo_judge",
       rubric_version: rubric.version,
+      award_id: rubric.award_id,
       scores: rubric.criteria.map(c => ({
         criteria_id: c.id,
         score: Number(scores[c.id] || 0),
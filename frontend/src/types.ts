@@ -7,8 +7,8 @@
   aggregation: { method: "weighted_mean"|"median"|"trimmed_mean"; outlier_policy?: string };
 };
 export type AnalyzeFinding = { region:{x:number;y:number;w:number;h:number}; label:string; confidence:number; explanation:string; citations?:string[]; };
-export type AnalyzeResponse = { findings: AnalyzeFinding[]; model_version:string; prompt_snapshot:string; };
-export type ReportEvent = { kind: string; at: string; payload: any };
+export type AnalyzeResponse = { findings: AnalyzeFinding[]; model_version:string; prompt_snapshot:string; checks?: Record<string, any>; };
+export type ReportEvent = { id?: number; kind: string; at: string; payload: any; image?: string; raw_output?: string };
 export type Project = { project_id:number; name:string; created_at:string };
 export type Submission = { submission_id:number; project_id?:number; title:string; created_at:string };
 export type Judge = { judge_id:number; name:string; created_at:string };
@@ -33,6 +33,7 @@ export type EvaluateRequest = {
   submission_id: string;
   judge_id: string;
   rubric_version: string;
+  award_id?: string;
   scores: Array<{
     criteria_id: string;
     score: number;